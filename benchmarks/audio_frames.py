@@ -0,0 +1,161 @@
+"""Audio frame path microbenchmark: CPU per call-second and allocations per frame.
+
+Pushes 48 kHz room audio in 10 ms frames through the frame handling of the
+input path, as laid out before and after ``audio_path``:
+
+* ``three_resamplers``: the room stream resampled to RoomIO's default of 24 kHz,
+  then google.STT's stream and silero VAD each resampling to 16 kHz on their own;
+* ``single_resampler``: the room stream resampled to 16 kHz once, STT and VAD
+  reading the same frames.
+
+Both paths also do what STT and VAD do with every frame regardless (STT copies
+the PCM into its request, VAD converts it to float), so the difference is the
+resampling and the frames it allocates. VAD inference itself is the same in
+both and left out. Allocations are counted with ``tracemalloc``, in a separate
+pass from the CPU timing.
+
+    uv run python benchmarks/audio_frames.py
+    uv run python benchmarks/audio_frames.py --seconds 120 --json audio.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from livekit import rtc
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from audio_path import INPUT_SAMPLE_RATE, frame_of, samples
+from fakes import synthetic_speech
+
+ROOM_SAMPLE_RATE = 48000
+ROOM_IO_DEFAULT_RATE = 24000
+FRAME_MS = 10
+
+
+def _consume(frame: rtc.AudioFrame) -> None:
+    frame.data.tobytes()  # STT: PCM into the request
+    samples(frame).astype(np.float32)  # VAD: input of the model
+
+
+def three_resamplers() -> Callable[[rtc.AudioFrame], int]:
+    room = rtc.AudioResampler(ROOM_SAMPLE_RATE, ROOM_IO_DEFAULT_RATE)
+    stt = rtc.AudioResampler(
+        ROOM_IO_DEFAULT_RATE, INPUT_SAMPLE_RATE, quality=rtc.AudioResamplerQuality.HIGH
+    )
+    vad = rtc.AudioResampler(
+        ROOM_IO_DEFAULT_RATE, INPUT_SAMPLE_RATE, quality=rtc.AudioResamplerQuality.QUICK
+    )
+
+    def _push(frame: rtc.AudioFrame) -> int:
+        frames = 0
+        for room_frame in room.push(frame):
+            frames += 1
+            for resampler in (stt, vad):
+                for resampled in resampler.push(room_frame):
+                    frames += 1
+                    _consume(resampled)
+        return frames
+
+    return _push
+
+
+def single_resampler() -> Callable[[rtc.AudioFrame], int]:
+    room = rtc.AudioResampler(ROOM_SAMPLE_RATE, INPUT_SAMPLE_RATE)
+
+    def _push(frame: rtc.AudioFrame) -> int:
+        frames = 0
+        for room_frame in room.push(frame):
+            frames += 1
+            _consume(room_frame)
+        return frames
+
+    return _push
+
+
+PATHS = {"three_resamplers": three_resamplers, "single_resampler": single_resampler}
+
+
+def _room_frames(seconds: float) -> list[rtc.AudioFrame]:
+    audio = synthetic_speech(seconds, sample_rate=ROOM_SAMPLE_RATE)
+    step = ROOM_SAMPLE_RATE * FRAME_MS // 1000
+    return [
+        frame_of(audio[i : i + step], sample_rate=ROOM_SAMPLE_RATE)
+        for i in range(0, len(audio) - step + 1, step)
+    ]
+
+
+def _measure(path: str, frames: list[rtc.AudioFrame], seconds: float) -> dict:
+    push = PATHS[path]()
+    started = time.process_time()
+    for frame in frames:
+        push(frame)
+    cpu = time.process_time() - started
+
+    # allocations in a second pass, tracing slows everything down
+    push = PATHS[path]()
+    allocated, created = 0, 0
+    tracemalloc.start()
+    for frame in frames:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        created += push(frame)
+        allocated += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+
+    return {
+        "cpu_ms_per_call_second": cpu / seconds * 1000,
+        "frames_per_frame": created / len(frames),
+        "bytes_per_frame": allocated / len(frames),
+    }
+
+
+def run_benchmark(*, seconds: float = 60.0) -> dict[str, Any]:
+    frames = _room_frames(seconds)
+    return {
+        "seconds": seconds,
+        "frames": len(frames),
+        "paths": {path: _measure(path, frames, seconds) for path in PATHS},
+    }
+
+
+def print_report(report: dict[str, Any]) -> None:
+    print(
+        f"\n{report['seconds']:.0f} s of 48 kHz room audio, "
+        f"{report['frames']} frames of {FRAME_MS} ms"
+    )
+    print(
+        f"  {'path':<18} {'CPU ms/call-s':>14} {'frames/frame':>13} "
+        f"{'bytes/frame':>12} {'calls/core':>11}"
+    )
+    for path, result in report["paths"].items():
+        cpu = result["cpu_ms_per_call_second"]
+        print(
+            f"  {path:<18} {cpu:>14.3f} {result['frames_per_frame']:>13.2f} "
+            f"{result['bytes_per_frame']:>12.0f} {1000 / cpu:>11.0f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--seconds", type=float, default=60.0, help="audio per path")
+    parser.add_argument("--json", type=Path, help="also write the report here")
+    args = parser.parse_args()
+
+    report = run_benchmark(seconds=args.seconds)
+    print_report(report)
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
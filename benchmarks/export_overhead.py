@@ -0,0 +1,211 @@
+"""Per-event cost of metrics logging on the event loop.
+
+Replays the work of the agent's ``metrics_collected`` handler, ``log_metrics``
+plus ``UsageCollector.collect``, for a stream of STT, LLM, TTS and EOU metrics,
+and times each event on the calling thread, i.e. what the audio loop pays. The
+root handler is the one of a job process (livekit's IPC handler, over a
+socketpair) or of dev mode (JSON to a stream), called inline or through
+``ExportPipeline``. ``--slow-sink-ms`` adds a handler that stalls per record,
+like a log shipper under back pressure.
+
+    uv run python benchmarks/export_overhead.py
+    uv run python benchmarks/export_overhead.py --handler stream --slow-sink-ms 2
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from livekit.agents import metrics
+from livekit.agents.cli.log import JsonFormatter
+from livekit.agents.ipc.log_queue import LogQueueHandler
+from livekit.agents.utils.aio import duplex_unix
+
+from export_pipeline import ExportPipeline
+from latency_tracer import QUANTILES
+
+
+def _metric(n: int) -> metrics.AgentMetrics:
+    common = {"label": "bench", "request_id": f"req-{n}", "timestamp": time.time()}
+    kind = n % 4
+    if kind == 0:
+        return metrics.STTMetrics(
+            **common, duration=0.0, audio_duration=1.2, streamed=True
+        )
+    if kind == 1:
+        return metrics.LLMMetrics(
+            **common,
+            duration=0.8,
+            ttft=0.35,
+            cancelled=False,
+            completion_tokens=40,
+            prompt_tokens=900,
+            prompt_cached_tokens=768,
+            total_tokens=940,
+            tokens_per_second=50.0,
+            speech_id=f"speech-{n}",
+        )
+    if kind == 2:
+        return metrics.TTSMetrics(
+            **common,
+            ttfb=0.2,
+            duration=0.9,
+            audio_duration=3.1,
+            cancelled=False,
+            characters_count=120,
+            streamed=True,
+            speech_id=f"speech-{n}",
+        )
+    return metrics.EOUMetrics(
+        timestamp=common["timestamp"],
+        end_of_utterance_delay=0.45,
+        transcription_delay=0.1,
+        on_user_turn_completed_delay=0.0,
+        last_speaking_time=common["timestamp"],
+        speech_id=f"speech-{n}",
+    )
+
+
+class _SlowSink(logging.Handler):
+    def __init__(self, delay: float) -> None:
+        super().__init__()
+        self._delay = delay
+
+    def emit(self, record: logging.LogRecord) -> None:
+        time.sleep(self._delay)
+
+
+def _drain(duplex: duplex_unix._Duplex) -> None:
+    # the worker's side of the IPC log channel
+    while True:
+        try:
+            duplex.recv_bytes()
+        except duplex_unix.DuplexClosed:
+            return
+
+
+def _handlers(kind: str, slow_sink: float) -> tuple[list[logging.Handler], Any]:
+    if kind == "ipc":
+        job, worker = socket.socketpair()
+        receiver = duplex_unix._Duplex.open(worker)
+        threading.Thread(target=_drain, args=(receiver,), daemon=True).start()
+        handlers: list[logging.Handler] = [
+            LogQueueHandler(duplex_unix._Duplex.open(job))
+        ]
+    else:
+        stream = open(os.devnull, "w")  # noqa: SIM115
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(JsonFormatter())
+        handlers = [handler]
+        receiver = stream
+    if slow_sink:
+        handlers.append(_SlowSink(slow_sink))
+    return handlers, receiver
+
+
+def run_benchmark(
+    *,
+    events: int = 5000,
+    handler: str = "ipc",
+    pipeline: bool = False,
+    slow_sink_ms: float = 0.0,
+    max_queue: int = 4096,
+) -> dict[str, Any]:
+    root = logging.getLogger()
+    original, level = root.handlers, root.level
+    handlers, receiver = _handlers(handler, slow_sink_ms / 1000)
+    export = ExportPipeline(max_queue=max_queue)
+    root.handlers = handlers
+    root.setLevel(logging.INFO)
+    if pipeline:
+        export.attach_logging()
+
+    collector = metrics.UsageCollector()
+    costs = []
+    try:
+        for n in range(events):
+            metric = _metric(n)
+            started = time.perf_counter()
+            metrics.log_metrics(metric)
+            collector.collect(metric)
+            costs.append(time.perf_counter() - started)
+            time.sleep(0)  # give other threads a chance, like awaiting the next frame
+        drain_started = time.perf_counter()
+        if pipeline:
+            export.detach_logging()
+        drained = time.perf_counter() - drain_started
+    finally:
+        root.handlers, root.level = original, level
+        export.close()
+        for h in handlers:
+            h.close()
+        receiver.close()
+
+    ordered = sorted(costs)
+    return {
+        "handler": handler,
+        "pipeline": pipeline,
+        "slow_sink_ms": slow_sink_ms,
+        "events": events,
+        "dropped": export.dropped,
+        "drain": drained,
+        "mean": sum(costs) / len(costs),
+        "cost": {
+            f"p{int(q * 100)}": ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+            for q in QUANTILES
+        },
+    }
+
+
+def print_report(report: dict[str, Any]) -> None:
+    print(
+        f"\nhandler={report['handler']} "
+        f"pipeline={'on' if report['pipeline'] else 'off'} "
+        f"slow sink={report['slow_sink_ms']} ms: {report['events']} events, "
+        f"{report['dropped']} dropped, drained in {report['drain'] * 1000:.1f} ms"
+    )
+    print(f"  {'mean':>5}  {report['mean'] * 1e6:8.1f} us")
+    for key, value in report["cost"].items():
+        print(f"  {key:>5}  {value * 1e6:8.1f} us")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--handler", choices=["ipc", "stream"], default="ipc")
+    parser.add_argument(
+        "--slow-sink-ms", type=float, default=0.0, help="stall of an extra handler"
+    )
+    parser.add_argument("--max-queue", type=int, default=4096)
+    parser.add_argument("--json", type=Path, help="also write the reports here")
+    args = parser.parse_args()
+
+    reports = [
+        run_benchmark(
+            events=args.events,
+            handler=args.handler,
+            pipeline=pipeline,
+            slow_sink_ms=args.slow_sink_ms,
+            max_queue=args.max_queue,
+        )
+        for pipeline in (False, True)
+    ]
+    for report in reports:
+        print_report(report)
+    if args.json:
+        args.json.write_text(json.dumps(reports, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""Concurrent-call load test: how many calls one worker sustains.
+
+Ramps the number of simultaneous calls and, at each step, runs that many
+synthetic callers, each in a room of its own, against sessions built by
+``build_session`` with the local STT, LLM and TTS stand-ins from
+``src/fakes.py``. Every caller speaks a few utterances in real time and waits
+for the reply. Per step it records the end-of-speech to first-audio latency of
+every turn, the CPU and RSS of the worker process, the event-loop lag and the
+caller audio frames delivered too late to be used. The ramp stops once p95
+latency exceeds ``--target-p95``.
+
+The result is a capacity curve, and the sessions one core carries at the
+target. Write it with ``--json`` and pass an earlier file as ``--compare`` to
+see what a commit changed:
+
+    uv run python benchmarks/load_test.py --max-sessions 64 --json load.json
+    uv run python benchmarks/load_test.py --compare load.json
+
+There is no SFU in the loop. Each room is the session's own paced audio input
+and captured output, the way ``pipeline_latency.py`` drives one session, and
+all sessions share one process and event loop like ``JOB_EXECUTOR=thread``.
+Capacity is therefore bounded by the agent's own work (VAD, turn handling,
+scheduling), not by media transport.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import psutil
+from livekit.agents import vad
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from pipeline_latency import (
+    SPEECH_RMS,
+    CaptureAudioOutput,
+    ReplayAudioInput,
+    Utterance,
+    summarize,
+    synthetic_corpus,
+)
+
+from agent import Assistant, build_session, load_vad
+from fakes import PROFILES, FakeLLM, FakeSTT, FakeTTS
+
+logger = logging.getLogger("load-test")
+
+# a frame later than this behind its real-time slot misses the jitter buffer
+LATE_FRAME = 0.02
+
+
+class PacedAudioInput(ReplayAudioInput):
+    """Caller microphone that counts the frames delivered behind real time."""
+
+    def __init__(self, sample_rate: int) -> None:
+        super().__init__(sample_rate)
+        self.frames = 0
+        self.late = 0
+
+    async def __anext__(self):
+        frame = await super().__anext__()
+        self.frames += 1
+        if time.perf_counter() - self._next_at > LATE_FRAME:
+            self.late += 1
+        return frame
+
+
+async def _call(
+    room: int,
+    utterances: list[Utterance],
+    vad: vad.VAD,
+    *,
+    profile: str,
+    gap: float,
+    reply_timeout: float,
+) -> dict[str, Any]:
+    profiles = PROFILES[profile]
+    session = build_session(
+        vad,
+        llm=FakeLLM(profile=profiles["llm"]),
+        stt=FakeSTT(
+            [u.transcript for u in utterances],
+            profile=profiles["stt"],
+            speech_threshold=SPEECH_RMS,
+        ),
+        tts=FakeTTS(profile=profiles["tts"]),
+        turn_detection="vad",
+    )
+    audio_in = PacedAudioInput(utterances[0].sample_rate)
+    audio_out = CaptureAudioOutput()
+    session.input.audio = audio_in
+    session.output.audio = audio_out
+
+    latencies: list[float] = []
+    missed = 0
+    await session.start(agent=Assistant())
+    try:
+        for utterance in utterances:
+            audio_out.reset()
+            speech_end = await audio_in.play(utterance)
+            try:
+                first_frame = await asyncio.wait_for(
+                    audio_out.wait_first_frame(), reply_timeout
+                )
+            except asyncio.TimeoutError:
+                missed += 1
+            else:
+                if first_frame >= speech_end:
+                    latencies.append(first_frame - speech_end)
+            await audio_out.wait_for_playout()
+            await asyncio.sleep(gap)
+    except Exception:
+        logger.exception("call failed", extra={"room": room})
+        missed += 1
+    finally:
+        await session.aclose()
+    return {
+        "latencies": latencies,
+        "missed": missed,
+        "frames": audio_in.frames,
+        "late_frames": audio_in.late,
+    }
+
+
+async def _loop_lag(samples: list[float], interval: float = 0.05) -> None:
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - started - interval)
+
+
+async def run_step(
+    sessions: int,
+    vad: vad.VAD,
+    *,
+    turns: int,
+    profile: str,
+    gap: float,
+    stagger: float,
+    reply_timeout: float,
+) -> dict[str, Any]:
+    process = psutil.Process()
+    cpu = process.cpu_times()
+    started = time.perf_counter()
+    lag: list[float] = []
+    lag_task = asyncio.create_task(_loop_lag(lag))
+    rss = [process.memory_info().rss]
+
+    async def _room(room: int) -> dict[str, Any]:
+        await asyncio.sleep(room * stagger)  # callers don't all dial in the same ms
+        utterances = synthetic_corpus(turns)
+        utterances = utterances[room % turns :] + utterances[: room % turns]
+        result = await _call(
+            room,
+            utterances,
+            vad,
+            profile=profile,
+            gap=gap,
+            reply_timeout=reply_timeout,
+        )
+        rss.append(process.memory_info().rss)
+        return result
+
+    try:
+        calls = await asyncio.gather(*(_room(i) for i in range(sessions)))
+    finally:
+        lag_task.cancel()
+
+    wall = time.perf_counter() - started
+    after = process.cpu_times()
+    cpu_seconds = (after.user - cpu.user) + (after.system - cpu.system)
+    latencies = [value for call in calls for value in call["latencies"]]
+    frames = sum(call["frames"] for call in calls)
+    return {
+        "sessions": sessions,
+        "turns": turns * sessions,
+        "answered": len(latencies),
+        "missed": sum(call["missed"] for call in calls),
+        "latency": summarize(latencies),
+        "cpu_cores": cpu_seconds / wall,
+        "rss_mb": max(rss) / 2**20,
+        "loop_lag_p95": float(np.quantile(lag, 0.95)) if lag else 0.0,
+        "late_frame_rate": sum(call["late_frames"] for call in calls) / max(frames, 1),
+    }
+
+
+def _levels(start: int, maximum: int) -> list[int]:
+    levels, n = [], start
+    while n < maximum:
+        levels.append(n)
+        n *= 2
+    return [*levels, maximum]
+
+
+async def run_benchmark(
+    *,
+    max_sessions: int = 32,
+    start_sessions: int = 1,
+    target_p95: float = 1.5,
+    turns: int = 3,
+    profile: str = "typical",
+    gap: float = 0.5,
+    stagger: float = 0.05,
+    reply_timeout: float = 10.0,
+) -> dict[str, Any]:
+    shared_vad = load_vad()  # one model per worker process, like ``shared_vad``
+    steps = []
+    for sessions in _levels(start_sessions, max_sessions):
+        step = await run_step(
+            sessions,
+            shared_vad,
+            turns=turns,
+            profile=profile,
+            gap=gap,
+            stagger=stagger,
+            reply_timeout=reply_timeout,
+        )
+        step["within_target"] = bool(
+            step["latency"]
+            and step["latency"]["p95"] <= target_p95
+            and step["missed"] == 0
+        )
+        steps.append(step)
+        logger.info("step done", extra={"step": step})
+        if not step["within_target"]:
+            break
+
+    passing = [step for step in steps if step["within_target"]]
+    best = passing[-1] if passing else None
+    return {
+        "commit": _commit(),
+        "cpu_count": os.cpu_count(),
+        "profile": profile,
+        "target_p95": target_p95,
+        "steps": steps,
+        "capacity": {
+            "sessions": best["sessions"] if best else 0,
+            # sessions per fully used core, at the load where the target still held
+            "sessions_per_core": (
+                best["sessions"] / max(best["cpu_cores"], 1e-6) if best else 0.0
+            ),
+        },
+    }
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(
+    report: dict[str, Any], baseline: dict[str, Any] | None = None
+) -> None:
+    print(
+        f"\ncommit {report['commit'] or '?'}, profile={report['profile']}, "
+        f"target p95 {report['target_p95'] * 1000:.0f} ms, "
+        f"{report['cpu_count']} CPUs"
+    )
+    print(
+        f"  {'calls':>5} {'p50 ms':>8} {'p95 ms':>8} {'missed':>6} {'CPU':>6} "
+        f"{'RSS MB':>7} {'lag p95':>8} {'late fr':>8}"
+    )
+    for step in report["steps"]:
+        latency = step["latency"] or {"p50": float("nan"), "p95": float("nan")}
+        mark = "" if step["within_target"] else "  over target"
+        print(
+            f"  {step['sessions']:>5} {latency['p50'] * 1000:>8.0f} "
+            f"{latency['p95'] * 1000:>8.0f} {step['missed']:>6} "
+            f"{step['cpu_cores']:>6.2f} {step['rss_mb']:>7.0f} "
+            f"{step['loop_lag_p95'] * 1000:>6.1f}ms {step['late_frame_rate']:>8.2%}"
+            f"{mark}"
+        )
+    capacity = report["capacity"]
+    print(
+        f"\ncapacity: {capacity['sessions']} calls, "
+        f"{capacity['sessions_per_core']:.1f} calls per core"
+    )
+    if baseline is not None:
+        before = baseline["capacity"]
+        print(
+            f"  baseline {baseline['commit'] or '?'}: {before['sessions']} calls, "
+            f"{before['sessions_per_core']:.1f} calls per core "
+            f"({capacity['sessions_per_core'] - before['sessions_per_core']:+.1f})"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--max-sessions", type=int, default=32)
+    parser.add_argument("--start-sessions", type=int, default=1)
+    parser.add_argument(
+        "--target-p95", type=float, default=1.5, help="seconds, end of the ramp"
+    )
+    parser.add_argument("--turns", type=int, default=3, help="utterances per call")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="typical")
+    parser.add_argument("--gap", type=float, default=0.5, help="pause between turns")
+    parser.add_argument("--json", type=Path, help="also write the report here")
+    parser.add_argument("--compare", type=Path, help="report of an earlier run")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    baseline = json.loads(args.compare.read_text()) if args.compare else None
+    report = asyncio.run(
+        run_benchmark(
+            max_sessions=args.max_sessions,
+            start_sessions=args.start_sessions,
+            target_p95=args.target_p95,
+            turns=args.turns,
+            profile=args.profile,
+            gap=args.gap,
+        )
+    )
+    print_report(report, baseline)
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
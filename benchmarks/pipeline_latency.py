@@ -0,0 +1,404 @@
+"""Offline end-of-speech to first-audio latency benchmark.
+
+Replays a corpus of WAV utterances in real time through the same ``AgentSession``
+that ``entrypoint`` builds (silero VAD, turn detection, preemptive generation and
+the ``Assistant`` agent). STT, LLM and TTS are replaced with the deterministic
+stand-ins from ``src/fakes.py``, so the numbers only move when the pipeline
+itself changes: VAD parameters, endpointing, turn detection or scheduling.
+
+    uv run python benchmarks/pipeline_latency.py --synthetic 20 --turn-detection vad
+    uv run python benchmarks/pipeline_latency.py --corpus ./corpus --profile slow
+
+A corpus is a directory of 16-bit PCM WAV files, one utterance each. An optional
+``<name>.txt`` next to a WAV is used as its transcript, which matters for the
+multilingual turn detector (``python src/agent.py download-files`` first).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+import wave
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from livekit import rtc
+from livekit.agents.inference_runner import _InferenceRunner
+from livekit.agents.voice import io
+from livekit.plugins.turn_detector.base import EOUModelBase
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from agent import Assistant, build_session, load_vad
+from fakes import PROFILES, FakeLLM, FakeSTT, FakeTTS, synthetic_speech
+from latency_tracer import QUANTILES, LatencyRegistry, TurnTracer
+
+logger = logging.getLogger("benchmark")
+
+FRAME_DURATION = 0.01
+SPEECH_RMS = 300.0
+REPORT_QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+
+@dataclass
+class Utterance:
+    name: str
+    samples: np.ndarray
+    sample_rate: int
+    transcript: str
+
+    @property
+    def voiced_frames(self) -> int:
+        """Number of frames up to and including the last one carrying speech."""
+        frame_size = int(self.sample_rate * FRAME_DURATION)
+        n_frames = len(self.samples) // frame_size
+        frames = self.samples[: n_frames * frame_size].reshape(n_frames, frame_size)
+        rms = np.sqrt(np.mean(frames.astype(np.float32) ** 2, axis=1))
+        voiced = np.nonzero(rms >= SPEECH_RMS)[0]
+        return int(voiced[-1]) + 1 if voiced.size else n_frames
+
+
+def load_corpus(path: Path) -> list[Utterance]:
+    utterances = []
+    for wav_path in sorted(path.glob("*.wav")):
+        with wave.open(str(wav_path), "rb") as f:
+            if f.getsampwidth() != 2:
+                raise ValueError(f"{wav_path}: only 16-bit PCM WAV files are supported")
+            samples = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+            if f.getnchannels() > 1:
+                samples = samples.reshape(-1, f.getnchannels()).mean(axis=1)
+            sample_rate = f.getframerate()
+
+        txt_path = wav_path.with_suffix(".txt")
+        transcript = txt_path.read_text().strip() if txt_path.exists() else "hello"
+        utterances.append(
+            Utterance(wav_path.stem, samples.astype(np.int16), sample_rate, transcript)
+        )
+
+    if not utterances:
+        raise ValueError(f"no .wav files found in {path}")
+    if len({u.sample_rate for u in utterances}) > 1:
+        raise ValueError("all corpus files must share the same sample rate")
+    return utterances
+
+
+def synthetic_corpus(count: int, sample_rate: int = 16000) -> list[Utterance]:
+    transcripts = [
+        "Hi, I have a question about my recent order.",
+        "It says delivered but I never got the package.",
+        "Can you tell me when my refund will show up?",
+        "I want to cancel my Prime membership.",
+        "What's the weather like in Seattle today?",
+    ]
+    return [
+        Utterance(
+            f"synthetic-{i}",
+            synthetic_speech(1.0 + (i % 4) * 0.5, sample_rate=sample_rate, seed=i),
+            sample_rate,
+            transcripts[i % len(transcripts)],
+        )
+        for i in range(count)
+    ]
+
+
+class ReplayAudioInput(io.AudioInput):
+    """Microphone stand-in: paced 10ms frames, silence whenever nothing is queued."""
+
+    def __init__(self, sample_rate: int) -> None:
+        super().__init__(label="ReplayAudioInput")
+        self._sample_rate = sample_rate
+        self._frame_size = int(sample_rate * FRAME_DURATION)
+        self._silence = np.zeros(self._frame_size, dtype=np.int16)
+        self._queue: deque[tuple[np.ndarray, asyncio.Future[float] | None]] = deque()
+        self._next_at: float | None = None
+
+    def play(self, utterance: Utterance) -> asyncio.Future[float]:
+        """Queue an utterance, resolves with the time its last voiced frame arrived."""
+        spoken = asyncio.get_running_loop().create_future()
+        voiced = utterance.voiced_frames
+        n_frames = len(utterance.samples) // self._frame_size
+        for i in range(n_frames):
+            chunk = utterance.samples[i * self._frame_size : (i + 1) * self._frame_size]
+            self._queue.append((chunk, spoken if i == voiced - 1 else None))
+        return spoken
+
+    async def __anext__(self) -> rtc.AudioFrame:
+        # a frame covering [t, t + 10ms] is only available from a real mic at t + 10ms
+        now = time.perf_counter()
+        if self._next_at is None:
+            self._next_at = now
+        self._next_at += FRAME_DURATION
+        await asyncio.sleep(max(0.0, self._next_at - now))
+
+        samples, marker = (
+            self._queue.popleft() if self._queue else (self._silence, None)
+        )
+        if marker is not None and not marker.done():
+            marker.set_result(time.perf_counter())
+        return rtc.AudioFrame(
+            data=samples.tobytes(),
+            sample_rate=self._sample_rate,
+            num_channels=1,
+            samples_per_channel=len(samples),
+        )
+
+
+class CaptureAudioOutput(io.AudioOutput):
+    """Speaker stand-in: records when agent audio starts, simulates real-time playout."""
+
+    def __init__(self) -> None:
+        super().__init__(
+            label="CaptureAudioOutput",
+            capabilities=io.AudioOutputCapabilities(pause=False),
+        )
+        self.first_frames: list[float] = []
+        self._segment_start: float | None = None
+        self._pushed = 0.0
+        self._playout: asyncio.TimerHandle | None = None
+        self._first_frame_ev = asyncio.Event()
+
+    async def wait_first_frame(self) -> float:
+        await self._first_frame_ev.wait()
+        return self.first_frames[-1]
+
+    def reset(self) -> None:
+        self._first_frame_ev.clear()
+
+    async def capture_frame(self, frame: rtc.AudioFrame) -> None:
+        await super().capture_frame(frame)
+        if self._segment_start is None:
+            self._segment_start = time.perf_counter()
+            self.first_frames.append(self._segment_start)
+            self._first_frame_ev.set()
+        self._pushed += frame.duration
+
+    def flush(self) -> None:
+        super().flush()
+        if self._segment_start is None:
+            return
+        remaining = self._segment_start + self._pushed - time.perf_counter()
+        self._playout = asyncio.get_running_loop().call_later(
+            max(0.0, remaining), self._finish, self._pushed, False
+        )
+
+    def clear_buffer(self) -> None:
+        if self._segment_start is None:
+            return
+        played = min(self._pushed, time.perf_counter() - self._segment_start)
+        self._finish(played, True)
+
+    def _finish(self, position: float, interrupted: bool) -> None:
+        if self._playout is not None:
+            self._playout.cancel()
+            self._playout = None
+        self._segment_start = None
+        self._pushed = 0.0
+        self.on_playback_finished(playback_position=position, interrupted=interrupted)
+
+
+class LocalInferenceExecutor:
+    """Runs the turn detector model in-process instead of the worker's inference proc."""
+
+    def __init__(self) -> None:
+        self._runners: dict[str, _InferenceRunner] = {}
+
+    async def do_inference(self, method: str, data: bytes) -> bytes | None:
+        if method not in self._runners:
+            runner = _InferenceRunner.registered_runners[method]()
+            await asyncio.to_thread(runner.initialize)
+            self._runners[method] = runner
+        return await asyncio.to_thread(self._runners[method].run, data)
+
+
+def multilingual_turn_detector() -> EOUModelBase:
+    from livekit.plugins.turn_detector.multilingual import MultilingualModel
+
+    model = MultilingualModel.__new__(MultilingualModel)
+    EOUModelBase.__init__(
+        model, model_type="multilingual", inference_executor=LocalInferenceExecutor()
+    )
+    return model
+
+
+def summarize(values: list[float]) -> dict[str, float]:
+    if not values:
+        return {}
+    summary = {
+        f"p{int(q * 100)}": float(np.quantile(values, q)) for q in REPORT_QUANTILES
+    }
+    summary["mean"] = float(np.mean(values))
+    summary["max"] = float(np.max(values))
+    return summary
+
+
+async def run_benchmark(
+    utterances: list[Utterance],
+    *,
+    profile: str = "typical",
+    turn_detection: str = "multilingual",
+    preemptive_generation: bool = True,
+    vad_overrides: dict[str, Any] | None = None,
+    gap: float = 0.5,
+    reply_timeout: float = 10.0,
+    on_turn: Callable[[str, float | None], None] | None = None,
+) -> dict[str, Any]:
+    profiles = PROFILES[profile]
+    session = build_session(
+        load_vad(**(vad_overrides or {})),
+        llm=FakeLLM(profile=profiles["llm"]),
+        stt=FakeSTT(
+            [u.transcript for u in utterances],
+            profile=profiles["stt"],
+            speech_threshold=SPEECH_RMS,
+        ),
+        tts=FakeTTS(profile=profiles["tts"]),
+        turn_detection=(
+            multilingual_turn_detector() if turn_detection == "multilingual" else "vad"
+        ),
+        preemptive_generation=preemptive_generation,
+    )
+
+    registry = LatencyRegistry()
+    tracer = TurnTracer(registry=registry)
+    tracer.attach(session)
+
+    audio_in = ReplayAudioInput(utterances[0].sample_rate)
+    audio_out = CaptureAudioOutput()
+    session.input.audio = audio_in
+    session.output.audio = audio_out
+
+    latencies: list[float] = []
+    premature = missed = 0
+    await session.start(agent=Assistant())
+    try:
+        for utterance in utterances:
+            audio_out.reset()
+            started = time.perf_counter()
+            spoken = audio_in.play(utterance)
+            speech_end = await spoken
+            try:
+                first_frame = await asyncio.wait_for(
+                    audio_out.wait_first_frame(), reply_timeout
+                )
+            except asyncio.TimeoutError:
+                missed += 1
+                latency = None
+            else:
+                latency = first_frame - speech_end
+                if first_frame < started or latency < 0:
+                    # the agent cut in before the user finished: endpointing is too eager
+                    premature += 1
+                    latency = None
+                else:
+                    latencies.append(latency)
+
+            if on_turn:
+                on_turn(utterance.name, latency)
+
+            await audio_out.wait_for_playout()
+            await asyncio.sleep(gap)
+    finally:
+        await tracer.aclose()
+        await session.aclose()
+
+    return {
+        "profile": profile,
+        "turn_detection": turn_detection,
+        "preemptive_generation": preemptive_generation,
+        "utterances": len(utterances),
+        "answered": len(latencies),
+        "premature": premature,
+        "missed": missed,
+        "end_of_speech_to_first_audio": summarize(latencies),
+        "stages": {
+            stage: {f"p{int(q * 100)}": hist.quantile(q) for q in QUANTILES}
+            for stage, hist in registry.histograms.items()
+            if hist.count
+        },
+    }
+
+
+def print_report(report: dict[str, Any]) -> None:
+    print(
+        f"\n{report['answered']}/{report['utterances']} turns answered "
+        f"({report['premature']} premature, {report['missed']} missed), "
+        f"profile={report['profile']} turn_detection={report['turn_detection']} "
+        f"preemptive={report['preemptive_generation']}"
+    )
+    latency = report["end_of_speech_to_first_audio"]
+    if latency:
+        print("\nend of speech -> first audio")
+        for key, value in latency.items():
+            print(f"  {key:>5}  {value * 1000:8.1f} ms")
+    if report["stages"]:
+        print("\nstages (from the turn tracer)")
+        for stage, quantiles in report["stages"].items():
+            cells = "  ".join(f"{k}={v * 1000:7.1f}ms" for k, v in quantiles.items())
+            print(f"  {stage:<18} {cells}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--corpus", type=Path, help="directory of WAV utterances")
+    source.add_argument(
+        "--synthetic", type=int, metavar="N", help="generate N synthetic utterances"
+    )
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="typical")
+    parser.add_argument(
+        "--turn-detection", choices=("multilingual", "vad"), default="multilingual"
+    )
+    parser.add_argument("--no-preemptive", action="store_true")
+    parser.add_argument("--min-silence-duration", type=float)
+    parser.add_argument("--min-speech-duration", type=float)
+    parser.add_argument("--activation-threshold", type=float)
+    parser.add_argument("--gap", type=float, default=0.5, help="pause between turns")
+    parser.add_argument("--json", type=Path, help="also write the report here")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    utterances = (
+        load_corpus(args.corpus) if args.corpus else synthetic_corpus(args.synthetic)
+    )
+    vad_overrides = {
+        key: value
+        for key in (
+            "min_silence_duration",
+            "min_speech_duration",
+            "activation_threshold",
+        )
+        if (value := getattr(args, key)) is not None
+    }
+
+    def on_turn(name: str, latency: float | None) -> None:
+        shown = f"{latency * 1000:.0f} ms" if latency is not None else "no reply"
+        print(f"{name}: {shown}", flush=True)
+
+    report = asyncio.run(
+        run_benchmark(
+            utterances,
+            profile=args.profile,
+            turn_detection=args.turn_detection,
+            preemptive_generation=not args.no_preemptive,
+            vad_overrides=vad_overrides,
+            gap=args.gap,
+            on_turn=on_turn,
+        )
+    )
+    print_report(report)
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
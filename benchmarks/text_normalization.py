@@ -0,0 +1,122 @@
+"""Streaming text normalization throughput benchmark.
+
+Feeds replies with order numbers, amounts, dates and codes through
+``StreamingNormalizer`` in LLM-sized chunks, as ``Assistant.tts_node`` does, and
+reports the time per chunk and the characters held back waiting for a word to
+end. Also estimates the output tokens the LLM saves by writing digits instead
+of the spelled-out form the TTS gets.
+
+    uv run python benchmarks/text_normalization.py
+    uv run python benchmarks/text_normalization.py --chunk-chars 2 --replies 5000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from latency_tracer import QUANTILES
+from prompt import estimate_tokens
+from text_normalizer import StreamingNormalizer, normalize
+
+TEMPLATES = [
+    "Your order {order} shipped on {date} and arrives by {time}.",
+    "I've issued a refund of {amount} to your card, it takes {range} business days.",
+    "Your confirmation code is {code}, and the return label was sent to your email.",
+    "The item was {amount} with a {pct} discount, so you paid {amount} in total.",
+    "Sure, I can help with that. Order {order} is out for delivery today.",
+    "Your Prime membership renews on {date} for {amount}.",
+]
+
+
+def _reply(rng: random.Random) -> str:
+    order = f"11{rng.randint(0, 9)}-{rng.randint(10**6, 10**7 - 1)}-{rng.randint(10**6, 10**7 - 1)}"  # fmt: skip
+    month = rng.choice(["January", "March", "June", "October", "Dec."])
+    return rng.choice(TEMPLATES).format(
+        order=order,
+        date=f"{month} {rng.randint(1, 28)}, {rng.randint(2024, 2026)}",
+        time=f"{rng.randint(1, 12)}:{rng.choice(['00', '30', '45'])} PM",
+        amount=f"${rng.randint(1, 1500)}.{rng.randint(0, 99):02d}",
+        range=f"{rng.randint(2, 3)}-{rng.randint(5, 7)}",
+        code="".join(rng.choice("ABCDEFGHJKLMNPQRSTUVWXYZ23456789") for _ in range(6)),
+        pct=f"{rng.choice([5, 10, 15, 20])}%",
+    )
+
+
+def run_benchmark(
+    *, replies: int = 2000, chunk_chars: int = 4, seed: int = 0
+) -> dict[str, Any]:
+    rng = random.Random(seed)
+    texts = [_reply(rng) for _ in range(replies)]
+
+    costs, held = [], []
+    started = time.perf_counter()
+    for text in texts:
+        normalizer = StreamingNormalizer()
+        for i in range(0, len(text), chunk_chars):
+            chunk_started = time.perf_counter()
+            normalizer.push(text[i : i + chunk_chars])
+            costs.append(time.perf_counter() - chunk_started)
+            held.append(len(normalizer._buffer))
+        normalizer.flush()
+    elapsed = time.perf_counter() - started
+
+    raw_tokens = sum(estimate_tokens(text) for text in texts)
+    spoken_tokens = sum(estimate_tokens(normalize(text)) for text in texts)
+    ordered = sorted(costs)
+    return {
+        "replies": replies,
+        "chunk_chars": chunk_chars,
+        "chunks": len(costs),
+        "chars_per_second": sum(map(len, texts)) / elapsed,
+        "mean_held_chars": sum(held) / len(held),
+        "max_held_chars": max(held),
+        "output_tokens": {"digits": raw_tokens, "spelled_out": spoken_tokens},
+        "chunk_cost": {
+            f"p{int(q * 100)}": ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+            for q in QUANTILES
+        },
+    }
+
+
+def print_report(report: dict[str, Any]) -> None:
+    tokens = report["output_tokens"]
+    print(
+        f"\n{report['replies']} replies in {report['chunks']} chunks of "
+        f"{report['chunk_chars']} chars: {report['chars_per_second'] / 1e6:.2f}M "
+        f"chars/s, held back {report['mean_held_chars']:.1f} chars on average "
+        f"({report['max_held_chars']} at most)"
+    )
+    print(
+        f"  output tokens: {tokens['digits']} with digits, {tokens['spelled_out']} "
+        f"spelled out ({tokens['spelled_out'] / tokens['digits']:.1f}x)"
+    )
+    for key, value in report["chunk_cost"].items():
+        print(f"  {key:>5}  {value * 1e6:8.1f} us per chunk")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--replies", type=int, default=2000)
+    parser.add_argument("--chunk-chars", type=int, default=4, help="LLM token size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=Path, help="also write the report here")
+    args = parser.parse_args()
+
+    report = run_benchmark(
+        replies=args.replies, chunk_chars=args.chunk_chars, seed=args.seed
+    )
+    print_report(report)
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Offline tool call latency benchmark.
+
+Runs a synthetic workload of tool lookups through ``ToolRuntime`` against the
+local ``FakeBackend`` from ``src/fakes.py``: a few calls, each asking for a small
+set of locations and orders, some of them repeatedly, as callers do. Reports the
+cache hit rate, timeouts and tool latency quantiles, with the cache on and off.
+
+    uv run python benchmarks/tool_latency.py
+    uv run python benchmarks/tool_latency.py --profile slow --stall-rate 0.05
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import sys
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from fakes import PROFILES, FakeBackend
+from latency_tracer import QUANTILES
+from tool_runtime import ToolRuntime
+
+LOCATIONS = ["Tokyo", "Paris", "New York", "Seattle", "London"]
+
+
+async def _call(
+    runtime: ToolRuntime, rng: random.Random, lookups: int, timeout: float, ttl: float
+) -> None:
+    @runtime.tool(fallback="unavailable", timeout=timeout, ttl=ttl)
+    async def lookup_weather(location: str) -> str:
+        return (await runtime.get_json("/weather", location=location))["summary"]
+
+    @runtime.tool(fallback="unavailable", timeout=timeout, ttl=ttl)
+    async def lookup_order(order_id: str) -> str:
+        return (await runtime.get_json(f"/orders/{order_id}"))["status"]
+
+    orders = [
+        f"11{rng.randint(0, 9)}-{rng.randint(10**6, 10**7 - 1)}" for _ in range(2)
+    ]
+    locations = rng.sample(LOCATIONS, 2)
+    for _ in range(lookups):
+        if rng.random() < 0.5:
+            # the caller says it slightly differently the second time
+            location = rng.choice(locations)
+            await lookup_weather(
+                rng.choice([location, location.lower(), f" {location}"])
+            )
+        else:
+            await lookup_order(rng.choice(orders))
+        await asyncio.sleep(0)
+
+
+async def run_benchmark(
+    *,
+    calls: int = 50,
+    lookups: int = 6,
+    profile: str = "typical",
+    stall_rate: float = 0.02,
+    timeout: float = 1.0,
+    cache: bool = True,
+    seed: int = 0,
+) -> dict[str, Any]:
+    rng = random.Random(seed)
+    async with FakeBackend(
+        profile=PROFILES[profile]["tools"], stall_rate=stall_rate, stall_delay=3.0
+    ) as backend:
+        runtime = ToolRuntime(base_url=backend.url)
+        ttl = 600.0 if cache else 0.0
+        # calls run concurrently like rooms on a worker, each with its own lookups
+        await asyncio.gather(
+            *(
+                _call(runtime, random.Random(rng.random()), lookups, timeout, ttl)
+                for _ in range(calls)
+            )
+        )
+        await runtime.aclose()
+
+    latencies = [
+        latency for stats in runtime.stats.values() for latency in stats.latencies
+    ]
+    total = sum(stats.calls for stats in runtime.stats.values())
+    ordered = sorted(latencies)
+    return {
+        "cache": cache,
+        "profile": profile,
+        "lookups": total,
+        "backend_requests": backend.num_requests,
+        "hit_rate": sum(s.hits for s in runtime.stats.values()) / total,
+        "timeouts": sum(s.timeouts for s in runtime.stats.values()),
+        "latency": {
+            f"p{int(q * 100)}": ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+            for q in QUANTILES
+        },
+    }
+
+
+def print_report(report: dict[str, Any]) -> None:
+    print(
+        f"\ncache={'on' if report['cache'] else 'off'} profile={report['profile']}: "
+        f"{report['lookups']} lookups, {report['backend_requests']} backend requests, "
+        f"hit rate {report['hit_rate']:.0%}, {report['timeouts']} timeouts"
+    )
+    for key, value in report["latency"].items():
+        print(f"  {key:>5}  {value * 1000:8.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--calls", type=int, default=50, help="concurrent calls")
+    parser.add_argument("--lookups", type=int, default=6, help="tool calls per call")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="typical")
+    parser.add_argument("--stall-rate", type=float, default=0.02)
+    parser.add_argument("--timeout", type=float, default=1.0, help="tool deadline")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=Path, help="also write the reports here")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+
+    # deadline warnings are counted in the report, only show them on request
+    logging.basicConfig(level=logging.WARNING if args.verbose else logging.ERROR)
+
+    reports = [
+        asyncio.run(
+            run_benchmark(
+                calls=args.calls,
+                lookups=args.lookups,
+                profile=args.profile,
+                stall_rate=args.stall_rate,
+                timeout=args.timeout,
+                cache=cache,
+                seed=args.seed,
+            )
+        )
+        for cache in (False, True)
+    ]
+    for report in reports:
+        print_report(report)
+    if args.json:
+        args.json.write_text(json.dumps(reports, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,421 @@
+"""Offline evaluation of per-call VAD tuning against the fixed ``VAD_OPTIONS``.
+
+Each call of a labeled corpus goes through silero once. Its speech probabilities
+are then replayed through the VAD's silence and threshold logic and a model of
+the session's endpointing, once with the fixed settings and once with
+``ThresholdTuner`` moving them turn by turn. The report compares end-of-turn
+latency (end of the last word to end of turn) with the false cut-offs (a turn
+closed while the caller was only pausing) and noise triggers (speech started
+outside the caller's speech, a false interruption when the agent talks).
+
+    uv run python benchmarks/vad_tuning.py --synthetic 12
+    uv run python benchmarks/vad_tuning.py --corpus ./calls --json tuning.json
+
+A corpus is a directory of 16 kHz 16-bit mono WAV files, one per call and caller
+side only, each with a ``<name>.json`` of labels::
+
+    {"turns": [[[0.8, 2.1], [2.5, 3.9]], [[8.0, 9.2]]],
+     "eou": [[0.05, 0.9], [0.8]]}
+
+``turns`` holds the speech segments (seconds) of each user turn, anything between
+two turns is the agent talking. ``eou`` is optional, the turn detector's
+probability at the pause after each segment; mid-turn pauses default to 0.05
+and turn ends to 0.85.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import wave
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from livekit import rtc
+from livekit.agents import vad
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from agent import VAD_OPTIONS, load_vad
+from fakes import synthetic_speech
+from vad_tuner import NOISE_PROBABILITY, Thresholds, ThresholdTuner, frame_dbfs
+
+SAMPLE_RATE = 16000
+FRAME_SAMPLES = 160
+WINDOW = 0.032
+MID_TURN_EOU = 0.05
+TURN_END_EOU = 0.85
+
+
+@dataclass
+class Call:
+    name: str
+    samples: np.ndarray
+    turns: list[list[tuple[float, float]]]
+    eou: list[list[float]]
+
+    def pauses(self) -> list[tuple[float, float]]:
+        """Start and turn detector probability of every pause after speech."""
+        return [
+            (end, probability)
+            for turn, probabilities in zip(self.turns, self.eou)
+            for (_, end), probability in zip(turn, probabilities)
+        ]
+
+
+def _labels(turns: list[list[tuple[float, float]]], eou: Any) -> list[list[float]]:
+    if eou is not None:
+        return [list(map(float, probabilities)) for probabilities in eou]
+    return [[MID_TURN_EOU] * (len(turn) - 1) + [TURN_END_EOU] for turn in turns]
+
+
+def load_corpus(path: Path) -> list[Call]:
+    calls = []
+    for wav_path in sorted(path.glob("*.wav")):
+        with wave.open(str(wav_path), "rb") as f:
+            if (f.getsampwidth(), f.getnchannels(), f.getframerate()) != (
+                2,
+                1,
+                SAMPLE_RATE,
+            ):
+                raise ValueError(f"{wav_path}: expected 16 kHz 16-bit mono PCM")
+            samples = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+        labels = json.loads(wav_path.with_suffix(".json").read_text())
+        turns = [[(float(s), float(e)) for s, e in turn] for turn in labels["turns"]]
+        calls.append(
+            Call(wav_path.stem, samples, turns, _labels(turns, labels.get("eou")))
+        )
+    return calls
+
+
+# pause lengths inside a turn, by how the caller talks
+PACES = {"fast": (0.1, 0.35), "average": (0.2, 0.7), "slow": (0.4, 1.3)}
+NOISE_DBFS = (-75.0, -55.0, -42.0)
+
+
+def synthetic_corpus(count: int, *, turns: int = 8, seed: int = 0) -> list[Call]:
+    """Calls of fast, average and slow talkers on quiet to noisy lines."""
+    rng = np.random.default_rng(seed)
+    return [
+        _synthetic_call(
+            rng,
+            pace=list(PACES)[n % len(PACES)],
+            noise_dbfs=NOISE_DBFS[(n // len(PACES)) % len(NOISE_DBFS)],
+            turns=turns,
+            index=n,
+        )
+        for n in range(count)
+    ]
+
+
+def _synthetic_call(
+    rng: np.random.Generator, *, pace: str, noise_dbfs: float, turns: int, index: int
+) -> Call:
+    """One call; agent turns sometimes carry a distant voice.
+
+    The turn detector's probabilities are drawn per pause: most pauses inside a
+    turn are clearly unfinished sentences, some are ambiguous.
+    """
+    pieces = [np.zeros(SAMPLE_RATE)]
+    position = 1.0
+    call_turns: list[list[tuple[float, float]]] = []
+    call_eou: list[list[float]] = []
+    for _ in range(turns):
+        segments: list[tuple[float, float]] = []
+        probabilities: list[float] = []
+        for i in range(int(rng.integers(1, 4))):
+            if i:
+                pause = rng.uniform(*PACES[pace])
+                pieces.append(np.zeros(int(pause * SAMPLE_RATE)))
+                position += pause
+                ambiguous = rng.random() < 0.3
+                probabilities.append(
+                    rng.uniform(0.1, 0.5) if ambiguous else rng.uniform(0.01, 0.08)
+                )
+            speech = synthetic_speech(
+                rng.uniform(0.6, 2.0),
+                f0=rng.uniform(100, 220),
+                seed=int(rng.integers(1 << 30)),
+            )
+            pieces.append(speech.astype(np.float64))
+            segments.append((position, position + len(speech) / SAMPLE_RATE))
+            position = segments[-1][1]
+        probabilities.append(rng.uniform(0.5, 0.95))
+        call_turns.append(segments)
+        call_eou.append(probabilities)
+
+        # the agent answers, sometimes over someone talking in the room
+        gap = np.zeros(int(rng.uniform(2.5, 4.0) * SAMPLE_RATE))
+        if rng.random() < 0.4:
+            voice = synthetic_speech(0.4, seed=int(rng.integers(1 << 30))) * 0.3
+            offset = int(rng.uniform(0.5, 1.5) * SAMPLE_RATE)
+            gap[offset : offset + len(voice)] += voice
+        pieces.append(gap)
+        position += len(gap) / SAMPLE_RATE
+
+    samples = np.concatenate(pieces)
+    samples += rng.normal(0, 32768 * 10 ** (noise_dbfs / 20), len(samples))
+    return Call(
+        f"{pace}-{int(-noise_dbfs)}dB-{index}",
+        np.clip(samples, -32768, 32767).astype(np.int16),
+        call_turns,
+        call_eou,
+    )
+
+
+async def speech_probabilities(samples: np.ndarray) -> list[tuple[float, float, float]]:
+    """End time, speech probability and level (dBFS) of every VAD window."""
+    stream = load_vad().stream()
+    for start in range(0, len(samples), FRAME_SAMPLES):
+        chunk = samples[start : start + FRAME_SAMPLES]
+        stream.push_frame(
+            rtc.AudioFrame(
+                chunk.tobytes(), SAMPLE_RATE, 1, samples_per_channel=len(chunk)
+            )
+        )
+    stream.end_input()
+    return [
+        (ev.timestamp, ev.probability, frame_dbfs(ev.frames[0]))
+        async for ev in stream
+        if ev.type == vad.VADEventType.INFERENCE_DONE
+    ]
+
+
+@dataclass
+class Endpointing:
+    """The session's endpointing: the turn detector's probability picks the delay."""
+
+    min_delay: float = 0.5
+    max_delay: float = 6.0
+    unlikely_threshold: float = 0.1
+
+    def delay(self, probability: float) -> float:
+        return (
+            self.min_delay if probability >= self.unlikely_threshold else self.max_delay
+        )
+
+
+@dataclass
+class Outcome:
+    latencies: list[float] = field(default_factory=list)
+    cut_offs: int = 0
+    noise_triggers: int = 0
+    missed_turns: int = 0
+
+
+def replay(
+    call: Call,
+    windows: list[tuple[float, float, float]],
+    endpointing: Endpointing,
+    tuner: ThresholdTuner | None = None,
+) -> Outcome:
+    """Run the VAD thresholds and endpointing over the probabilities of a call."""
+    outcome = Outcome()
+    speech = [segment for turn in call.turns for segment in turn]
+    turn_starts = [turn[0][0] for turn in call.turns]
+    turn_ends = [turn[-1][1] for turn in call.turns]
+    pauses = call.pauses()
+    thresholds = Thresholds(
+        VAD_OPTIONS["min_silence_duration"], VAD_OPTIONS["activation_threshold"]
+    )
+    speaking = False
+    speech_acc = silence_acc = 0.0
+    eou_at: float | None = None
+    answered: set[int] = set()
+    resumed_after_cut_off = False
+
+    def in_speech(t: float, margin: float) -> bool:
+        return any(s - margin <= t <= e + margin for s, e in speech)
+
+    for t, p, dbfs in windows:
+        if eou_at is not None and t >= eou_at:
+            # the turn was closed: too early if the caller had more to say
+            turn = _turn_at(turn_starts, eou_at)
+            if turn is not None and eou_at < turn_ends[turn]:
+                outcome.cut_offs += 1
+                resumed_after_cut_off = True
+            elif turn is not None and turn not in answered:
+                answered.add(turn)
+                outcome.latencies.append(eou_at - turn_ends[turn])
+            eou_at = None
+            if tuner is not None:
+                thresholds = tuner.update()
+
+        if tuner is not None and not speaking and p < NOISE_PROBABILITY:
+            tuner.observe_noise(dbfs)
+
+        if p >= thresholds.activation_threshold:
+            speech_acc += WINDOW
+            silence_acc = 0.0
+            if not speaking and speech_acc >= VAD_OPTIONS["min_speech_duration"]:
+                speaking = True
+                eou_at = None  # the caller went on, endpointing starts over
+                if tuner is not None:
+                    tuner.speech_started()
+                if not in_speech(t, 0.2):
+                    outcome.noise_triggers += 1
+                    if tuner is not None:
+                        tuner.false_interruption()
+                elif resumed_after_cut_off and tuner is not None:
+                    tuner.cut_off()
+                resumed_after_cut_off = False
+        else:
+            silence_acc += WINDOW
+            speech_acc = 0.0
+            if speaking and silence_acc >= thresholds.min_silence_duration:
+                speaking = False
+                probability = _pause_probability(pauses, t)
+                if tuner is not None:
+                    tuner.observe_eou(probability)
+                eou_at = t + endpointing.delay(probability)
+
+    outcome.missed_turns = len(turn_ends) - len(answered)
+    return outcome
+
+
+def _turn_at(turn_starts: list[float], t: float) -> int | None:
+    started = [i for i, start in enumerate(turn_starts) if start <= t]
+    return started[-1] if started else None
+
+
+def _pause_probability(pauses: list[tuple[float, float]], t: float) -> float:
+    """Turn detector probability at a VAD end of speech at ``t``."""
+    before = [p for start, p in pauses if start <= t]
+    return before[-1] if before else MID_TURN_EOU
+
+
+def summarize(values: list[float]) -> dict[str, float]:
+    if not values:
+        return {"mean": 0.0, "p50": 0.0, "p95": 0.0}
+    return {
+        "mean": round(float(np.mean(values)), 3),
+        "p50": round(float(np.quantile(values, 0.5)), 3),
+        "p95": round(float(np.quantile(values, 0.95)), 3),
+    }
+
+
+async def run_benchmark(calls: list[Call], endpointing: Endpointing) -> dict[str, Any]:
+    results: dict[str, Outcome] = {"fixed": Outcome(), "tuned": Outcome()}
+    per_call = []
+    for call in calls:
+        windows = await speech_probabilities(call.samples)
+        fixed = replay(call, windows, endpointing)
+        tuner = ThresholdTuner(
+            VAD_OPTIONS["min_silence_duration"], VAD_OPTIONS["activation_threshold"]
+        )
+        tuned = replay(call, windows, endpointing, tuner)
+        for name, outcome in (("fixed", fixed), ("tuned", tuned)):
+            total = results[name]
+            total.latencies += outcome.latencies
+            total.cut_offs += outcome.cut_offs
+            total.noise_triggers += outcome.noise_triggers
+            total.missed_turns += outcome.missed_turns
+        final = tuner.thresholds
+        per_call.append(
+            {
+                "call": call.name,
+                "turns": len(call.turns),
+                "latency_saved": round(
+                    float(np.mean(fixed.latencies or [0.0]))
+                    - float(np.mean(tuned.latencies or [0.0])),
+                    3,
+                ),
+                "extra_cut_offs": tuned.cut_offs - fixed.cut_offs,
+                "min_silence_duration": final.min_silence_duration,
+                "activation_threshold": final.activation_threshold,
+                "noise_dbfs": round(tuner.noise_dbfs or 0.0, 1),
+            }
+        )
+
+    turns = sum(len(call.turns) for call in calls)
+    report: dict[str, Any] = {"calls": len(calls), "turns": turns}
+    for name, outcome in results.items():
+        report[name] = {
+            "latency": summarize(outcome.latencies),
+            "cut_offs": outcome.cut_offs,
+            "noise_triggers": outcome.noise_triggers,
+            "missed_turns": outcome.missed_turns,
+        }
+    report["latency_saved"] = {
+        key: round(report["fixed"]["latency"][key] - report["tuned"]["latency"][key], 3)
+        for key in ("mean", "p50", "p95")
+    }
+    report["extra_cut_offs"] = results["tuned"].cut_offs - results["fixed"].cut_offs
+    report["extra_cut_offs_per_100_turns"] = (
+        round(100 * report["extra_cut_offs"] / turns, 2) if turns else 0.0
+    )
+    report["per_call"] = per_call
+    return report
+
+
+def print_report(report: dict[str, Any]) -> None:
+    print(f"{report['calls']} calls, {report['turns']} user turns\n")
+    print(
+        f"{'':8}{'mean':>8}{'p50':>8}{'p95':>8}{'cut-offs':>10}{'noise':>8}{'missed':>8}"
+    )
+    for name in ("fixed", "tuned"):
+        row = report[name]
+        latency = row["latency"]
+        print(
+            f"{name:8}{latency['mean']:8.3f}{latency['p50']:8.3f}{latency['p95']:8.3f}"
+            f"{row['cut_offs']:10}{row['noise_triggers']:8}{row['missed_turns']:8}"
+        )
+    saved = report["latency_saved"]
+    print(
+        f"\nlatency saved: mean {saved['mean'] * 1000:.0f} ms, "
+        f"p95 {saved['p95'] * 1000:.0f} ms; extra false cut-offs: "
+        f"{report['extra_cut_offs']} ({report['extra_cut_offs_per_100_turns']} per 100 turns)\n"
+    )
+    print(
+        f"{'call':24}{'saved':>8}{'cut-offs':>10}{'silence':>9}{'threshold':>11}{'noise':>8}"
+    )
+    for row in report["per_call"]:
+        print(
+            f"{row['call']:24}{row['latency_saved'] * 1000:6.0f}ms{row['extra_cut_offs']:+10}"
+            f"{row['min_silence_duration']:9.2f}{row['activation_threshold']:11.2f}"
+            f"{row['noise_dbfs']:8.1f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--corpus", type=Path, help="directory of labeled call WAVs")
+    source.add_argument(
+        "--synthetic", type=int, default=12, help="number of generated calls"
+    )
+    parser.add_argument(
+        "--turns", type=int, default=8, help="user turns per generated call"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-endpointing-delay", type=float, default=0.5)
+    parser.add_argument("--max-endpointing-delay", type=float, default=6.0)
+    parser.add_argument(
+        "--unlikely-threshold",
+        type=float,
+        default=0.1,
+        help="turn detector probability below which the max delay applies",
+    )
+    parser.add_argument("--json", type=Path, help="also write the report here")
+    args = parser.parse_args()
+
+    calls = (
+        load_corpus(args.corpus)
+        if args.corpus
+        else synthetic_corpus(args.synthetic, turns=args.turns, seed=args.seed)
+    )
+    endpointing = Endpointing(
+        args.min_endpointing_delay, args.max_endpointing_delay, args.unlikely_threshold
+    )
+    report = asyncio.run(run_benchmark(calls, endpointing))
+    print_report(report)
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""Load-aware job admission for the worker.
+
+livekit's default load is the host CPU averaged over a few seconds. Under a
+burst, VAD and turn detector inference can starve the job event loops well
+before CPU looks saturated, and then every call in progress gets slower at
+once. ``AdmissionController`` combines four signals into one load score:
+
+* process CPU of the host or container (livekit's cgroup-aware monitor);
+* event-loop lag, sampled in each job process by ``LoopLagMonitor`` and
+  written to the worker's metrics directory;
+* active jobs of the worker;
+* pending requests to the worker's inference process (turn detector).
+
+Each signal is scaled by its limit, and the score is the largest of them, so
+the first resource to run out decides. As ``load_fnc`` the score marks the
+worker full at ``load_threshold``. As ``request_fnc`` it defers a job offered
+above the threshold for a moment and rejects it if the load does not drop. The
+server then offers the job to another worker.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from livekit.agents import JobRequest, utils
+from livekit.agents.utils.hw import get_cpu_monitor
+
+logger = logging.getLogger("admission")
+
+LOAD_THRESHOLD_ENV = "LOAD_THRESHOLD"
+MAX_SESSIONS_ENV = "MAX_SESSIONS"
+
+COMPONENTS = ("cpu", "loop_lag", "sessions", "inference_queue")
+
+
+@dataclass(frozen=True)
+class LoadLimits:
+    """Value of each signal that counts as full load."""
+
+    loop_lag: float = 0.1
+    sessions: int = 20
+    inference_queue: int = 8
+
+
+def load_score(components: dict[str, float], limits: LoadLimits) -> float:
+    """Highest of the signals relative to their limits, within 0 and 1."""
+    scaled = (
+        components["cpu"],
+        components["loop_lag"] / limits.loop_lag,
+        components["sessions"] / limits.sessions,
+        components["inference_queue"] / limits.inference_queue,
+    )
+    return min(max(scaled), 1.0)
+
+
+class LoopLagMonitor:
+    """Measure how late the event loop of a job process wakes up.
+
+    The worst lag of the recent samples is written to ``load-<pid>.json`` in the
+    worker's metrics directory, where ``AdmissionController`` picks it up.
+
+    Args:
+        metrics_dir: Directory shared with the worker, ``None`` to only measure.
+        interval: Seconds between samples.
+        window: Samples the reported lag is the maximum of.
+    """
+
+    def __init__(
+        self,
+        metrics_dir: str | Path | None,
+        *,
+        interval: float = 0.25,
+        window: int = 8,
+    ) -> None:
+        self._path = (
+            Path(metrics_dir) / f"load-{os.getpid()}.json" if metrics_dir else None
+        )
+        self._interval = interval
+        self._samples: deque[float] = deque(maxlen=window)
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def lag(self) -> float:
+        return max(self._samples, default=0.0)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name="LoopLagMonitor._run")
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self._interval
+            await asyncio.sleep(self._interval)
+            self._samples.append(max(0.0, loop.time() - expected))
+            self._write()
+
+    def _write(self) -> None:
+        if self._path is None:
+            return
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self._path.with_suffix(".tmp")
+            tmp.write_text(json.dumps({"loop_lag": self.lag}))
+            os.replace(tmp, self._path)
+        except OSError:
+            logger.warning("failed to write loop lag", exc_info=True)
+
+    async def aclose(self) -> None:
+        if self._task is not None:
+            await utils.aio.cancel_and_wait(self._task)
+        if self._path is not None:
+            # a finished job no longer adds to the worker's load
+            self._path.unlink(missing_ok=True)
+
+
+class AdmissionController:
+    """Worker ``load_fnc`` and ``request_fnc`` based on the combined load score.
+
+    Args:
+        metrics_dir: Directory the job processes write their loop lag into.
+        threshold: Score from which jobs are deferred, then rejected.
+        limits: Value of each signal that counts as full load.
+        defer: Seconds a job offered above the threshold waits for the load to drop.
+        stale_after: Seconds after which a job's loop lag report is ignored.
+        cpu: Sampler returning CPU usage within 0 and 1, blocks for its interval.
+    """
+
+    def __init__(
+        self,
+        metrics_dir: str | Path | None,
+        *,
+        threshold: float = 0.75,
+        limits: LoadLimits | None = None,
+        defer: float = 1.0,
+        stale_after: float = 5.0,
+        cpu: Callable[[], float] | None = None,
+    ) -> None:
+        self._metrics_dir = Path(metrics_dir) if metrics_dir else None
+        self.threshold = threshold
+        self._limits = limits or LoadLimits()
+        self._defer = defer
+        self._stale_after = stale_after
+        self._cpu = cpu or _cpu_sampler()
+        self._cpu_avg = utils.MovingAverage(4)
+        self._lock = threading.Lock()
+        self.components = dict.fromkeys(COMPONENTS, 0.0)
+        self.score = 0.0
+        self.decisions = {"accepted": 0, "deferred": 0, "rejected": 0}
+
+    def load(self, worker: Any) -> float:
+        """``load_fnc``: runs on a worker thread every half second."""
+        self._cpu_avg.add_sample(self._cpu())
+        components = {
+            "cpu": self._cpu_avg.get_avg(),
+            "loop_lag": self._loop_lag(),
+            "sessions": float(len(worker.active_jobs)),
+            "inference_queue": float(_inference_queue(worker)),
+        }
+        score = load_score(components, self._limits)
+        with self._lock:
+            was_full = self.score >= self.threshold
+            self.components, self.score = components, score
+        if was_full != (score >= self.threshold):
+            logger.info(
+                "worker full" if not was_full else "worker available",
+                extra={"score": round(score, 3), **components},
+            )
+        return score
+
+    def _loop_lag(self) -> float:
+        if self._metrics_dir is None:
+            return 0.0
+        now = time.time()
+        lag = 0.0
+        for path in self._metrics_dir.glob("load-*.json"):
+            try:
+                if now - path.stat().st_mtime > self._stale_after:
+                    continue  # the job process died without cleaning up
+                lag = max(lag, json.loads(path.read_text())["loop_lag"])
+            except (OSError, ValueError, KeyError):
+                continue  # being replaced, picked up on the next sample
+        return lag
+
+    async def request(self, req: JobRequest) -> None:
+        """``request_fnc``: accept, or defer and then accept or reject."""
+        if self.score >= self.threshold:
+            self.decisions["deferred"] += 1
+            deadline = time.monotonic() + self._defer
+            while self.score >= self.threshold and time.monotonic() < deadline:
+                await asyncio.sleep(0.1)
+            if self.score >= self.threshold:
+                self.decisions["rejected"] += 1
+                logger.warning(
+                    "rejecting job, worker overloaded",
+                    extra={"score": round(self.score, 3), **self.components},
+                )
+                await req.reject()
+                return
+
+        self.decisions["accepted"] += 1
+        await req.accept()
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            components, score = dict(self.components), self.score
+        lines = [
+            "# HELP agent_worker_load Combined load score and its signals",
+            "# TYPE agent_worker_load gauge",
+            f'agent_worker_load{{signal="score"}} {score}',
+            *(f'agent_worker_load{{signal="{k}"}} {v}' for k, v in components.items()),
+            "# HELP agent_job_requests_total Job offers by admission decision",
+            "# TYPE agent_job_requests_total counter",
+            *(
+                f'agent_job_requests_total{{decision="{k}"}} {v}'
+                for k, v in self.decisions.items()
+            ),
+        ]
+        return "\n".join(lines) + "\n"
+
+
+def _cpu_sampler() -> Callable[[], float]:
+    monitor = get_cpu_monitor()  # cgroup-aware, same as livekit's default load
+    return lambda: monitor.cpu_percent(interval=0.25)
+
+
+def _inference_queue(worker: Any) -> int:
+    # livekit exposes no public count of pending inference requests
+    executor = getattr(worker, "_inference_executor", None)
+    return len(getattr(executor, "_active_requests", ()))
@@ -1,35 +1,107 @@
+from __future__ import annotations
+
 import logging
 import os
+import sys
+from collections.abc import AsyncIterable
+from typing import Any
 
 from livekit.agents import (
-    NOT_GIVEN,
     Agent,
-    AgentFalseInterruptionEvent,
     AgentSession,
     JobContext,
+    JobExecutorType,
     JobProcess,
     MetricsCollectedEvent,
+    ModelSettings,
     RoomInputOptions,
+    RoomOutputOptions,
     RunContext,
+    StopResponse,
     WorkerOptions,
     cli,
+    llm,
     metrics,
+    stt,
+    tts,
+    vad,
 )
 from livekit.agents.llm import function_tool
-from livekit.plugins import google, noise_cancellation, silero
+from livekit.agents.voice.agent_session import TurnDetectionMode
+from livekit.plugins import silero
 from livekit.plugins.turn_detector.multilingual import MultilingualModel
 
 from dotenv import load_dotenv
 
+from admission import (
+    LOAD_THRESHOLD_ENV,
+    MAX_SESSIONS_ENV,
+    AdmissionController,
+    LoadLimits,
+    LoopLagMonitor,
+)
+from audio_path import INPUT_SAMPLE_RATE
+from latency_tracer import (
+    METRICS_DIR_ENV,
+    METRICS_PORT_ENV,
+    TurnTracer,
+    default_metrics_dir,
+    start_metrics_server,
+)
+from context_window import ContextWindow
+from export_pipeline import METRICS_EXPORT_PATH_ENV, MetricsExporter, get_pipeline
+from faq import FaqEntry, FaqIndex, FaqResponder
+from filler import FillerBank, ToolFiller
+from handoff import Handoffs, Route, Router
+from hedged_llm import HedgedLLM, hedge_model
+from lookups import Lookups, canonical_order_number
+from loop_profiler import LoopInstrumentation
+from model_host import (
+    JobMemory,
+    enable_preload,
+    job_executor_type,
+    shared_turn_detector,
+    shared_vad,
+)
+from prefetch import Prefetcher, extract_cities, extract_order_numbers
+from prompt import PromptAssembler, SectionRule, subsections
+from speech_buffer import SpeechBuffer
+from startup import (
+    get_timeline,
+    import_plugins,
+    lazy_import,
+    plugins_deferred,
+    watch_worker,
+)
+from text_normalizer import normalize_stream
+from tts_cache import CachedTTS
+from tts_chunking import AdaptiveChunker, ChunkPolicy
+from usage_store import USAGE_DB_ENV, UsageStore, session_models
+from vad_tuner import EndpointingTuner
+from warm_providers import (
+    ProviderPool,
+    gemini_provider,
+    google_stt_provider,
+    google_tts_provider,
+    warmup_enabled,
+)
+
 logger = logging.getLogger("agent")
 
 load_dotenv(".env.local")
 
+# Only job processes build the Gemini, STT and TTS clients and the noise filter;
+# these import on first use so the worker process can start without them
+google = lazy_import("livekit.plugins.google")
+noise_cancellation = lazy_import("livekit.plugins.noise_cancellation")
 
-class Assistant(Agent):
-    def __init__(self) -> None:
-        super().__init__(
-            instructions="""<SystemPreamble>
+PROMPT_BUDGET_ENV = "PROMPT_TOKEN_BUDGET"
+FILLER_DELAY_ENV = "TOOL_FILLER_DELAY"
+
+
+# The full persona prompt, split into tagged sections. Only the core below goes
+# out on every turn; the other sections are added when the conversation needs them.
+PERSONA_PROMPT = """<SystemPreamble>
 You are Riya, an AI-powered Amazon Customer Care Agent designed to provide exceptional customer service through voice interactions. Your primary goal is to handle customer inquiries with natural, flowing conversations while maintaining a professional, empathetic, and helpful demeanor. Respond naturally as if you have immediate access to information and can resolve issues conversationally.
 </SystemPreamble>
 
@@ -50,12 +122,8 @@ Tone: Warm, professional, and customer-focused
 </LanguageGuidelines>
 
 <TTSCompatibilityRules>
-Numbers: Always spell out numbers as words (e.g., "twenty-five" not "25")
-Dates: Spell out completely (e.g., "March fifteenth, two thousand twenty-four")
-Currency: Spell out amounts (e.g., "twenty-nine dollars and ninety-nine cents" not "$29.99")
-Order Numbers: Spell each digit individually (e.g., "one-one-two-dash-seven-eight-nine-zero-one-two-three")
-Abbreviations: Expand all abbreviations (e.g., "Amazon Prime" not "Prime", "United States Postal Service" not "USPS")
-Special Characters: Avoid symbols, use words instead (e.g., "at" instead of "@")
+Write numbers, amounts, dates and order numbers in digits (e.g., "$29.99", "March 15", "112-7890123-4567890"), they are converted for speech
+Abbreviations: Expand all abbreviations (e.g., "Amazon Prime" not "Prime")
 </TTSCompatibilityRules>
 
 <AmazonSpecificKnowledge>
@@ -245,16 +313,16 @@ Opening Example:
 "Hello! Thank you for calling Amazon Customer Service. My name is Riya, and I'm here to help you today. May I please have your name and the email address associated with your Amazon account?"
 
 Order Issue Example:
-"I see you're calling about order number one-one-two-dash-seven-eight-nine-zero-one-two-three for the Apple AirPods Pro. I can see this was delivered yesterday, but you haven't received it. Let me check the delivery details and help resolve this for you right away."
+"I see you're calling about order number 112-7890123-4567890 for the Apple AirPods Pro. I can see this was delivered yesterday, but you haven't received it. Let me check the delivery details and help resolve this for you right away."
 
 Prime Membership Example:
-"I understand you have questions about your Prime membership billing. I can see you've been a valued Prime member for three years. Let me review your account and explain the recent charge of one hundred thirty-nine dollars."
+"I understand you have questions about your Prime membership billing. I can see you've been a valued Prime member for three years. Let me review your account and explain the recent charge of $139."
 
 Resolution Example:
-"Perfect! I've processed a replacement for your AirPods Pro, and it will arrive by tomorrow with free one-day shipping. I've also issued a five-dollar account credit for the inconvenience. Your confirmation number is AMZ-REP-seven-eight-nine-one-two-three. Is there anything else I can help you with today?"
+"Perfect! I've processed a replacement for your AirPods Pro, and it will arrive by tomorrow with free one-day shipping. I've also issued a $5 account credit for the inconvenience. Your confirmation number is AMZ-REP-789123. Is there anything else I can help you with today?"
 
 Closing Example:
-"Wonderful! I've successfully resolved your delivery issue and you should see the replacement arrive tomorrow. Your reference number is AMZ-seven-eight-nine-one-two-three for any future questions. Thank you for being a loyal Amazon customer, and have a great day!"
+"Wonderful! I've successfully resolved your delivery issue and you should see the replacement arrive tomorrow. Your reference number is AMZ-789123 for any future questions. Thank you for being a loyal Amazon customer, and have a great day!"
 </SampleInteractions>
 
 <ErrorHandling>
@@ -310,26 +378,372 @@ Agent: "Thank you, Sarah. I can see you're a Prime member. What can I help you w
 Customer: "I have an order that shows delivered, but I never received it."
 Agent: "I'm sorry to hear that, Sarah. Let me look into this right away. Can you provide me with your order number?"
 Customer: "It's 112-7890123-4567890."
-Agent: "Perfect. I can see this order for Apple AirPods Pro that was delivered yesterday at two thirty PM to your front door. Since you haven't received it, let me start a replacement process immediately and also check with our delivery team about what might have happened."
+Agent: "Perfect. I can see this order for Apple AirPods Pro that was delivered yesterday at 2:30 PM to your front door. Since you haven't received it, let me start a replacement process immediately and also check with our delivery team about what might have happened."
 
 Demo Script 2 - Prime Membership Question:
 Agent: "Hello! Thank you for calling Amazon Customer Service. My name is Riya, and I'm here to help you today."
 Customer: "Hi, I'm Jennifer Martinez, and I have a question about a charge on my account."
 Agent: "I'd be happy to help you with that, Jennifer. Can you tell me more about the charge you're seeing?"
-Customer: "I was charged one hundred thirty-nine dollars for Prime, but I thought it was one hundred nineteen dollars."
-Agent: "I understand your concern, Jennifer. I can see you've been a loyal Prime member for three years. The annual Prime membership price did increase to one hundred thirty-nine dollars this year. Let me explain the additional benefits you're now receiving and also discuss some options that might work better for your budget."
+Customer: "I was charged $139 for Prime, but I thought it was $119."
+Agent: "I understand your concern, Jennifer. I can see you've been a loyal Prime member for three years. The annual Prime membership price did increase to $139 this year. Let me explain the additional benefits you're now receiving and also discuss some options that might work better for your budget."
 
 Demo Script 3 - Return Issue:
 Agent: "Hello! Thank you for calling Amazon Customer Service. My name is Riya."
 Customer: "Hi, I'm Lisa Wang. I returned a laptop two weeks ago but haven't gotten my refund yet."
 Agent: "I'm sorry for the delay, Lisa. Let me check on your return status immediately. Can you provide me with the order number for the laptop?"
 Customer: "It's 115-3456789-0123456."
-Agent: "Thank you. I can see your eight hundred ninety-nine dollar laptop return was received at our facility. I'm going to expedite the refund processing right now, and you should see the credit back to your original payment method within twenty-four to forty-eight hours. I'll also send you a confirmation email with the details."
-</DemoScriptExamples>""",
-        )
+Agent: "Thank you. I can see your $899 laptop return was received at our facility. I'm going to expedite the refund processing right now, and you should see the credit back to your original payment method within 24 to 48 hours. I'll also send you a confirmation email with the details."
+</DemoScriptExamples>"""
+
+PROMPT = PromptAssembler(
+    PERSONA_PROMPT,
+    core=[
+        "SystemPreamble",
+        "AgentProfile",
+        "LanguageGuidelines",
+        "TTSCompatibilityRules",
+        "ConversationGuidelines",
+    ],
+    rules={
+        "ConversationFlow": SectionRule(
+            opening=2, keywords=[r"verif", r"email", r"account"], priority=3
+        ),
+        "AmazonSpecificKnowledge": SectionRule(
+            keywords=[
+                r"prime", r"ship", r"deliver", r"return", r"refund", r"pay",
+                r"card", r"gift", r"locker", r"order", r"package", r"membership",
+                r"charge", r"bill",
+            ],
+            priority=5,
+        ),
+        "ObjectionHandling": SectionRule(
+            keywords=[
+                r"cancel", r"frustrat", r"too long", r"ridiculous", r"unacceptable",
+                r"downhill", r"years", r"unreliable", r"angry", r"terrible", r"worst",
+            ],
+            priority=4,
+        ),
+        "EscalationProcedures": SectionRule(
+            keywords=[
+                r"supervisor", r"manager", r"escalat", r"lawyer", r"legal",
+                r"complaint", r"human", r"real person", r"safety",
+            ],
+            priority=4,
+        ),
+        "StateManagement": SectionRule(
+            keywords=[
+                r"hold on", r"one (?:moment|sec)", r"be right back", r"step away",
+                r"disconnect", r"i'm back", r"still there",
+            ],
+            priority=2,
+        ),
+        "AmazonComplianceGuidelines": SectionRule(
+            keywords=[
+                r"password", r"secur", r"hack", r"fraud", r"unauthori[sz]ed",
+                r"verif", r"phone number", r"email",
+            ],
+            priority=3,
+        ),
+        "ErrorHandling": SectionRule(
+            keywords=[
+                r"confus", r"don't understand", r"what do you mean", r"not working",
+                r"error", r"doesn't make sense",
+            ],
+            priority=2,
+        ),
+        "SampleInteractions": SectionRule(opening=1, priority=1),
+        "DemoScriptExamples": SectionRule(opening=1, priority=0),
+        # QualityStandards and PerformanceMetrics are internal KPIs, never sent
+    },
+    budget_tokens=int(os.environ.get(PROMPT_BUDGET_ENV, "1800")),
+)
+
+
+# Prompts of the routed agents: a shared core without the knowledge and issue
+# patterns of every topic, plus a desk section with the slice of one topic
+_GUIDELINES = subsections(PROMPT.section("ConversationGuidelines"))
+_KNOWLEDGE = subsections(PROMPT.section("AmazonSpecificKnowledge"))
+_ISSUE_PATTERNS = _GUIDELINES["Common Issue Handling Patterns"].splitlines()[1:]
+
+
+def _desk(tag: str, role: str, issues: list[str], knowledge: list[str]) -> str:
+    patterns = [line for line in _ISSUE_PATTERNS if line.startswith(tuple(issues))]
+    blocks = [
+        role,
+        "\n".join(["Common Issue Handling Patterns:", *patterns]),
+        *(_KNOWLEDGE[name] for name in knowledge),
+    ]
+    return f"<{tag}>\n" + "\n\n".join(blocks) + f"\n</{tag}>"
+
+
+ROUTED_PROMPT = "\n\n".join([
+    PERSONA_PROMPT,
+    f"<NaturalFlow>\n{_GUIDELINES['Natural Flow Principles']}\n</NaturalFlow>",
+    _desk(
+        "TriageDesk",
+        "You take the call first. Greet the customer, find out what they need and "
+        "help with general questions; account security questions stay with you.",
+        ["- Account security", "- Product defects", "- Gift card"],
+        [],
+    ),
+    _desk(
+        "OrdersDesk",
+        "You handle orders and deliveries: order status, tracking, late or "
+        "missing packages and wrong items.",
+        ["- Order not received", "- Wrong item", "- Delivery delays"],
+        ["Delivery Options"],
+    ),
+    _desk(
+        "ReturnsDesk",
+        "You handle returns and refunds: return windows, drop-off options and the "
+        "status of a refund.",
+        ["- Return issues", "- Wrong item", "- Product defects"],
+        ["Return Policy"],
+    ),
+    _desk(
+        "BillingDesk",
+        "You handle Prime membership and billing: benefits, membership charges, "
+        "payment methods and unexpected charges.",
+        ["- Prime billing"],
+        ["Prime Membership Benefits", "Payment Methods"],
+    ),
+])
+ROUTED_CORE = [
+    "SystemPreamble", "AgentProfile", "LanguageGuidelines", "TTSCompatibilityRules",
+    "NaturalFlow",
+]  # fmt: skip
+ROUTED_RULES = {
+    name: rule
+    for name, rule in PROMPT.rules.items()
+    # each desk carries its own slice of the knowledge
+    if name != "AmazonSpecificKnowledge"
+}
+
+
+def desk_prompt(desk: str) -> PromptAssembler:
+    return PromptAssembler(
+        ROUTED_PROMPT,
+        core=[*ROUTED_CORE, desk],
+        rules=ROUTED_RULES,
+        budget_tokens=PROMPT.budget_tokens,
+    )
 
-    # all functions annotated with @function_tool will be passed to the LLM when this
-    # agent is active
+
+# Keywords of the user message that hand the call to a specialist, checked when
+# the turn ends; the current specialist keeps the turn while its own rule matches.
+# Keywords are whole words, "later" is not "late"; the triage route takes general
+# questions back from the specialists
+ROUTES = [
+    Route(
+        "triage",
+        SectionRule(
+            keywords=[
+                r"weather", r"forecast", r"temperature", r"rain(?:ing|y)?",
+                r"snow(?:ing|y)?", r"storms?", r"something else", r"another question",
+                r"(?:a )?different question",
+            ],
+            whole_words=True,
+        ),
+        topic="a general question",
+    ),
+    Route(
+        "orders",
+        SectionRule(
+            keywords=[
+                r"orders?", r"ordered", r"packages?", r"deliver(?:y|ies|ed)?",
+                r"ship(?:s|ped|ping|ment|ments)?", r"track(?:ing|ed)?",
+                r"arriv(?:e|ed|es|ing|al)", r"late", r"delayed", r"wrong item",
+                r"lockers?",
+            ],
+            priority=1,
+            whole_words=True,
+        ),
+        topic="an order or a delivery",
+    ),
+    Route(
+        "returns",
+        SectionRule(
+            keywords=[
+                r"return(?:s|ed|ing)?", r"refund(?:s|ed)?", r"send (?:it|this) back",
+                r"exchange(?:d)?",
+            ],
+            priority=2,
+            whole_words=True,
+        ),
+        topic="a return or a refund",
+    ),
+    Route(
+        "billing",
+        SectionRule(
+            keywords=[
+                r"prime", r"memberships?", r"charge(?:s|d)?", r"bill(?:s|ed|ing)?",
+                r"payments?", r"pay(?:ing)?", r"(?:credit|debit) card",
+                r"subscriptions?", r"renew(?:s|ed|al)?",
+            ],
+            priority=2,
+            whole_words=True,
+        ),
+        topic="Prime membership or billing",
+    ),
+]
+
+
+# Vetted answers from AmazonSpecificKnowledge, spoken without an LLM request when
+# the question clearly matches one of the examples
+FAQ_ENTRIES = [
+    FaqEntry(
+        id="prime_benefits",
+        questions=[
+            "What are the Prime benefits?",
+            "What do I get with Prime?",
+            "What does a Prime membership include?",
+            "What comes with Amazon Prime?",
+        ],
+        answer=(
+            "Amazon Prime includes free two-day shipping on eligible items, Prime "
+            "Video, Prime Music with over two million songs, Prime Reading, Whole "
+            "Foods discounts, unlimited photo storage with Amazon Photos, and Prime "
+            "Gaming. Is there a benefit you'd like to know more about?"
+        ),
+    ),
+    FaqEntry(
+        id="delivery_options",
+        questions=[
+            "What are the delivery options?",
+            "What shipping options do you have?",
+            "How long does standard shipping take?",
+            "Do you have same day delivery?",
+            "How fast is one day shipping?",
+        ],
+        answer=(
+            "Standard shipping takes three to five business days. Amazon Prime "
+            "members get two-day shipping, one-day shipping is available in select "
+            "areas, and same-day delivery is available in major cities. You can also "
+            "pick up your order at an Amazon Locker or an Amazon Hub Counter."
+        ),
+    ),
+    FaqEntry(
+        id="return_window",
+        questions=[
+            "What is the return policy?",
+            "What's the return window?",
+            "How long do I have to return an item?",
+            "How many days do I have to return something?",
+        ],
+        answer=(
+            "Most items can be returned within thirty days, and some items have an "
+            "extended return period. Digital content generally can't be returned, and "
+            "many items qualify for free returns. Is there an item you'd like to "
+            "return?"
+        ),
+    ),
+    FaqEntry(
+        id="return_methods",
+        questions=[
+            "Where can I drop off a return?",
+            "How do I send a return back?",
+            "Can I return something at Whole Foods?",
+            "What are the ways to return an item?",
+        ],
+        answer=(
+            "You can drop off a return at UPS, an Amazon Locker, Whole Foods, or "
+            "Kohl's. Is there an order you'd like to start a return for?"
+        ),
+    ),
+    FaqEntry(
+        id="payment_methods",
+        questions=[
+            "What payment methods do you accept?",
+            "How can I pay for my order?",
+            "Can I pay with a gift card?",
+            "Do you offer installment plans?",
+        ],
+        answer=(
+            "You can pay with a credit or debit card, Amazon Pay, gift cards and "
+            "promotional credits, or the Amazon Store Card, and installment plans are "
+            "available for eligible purchases."
+        ),
+    ),
+]
+
+
+class CareAgent(Agent):
+    """Prompt assembly, bounded context, fillers, FAQ answers and speech buffering
+    of every customer care agent; the tools come from the subclasses and use the
+    call's lookups."""
+
+    def __init__(
+        self,
+        prompt: PromptAssembler = PROMPT,
+        context_window: ContextWindow | None = None,
+        filler: ToolFiller | None = None,
+        faq: FaqResponder | None = None,
+        speech_buffer: SpeechBuffer | None = None,
+        lookups: Lookups | None = None,
+        *,
+        chat_ctx: llm.ChatContext | None = None,
+    ) -> None:
+        super().__init__(instructions=prompt.core, chat_ctx=chat_ctx)
+        self._prompt = prompt
+        self._context_window = context_window
+        self._filler = filler
+        self._faq = faq
+        self._speech_buffer = speech_buffer
+        self._lookups = lookups or Lookups()
+
+    async def llm_node(
+        self,
+        chat_ctx: llm.ChatContext,
+        tools: list[llm.FunctionTool | llm.RawFunctionTool],
+        model_settings: ModelSettings,
+    ):
+        if self._faq is not None and (answer := self._faq.answer(chat_ctx)) is not None:
+            # a vetted answer to a static question, no LLM request
+            yield answer
+            return
+
+        # the static core is the agent's instructions; add this turn's sections
+        chat_ctx = self._prompt.apply(chat_ctx)
+        if self._context_window is not None:
+            # older turns are replaced by a summary built in the background
+            chat_ctx = self._context_window.apply(chat_ctx)
+
+        spoke = False
+        async for chunk in Agent.default.llm_node(self, chat_ctx, tools, model_settings):
+            if self._filler is not None and isinstance(chunk, llm.ChatChunk) and chunk.delta:
+                spoke = spoke or bool(chunk.delta.content)
+                if chunk.delta.tool_calls and not spoke:
+                    # nothing was said before the call, cover the wait if it drags on
+                    self._filler.tool_called()
+            yield chunk
+
+    async def tts_node(self, text: AsyncIterable[str], model_settings: ModelSettings):
+        recording = None
+        if self._speech_buffer is not None:
+            # kept so a false interruption resumes the audio instead of regenerating it
+            recording = self._speech_buffer.record()
+            text = recording.tee(text)
+        # numbers, amounts, dates and codes as spoken words, the transcript keeps
+        # the digits
+        text = normalize_stream(text)
+
+        async for frame in Agent.default.tts_node(self, text, model_settings):
+            if self._filler is not None:
+                # the reply is ready to play, cut any filler short
+                self._filler.speech_ready()
+            if recording is not None:
+                recording.add_frame(frame)
+            yield frame
+
+        if recording is not None:
+            recording.finish()
+
+
+# all functions annotated with @function_tool will be passed to the LLM when an
+# agent with these tools is active
+
+
+class WeatherTools:
     @function_tool
     async def lookup_weather(self, context: RunContext, location: str):
         """Use this tool to look up current weather information in the given location.
@@ -342,16 +756,283 @@ Agent: "Thank you. I can see your eight hundred ninety-nine dollar laptop return
 
         logger.info(f"Looking up weather for {location}")
 
-        return "sunny with a temperature of 70 degrees."
+        # cached, and possibly already fetched from the interim transcript
+        return await self._lookups.fetch_weather(location)
+
+
+class OrderTools:
+    @function_tool
+    async def lookup_order(self, context: RunContext, order_number: str):
+        """Use this tool to look up the status, item and delivery date of an Amazon order.
+
+        Args:
+            order_number: The order number, three, seven and seven digits (e.g. 112-7890123-4567890)
+        """
+
+        logger.info(f"Looking up order {order_number}")
+
+        return await self._lookups.fetch_order(
+            canonical_order_number(order_number) or order_number
+        )
+
+
+class Assistant(WeatherTools, OrderTools, CareAgent):
+    """One agent with every topic and every tool, as used by the eval suite."""
+
+
+class RoutedAgent(CareAgent):
+    """An agent of a routed call, handing turns of other topics to their agent.
+
+    Args:
+        route: Name of this agent's route.
+        handoffs: Routes of the call and their agents.
+        prompt: This agent's prompt, its desk section included.
+        user_input: User message this agent was handed to answer.
+    """
+
+    def __init__(
+        self,
+        route: str,
+        handoffs: Handoffs,
+        prompt: PromptAssembler,
+        *,
+        chat_ctx: llm.ChatContext | None = None,
+        user_input: str | None = None,
+        **components: Any,
+    ) -> None:
+        super().__init__(prompt, chat_ctx=chat_ctx, **components)
+        self.route = route
+        self.handoffs = handoffs
+        self._user_input = user_input
+
+    async def on_enter(self) -> None:
+        if self._user_input is not None:
+            # the turn that was routed here, answered with one LLM request
+            self.session.generate_reply(user_input=self._user_input)
+            self._user_input = None
+
+    async def on_user_turn_completed(
+        self, turn_ctx: llm.ChatContext, new_message: llm.ChatMessage
+    ) -> None:
+        text = new_message.text_content or ""
+        target = self.handoffs.route(text, current=self.route)
+        if target is None:
+            return
+        # no request was sent for this turn yet; a preemptive reply of this agent
+        # is dropped when it drains, and the next agent answers the turn
+        self.session.update_agent(
+            self.handoffs.handoff(target, self.chat_ctx, text, source=self.route)
+        )
+        raise StopResponse()
+
+
+class TriageAgent(WeatherTools, RoutedAgent):
+    pass
+
+
+class OrdersAgent(OrderTools, RoutedAgent):
+    pass
+
+
+class ReturnsAgent(OrderTools, RoutedAgent):
+    pass
+
+
+class BillingAgent(RoutedAgent):
+    pass
+
+
+DESKS: dict[str, tuple[type[RoutedAgent], str]] = {
+    "triage": (TriageAgent, "TriageDesk"),
+    "orders": (OrdersAgent, "OrdersDesk"),
+    "returns": (ReturnsAgent, "ReturnsDesk"),
+    "billing": (BillingAgent, "BillingDesk"),
+}
+
+
+def build_triage(**components: Any) -> TriageAgent:
+    """The first agent of a routed call, the specialists are built on handoff.
+
+    ``components`` (context window, filler, FAQ, speech buffer, lookups) are shared
+    by all agents of the call.
+    """
+    prompts = {name: desk_prompt(desk) for name, (_, desk) in DESKS.items()}
+
+    def _factory(name: str):
+        cls = DESKS[name][0]
+        return lambda chat_ctx, user_input: cls(
+            name,
+            handoffs,
+            prompts[name],
+            chat_ctx=chat_ctx,
+            user_input=user_input,
+            **components,
+        )
+
+    handoffs = Handoffs(
+        Router(ROUTES), {route.name: _factory(route.name) for route in ROUTES}
+    )
+    return TriageAgent("triage", handoffs, prompts["triage"], **components)
+
+
+# Optimized VAD settings for low latency
+VAD_OPTIONS: dict[str, Any] = {
+    "min_speech_duration": 0.1,      # Reduce from default 0.25s to 0.1s
+    "min_silence_duration": 0.3,     # Reduce from default 0.4s to 0.3s
+    "prefix_padding_duration": 0.05, # Reduce padding from 0.5s to 0.05s
+    "activation_threshold": 0.6,     # Slightly higher threshold for faster detection
+}
+
+
+# Optimized Google TTS: High-quality neural voice, also the phrase cache key
+TTS_VOICE: dict[str, Any] = {
+    "language": "en-US",             # Match STT language
+    "gender": "female",              # For "Riya" persona
+    "speaking_rate": 1.1,            # Slightly faster for efficiency
+    "pitch": 0,                      # Natural pitch
+    "sample_rate": 24000,            # High quality audio
+    "volume_gain_db": 2.0,           # Slight boost for clarity
+}
+
+# Fastest Gemini model for real-time voice
+PRIMARY_MODEL = "gemini-2.0-flash-001"
+
+
+def load_vad(**overrides: Any) -> vad.VAD:
+    return silero.VAD.load(**{**VAD_OPTIONS, **overrides})
 
 
 def prewarm(proc: JobProcess):
-    # Optimized VAD settings for low latency
-    proc.userdata["vad"] = silero.VAD.load(
-        min_speech_duration=0.1,      # Reduce from default 0.25s to 0.1s
-        min_silence_duration=0.3,     # Reduce from default 0.4s to 0.3s
-        prefix_padding_duration=0.05, # Reduce padding from 0.5s to 0.05s
-        activation_threshold=0.6,     # Slightly higher threshold for faster detection
+    timeline = get_timeline()
+    if timeline.role == "process":
+        timeline.role = "job"
+    with timeline.span("prewarm"):
+        # inherited from the forkserver like the VAD, imported here when not
+        import_plugins()
+        # inherited from the forkserver when it preloaded the models, else loaded here
+        with timeline.span("load vad"):
+            proc.userdata["vad"] = shared_vad(**VAD_OPTIONS)
+        proc.userdata["faq"] = FaqIndex(FAQ_ENTRIES)
+        providers = build_providers()
+        # each client resolves its credentials, on a cold pod they wait in parallel
+        with timeline.span("create provider clients"):
+            providers.create(parallel=True)
+        proc.userdata["providers"] = providers
+
+
+def build_prefetcher(lookups: Lookups) -> Prefetcher:
+    # Lookups start as soon as an order number or city is stable in the interim
+    # transcript, the tool call then finds them in the cache
+    return Prefetcher(
+        {
+            "order": (extract_order_numbers, lookups.fetch_order.prefetch),
+            "city": (extract_cities, lookups.fetch_weather.prefetch),
+        }
+    )
+
+
+def build_context_window() -> ContextWindow:
+    # Summaries are written between turns by a cheaper model than the main LLM
+    return ContextWindow(
+        google.LLM(
+            model="gemini-2.0-flash-lite",
+            temperature=0.2,
+            max_output_tokens=250,
+        ),
+        keep_turns=6,
+    )
+
+
+def gemini_llm(model: str) -> google.LLM:
+    # Optimized Gemini LLM: Using Gemini 2.0 Flash for ultra-low latency
+    return google.LLM(
+        model=model,
+        temperature=0.8,                # Balanced creativity and consistency
+        max_output_tokens=200,          # Limit for faster responses in voice context
+        top_p=0.95,                     # Nucleus sampling for quality
+        tool_choice="auto",             # Enable automatic function calling
+    )
+
+
+def google_stt() -> google.STT:
+    # Optimized Google STT: Latest long-form model with streaming
+    return google.STT(
+        languages="en-US",              # Primary language (Amazon customer care context)
+        detect_language=False,          # Disable for speed (we know it's English)
+        interim_results=True,           # Enable for lower perceived latency
+        punctuate=True,                 # Better transcription quality
+        model="latest_long",            # Best quality for conversations
+        sample_rate=INPUT_SAMPLE_RATE,  # Room input rate, no resampling in the stream
+        min_confidence_threshold=0.65,  # Balanced accuracy
+        use_streaming=True,             # Critical for real-time performance
+    )
+
+
+def google_tts() -> google.TTS:
+    return google.TTS(**TTS_VOICE, use_streaming=True)  # Stream for lower latency
+
+
+def build_providers() -> ProviderPool:
+    # Built at prewarm and connected at the top of the entrypoint, so the greeting
+    # and the first answer don't pay the connection setup of each provider
+    hedge = hedge_model()
+    providers = [
+        gemini_provider("llm", lambda: gemini_llm(PRIMARY_MODEL)),
+        google_stt_provider("stt", google_stt),
+        google_tts_provider("tts", google_tts),
+    ]
+    if hedge:
+        providers.append(gemini_provider("llm_hedge", lambda: gemini_llm(hedge)))
+    return ProviderPool(providers, warmup=warmup_enabled())
+
+
+def build_llm(
+    primary: llm.LLM | None = None, hedge: llm.LLM | None = None
+) -> HedgedLLM:
+    # A reply whose first token is later than the recent p95 is raced against a
+    # second request, on LLM_HEDGE_MODEL when set (e.g. gemini-2.0-flash-lite);
+    # errors before the first token fail over to it
+    if hedge is None and (model := hedge_model()):
+        hedge = gemini_llm(model)
+    return HedgedLLM(primary or gemini_llm(PRIMARY_MODEL), hedge)
+
+
+def build_tts(inner: tts.TTS | None = None) -> CachedTTS:
+    # Google TTS behind the phrase cache: recurring phrases (greeting, closing)
+    # play from the cache without a provider round-trip. The first clause of a
+    # reply is synthesized as soon as it is written, the rest by sentence
+    return CachedTTS(
+        inner or google_tts(),
+        voice=TTS_VOICE,
+        tokenizer=AdaptiveChunker(ChunkPolicy.from_env()),
+    )
+
+
+def build_session(
+    vad: vad.VAD,
+    *,
+    llm: llm.LLM | None = None,
+    stt: stt.STT | None = None,
+    tts: tts.TTS | None = None,
+    turn_detection: TurnDetectionMode | None = None,
+    preemptive_generation: bool = True,
+) -> AgentSession:
+    """Build the voice pipeline used for every call.
+
+    Providers default to Google Gemini; the offline benchmarks pass local stand-ins
+    so the same VAD, turn detection and session settings are measured without network.
+    """
+    return AgentSession(
+        # Gemini 2.0 Flash, hedged against a stalled first token
+        llm=llm or build_llm(),
+        stt=stt or google_stt(),
+        tts=tts or build_tts(),
+        # Optimized Turn Detection: Faster multilingual detection
+        turn_detection=turn_detection or MultilingualModel(),
+        # Optimized VAD from prewarm
+        vad=vad,
+        # Performance optimizations
+        preemptive_generation=preemptive_generation,  # Generate responses while user is speaking
     )
 
 
@@ -362,44 +1043,57 @@ async def entrypoint(ctx: JobContext):
         "room": ctx.room.name,
     }
 
+    # Log handlers run on a background thread, the event loop only queues records
+    export = get_pipeline()
+    export.attach_logging()
+    metrics_export = (
+        MetricsExporter(export, path, fields={"room": ctx.room.name})
+        if (path := os.environ.get(METRICS_EXPORT_PATH_ENV))
+        else None
+    )
+
+    # Opt-in: LOOP_BLOCKING_MS logs callbacks that block the event loop with their
+    # stack, LOOP_PROFILE_DIR gets collapsed stacks of the loop for flamegraphs
+    if (instrumentation := LoopInstrumentation.from_env(ctx.room.name)) is not None:
+        instrumentation.start()
+        ctx.add_shutdown_callback(instrumentation.aclose)
+
+    # Event-loop lag of this job, part of the worker's load score
+    loop_lag = LoopLagMonitor(os.environ.get(METRICS_DIR_ENV))
+    loop_lag.start()
+    ctx.add_shutdown_callback(loop_lag.aclose)
+
+    # RSS of this job process, and the part not shared with the other jobs
+    job_memory = JobMemory()
+    job_memory.start()
+    ctx.add_shutdown_callback(job_memory.aclose)
+
     # Set up an optimized low-latency voice AI pipeline with Google Gemini
-    session = AgentSession(
-        # Optimized Gemini LLM: Using Gemini 2.0 Flash for ultra-low latency
-        llm=google.LLM(
-            model="gemini-2.0-flash-001",  # Fastest Gemini model for real-time voice
-            temperature=0.8,                # Balanced creativity and consistency
-            max_output_tokens=200,          # Limit for faster responses in voice context
-            top_p=0.95,                     # Nucleus sampling for quality
-            tool_choice="auto",             # Enable automatic function calling
-        ),
-        # Optimized Google STT: Latest long-form model with streaming
-        stt=google.STT(
-            languages="en-US",              # Primary language (Amazon customer care context)
-            detect_language=False,          # Disable for speed (we know it's English)
-            interim_results=True,           # Enable for lower perceived latency
-            punctuate=True,                 # Better transcription quality
-            model="latest_long",            # Best quality for conversations
-            sample_rate=16000,              # Standard telephony quality
-            min_confidence_threshold=0.65,  # Balanced accuracy
-            use_streaming=True,             # Critical for real-time performance
-        ),
-        # Optimized Google TTS: High-quality neural voice
-        tts=google.TTS(
-            language="en-US",               # Match STT language
-            gender="female",                # For "Riya" persona
-            speaking_rate=1.1,              # Slightly faster for efficiency
-            pitch=0,                        # Natural pitch
-            sample_rate=24000,              # High quality audio
-            use_streaming=True,             # Stream for lower latency
-            volume_gain_db=2.0,             # Slight boost for clarity
+    # The turn detector is a client of the worker's inference process, one per process
+    # Provider clients come from prewarm, their connections open in the background
+    providers: ProviderPool = ctx.proc.userdata["providers"]
+    providers.start()
+    # VAD silence and activation threshold are tuned per call, from false
+    # interruptions, the line's noise floor and the turn detector; VAD_TUNING=0
+    # keeps VAD_OPTIONS for every caller
+    tuner = EndpointingTuner.from_env(ctx.proc.userdata["vad"], shared_turn_detector())
+    session = build_session(
+        tuner.vad if tuner is not None else ctx.proc.userdata["vad"],
+        llm=build_llm(providers["llm"], providers.get("llm_hedge")),
+        stt=providers["stt"],
+        tts=build_tts(providers["tts"]),
+        turn_detection=(
+            tuner.turn_detector if tuner is not None else shared_turn_detector()
         ),
-        # Optimized Turn Detection: Faster multilingual detection
-        turn_detection=MultilingualModel(),
-        # Optimized VAD from prewarm
-        vad=ctx.proc.userdata["vad"],
-        # Performance optimizations
-        preemptive_generation=True,        # Generate responses while user is speaking
     )
+    if tuner is not None:
+        tuner.attach(session)
+
+    # Static policy questions are answered from the FAQ index built at prewarm,
+    # the answers are pre-synthesized into the phrase cache
+    faq = FaqResponder(ctx.proc.userdata["faq"])
+    faq.attach(session, session.tts)
+    ctx.add_shutdown_callback(faq.aclose)
 
     # To use a realtime model instead of a voice pipeline, use the following session setup instead:
     # session = AgentSession(
@@ -408,26 +1102,66 @@ async def entrypoint(ctx: JobContext):
     # )
 
     # sometimes background noise could interrupt the agent session, these are considered false positive interruptions
-    # when it's detected, you may resume the agent's speech
-    @session.on("agent_false_interruption")
-    def _on_agent_false_interruption(ev: AgentFalseInterruptionEvent):
-        logger.info("false positive interruption, resuming")
-        session.generate_reply(instructions=ev.extra_instructions or NOT_GIVEN)
+    # when it's detected, the rest of the agent's speech is resumed from its buffered
+    # audio, and only regenerated when the buffer expired or the user spoke since
+    speech_buffer = SpeechBuffer()
 
     # Metrics collection, to measure pipeline performance
     # For more information, see https://docs.livekit.io/agents/build/metrics/
     usage_collector = metrics.UsageCollector()
+    # With USAGE_DB_PATH set, tokens, audio seconds and characters of every turn
+    # also go to a SQLite store shared by the worker's jobs, written off the loop
+    usage_store = (
+        UsageStore(path, export) if (path := os.environ.get(USAGE_DB_ENV)) else None
+    )
+    call_usage = (
+        usage_store.call(ctx.room.name, ctx.job.id, session_models(session))
+        if usage_store is not None
+        else None
+    )
 
     @session.on("metrics_collected")
     def _on_metrics_collected(ev: MetricsCollectedEvent):
         metrics.log_metrics(ev.metrics)
         usage_collector.collect(ev.metrics)
+        if metrics_export is not None:
+            metrics_export.submit(ev.metrics)
+        if call_usage is not None:
+            call_usage.collect(ev.metrics)
 
     async def log_usage():
         summary = usage_collector.get_summary()
         logger.info(f"Usage: {summary}")
+        logger.info(f"Tool usage: {lookups.summary()}")
+        logger.info(f"FAQ fast path: {faq.summary()}")
+        logger.info(f"False interruptions: {speech_buffer.summary()}")
+        logger.info(f"Job memory: {job_memory.summary()}")
+        logger.info(f"Log export: {export.stats()}")
+        logger.info(f"Provider connections: {providers.summary()}")
+        logger.info(f"Agent handoffs: {triage.handoffs.summary()}")
+        if tuner is not None:
+            logger.info(f"VAD tuning: {tuner.summary()}")
+        if isinstance(session.llm, HedgedLLM):
+            logger.info(f"LLM hedging: {session.llm.summary()}")
+        if isinstance(session.tts, CachedTTS):
+            logger.info(f"TTS chunks: {session.tts.chunk_summary()}")
 
     ctx.add_shutdown_callback(log_usage)
+    ctx.add_shutdown_callback(providers.aclose)
+    # after the usage summary, so it is flushed with everything else
+    ctx.add_shutdown_callback(export.adetach_logging)
+    if usage_store is not None:
+        ctx.add_shutdown_callback(usage_store.aclose)
+    # Tool lookups of this call: pooled backend client, deadlines and result cache,
+    # on this job's event loop (jobs may run as threads of one process)
+    lookups = Lookups()
+    ctx.add_shutdown_callback(lookups.aclose)
+
+    # Per-turn latency breakdown (EOU, STT, LLM TTFT, TTS TTFB, first audio),
+    # aggregated per worker and served on LATENCY_METRICS_PORT when set
+    turn_tracer = TurnTracer()
+    turn_tracer.attach(session)
+    ctx.add_shutdown_callback(turn_tracer.aclose)
 
     # # Add a virtual avatar to the session, if desired
     # # For other providers, see https://docs.livekit.io/agents/integrations/avatar/
@@ -437,27 +1171,91 @@ async def entrypoint(ctx: JobContext):
     # # Start the avatar and wait for it to join
     # await avatar.start(session, room=ctx.room)
 
+    # Long calls keep a bounded context: recent turns, a running summary, pinned facts
+    context_window = build_context_window()
+    ctx.add_shutdown_callback(context_window.aclose)
+
+    # Tool calls slower than TOOL_FILLER_DELAY are covered with a short
+    # acknowledgement, rendered once through the (cached) session TTS
+    filler = ToolFiller(
+        FillerBank(), delay=float(os.environ.get(FILLER_DELAY_ENV, "0.6"))
+    )
+    filler.attach(session, session.tts)
+    ctx.add_shutdown_callback(filler.aclose)
+
+    build_prefetcher(lookups).attach(session)
+
+    # The call starts with a triage agent; orders, returns and billing turns are
+    # handed to specialists with only their own prompt slice and tools
+    triage = build_triage(
+        context_window=context_window,
+        filler=filler,
+        faq=faq,
+        speech_buffer=speech_buffer,
+        lookups=lookups,
+    )
+
     # Start the session, which initializes the voice pipeline and warms up the models
     await session.start(
-        agent=Assistant(),
+        agent=triage,
         room=ctx.room,
         room_input_options=RoomInputOptions(
             # LiveKit Cloud enhanced noise cancellation
             # - If self-hosting, omit this parameter
             # - For telephony applications, use `BVCTelephony` for best results
             noise_cancellation=noise_cancellation.BVC(),
+            # Resampled once from 48 kHz, STT and VAD take the frames as they are
+            audio_sample_rate=INPUT_SAMPLE_RATE,
+        ),
+        # Same rate as the TTS and the phrase cache, no resampling before the room
+        room_output_options=RoomOutputOptions(
+            audio_sample_rate=TTS_VOICE["sample_rate"],
         ),
     )
+    # the audio output exists once the session started
+    speech_buffer.attach(session)
 
     # Join the room and connect to the user
     await ctx.connect()
 
 
 if __name__ == "__main__":
+    # Startup steps of the worker, its forkserver and job processes: logged, and
+    # collected in STARTUP_TIMELINE_PATH for `python src/startup.py <path>`
+    timeline = watch_worker()
+    timeline.mark("imports done")
+    # LAZY_PLUGINS=1 leaves the job-only plugins to the forkserver and job processes
+    thread_jobs = job_executor_type() is JobExecutorType.THREAD
+    if not plugins_deferred(sys.argv, thread_jobs=thread_jobs):
+        import_plugins()
+
+    # job processes inherit the directory and write their histograms and loop lag into it
+    metrics_dir = os.environ.setdefault(METRICS_DIR_ENV, str(default_metrics_dir()))
+
+    # One load score from CPU, job loop lag, active calls and inference backlog;
+    # above LOAD_THRESHOLD the worker reports itself full and turns jobs away
+    admission = AdmissionController(
+        metrics_dir,
+        threshold=float(os.environ.get(LOAD_THRESHOLD_ENV, "0.75")),
+        limits=LoadLimits(sessions=int(os.environ.get(MAX_SESSIONS_ENV, "20"))),
+    )
+
+    if metrics_port := os.environ.get(METRICS_PORT_ENV):
+        start_metrics_server(
+            int(metrics_port), metrics_dir, extra=admission.render_prometheus
+        )
+
+    # the forkserver loads the VAD once, job processes share its pages
+    enable_preload()
+
     cli.run_app(
         WorkerOptions(
             entrypoint_fnc=entrypoint,
             prewarm_fnc=prewarm,
+            job_executor_type=job_executor_type(),
+            load_fnc=admission.load,
+            load_threshold=admission.threshold,
+            request_fnc=admission.request,
             ws_url=os.environ.get("LIVEKIT_URL"),
             api_key=os.environ.get("LIVEKIT_API_KEY"),
             api_secret=os.environ.get("LIVEKIT_API_SECRET"),
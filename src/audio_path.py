@@ -0,0 +1,55 @@
+"""Sample rates of the call audio, and frames as NumPy views.
+
+Room audio arrives at 48 kHz. ``RoomIO`` used to resample it to its default of
+24 kHz, then ``google.STT`` (16 kHz) and silero VAD (16 kHz) each resampled
+those frames again with a resampler of their own: three resampling passes and
+three copies of every 10 ms frame, on the CPU budget of every call. The room
+input is now requested at ``INPUT_SAMPLE_RATE``, the rate STT and VAD run at.
+The native stream resamples once, right after noise cancellation, and STT and
+VAD get the same ``AudioFrame`` objects without conversion. The turn detector
+only reads transcripts. On the way out, TTS, the phrase cache and the filler
+clips all use the TTS sample rate, which is also the room output rate, so the
+only conversion is the native one to 48 kHz for Opus.
+
+``samples`` reads a frame as a NumPy view without copying it, and ``frame_of``
+builds a frame from samples with the one copy ``rtc.AudioFrame`` makes anyway.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+from livekit import rtc
+
+# google.STT and silero VAD both infer at 16 kHz
+INPUT_SAMPLE_RATE = 16000
+
+
+def resampling_steps(source_rate: int, consumers: dict[str, int]) -> list[str]:
+    """The conversions ``consumers`` make on frames at ``source_rate``."""
+    return [
+        f"{name}: {source_rate} -> {rate} Hz"
+        for name, rate in consumers.items()
+        if rate != source_rate
+    ]
+
+
+def samples(frame: rtc.AudioFrame) -> np.ndarray:
+    """The samples of ``frame``, one row per sample and one column per channel.
+
+    A view of the frame's buffer: writing to it changes the frame.
+    """
+    return np.frombuffer(frame.data, dtype=np.int16).reshape(-1, frame.num_channels)
+
+
+def frame_of(samples: np.ndarray, *, sample_rate: int) -> rtc.AudioFrame:
+    """An ``rtc.AudioFrame`` holding a copy of ``samples`` (rows of channels)."""
+    samples = np.ascontiguousarray(samples, dtype=np.int16)
+    if samples.ndim == 1:
+        samples = samples[:, None]
+    return rtc.AudioFrame(
+        # the frame copies the buffer, a memoryview avoids a second copy
+        data=memoryview(samples).cast("B"),
+        sample_rate=sample_rate,
+        num_channels=samples.shape[1],
+        samples_per_channel=samples.shape[0],
+    )
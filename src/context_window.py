@@ -0,0 +1,270 @@
+"""Bounded LLM context for long calls.
+
+``AgentSession`` keeps the whole conversation, and sending all of it on every turn
+makes input tokens and TTFT grow with the length of the call. ``ContextWindow``
+keeps what is sent bounded:
+
+* the last ``keep_turns`` user turns go out verbatim, tool calls included;
+* older turns are folded into a running summary written by a cheaper model in a
+  background task, never on the path of the current reply. Turns that are not
+  summarized yet are still sent verbatim, so nothing is lost while it catches up;
+* facts the rest of the call depends on (customer name, email, order numbers,
+  issue type) are extracted as they are said and pinned next to the summary.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+from collections.abc import Iterable
+
+from livekit.agents import llm, utils
+
+logger = logging.getLogger("context-window")
+
+SUMMARY_INSTRUCTIONS = (
+    "You maintain the running summary of a customer service phone call. "
+    "Merge the previous summary with the new part of the conversation. Keep what "
+    "the customer asked for, what was verified, what the agent promised or did and "
+    "what is still open. Write at most 120 words of plain prose, no lists."
+)
+
+_ORDER_RE = re.compile(r"\b\d{3}-\d{7}-\d{7}\b")
+_EMAIL_RE = re.compile(r"\b[\w.+-]+@[\w-]+\.[\w.-]+\b")
+_PHONE_RE = re.compile(r"(?<![\d-])(?:\+?1[ -]?)?\(?\d{3}\)?[ -]?\d{3}-?\d{4}(?![\d-])")
+# the lead-in in any case, the name itself capitalized
+_NAME_RE = re.compile(
+    r"\b(?i:my name is|this is|i'm|i am)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)"
+)
+_NOT_NAMES = {"Calling", "Looking", "Trying", "Sorry", "Here", "Still", "Just", "Not"}
+
+ISSUE_PATTERNS = {
+    issue: re.compile(r"\b(?:" + "|".join(keywords) + ")")
+    for issue, keywords in {
+        "missing delivery": [
+            "never (?:received|got|arrived)",
+            "didn't arrive",
+            "not arrived",
+        ],
+        "delivery delay": ["late", "delayed", "still waiting", "when will"],
+        "return or refund": ["return", "refund"],
+        "wrong or damaged item": ["wrong item", "damaged", "broken", "defective"],
+        "prime membership": ["prime"],
+        "billing": ["charged?", "bill", "billing", "payment"],
+        "account security": ["hacked", "password", "unauthori[sz]ed", "security"],
+        "gift card": ["gift card"],
+    }.items()
+}
+
+
+class PinnedFacts:
+    """Facts pulled out of user messages that must survive summarization."""
+
+    def __init__(self) -> None:
+        self.name: str | None = None
+        self.emails: list[str] = []
+        self.phones: list[str] = []
+        self.order_numbers: list[str] = []
+        self.issues: list[str] = []
+
+    def update(self, text: str) -> None:
+        for values, pattern in (
+            (self.order_numbers, _ORDER_RE),
+            (self.emails, _EMAIL_RE),
+            (self.phones, _PHONE_RE),
+        ):
+            for match in pattern.findall(text):
+                if match not in values:
+                    values.append(match)
+
+        if (m := _NAME_RE.search(text)) and m.group(1).split()[0] not in _NOT_NAMES:
+            self.name = m.group(1)
+
+        lowered = text.lower()
+        for issue, pattern in ISSUE_PATTERNS.items():
+            if issue not in self.issues and pattern.search(lowered):
+                self.issues.append(issue)
+
+    def render(self) -> str:
+        lines = []
+        if self.name:
+            lines.append(f"Customer name: {self.name}")
+        if self.emails:
+            lines.append(f"Email: {', '.join(self.emails)}")
+        if self.phones:
+            lines.append(f"Phone: {', '.join(self.phones)}")
+        if self.order_numbers:
+            lines.append(f"Order numbers: {', '.join(self.order_numbers)}")
+        if self.issues:
+            lines.append(f"Issue: {', '.join(self.issues)}")
+        return "\n".join(lines)
+
+
+def render_items(items: Iterable[llm.ChatItem]) -> str:
+    """Transcript form of chat items, as given to the summarizer."""
+    lines = []
+    for item in items:
+        if item.type == "message" and item.role in ("user", "assistant"):
+            speaker = "Customer" if item.role == "user" else "Agent"
+            lines.append(f"{speaker}: {item.text_content or ''}")
+        elif item.type == "function_call":
+            lines.append(f"Agent called {item.name}({item.arguments})")
+        elif item.type == "function_call_output":
+            lines.append(f"{item.name} returned: {item.output}")
+    return "\n".join(lines)
+
+
+class ContextWindow:
+    """Keep the context sent to the LLM bounded over a long call.
+
+    Args:
+        summarizer: Model used for the running summary, a cheap and fast one.
+        keep_turns: User turns sent verbatim.
+        fold_batch: Minimum number of turns folded into the summary at once.
+    """
+
+    def __init__(
+        self,
+        summarizer: llm.LLM,
+        *,
+        keep_turns: int = 6,
+        fold_batch: int = 2,
+    ) -> None:
+        self._summarizer = summarizer
+        self._keep_turns = keep_turns
+        self._fold_batch = fold_batch
+        self._summary = ""
+        self._summarized_until: str | None = None  # id of the last folded item
+        self._facts = PinnedFacts()
+        self._seen_ids: set[str] = set()
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def summary(self) -> str:
+        return self._summary
+
+    @property
+    def facts(self) -> PinnedFacts:
+        return self._facts
+
+    def _turn_starts(self, items: list[llm.ChatItem]) -> list[int]:
+        return [
+            i
+            for i, item in enumerate(items)
+            if item.type == "message" and item.role == "user"
+        ]
+
+    def _folded_count(self, items: list[llm.ChatItem]) -> int:
+        """Number of leading conversation items already covered by the summary."""
+        if self._summarized_until is None:
+            return 0
+        for i, item in enumerate(items):
+            if item.id == self._summarized_until:
+                return i + 1
+        # the history was replaced (e.g. a handoff), start over
+        self._summary = ""
+        self._summarized_until = None
+        return 0
+
+    def apply(self, chat_ctx: llm.ChatContext) -> llm.ChatContext:
+        """Return the bounded copy of ``chat_ctx`` to send for this turn.
+
+        Also pins new facts and schedules summarization of turns that left the
+        window, to run while this reply is generated and played.
+        """
+        for item in chat_ctx.items:
+            if item.id in self._seen_ids:
+                continue
+            self._seen_ids.add(item.id)
+            if item.type == "message" and item.role == "user":
+                self._facts.update(item.text_content or "")
+
+        system = [
+            item
+            for item in chat_ctx.items
+            if item.type == "message" and item.role == "system"
+        ]
+        conversation = [
+            item
+            for item in chat_ctx.items
+            if not (item.type == "message" and item.role == "system")
+        ]
+
+        folded = self._folded_count(conversation)
+        starts = self._turn_starts(conversation)
+        window_start = (
+            starts[-self._keep_turns] if len(starts) > self._keep_turns else 0
+        )
+        self._schedule(conversation, folded, window_start)
+
+        memory = []
+        if self._summary:
+            memory.append(f"Summary of the call so far:\n{self._summary}")
+        if facts := self._facts.render():
+            memory.append(f"Pinned facts:\n{facts}")
+        if not memory and folded == 0:
+            return chat_ctx
+
+        bounded = chat_ctx.copy()
+        bounded.items = [
+            *system,
+            *(
+                [llm.ChatMessage(role="system", content=["\n\n".join(memory)])]
+                if memory
+                else []
+            ),
+            *conversation[folded:],
+        ]
+        return bounded
+
+    def _schedule(
+        self, conversation: list[llm.ChatItem], folded: int, window_start: int
+    ) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        foldable = [
+            i for i in self._turn_starts(conversation) if folded <= i < window_start
+        ]
+        if len(foldable) < self._fold_batch:
+            return
+
+        to_fold = conversation[folded:window_start]
+        self._task = asyncio.create_task(
+            self._summarize(to_fold), name="ContextWindow._summarize"
+        )
+
+    async def _summarize(self, items: list[llm.ChatItem]) -> None:
+        chat_ctx = llm.ChatContext()
+        chat_ctx.add_message(role="system", content=SUMMARY_INSTRUCTIONS)
+        chat_ctx.add_message(
+            role="user",
+            content=(
+                f"Previous summary:\n{self._summary or '(none)'}\n\n"
+                f"New part of the conversation:\n{render_items(items)}"
+            ),
+        )
+
+        try:
+            parts = []
+            async with self._summarizer.chat(chat_ctx=chat_ctx) as stream:
+                async for chunk in stream:
+                    if chunk.delta and chunk.delta.content:
+                        parts.append(chunk.delta.content)
+        except Exception:
+            # the turns stay verbatim and are retried with the next batch
+            logger.warning("failed to summarize the conversation", exc_info=True)
+            return
+
+        summary = "".join(parts).strip()
+        if summary:
+            self._summary = summary
+            self._summarized_until = items[-1].id
+            logger.debug(
+                "conversation summarized",
+                extra={"folded_items": len(items), "summary_chars": len(summary)},
+            )
+
+    async def aclose(self) -> None:
+        if self._task is not None:
+            await utils.aio.cancel_and_wait(self._task)
@@ -0,0 +1,236 @@
+"""Logging and metrics export off the event loop.
+
+Every STT, LLM, TTS, VAD and EOU metric of a call is logged from a
+``metrics_collected`` handler, on the loop that also moves the audio frames.
+The root logging handlers then run inline. In a job process that is livekit's
+IPC handler, which formats and pickles each record. In dev mode it is a
+formatter and a write to stdout. Under load both add jitter to the audio path.
+
+``ExportPipeline`` is a bounded queue drained by one background thread. The
+loop only puts a reference on the queue. The thread takes whatever has
+accumulated as one batch and hands it to the sinks:
+
+* ``QueueLogHandler`` replaces the root handlers and runs them on the thread.
+  Records are still created on the loop, so they keep the job's log context
+  fields (the room).
+* ``MetricsExporter`` appends every metric as a JSON line to a file, written
+  once per batch.
+
+When the queue is full the item is dropped and counted: a slow sink loses
+records instead of stalling a call. Drops are reported by the thread itself.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import queue
+import sys
+import threading
+import traceback
+from collections.abc import Callable, Sequence
+from pathlib import Path
+from typing import Any
+
+from livekit.agents import metrics
+
+logger = logging.getLogger("export")
+
+METRICS_EXPORT_PATH_ENV = "METRICS_EXPORT_PATH"
+
+Sink = Callable[[list[Any]], None]
+
+_STOP = object()
+
+
+class ExportPipeline:
+    """Bounded queue of ``(sink, item)`` drained in batches by a daemon thread.
+
+    Args:
+        max_queue: Items waiting before new ones are dropped.
+        batch_size: Most items handed to the sinks at once.
+    """
+
+    def __init__(self, *, max_queue: int = 4096, batch_size: int = 256) -> None:
+        self._queue: queue.Queue[Any] = queue.Queue(maxsize=max_queue)
+        self._batch_size = batch_size
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._users = 0
+        self._log_handler: QueueLogHandler | None = None
+        self._reported_drops = 0
+        self.submitted = 0
+        self.dropped = 0
+        self.batches = 0
+
+    @property
+    def on_export_thread(self) -> bool:
+        return self._thread is not None and threading.get_ident() == self._thread.ident
+
+    def submit(self, sink: Sink, item: Any) -> bool:
+        """Queue ``item`` for ``sink``, never blocks. False if it was dropped."""
+        try:
+            self._queue.put_nowait((sink, item))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.submitted += 1
+        return True
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="export-pipeline", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self._batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = _STOP in batch
+            self._export([entry for entry in batch if entry is not _STOP])
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _export(self, batch: list[tuple[Sink, Any]]) -> None:
+        # consecutive items of the same sink go out together, in order
+        start = 0
+        for end in range(1, len(batch) + 1):
+            if end == len(batch) or batch[end][0] != batch[start][0]:
+                sink = batch[start][0]
+                try:
+                    sink([item for _, item in batch[start:end]])
+                except Exception:
+                    # logging could fail the same way, stderr is the last resort
+                    traceback.print_exc(file=sys.stderr)
+                start = end
+        self.batches += 1
+
+        if (dropped := self.dropped) > self._reported_drops:
+            logger.warning(
+                "export queue full, records dropped",
+                extra={"dropped": dropped - self._reported_drops},
+            )
+            self._reported_drops = dropped
+
+    def flush(self) -> None:
+        """Block until everything queued so far is exported."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self) -> None:
+        """Export what is queued and stop the thread."""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+    def attach_logging(self) -> None:
+        """Route the root logger's records through the queue; counted per user."""
+        with self._lock:
+            self._users += 1
+            if self._users > 1:
+                return
+            self.start()
+            root = logging.getLogger()
+            self._log_handler = QueueLogHandler(self, root.handlers)
+            root.handlers = [self._log_handler]
+
+    def detach_logging(self) -> None:
+        """Flush, and give the root logger its handlers back after the last user."""
+        self.flush()
+        with self._lock:
+            self._users -= 1
+            if self._users > 0 or self._log_handler is None:
+                return
+            root = logging.getLogger()
+            if self._log_handler in root.handlers:
+                root.handlers = list(self._log_handler.handlers)
+            self._log_handler = None
+
+    async def adetach_logging(self) -> None:
+        await asyncio.to_thread(self.detach_logging)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "submitted": self.submitted,
+            "dropped": self.dropped,
+            "batches": self.batches,
+        }
+
+
+class QueueLogHandler(logging.Handler):
+    """Root handler that defers the real handlers to the export thread."""
+
+    def __init__(
+        self, pipeline: ExportPipeline, handlers: Sequence[logging.Handler]
+    ) -> None:
+        super().__init__()
+        self._pipeline = pipeline
+        self.handlers = list(handlers)
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        # no filters or lock on the loop, the real handlers apply theirs
+        if self._pipeline.on_export_thread:
+            # the pipeline's own warnings, and anything the sinks log
+            self._handle_batch([record])
+        else:
+            self._pipeline.submit(self._handle_batch, record)
+        return True
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.handle(record)
+
+    def _handle_batch(self, records: list[logging.LogRecord]) -> None:
+        for record in records:
+            for handler in self.handlers:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+
+
+class MetricsExporter:
+    """Append every metric of a call to a JSON lines file, from the export thread.
+
+    Args:
+        pipeline: Queue and thread the writes go through.
+        path: File the lines are appended to.
+        fields: Added to every line, e.g. the room name.
+    """
+
+    def __init__(
+        self, pipeline: ExportPipeline, path: str | Path, fields: dict[str, Any]
+    ) -> None:
+        self._pipeline = pipeline
+        self._path = Path(path)
+        self._fields = fields
+
+    def submit(self, metric: metrics.AgentMetrics) -> None:
+        self._pipeline.submit(self._write, metric)
+
+    def _write(self, batch: list[metrics.AgentMetrics]) -> None:
+        lines = "".join(
+            json.dumps({**self._fields, **metric.model_dump()}, default=str) + "\n"
+            for metric in batch
+        )
+        with self._path.open("a") as f:
+            f.write(lines)
+
+
+_pipeline: ExportPipeline | None = None
+
+
+def get_pipeline() -> ExportPipeline:
+    """Return the pipeline of the current process, created on first use."""
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = ExportPipeline()
+    return _pipeline
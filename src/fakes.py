@@ -0,0 +1,697 @@
+"""Deterministic local stand-ins for the STT, LLM and TTS providers and tool backend.
+
+They implement the regular LiveKit plugin interfaces, so an ``AgentSession`` built
+with them goes through the exact same VAD, turn detection and scheduling code as
+in production, while every provider delay comes from a seeded ``LatencyProfile``.
+Used by the offline benchmarks and tests; never imported by the worker itself.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import random
+import re
+from collections import deque
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from typing import Any, Union
+
+import aiohttp
+import numpy as np
+from aiohttp import web
+from livekit import rtc
+from livekit.agents import (
+    DEFAULT_API_CONNECT_OPTIONS,
+    NOT_GIVEN,
+    APIConnectOptions,
+    NotGivenOr,
+    llm,
+    stt,
+    tokenize,
+    tts,
+    utils,
+)
+from livekit.agents.llm import FunctionTool, RawFunctionTool, ToolChoice
+
+
+@dataclass(frozen=True)
+class LatencyProfile:
+    """Timing of a fake provider.
+
+    Args:
+        first_delay: Seconds before the first result (final transcript, first
+            token or first audio byte).
+        jitter: Uniform +/- jitter in seconds applied to ``first_delay``.
+        rate: Throughput after the first result: tokens per second for the LLM,
+            generated audio seconds per wall-clock second for the TTS.
+        seed: Seed of the jitter, the same seed always replays the same delays.
+    """
+
+    first_delay: float = 0.0
+    jitter: float = 0.0
+    rate: float = math.inf
+    seed: int = 0
+
+    def rng(self) -> random.Random:
+        return random.Random(self.seed)
+
+    def delay(self, rng: random.Random) -> float:
+        if not self.jitter:
+            return self.first_delay
+        return max(0.0, self.first_delay + rng.uniform(-self.jitter, self.jitter))
+
+    def interval(self) -> float:
+        return 0.0 if math.isinf(self.rate) else 1.0 / self.rate
+
+
+# rough shape of the Google providers (and a tool backend) on a good connection
+PROFILES: dict[str, dict[str, LatencyProfile]] = {
+    "instant": {
+        "stt": LatencyProfile(),
+        "llm": LatencyProfile(),
+        "tts": LatencyProfile(),
+        "tools": LatencyProfile(),
+    },
+    "typical": {
+        "stt": LatencyProfile(first_delay=0.2, jitter=0.05),
+        "llm": LatencyProfile(first_delay=0.45, jitter=0.15, rate=80.0),
+        "tts": LatencyProfile(first_delay=0.2, jitter=0.05, rate=5.0),
+        "tools": LatencyProfile(first_delay=0.12, jitter=0.06),
+    },
+    "slow": {
+        "stt": LatencyProfile(first_delay=0.4, jitter=0.1),
+        "llm": LatencyProfile(first_delay=1.2, jitter=0.4, rate=30.0),
+        "tts": LatencyProfile(first_delay=0.5, jitter=0.15, rate=2.0),
+        "tools": LatencyProfile(first_delay=0.4, jitter=0.2),
+    },
+}
+
+
+def frame_rms(frame: rtc.AudioFrame) -> float:
+    samples = np.frombuffer(frame.data, dtype=np.int16).astype(np.float32)
+    if samples.size == 0:
+        return 0.0
+    return float(np.sqrt(np.mean(samples * samples)))
+
+
+def synthetic_speech(
+    duration: float, *, sample_rate: int = 16000, f0: float = 120.0, seed: int = 0
+) -> np.ndarray:
+    """Generate a speech-like int16 signal that silero VAD detects as voice.
+
+    A glottal pulse train goes through three vowel formant resonators and is shaped
+    into ~4 syllables per second. Good enough to drive VAD and endpointing when no
+    recorded corpus is available; it carries no words.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(duration * sample_rate)
+    t = np.arange(n) / sample_rate
+
+    # slight pitch drift so consecutive utterances don't sound identical
+    pitch = f0 * (1 + 0.05 * np.sin(2 * np.pi * rng.uniform(0.5, 1.5) * t))
+    phase = np.cumsum(pitch / sample_rate)
+    pulses = (np.diff(np.floor(phase), prepend=0.0) > 0).astype(np.float64)
+
+    out = np.zeros(n)
+    for freq, bandwidth in ((700, 110), (1220, 120), (2600, 160)):
+        r = math.exp(-math.pi * bandwidth / sample_rate)
+        a1 = 2 * r * math.cos(2 * math.pi * freq / sample_rate)
+        a2 = -r * r
+        y1 = y2 = 0.0
+        res = np.empty(n)
+        for i, x in enumerate(pulses):
+            y = (1 - r) * x + a1 * y1 + a2 * y2
+            res[i] = y
+            y2, y1 = y1, y
+        out += res
+
+    out *= 0.5 * (1 - np.cos(2 * np.pi * 4 * t))
+    peak = np.max(np.abs(out)) or 1.0
+    return (out / peak * 0.5 * 32767).astype(np.int16)
+
+
+class FakeSTT(stt.STT):
+    """Streaming STT that endpoints on signal energy and replays scripted transcripts.
+
+    Args:
+        transcripts: Transcripts returned in order, one per detected utterance.
+        profile: Delay between the end of an utterance and its final transcript.
+        speech_threshold: Frame RMS (int16 scale) above which audio counts as speech.
+        endpoint_silence: Seconds of silence that end an utterance.
+        words_per_second: Pace at which interim transcripts reveal words.
+    """
+
+    def __init__(
+        self,
+        transcripts: list[str] | None = None,
+        *,
+        profile: LatencyProfile = PROFILES["typical"]["stt"],
+        speech_threshold: float = 300.0,
+        endpoint_silence: float = 0.2,
+        words_per_second: float = 2.5,
+    ) -> None:
+        super().__init__(
+            capabilities=stt.STTCapabilities(streaming=True, interim_results=True)
+        )
+        self._transcripts = deque(transcripts or [])
+        self._profile = profile
+        self._rng = profile.rng()
+        self._speech_threshold = speech_threshold
+        self._endpoint_silence = endpoint_silence
+        self._words_per_second = words_per_second
+
+    def push_transcript(self, text: str) -> None:
+        self._transcripts.append(text)
+
+    def _next_transcript(self) -> str:
+        return self._transcripts.popleft() if self._transcripts else "hello"
+
+    async def _recognize_impl(
+        self,
+        buffer: utils.AudioBuffer,
+        *,
+        language: NotGivenOr[str] = NOT_GIVEN,
+        conn_options: APIConnectOptions,
+    ) -> stt.SpeechEvent:
+        await asyncio.sleep(self._profile.delay(self._rng))
+        return _final_event(utils.shortuuid(), self._next_transcript())
+
+    def stream(
+        self,
+        *,
+        language: NotGivenOr[str] = NOT_GIVEN,
+        conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+    ) -> FakeRecognizeStream:
+        return FakeRecognizeStream(stt=self, conn_options=conn_options)
+
+
+def _final_event(request_id: str, text: str) -> stt.SpeechEvent:
+    return stt.SpeechEvent(
+        type=stt.SpeechEventType.FINAL_TRANSCRIPT,
+        request_id=request_id,
+        alternatives=[stt.SpeechData(language="en-US", text=text, confidence=1.0)],
+    )
+
+
+class FakeRecognizeStream(stt.RecognizeStream):
+    def __init__(self, *, stt: FakeSTT, conn_options: APIConnectOptions) -> None:
+        super().__init__(stt=stt, conn_options=conn_options)
+        self._fake: FakeSTT = stt
+
+    async def _run(self) -> None:
+        request_id = utils.shortuuid()
+        finals: list[asyncio.Task[None]] = []
+        speaking = False
+        words: list[str] = []
+        audio_time = speech_start = last_interim = silence = 0.0
+
+        async def _finalize(text: str, audio_duration: float) -> None:
+            await asyncio.sleep(self._fake._profile.delay(self._fake._rng))
+            self._event_ch.send_nowait(_final_event(request_id, text))
+            self._event_ch.send_nowait(
+                stt.SpeechEvent(
+                    type=stt.SpeechEventType.END_OF_SPEECH, request_id=request_id
+                )
+            )
+            self._event_ch.send_nowait(
+                stt.SpeechEvent(
+                    type=stt.SpeechEventType.RECOGNITION_USAGE,
+                    request_id=request_id,
+                    recognition_usage=stt.RecognitionUsage(
+                        audio_duration=audio_duration
+                    ),
+                )
+            )
+
+        try:
+            async for data in self._input_ch:
+                if isinstance(data, self._FlushSentinel):
+                    continue
+
+                audio_time += data.duration
+                if frame_rms(data) >= self._fake._speech_threshold:
+                    silence = 0.0
+                    if not speaking:
+                        speaking = True
+                        words = self._fake._next_transcript().split()
+                        speech_start = last_interim = audio_time
+                        self._event_ch.send_nowait(
+                            stt.SpeechEvent(
+                                type=stt.SpeechEventType.START_OF_SPEECH,
+                                request_id=request_id,
+                            )
+                        )
+                    elif audio_time - last_interim >= 0.3:
+                        last_interim = audio_time
+                        n = int(
+                            (audio_time - speech_start) * self._fake._words_per_second
+                        )
+                        if n > 0:
+                            self._event_ch.send_nowait(
+                                stt.SpeechEvent(
+                                    type=stt.SpeechEventType.INTERIM_TRANSCRIPT,
+                                    request_id=request_id,
+                                    alternatives=[
+                                        stt.SpeechData(
+                                            language="en-US",
+                                            text=" ".join(words[:n]),
+                                            confidence=0.5,
+                                        )
+                                    ],
+                                )
+                            )
+                elif speaking:
+                    silence += data.duration
+                    if silence >= self._fake._endpoint_silence:
+                        speaking = False
+                        finals.append(
+                            asyncio.create_task(
+                                _finalize(" ".join(words), audio_time - speech_start)
+                            )
+                        )
+
+            await asyncio.gather(*finals)
+        finally:
+            await utils.aio.cancel_and_wait(*finals)
+
+
+# a response is either spoken text or a tool call
+Response = Union[str, llm.FunctionToolCall]
+ResponseSource = Union[list[Response], Callable[[llm.ChatContext], Response]]
+
+
+class FakeLLM(llm.LLM):
+    """LLM that streams canned responses word by word with a configurable TTFT.
+
+    Args:
+        responses: Responses returned in turn (cycled), or a callable building the
+            response from the chat context. A ``FunctionToolCall`` response makes
+            the model call that tool instead of answering.
+        profile: Time to first token and tokens per second of the stream.
+        model: Model name reported in metrics.
+        stalls: Per request in turn, extra seconds before the first token or an
+            exception raised instead of answering. Later requests run normally.
+    """
+
+    def __init__(
+        self,
+        responses: ResponseSource | None = None,
+        *,
+        profile: LatencyProfile = PROFILES["typical"]["llm"],
+        model: str = "fake-llm",
+        stalls: Sequence[float | Exception] = (),
+    ) -> None:
+        super().__init__()
+        self._responses = responses or [
+            "I understand. Let me help you with that right away."
+        ]
+        self._profile = profile
+        self._rng = profile.rng()
+        self._model = model
+        self._stalls = list(stalls)
+        self.num_requests = 0
+
+    @property
+    def model(self) -> str:
+        return self._model
+
+    def _response(self, chat_ctx: llm.ChatContext) -> Response:
+        if callable(self._responses):
+            return self._responses(chat_ctx)
+        return self._responses[(self.num_requests - 1) % len(self._responses)]
+
+    def chat(
+        self,
+        *,
+        chat_ctx: llm.ChatContext,
+        tools: list[FunctionTool | RawFunctionTool] | None = None,
+        conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+        parallel_tool_calls: NotGivenOr[bool] = NOT_GIVEN,
+        tool_choice: NotGivenOr[ToolChoice] = NOT_GIVEN,
+        extra_kwargs: NotGivenOr[dict[str, Any]] = NOT_GIVEN,
+    ) -> FakeLLMStream:
+        self.num_requests += 1
+        return FakeLLMStream(
+            self, chat_ctx=chat_ctx, tools=tools or [], conn_options=conn_options
+        )
+
+
+class FakeLLMStream(llm.LLMStream):
+    def __init__(
+        self,
+        llm: FakeLLM,
+        *,
+        chat_ctx: llm.ChatContext,
+        tools: list[FunctionTool | RawFunctionTool],
+        conn_options: APIConnectOptions,
+    ) -> None:
+        super().__init__(llm, chat_ctx=chat_ctx, tools=tools, conn_options=conn_options)
+        self._fake: FakeLLM = llm
+        stalls = llm._stalls
+        self._stall = (
+            stalls[llm.num_requests - 1] if llm.num_requests <= len(stalls) else 0.0
+        )
+
+    async def _run(self) -> None:
+        request_id = utils.shortuuid()
+        profile = self._fake._profile
+        if isinstance(self._stall, Exception):
+            await asyncio.sleep(profile.delay(self._fake._rng))
+            raise self._stall
+        await asyncio.sleep(profile.delay(self._fake._rng) + self._stall)
+
+        response = self._fake._response(self._chat_ctx)
+        if isinstance(response, llm.FunctionToolCall):
+            self._event_ch.send_nowait(
+                llm.ChatChunk(
+                    id=request_id,
+                    delta=llm.ChoiceDelta(role="assistant", tool_calls=[response]),
+                )
+            )
+            response = ""
+
+        tokens = re.findall(r"\S+\s*", response)
+        for i, token in enumerate(tokens):
+            if i:
+                await asyncio.sleep(profile.interval())
+            self._event_ch.send_nowait(
+                llm.ChatChunk(
+                    id=request_id,
+                    delta=llm.ChoiceDelta(role="assistant", content=token),
+                )
+            )
+
+        # ~4 characters per token, close enough for budget tracking
+        prompt_chars = sum(
+            len(item.text_content or "")
+            for item in self._chat_ctx.items
+            if item.type == "message"
+        )
+        prompt_tokens = prompt_chars // 4
+        self._event_ch.send_nowait(
+            llm.ChatChunk(
+                id=request_id,
+                usage=llm.CompletionUsage(
+                    completion_tokens=len(tokens),
+                    prompt_tokens=prompt_tokens,
+                    total_tokens=prompt_tokens + len(tokens),
+                ),
+            )
+        )
+
+
+class FakeTTS(tts.TTS):
+    """TTS producing a quiet tone whose length follows the text length.
+
+    Args:
+        profile: Time to first byte of each segment and how much faster than
+            real time the audio is generated.
+        sample_rate: Output sample rate.
+        streaming: Expose a streaming interface like ``google.TTS(use_streaming=True)``.
+        chars_per_second: Speaking speed used to size the generated audio.
+    """
+
+    def __init__(
+        self,
+        *,
+        profile: LatencyProfile = PROFILES["typical"]["tts"],
+        sample_rate: int = 24000,
+        streaming: bool = True,
+        chars_per_second: float = 15.0,
+    ) -> None:
+        super().__init__(
+            capabilities=tts.TTSCapabilities(streaming=streaming),
+            sample_rate=sample_rate,
+            num_channels=1,
+        )
+        self._profile = profile
+        self._rng = profile.rng()
+        self._chars_per_second = chars_per_second
+        self.num_requests = 0
+
+    def synthesize(
+        self,
+        text: str,
+        *,
+        conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+    ) -> FakeChunkedStream:
+        self.num_requests += 1
+        return FakeChunkedStream(tts=self, input_text=text, conn_options=conn_options)
+
+    def stream(
+        self, *, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS
+    ) -> FakeSynthesizeStream:
+        if not self.capabilities.streaming:
+            return super().stream(conn_options=conn_options)  # type: ignore[return-value]
+        self.num_requests += 1
+        return FakeSynthesizeStream(tts=self, conn_options=conn_options)
+
+    async def _emit_audio(self, output_emitter: tts.AudioEmitter, text: str) -> None:
+        await asyncio.sleep(self._profile.delay(self._rng))
+
+        chunk_duration = 0.1
+        duration = max(chunk_duration, len(text.strip()) / self._chars_per_second)
+        samples_per_chunk = int(self.sample_rate * chunk_duration)
+        t = np.arange(samples_per_chunk) / self.sample_rate
+        chunk = (np.sin(2 * np.pi * 220 * t) * 1000).astype(np.int16).tobytes()
+
+        realtime_factor = self._profile.rate
+        for i in range(math.ceil(duration / chunk_duration)):
+            if i and not math.isinf(realtime_factor):
+                await asyncio.sleep(chunk_duration / realtime_factor)
+            output_emitter.push(chunk)
+
+
+class FakeChunkedStream(tts.ChunkedStream):
+    def __init__(
+        self, *, tts: FakeTTS, input_text: str, conn_options: APIConnectOptions
+    ) -> None:
+        super().__init__(tts=tts, input_text=input_text, conn_options=conn_options)
+        self._fake: FakeTTS = tts
+
+    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
+        output_emitter.initialize(
+            request_id=utils.shortuuid(),
+            sample_rate=self._fake.sample_rate,
+            num_channels=1,
+            mime_type="audio/pcm",
+        )
+        await self._fake._emit_audio(output_emitter, self._input_text)
+
+
+class FakeSynthesizeStream(tts.SynthesizeStream):
+    """Mirrors the Google streaming TTS: one segment per flush, sentence by sentence."""
+
+    def __init__(self, *, tts: FakeTTS, conn_options: APIConnectOptions) -> None:
+        super().__init__(tts=tts, conn_options=conn_options)
+        self._fake: FakeTTS = tts
+        self._segments_ch = utils.aio.Chan[tokenize.SentenceStream]()
+
+    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
+        output_emitter.initialize(
+            request_id=utils.shortuuid(),
+            sample_rate=self._fake.sample_rate,
+            num_channels=1,
+            mime_type="audio/pcm",
+            stream=True,
+        )
+
+        async def _tokenize_input() -> None:
+            input_stream = None
+            async for data in self._input_ch:
+                if isinstance(data, str):
+                    if input_stream is None:
+                        input_stream = tokenize.basic.SentenceTokenizer().stream()
+                        self._segments_ch.send_nowait(input_stream)
+                    input_stream.push_text(data)
+                elif input_stream is not None:
+                    input_stream.end_input()
+                    input_stream = None
+            self._segments_ch.close()
+
+        async def _run_segments() -> None:
+            async for input_stream in self._segments_ch:
+                output_emitter.start_segment(segment_id=utils.shortuuid())
+                async for sentence in input_stream:
+                    self._mark_started()
+                    await self._fake._emit_audio(output_emitter, sentence.token)
+                output_emitter.end_segment()
+
+        tasks = [
+            asyncio.create_task(_tokenize_input()),
+            asyncio.create_task(_run_segments()),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            await utils.aio.cancel_and_wait(*tasks)
+
+
+class FakeBackend:
+    """Local HTTP server standing in for the tool backends.
+
+    Serves ``GET /weather?location=...`` and ``GET /orders/{order_id}``, each
+    after a delay drawn from ``profile``. A fraction of the requests stalls for
+    ``stall_delay`` seconds to reproduce the tail latency of real backends.
+
+    Args:
+        profile: Response delay of the backend.
+        stall_rate: Fraction of the requests that stall.
+        stall_delay: How long a stalled request takes, in seconds.
+    """
+
+    def __init__(
+        self,
+        *,
+        profile: LatencyProfile = PROFILES["typical"]["tools"],
+        stall_rate: float = 0.0,
+        stall_delay: float = 5.0,
+    ) -> None:
+        self._profile = profile
+        self._rng = profile.rng()
+        self._stall_rate = stall_rate
+        self._stall_delay = stall_delay
+        self._runner: web.AppRunner | None = None
+        self.url = ""
+        self.num_requests = 0
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/weather", self._weather)
+        app.router.add_get("/orders/{order_id}", self._order)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = self._runner.addresses[0][:2]
+        self.url = f"http://{host}:{port}"
+
+    async def aclose(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def __aenter__(self) -> FakeBackend:
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc: object) -> None:
+        await self.aclose()
+
+    async def _respond(self) -> None:
+        self.num_requests += 1
+        if self._rng.random() < self._stall_rate:
+            await asyncio.sleep(self._stall_delay)
+        else:
+            await asyncio.sleep(self._profile.delay(self._rng))
+
+    async def _weather(self, request: web.Request) -> web.Response:
+        await self._respond()
+        return web.json_response(
+            {
+                "location": request.query.get("location", ""),
+                "summary": "sunny with a temperature of 70 degrees.",
+            }
+        )
+
+    async def _order(self, request: web.Request) -> web.Response:
+        await self._respond()
+        return web.json_response(
+            {
+                "order_id": request.match_info["order_id"],
+                "status": "delivered",
+                "item": "Apple AirPods Pro",
+                "delivered_on": "yesterday",
+            }
+        )
+
+
+class FakeProviderEndpoint:
+    """Local HTTP server standing in for a provider API, to test connection reuse.
+
+    The first request on every new connection is delayed by ``setup_delay``, like
+    the TLS handshake and channel setup of the real endpoint. Serves
+    ``GET /health`` (503 when ``healthy`` is false), ``POST /warmup`` and
+    ``POST /generate``.
+
+    Args:
+        setup_delay: Seconds added to the first request of a connection.
+    """
+
+    def __init__(self, *, setup_delay: float = 0.1) -> None:
+        self._setup_delay = setup_delay
+        self._seen: set[int] = set()
+        self._runner: web.AppRunner | None = None
+        self.url = ""
+        self.healthy = True
+        self.connections = 0
+        self.requests: list[str] = []
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/health", self._health)
+        app.router.add_post("/warmup", self._ok)
+        app.router.add_post("/generate", self._ok)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = self._runner.addresses[0][:2]
+        self.url = f"http://{host}:{port}"
+
+    async def aclose(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def __aenter__(self) -> FakeProviderEndpoint:
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc: object) -> None:
+        await self.aclose()
+
+    async def _accept(self, request: web.Request) -> None:
+        self.requests.append(request.path)
+        connection = id(request.transport)
+        if connection not in self._seen:
+            self._seen.add(connection)
+            self.connections += 1
+            await asyncio.sleep(self._setup_delay)
+
+    async def _health(self, request: web.Request) -> web.Response:
+        await self._accept(request)
+        return web.json_response(
+            {"ok": self.healthy}, status=200 if self.healthy else 503
+        )
+
+    async def _ok(self, request: web.Request) -> web.Response:
+        await self._accept(request)
+        return web.json_response({"ok": True})
+
+
+class FakeProviderClient:
+    """Client of ``FakeProviderEndpoint`` keeping a pooled connection, like the
+    plugin clients do."""
+
+    def __init__(self, url: str) -> None:
+        self._url = url
+        self._session: aiohttp.ClientSession | None = None
+
+    async def _request(self, method: str, path: str) -> None:
+        if self._session is None:
+            self._session = aiohttp.ClientSession()
+        async with self._session.request(method, self._url + path) as response:
+            response.raise_for_status()
+
+    async def health(self) -> None:
+        await self._request("GET", "/health")
+
+    async def warmup(self) -> None:
+        await self._request("POST", "/warmup")
+
+    async def generate(self) -> None:
+        await self._request("POST", "/generate")
+
+    async def aclose(self) -> None:
+        if self._session is not None:
+            await self._session.close()
@@ -0,0 +1,210 @@
+"""Local fast path for static policy questions.
+
+Many callers ask questions whose answer is fixed (Prime benefits, delivery
+timings, the return window). ``FaqIndex`` is a TF-IDF index over word unigrams
+and bigrams of example questions, built once per job process at prewarm.
+``FaqResponder`` matches the final user transcript against it. Above the
+confidence threshold it returns the vetted answer, and the agent speaks it
+without calling the LLM. Otherwise the turn goes through the normal pipeline.
+
+The answers are pre-synthesized into the TTS phrase cache, so a matched turn
+costs neither an LLM request nor a TTS request.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import re
+import time
+from collections import Counter, defaultdict
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+from livekit.agents import AgentSession, MetricsCollectedEvent, llm, tts
+from livekit.agents.metrics import LLMMetrics
+
+from text_normalizer import normalize
+from tts_cache import CachedTTS
+
+logger = logging.getLogger("faq")
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+_STOPWORDS = frozenset({
+    "a", "an", "and", "are", "be", "can", "could", "do", "does", "for", "from", "hi",
+    "hello", "how", "i", "i'm", "is", "it", "it's", "me", "my", "of", "on", "or",
+    "please", "so", "than", "that", "the", "then", "there", "this", "to", "u", "us",
+    "was", "we", "what", "what's", "when", "where", "which", "will", "with", "would",
+    "you", "your", "hey", "okay", "ok", "um", "uh", "just", "about", "tell", "know",
+    "want", "like",
+})  # fmt: skip
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased content words, with a crude plural strip ("returns" -> "return")."""
+    words = []
+    for word in _WORD_RE.findall(text.lower()):
+        if word in _STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.append(word)
+    return words
+
+
+def ngrams(words: Sequence[str]) -> list[str]:
+    return [*words, *(f"{a} {b}" for a, b in zip(words, words[1:]))]
+
+
+@dataclass(frozen=True)
+class FaqEntry:
+    """A vetted answer and example phrasings of the question it answers."""
+
+    id: str
+    questions: Sequence[str]
+    answer: str
+
+
+@dataclass(frozen=True)
+class FaqMatch:
+    entry: FaqEntry
+    score: float
+
+
+class FaqIndex:
+    """TF-IDF index of the example questions, with postings per n-gram."""
+
+    def __init__(self, entries: Sequence[FaqEntry]) -> None:
+        self._entries = list(entries)
+        docs = [
+            (i, Counter(ngrams(tokenize(question))))
+            for i, entry in enumerate(self._entries)
+            for question in entry.questions
+        ]
+        df = Counter(gram for _, counts in docs for gram in counts)
+        self._idf = {gram: math.log(1 + len(docs) / n) for gram, n in df.items()}
+        self._max_idf = max(self._idf.values(), default=1.0)
+
+        # weight of each n-gram in each example, examples normalized to unit length
+        self._postings: dict[str, list[tuple[int, float]]] = defaultdict(list)
+        self._doc_entry: list[int] = []
+        for doc, (entry, counts) in enumerate(docs):
+            weights = {g: c * self._idf[g] for g, c in counts.items()}
+            norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+            for gram, weight in weights.items():
+                self._postings[gram].append((doc, weight / norm))
+            self._doc_entry.append(entry)
+
+    @property
+    def entries(self) -> list[FaqEntry]:
+        return self._entries
+
+    def match(self, text: str) -> FaqMatch | None:
+        """Best entry by cosine similarity with its closest example question."""
+        counts = Counter(ngrams(tokenize(text)))
+        # words no example uses are as telling as the rarest known ones: "cancel my
+        # prime membership" is not a question about Prime benefits
+        weights = {g: c * self._idf.get(g, self._max_idf) for g, c in counts.items()}
+        norm = math.sqrt(sum(w * w for w in weights.values()))
+        if not norm:
+            return None
+
+        scores: dict[int, float] = defaultdict(float)
+        for gram, weight in weights.items():
+            for doc, doc_weight in self._postings.get(gram, ()):
+                scores[doc] += weight / norm * doc_weight
+        if not scores:
+            return None
+        doc, score = max(scores.items(), key=lambda item: item[1])
+        return FaqMatch(self._entries[self._doc_entry[doc]], score)
+
+
+class FaqResponder:
+    """Answer a user turn from the FAQ index when the match is confident.
+
+    Also reports how often it answered and the LLM time to first token it saved,
+    estimated from the TTFT of the turns that did go to the LLM.
+
+    Args:
+        index: Index built at prewarm.
+        threshold: Minimum cosine similarity for answering without the LLM.
+    """
+
+    def __init__(self, index: FaqIndex, *, threshold: float = 0.6) -> None:
+        self._index = index
+        self._threshold = threshold
+        self._seen: set[str] = set()
+        self._llm_ttft: float | None = None
+        self._warm_task: asyncio.Task[None] | None = None
+        self.turns = 0
+        self.matches = 0
+        self.saved = 0.0
+
+    def attach(self, session: AgentSession, tts: tts.TTS | None = None) -> None:
+        """Track the LLM TTFT of ``session``, pre-synthesize answers with ``tts``."""
+        session.on("metrics_collected", self._on_metrics_collected)
+        if isinstance(tts, CachedTTS):
+            self._warm_task = asyncio.create_task(
+                self._warm(tts), name="FaqResponder._warm"
+            )
+
+    async def _warm(self, tts: CachedTTS) -> None:
+        try:
+            # as they reach the TTS, see ``Assistant.tts_node``
+            synthesized = await tts.warm(
+                normalize(entry.answer) for entry in self._index.entries
+            )
+        except Exception:
+            # answers are then synthesized on first use like any other reply
+            logger.warning("failed to pre-synthesize faq answers", exc_info=True)
+            return
+        logger.debug("faq answers pre-synthesized", extra={"sentences": synthesized})
+
+    def _on_metrics_collected(self, ev: MetricsCollectedEvent) -> None:
+        if isinstance(ev.metrics, LLMMetrics) and not ev.metrics.cancelled:
+            ttft = ev.metrics.ttft
+            self._llm_ttft = (
+                ttft if self._llm_ttft is None else 0.8 * self._llm_ttft + 0.2 * ttft
+            )
+
+    def answer(self, chat_ctx: llm.ChatContext) -> str | None:
+        """The vetted answer to the last user message, if it is an FAQ."""
+        last = chat_ctx.items[-1] if chat_ctx.items else None
+        if last is None or last.type != "message" or last.role != "user":
+            return None  # e.g. the reply to a tool call
+
+        started = time.perf_counter()
+        match = self._index.match(last.text_content or "")
+        # preemptive generation may ask twice for the same message
+        first_time = last.id not in self._seen
+        self._seen.add(last.id)
+        if first_time:
+            self.turns += 1
+        if match is None or match.score < self._threshold:
+            return None
+
+        if first_time:
+            self.matches += 1
+            self.saved += self._llm_ttft or 0.0
+        logger.info(
+            "answered from the faq",
+            extra={
+                "faq": match.entry.id,
+                "score": round(match.score, 3),
+                "match_ms": round((time.perf_counter() - started) * 1000, 2),
+            },
+        )
+        return match.entry.answer
+
+    def summary(self) -> dict[str, float]:
+        return {
+            "turns": self.turns,
+            "matches": self.matches,
+            "match_rate": round(self.matches / self.turns, 3) if self.turns else 0.0,
+            "llm_ttft_saved_s": round(self.saved, 3),
+        }
+
+    async def aclose(self) -> None:
+        if self._warm_task is not None:
+            self._warm_task.cancel()
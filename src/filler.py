@@ -0,0 +1,201 @@
+"""Pre-rendered filler audio that covers the silence of slow tool calls.
+
+When the LLM calls a tool, the caller hears nothing until the tool returns and
+the next LLM pass produces audio. If a tool has not returned after ``delay``,
+``ToolFiller`` plays a short acknowledgement ("One moment please.") from a bank
+of clips rendered once per process. A clip fades out as soon as the audio of the
+real reply is ready, so the reply never waits for it.
+
+The clips are rendered through the session TTS and therefore land in the phrase
+cache: after the first call they are read from disk and cost no provider request.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import time
+from collections.abc import AsyncIterator, Sequence
+from dataclasses import dataclass
+
+import numpy as np
+from livekit import rtc
+from livekit.agents import AgentSession, FunctionToolsExecutedEvent, tts
+
+from audio_path import frame_of, samples
+
+logger = logging.getLogger("filler")
+
+# the persona never announces lookups, keep the fillers neutral
+FILLER_PHRASES = (
+    "One moment please.",
+    "Sure, just a second.",
+    "Okay, bear with me a moment.",
+)
+FOLLOWUP_PHRASES = (
+    "Thanks for waiting, almost there.",
+    "Still on it, one more moment.",
+)
+
+_FRAME_MS = 20
+_MAX_LEAD = 0.1  # audio pushed ahead of real time, bounds how late a cut-off lands
+
+
+@dataclass(frozen=True)
+class FillerClip:
+    text: str
+    frame: rtc.AudioFrame
+
+
+class FillerBank:
+    """Acknowledgement clips, rendered once with the session TTS."""
+
+    def __init__(
+        self,
+        phrases: Sequence[str] = FILLER_PHRASES,
+        followups: Sequence[str] = FOLLOWUP_PHRASES,
+    ) -> None:
+        self._phrases = {False: list(phrases), True: list(followups)}
+        self._next = {False: 0, True: 0}
+        self._clips: dict[str, rtc.AudioFrame] = {}
+
+    @property
+    def ready(self) -> bool:
+        return any(text in self._clips for text in self._phrases[False])
+
+    async def render(self, tts: tts.TTS) -> None:
+        for text in [*self._phrases[False], *self._phrases[True]]:
+            try:
+                async with tts.synthesize(text) as stream:
+                    frames = [ev.frame async for ev in stream]
+            except Exception:
+                logger.warning(
+                    "failed to render filler clip", extra={"text": text}, exc_info=True
+                )
+                continue
+            if frames:
+                self._clips[text] = rtc.combine_audio_frames(frames)
+
+    def pick(self, *, followup: bool = False) -> FillerClip | None:
+        """Next rendered clip, rotating so the same phrase is not heard twice in a row."""
+        candidates = [t for t in self._phrases[followup] if t in self._clips]
+        if not candidates:
+            return None
+        text = candidates[self._next[followup] % len(candidates)]
+        self._next[followup] += 1
+        return FillerClip(text, self._clips[text])
+
+
+class ToolFiller:
+    """Play filler clips while a tool call keeps the caller waiting.
+
+    The agent reports tool calls with ``tool_called()`` and its first synthesized
+    reply frame with ``speech_ready()``. Clips are only started while the tools run:
+    once they returned, the reply is queued behind anything said meanwhile.
+
+    Args:
+        bank: Clips to play.
+        delay: Silence tolerated after a tool call before the first clip.
+        repeat_after: Silence between two clips while the tool is still running.
+        max_clips: Clips played per tool call at most.
+        fade_out: Length of the fade when the reply cuts a clip short.
+    """
+
+    def __init__(
+        self,
+        bank: FillerBank,
+        *,
+        delay: float = 0.6,
+        repeat_after: float = 2.5,
+        max_clips: int = 2,
+        fade_out: float = 0.03,
+    ) -> None:
+        self._bank = bank
+        self._delay = delay
+        self._repeat_after = repeat_after
+        self._max_clips = max_clips
+        self._fade_out = fade_out
+        self._session: AgentSession | None = None
+        self._tools_done = asyncio.Event()
+        self._speech_ready = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self._render_task: asyncio.Task[None] | None = None
+
+    def attach(self, session: AgentSession, tts: tts.TTS | None = None) -> None:
+        """Play through ``session``, rendering the bank with ``tts`` in the background."""
+        self._session = session
+        session.on("function_tools_executed", self._on_tools_executed)
+        if tts is not None and not self._bank.ready:
+            self._render_task = asyncio.create_task(
+                self._bank.render(tts), name="FillerBank.render"
+            )
+
+    def tool_called(self) -> None:
+        if self._session is None or (self._task is not None and not self._task.done()):
+            return
+        self._tools_done = asyncio.Event()
+        self._speech_ready = asyncio.Event()
+        self._task = asyncio.create_task(
+            self._run(self._session, self._tools_done, self._speech_ready),
+            name="ToolFiller._run",
+        )
+
+    def speech_ready(self) -> None:
+        self._tools_done.set()
+        self._speech_ready.set()
+
+    def _on_tools_executed(self, ev: FunctionToolsExecutedEvent) -> None:
+        self._tools_done.set()
+
+    async def _run(
+        self,
+        session: AgentSession,
+        tools_done: asyncio.Event,
+        speech_ready: asyncio.Event,
+    ) -> None:
+        wait = self._delay
+        for i in range(self._max_clips):
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(tools_done.wait(), wait)
+            if tools_done.is_set():
+                return
+
+            clip = self._bank.pick(followup=i > 0)
+            if clip is None:
+                return  # bank not rendered yet
+            logger.debug("playing tool filler", extra={"text": clip.text})
+            handle = session.say(
+                clip.text,
+                audio=self._play(clip.frame, speech_ready),
+                add_to_chat_ctx=False,
+            )
+            await handle.wait_for_playout()
+            if handle.interrupted:
+                return  # the caller spoke
+            wait = self._repeat_after
+
+    async def _play(
+        self, clip: rtc.AudioFrame, stop: asyncio.Event
+    ) -> AsyncIterator[rtc.AudioFrame]:
+        """Yield ``clip`` paced to real time, fading out once ``stop`` is set."""
+        data = samples(clip)
+        step = clip.sample_rate * _FRAME_MS // 1000
+        started = time.perf_counter()
+        for start in range(0, len(data), step):
+            if stop.is_set():
+                tail = data[start : start + int(self._fade_out * clip.sample_rate)]
+                ramp = np.linspace(1.0, 0.0, len(tail))[:, None]
+                yield frame_of(tail * ramp, sample_rate=clip.sample_rate)
+                return
+
+            yield frame_of(data[start : start + step], sample_rate=clip.sample_rate)
+            ahead = (start + step) / clip.sample_rate - (time.perf_counter() - started)
+            if ahead > _MAX_LEAD:
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(stop.wait(), ahead - _MAX_LEAD)
+
+    async def aclose(self) -> None:
+        for task in (self._task, self._render_task):
+            if task is not None:
+                task.cancel()
@@ -0,0 +1,157 @@
+"""Handoff between a triage agent and small specialist agents.
+
+One agent for everything carries the instructions and tool declarations of every
+topic (orders, returns, Prime and billing) on every turn, and each new tool makes
+every request larger. The call now starts with a triage agent that has a
+compact prompt, and moves to a specialist that carries only its own slice of the
+policy knowledge and its own tools.
+
+Routing adds no LLM round trip. ``Router`` matches the final user transcript
+against keyword rules when the turn ends, before any request is sent. On a
+match, the specialist takes over and answers that same turn, with the history
+carried over. The usual transfer tool would cost an extra request: one reply to
+call the tool and one to answer. Turns that match no other route stay with the
+current agent, and a general route leads back to the first one.
+
+The history moves without the previous agent's instructions and function calls,
+since their tools are not declared on the new agent. What the lookups returned
+is kept in a short handoff note, and the lookups of earlier notes move on with
+each later handoff. Names, order numbers and the issue come with the user
+messages, and ``ContextWindow`` pins them.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from livekit.agents import Agent, llm, utils
+
+from context_window import render_items
+from prompt import ConversationState, SectionRule
+
+logger = logging.getLogger("handoff")
+
+_NOTE_ID = "handoff_note"
+_LOOKUPS_HEADER = "Earlier lookups in this call:"
+
+
+@dataclass(frozen=True)
+class Route:
+    """A specialist and the user messages that go to it.
+
+    Args:
+        name: Name of the specialist.
+        rule: Keywords matched against the user message, the priority decides
+            between routes matching the same message.
+        topic: What the specialist handles, for the handoff note.
+    """
+
+    name: str
+    rule: SectionRule
+    topic: str
+
+
+class Router:
+    """Pick the agent for a user message from keyword rules, without the LLM."""
+
+    def __init__(self, routes: list[Route]) -> None:
+        self.routes = {route.name: route for route in routes}
+
+    def route(self, text: str, *, current: str | None = None) -> str | None:
+        """The agent that should answer ``text``, None to stay with ``current``.
+
+        The current agent keeps the turn as long as its own rule matches, so a
+        return question mentioning an order stays with the returns agent.
+        """
+        state = ConversationState(recent_user_text=text.lower(), user_turns=1)
+        if current in self.routes and self.routes[current].rule.matches(state):
+            return None
+        matches = [route for route in self.routes.values() if route.rule.matches(state)]
+        if not matches:
+            return None
+        best = max(matches, key=lambda route: route.rule.priority)
+        return best.name if best.name != current else None
+
+
+AgentFactory = Callable[[llm.ChatContext, str], Agent]
+
+
+class Handoffs:
+    """Routes of a call and how their agents are built.
+
+    Args:
+        router: Picks the agent for each user message.
+        agents: Builds the agent of a route from the carried-over history and
+            the user message it answers first.
+    """
+
+    def __init__(self, router: Router, agents: dict[str, AgentFactory]) -> None:
+        missing = [name for name in router.routes if name not in agents]
+        if missing:
+            raise ValueError(f"no agent for routes: {', '.join(missing)}")
+        self.router = router
+        self._agents = agents
+        self.turns = 0
+        self.counts: Counter[str] = Counter()
+
+    def route(self, text: str, *, current: str | None) -> str | None:
+        self.turns += 1
+        return self.router.route(text, current=current)
+
+    def handoff(
+        self, target: str, chat_ctx: llm.ChatContext, user_input: str, *, source: str
+    ) -> Agent:
+        """The agent of ``target``, taking over ``chat_ctx`` to answer ``user_input``."""
+        self.counts[f"{source}->{target}"] += 1
+        logger.info("handing off", extra={"from": source, "to": target})
+        return self._agents[target](
+            carry_over(chat_ctx, self.router.routes[target]), user_input
+        )
+
+    def summary(self) -> dict[str, object]:
+        handoffs = sum(self.counts.values())
+        return {
+            "turns": self.turns,
+            "handoffs": handoffs,
+            "handoff_rate": round(handoffs / self.turns, 3) if self.turns else 0.0,
+            "paths": dict(self.counts),
+        }
+
+
+def carry_over(chat_ctx: llm.ChatContext, route: Route) -> llm.ChatContext:
+    """The history for the agent of ``route``, with a handoff note.
+
+    Instructions and function calls are left out, the new agent has its own;
+    the outputs of the calls are summarized in the note, after the lookups of the
+    note of the previous handoff.
+    """
+    lookups = []
+    for item in chat_ctx.items:
+        if item.type == "message" and item.id.startswith(_NOTE_ID):
+            _, _, earlier = (item.text_content or "").partition(_LOOKUPS_HEADER)
+            lookups.append(earlier.strip())
+    lookups.append(
+        render_items(
+            item for item in chat_ctx.items if item.type == "function_call_output"
+        )
+    )
+    lookups = [text for text in lookups if text]
+
+    note = (
+        f"The call was transferred to you because the customer needs help with "
+        f"{route.topic}. Continue the conversation, do not greet the customer again."
+    )
+    if lookups:
+        note += f"\n\n{_LOOKUPS_HEADER}\n" + "\n".join(lookups)
+
+    carried = chat_ctx.copy(exclude_instructions=True, exclude_function_call=True)
+    carried.items.insert(
+        0,
+        llm.ChatMessage(
+            id=utils.shortuuid(f"{_NOTE_ID}_"), role="system", content=[note]
+        ),
+    )
+    return carried
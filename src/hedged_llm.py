@@ -0,0 +1,292 @@
+"""LLM requests hedged against a slow first token, with failover on errors.
+
+Gemini's time to first token has a long tail: most replies start within half a
+second, but now and then a stream stalls for seconds, and the caller hears dead
+air. ``HedgedLLM`` sends the request to its primary backend and, when no token
+arrived by a deadline derived from the primary's recent p95 TTFT, sends the same
+request to a second backend (the same model or a lighter one). Whichever starts
+first is streamed, the other is cancelled. A request failing before its first
+token fails over to the next backend right away.
+
+Only the start of a reply is hedged: once a token was streamed, an error ends
+the reply instead of restarting it on another backend. Cancelled requests are
+still billed for their prompt tokens, so ``summary`` reports the hedge rate.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any
+
+from livekit.agents import (
+    DEFAULT_API_CONNECT_OPTIONS,
+    NOT_GIVEN,
+    APIConnectionError,
+    APIConnectOptions,
+    APIError,
+    NotGivenOr,
+    llm,
+)
+from livekit.agents.llm import FunctionTool, RawFunctionTool, ToolChoice
+
+HEDGE_MODEL_ENV = "LLM_HEDGE_MODEL"
+
+
+@dataclass(frozen=True)
+class HedgePolicy:
+    """When the hedge request is sent.
+
+    Args:
+        quantile: TTFT quantile of the primary backend used as the deadline.
+        initial_deadline: Deadline in seconds until ``min_samples`` TTFTs are known.
+        min_deadline: Lower bound of the deadline in seconds.
+        max_deadline: Upper bound of the deadline in seconds.
+        min_samples: TTFTs needed before the deadline follows the quantile.
+        window: Recent TTFTs kept per backend.
+    """
+
+    quantile: float = 0.95
+    initial_deadline: float = 1.0
+    min_deadline: float = 0.3
+    max_deadline: float = 2.0
+    min_samples: int = 20
+    window: int = 200
+
+
+@dataclass
+class BackendStats:
+    requests: int = 0
+    wins: int = 0
+    errors: int = 0
+    ttfts: deque[float] = field(default_factory=lambda: deque(maxlen=200))
+
+    def quantile(self, q: float) -> float:
+        if not self.ttfts:
+            return 0.0
+        ordered = sorted(self.ttfts)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+@dataclass
+class _Backend:
+    name: str
+    llm: llm.LLM
+    stats: BackendStats
+
+
+@dataclass
+class _Attempt:
+    backend: _Backend
+    stream: llm.LLMStream
+    started: float
+
+
+class HedgedLLM(llm.LLM):
+    """LLM racing a second request against a primary whose first token is late.
+
+    Args:
+        primary: LLM every request is sent to first.
+        hedge: LLM of the hedge and failover request, the primary when ``None``.
+        policy: When the hedge request is sent.
+    """
+
+    def __init__(
+        self,
+        primary: llm.LLM,
+        hedge: llm.LLM | None = None,
+        *,
+        policy: HedgePolicy | None = None,
+    ) -> None:
+        super().__init__()
+        self.policy = policy or HedgePolicy()
+        self._backends = [
+            _Backend(
+                name, instance, BackendStats(ttfts=deque(maxlen=self.policy.window))
+            )
+            for name, instance in (("primary", primary), ("hedge", hedge or primary))
+        ]
+        self.requests = 0
+        self.hedged = 0
+        self.failovers = 0
+
+    @property
+    def model(self) -> str:
+        return self._backends[0].llm.model
+
+    @property
+    def provider(self) -> str:
+        return self._backends[0].llm.provider
+
+    @property
+    def hedge_rate(self) -> float:
+        return self.hedged / self.requests if self.requests else 0.0
+
+    def deadline(self) -> float:
+        """Seconds without a first token before the hedge request is sent."""
+        policy = self.policy
+        stats = self._backends[0].stats
+        if len(stats.ttfts) < policy.min_samples:
+            return policy.initial_deadline
+        deadline = stats.quantile(policy.quantile)
+        return min(policy.max_deadline, max(policy.min_deadline, deadline))
+
+    def chat(
+        self,
+        *,
+        chat_ctx: llm.ChatContext,
+        tools: list[FunctionTool | RawFunctionTool] | None = None,
+        conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+        parallel_tool_calls: NotGivenOr[bool] = NOT_GIVEN,
+        tool_choice: NotGivenOr[ToolChoice] = NOT_GIVEN,
+        extra_kwargs: NotGivenOr[dict[str, Any]] = NOT_GIVEN,
+    ) -> HedgedLLMStream:
+        return HedgedLLMStream(
+            self,
+            chat_ctx=chat_ctx,
+            tools=tools or [],
+            conn_options=conn_options,
+            chat_kwargs={
+                "parallel_tool_calls": parallel_tool_calls,
+                "tool_choice": tool_choice,
+                "extra_kwargs": extra_kwargs,
+            },
+        )
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "hedge_rate": round(self.hedge_rate, 3),
+            "failovers": self.failovers,
+            "deadline_ms": round(self.deadline() * 1000, 1),
+            **{
+                backend.name: {
+                    "requests": backend.stats.requests,
+                    "wins": backend.stats.wins,
+                    "errors": backend.stats.errors,
+                    "ttft_p50_ms": round(backend.stats.quantile(0.5) * 1000, 1),
+                    "ttft_p95_ms": round(backend.stats.quantile(0.95) * 1000, 1),
+                }
+                for backend in self._backends
+            },
+        }
+
+    async def aclose(self) -> None:
+        for backend in {id(b.llm): b for b in self._backends}.values():
+            await backend.llm.aclose()
+
+
+class HedgedLLMStream(llm.LLMStream):
+    def __init__(
+        self,
+        llm: HedgedLLM,
+        *,
+        chat_ctx: llm.ChatContext,
+        tools: list[FunctionTool | RawFunctionTool],
+        conn_options: APIConnectOptions,
+        chat_kwargs: dict[str, Any],
+    ) -> None:
+        super().__init__(llm, chat_ctx=chat_ctx, tools=tools, conn_options=conn_options)
+        self._hedged: HedgedLLM = llm
+        self._chat_kwargs = chat_kwargs
+
+    def _start(self, backend: _Backend) -> _Attempt:
+        backend.stats.requests += 1
+        stream = backend.llm.chat(
+            chat_ctx=self._chat_ctx,
+            tools=self._tools,
+            # retries would only delay the failover, this stream retries as a whole
+            conn_options=APIConnectOptions(
+                max_retry=0, timeout=self._conn_options.timeout
+            ),
+            **self._chat_kwargs,
+        )
+        return _Attempt(backend, stream, time.perf_counter())
+
+    async def _run(self) -> None:
+        owner = self._hedged
+        owner.requests += 1
+        waiting = list(owner._backends)
+        pending: dict[asyncio.Future[llm.ChatChunk | None], _Attempt] = {}
+        deadline = owner.deadline()
+
+        def _send(attempt: _Attempt) -> None:
+            pending[asyncio.ensure_future(_first_chunk(attempt.stream))] = attempt
+
+        _send(self._start(waiting.pop(0)))
+        winner: _Attempt | None = None
+        first: llm.ChatChunk | None = None
+        error: BaseException | None = None
+        try:
+            while winner is None:
+                if not pending:
+                    if not waiting:
+                        raise APIConnectionError(
+                            "all LLM backends failed before the first token",
+                            retryable=not isinstance(error, APIError)
+                            or error.retryable,
+                        ) from error
+                    owner.failovers += 1
+                    _send(self._start(waiting.pop(0)))
+
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=deadline if waiting else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    owner.hedged += 1
+                    _send(self._start(waiting.pop(0)))
+                    continue
+
+                for future in done:
+                    attempt = pending.pop(future)
+                    try:
+                        first = future.result()
+                    except Exception as e:
+                        attempt.backend.stats.errors += 1
+                        error = e
+                        continue
+                    winner = attempt
+                    break
+        finally:
+            for future, attempt in pending.items():
+                # a lower bound of its TTFT, dropping it would bias the deadline low
+                attempt.backend.stats.ttfts.append(
+                    time.perf_counter() - attempt.started
+                )
+                future.cancel()
+                await attempt.stream.aclose()
+
+        stats = winner.backend.stats
+        stats.wins += 1
+        stats.ttfts.append(time.perf_counter() - winner.started)
+        try:
+            if first is not None:
+                self._event_ch.send_nowait(first)
+                async for chunk in winner.stream:
+                    self._event_ch.send_nowait(chunk)
+        except Exception as e:
+            stats.errors += 1
+            # part of the reply was spoken, another backend would repeat it
+            raise APIConnectionError(
+                "LLM stream failed after the first token", retryable=False
+            ) from e
+        finally:
+            await winner.stream.aclose()
+
+
+async def _first_chunk(stream: llm.LLMStream) -> llm.ChatChunk | None:
+    """The first chunk of ``stream``, ``None`` when the reply is empty."""
+    try:
+        return await stream.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+def hedge_model() -> str | None:
+    """Model of the hedge request from the environment, ``None`` for the primary's."""
+    return os.environ.get(HEDGE_MODEL_ENV) or None
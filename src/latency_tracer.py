@@ -0,0 +1,431 @@
+"""Per-turn latency breakdown for the voice pipeline.
+
+Every user turn is tracked under its speech id (the same id LiveKit stamps on the
+EOU, LLM and TTS metrics it emits) so that end-of-utterance, final transcript,
+LLM time-to-first-token, TTS time-to-first-byte and the first audio frame played
+to the room can be linked together. The first value of each stage in a call is
+also recorded on its own: it includes the provider connection setup that later
+turns skip, and would otherwise disappear in the steady-state quantiles.
+
+Each job process keeps fixed-bucket histograms per stage and periodically writes
+a snapshot to a directory shared by the worker. The worker process serves the
+merged snapshots on a local Prometheus-style ``/metrics`` endpoint, so a single
+scrape shows p50/p95/p99 for every stage across all calls handled by the worker.
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from livekit.agents import (
+    AgentSession,
+    AgentStateChangedEvent,
+    MetricsCollectedEvent,
+    metrics,
+)
+
+logger = logging.getLogger("agent.latency")
+
+METRICS_DIR_ENV = "LATENCY_METRICS_DIR"
+METRICS_PORT_ENV = "LATENCY_METRICS_PORT"
+
+# stage names, in pipeline order
+STAGE_EOU = "end_of_utterance"
+STAGE_TRANSCRIPT = "final_transcript"
+STAGE_LLM_TTFT = "llm_ttft"
+STAGE_TTS_TTFB = "tts_ttfb"
+STAGE_FIRST_AUDIO = "first_audio"
+STAGES = (
+    STAGE_EOU,
+    STAGE_TRANSCRIPT,
+    STAGE_LLM_TTFT,
+    STAGE_TTS_TTFB,
+    STAGE_FIRST_AUDIO,
+)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# log-spaced bucket bounds from 5ms to ~33s, fine enough to keep quantile
+# interpolation error well under the variance we see between calls
+DEFAULT_BUCKETS = tuple(round(0.005 * 1.25**i, 6) for i in range(40))
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram that can be merged across processes."""
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        # one extra slot for observations above the last bound (+Inf)
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        if value < 0:
+            return
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def merge(self, other: LatencyHistogram) -> None:
+        if other.buckets != self.buckets:
+            raise ValueError("cannot merge histograms with different buckets")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
+
+    def quantile(self, q: float) -> float:
+        """Estimate the ``q`` quantile by linear interpolation inside its bucket."""
+        if self.count == 0:
+            return float("nan")
+
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i]
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+    def to_dict(self) -> dict:
+        return {"counts": self.counts, "count": self.count, "sum": self.sum}
+
+    @classmethod
+    def from_dict(
+        cls, data: dict, buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> LatencyHistogram:
+        hist = cls(buckets)
+        if len(data["counts"]) != len(hist.counts):
+            raise ValueError("snapshot bucket layout does not match")
+        hist.counts = list(data["counts"])
+        hist.count = int(data["count"])
+        hist.sum = float(data["sum"])
+        return hist
+
+
+class LatencyRegistry:
+    """Per-process set of stage histograms, flushed to the worker's metrics dir."""
+
+    def __init__(self, metrics_dir: str | Path | None = None) -> None:
+        self.histograms = {stage: LatencyHistogram() for stage in STAGES}
+        # the first value of each stage in a call, also part of ``histograms``
+        self.first_turn = {stage: LatencyHistogram() for stage in STAGES}
+        self._metrics_dir = Path(metrics_dir) if metrics_dir else None
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, value: float, *, first_turn: bool = False) -> None:
+        with self._lock:
+            self.histograms[stage].observe(value)
+            if first_turn:
+                self.first_turn[stage].observe(value)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                **{stage: h.to_dict() for stage, h in self.histograms.items()},
+                "first_turn": {
+                    stage: h.to_dict() for stage, h in self.first_turn.items()
+                },
+            }
+
+    def flush(self) -> None:
+        """Atomically write this process's histograms to the shared directory."""
+        if self._metrics_dir is None:
+            return
+
+        self._metrics_dir.mkdir(parents=True, exist_ok=True)
+        path = self._metrics_dir / f"latency-{os.getpid()}.json"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.snapshot()))
+        os.replace(tmp, path)
+
+
+_registry: LatencyRegistry | None = None
+
+
+def get_registry() -> LatencyRegistry:
+    """Return the registry of the current process, created on first use."""
+    global _registry
+    if _registry is None:
+        _registry = LatencyRegistry(os.environ.get(METRICS_DIR_ENV))
+    return _registry
+
+
+@dataclass
+class TurnRecord:
+    speech_id: str
+    last_speaking_time: float | None = None
+    first_stages: set[str] = field(default_factory=set)
+    first_audio_at: float | None = None
+    stages: dict[str, float] = field(default_factory=dict)
+
+    @property
+    def complete(self) -> bool:
+        return all(stage in self.stages for stage in STAGES)
+
+
+class TurnTracer:
+    """Links the metrics of a session's turns and records them per stage.
+
+    Args:
+        registry: Histograms to record into, defaults to the process registry.
+        flush_interval: Minimum number of seconds between two snapshot writes.
+        max_pending: Number of unfinished turns kept before the oldest is dropped.
+    """
+
+    def __init__(
+        self,
+        *,
+        registry: LatencyRegistry | None = None,
+        flush_interval: float = 5.0,
+        max_pending: int = 32,
+    ) -> None:
+        self._registry = registry or get_registry()
+        self._flush_interval = flush_interval
+        self._max_pending = max_pending
+        self._turns: OrderedDict[str, TurnRecord] = OrderedDict()
+        # late metrics of finished turns (e.g. a second TTS segment) are ignored
+        self._finished: OrderedDict[str, None] = OrderedDict()
+        self._session: AgentSession | None = None
+        self._last_flush = 0.0
+        self._seen_stages: set[str] = set()
+
+    def attach(self, session: AgentSession) -> None:
+        self._session = session
+        session.on("metrics_collected", self._on_metrics_collected)
+        session.on("agent_state_changed", self._on_agent_state_changed)
+
+    def _turn(self, speech_id: str) -> TurnRecord | None:
+        if speech_id in self._finished:
+            return None
+
+        turn = self._turns.get(speech_id)
+        if turn is None:
+            turn = self._turns[speech_id] = TurnRecord(speech_id=speech_id)
+            while len(self._turns) > self._max_pending:
+                self._finish(next(iter(self._turns)))
+        return turn
+
+    def _record(self, turn: TurnRecord | None, stage: str, value: float) -> None:
+        # only the first occurrence counts, e.g. the first LLM call of a tool turn
+        if turn is None or stage in turn.stages:
+            return
+        turn.stages[stage] = value
+        first_turn = stage not in self._seen_stages
+        if first_turn:
+            self._seen_stages.add(stage)
+            turn.first_stages.add(stage)
+        self._registry.observe(stage, value, first_turn=first_turn)
+        if turn.complete:
+            self._finish(turn.speech_id)
+
+    def _finish(self, speech_id: str) -> None:
+        turn = self._turns.pop(speech_id, None)
+        if turn is None:
+            return
+
+        self._finished[speech_id] = None
+        while len(self._finished) > self._max_pending:
+            self._finished.popitem(last=False)
+
+        # agent-initiated speech (greetings, tool follow-ups) has no user turn
+        if turn.last_speaking_time is not None:
+            logger.info(
+                "turn latency breakdown",
+                extra={
+                    "speech_id": turn.speech_id,
+                    "first_turn": sorted(turn.first_stages),
+                    **{stage: round(v, 4) for stage, v in turn.stages.items()},
+                },
+            )
+
+        now = time.monotonic()
+        if now - self._last_flush >= self._flush_interval:
+            self._last_flush = now
+            self.flush()
+
+    def _on_metrics_collected(self, ev: MetricsCollectedEvent) -> None:
+        m = ev.metrics
+        if isinstance(m, metrics.EOUMetrics) and m.speech_id:
+            turn = self._turn(m.speech_id)
+            if turn is None:
+                return
+            turn.last_speaking_time = m.last_speaking_time
+            self._record(turn, STAGE_EOU, m.end_of_utterance_delay)
+            self._record(turn, STAGE_TRANSCRIPT, m.transcription_delay)
+            if turn.first_audio_at is not None:
+                # audio can start before the EOU metrics are emitted with
+                # preemptive generation, resolve the deferred measurement now
+                self._record(
+                    turn, STAGE_FIRST_AUDIO, turn.first_audio_at - m.last_speaking_time
+                )
+        elif isinstance(m, metrics.LLMMetrics) and m.speech_id and m.ttft >= 0:
+            self._record(self._turn(m.speech_id), STAGE_LLM_TTFT, m.ttft)
+        elif isinstance(m, metrics.TTSMetrics) and m.speech_id and m.ttfb >= 0:
+            self._record(self._turn(m.speech_id), STAGE_TTS_TTFB, m.ttfb)
+
+    def _on_agent_state_changed(self, ev: AgentStateChangedEvent) -> None:
+        if ev.new_state != "speaking" or self._session is None:
+            return
+
+        speech = self._session.current_speech
+        if speech is None:
+            return
+
+        turn = self._turn(speech.id)
+        if turn is None or turn.first_audio_at is not None:
+            return  # resumed after a pause, not the first frame
+
+        turn.first_audio_at = ev.created_at
+        if turn.last_speaking_time is not None:
+            self._record(
+                turn, STAGE_FIRST_AUDIO, ev.created_at - turn.last_speaking_time
+            )
+
+    def flush(self) -> None:
+        try:
+            self._registry.flush()
+        except OSError:
+            logger.warning("failed to write latency snapshot", exc_info=True)
+
+    async def aclose(self) -> None:
+        for speech_id in list(self._turns):
+            self._finish(speech_id)
+        self.flush()
+
+
+def default_metrics_dir() -> Path:
+    return Path(tempfile.gettempdir()) / f"agent-latency-{os.getpid()}"
+
+
+def collect(
+    metrics_dir: str | Path, *, first_turn: bool = False
+) -> dict[str, LatencyHistogram]:
+    """Merge the snapshots written by every job process of the worker.
+
+    With ``first_turn``, merge the histograms of the first value of each stage
+    in a call instead of all turns.
+    """
+    merged = {stage: LatencyHistogram() for stage in STAGES}
+    for path in Path(metrics_dir).glob("latency-*.json"):
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue  # file removed or being replaced, picked up on next scrape
+        if first_turn:
+            data = data.get("first_turn", {})
+
+        for stage, hist in merged.items():
+            if stage in data:
+                hist.merge(LatencyHistogram.from_dict(data[stage]))
+    return merged
+
+
+def render_prometheus(
+    histograms: dict[str, LatencyHistogram],
+    first_turn: dict[str, LatencyHistogram] | None = None,
+) -> str:
+    lines = [
+        "# HELP agent_turn_latency_seconds Per-stage latency of user turns",
+        "# TYPE agent_turn_latency_seconds histogram",
+    ]
+    for stage, hist in histograms.items():
+        cumulative = 0
+        for bound, n in zip(hist.buckets, hist.counts):
+            cumulative += n
+            lines.append(
+                f'agent_turn_latency_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}'
+            )
+        lines.append(
+            f'agent_turn_latency_seconds_bucket{{stage="{stage}",le="+Inf"}} {hist.count}'
+        )
+        lines.append(f'agent_turn_latency_seconds_sum{{stage="{stage}"}} {hist.sum}')
+        lines.append(
+            f'agent_turn_latency_seconds_count{{stage="{stage}"}} {hist.count}'
+        )
+
+    lines += [
+        "# HELP agent_turn_latency_quantile_seconds Estimated per-stage latency quantiles",
+        "# TYPE agent_turn_latency_quantile_seconds gauge",
+    ]
+    for stage, hist in histograms.items():
+        for q in QUANTILES:
+            lines.append(
+                f'agent_turn_latency_quantile_seconds{{stage="{stage}",quantile="{q}"}} '
+                f"{hist.quantile(q)}"
+            )
+
+    if first_turn is not None:
+        lines += [
+            "# HELP agent_first_turn_latency_quantile_seconds Estimated per-stage "
+            "latency quantiles of the first turn of each call",
+            "# TYPE agent_first_turn_latency_quantile_seconds gauge",
+        ]
+        for stage, hist in first_turn.items():
+            for q in QUANTILES:
+                lines.append(
+                    f'agent_first_turn_latency_quantile_seconds{{stage="{stage}",'
+                    f'quantile="{q}"}} {hist.quantile(q)}'
+                )
+            lines.append(
+                f'agent_first_turn_latency_seconds_count{{stage="{stage}"}} {hist.count}'
+            )
+    return "\n".join(lines) + "\n"
+
+
+def start_metrics_server(
+    port: int,
+    metrics_dir: str | Path,
+    host: str = "127.0.0.1",
+    extra: Callable[[], str] | None = None,
+) -> ThreadingHTTPServer:
+    """Serve the merged histograms on ``http://{host}:{port}/metrics``.
+
+    ``extra`` renders more metrics of the worker process, appended to the page.
+    The server runs on a daemon thread so it never competes with the worker's
+    event loop.
+    """
+
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.rstrip("/") != "/metrics":
+                self.send_error(404)
+                return
+
+            text = render_prometheus(
+                collect(metrics_dir), collect(metrics_dir, first_turn=True)
+            )
+            if extra is not None:
+                text += extra()
+            body = text.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+            pass
+
+    server = ThreadingHTTPServer((host, port), _Handler)
+    thread = threading.Thread(
+        target=server.serve_forever, name="latency-metrics-server", daemon=True
+    )
+    thread.start()
+    logger.info(f"serving turn latency metrics on http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,292 @@
+"""Recorded LLM replies, replayed so the eval suite runs offline.
+
+The behavioral tests in ``tests/test_agent.py`` drive ``Assistant`` through a
+real ``AgentSession`` and grade the replies with ``.judge(...)``: every run used
+to call the model a few dozen times, took minutes, cost money and needed the
+network. ``CassetteLLM`` wraps the model the way ``vcrpy`` wraps HTTP. Recording
+streams each request through the real model and stores the chunks it returned,
+text and function calls alike. Replaying streams the stored chunks back, without
+a model, instantly or with the recorded token timing.
+
+Requests are keyed by a hash of what the model sees: the chat context without
+item ids, call ids and timestamps, the tool schemas, the tool choice, the extra
+arguments and the model name. Each reply is its own JSON file under the cassette
+directory, written atomically, so tests running in parallel (``pytest -n auto``)
+record and read without locks. In ``replay`` mode, a request that was never
+recorded raises ``CassetteMissError`` instead of reaching a model.
+
+Modes (``LLM_CASSETTE_MODE``):
+
+* ``replay``: stored replies only, a miss is an error (the default without
+  ``OPENAI_API_KEY``);
+* ``record``: every request goes to the model and its reply is stored;
+* ``missing``: stored replies are replayed, misses go to the model and are stored
+  (the default with ``OPENAI_API_KEY``, so a run with a key records new requests).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Literal
+
+from livekit.agents import (
+    DEFAULT_API_CONNECT_OPTIONS,
+    NOT_GIVEN,
+    APIConnectionError,
+    APIConnectOptions,
+    NotGivenOr,
+    llm,
+)
+from livekit.agents.llm import FunctionTool, RawFunctionTool, ToolChoice
+from livekit.agents.llm.tool_context import get_raw_function_info, is_function_tool
+from livekit.agents.llm.utils import build_legacy_openai_schema
+
+MODE_ENV = "LLM_CASSETTE_MODE"
+# a key for the recorded model, misses can be recorded instead of failing
+KEY_ENV = "OPENAI_API_KEY"
+
+CassetteMode = Literal["replay", "record", "missing"]
+MODES: tuple[CassetteMode, ...] = ("replay", "record", "missing")
+
+
+class CassetteMissError(Exception):
+    """A request with no recorded reply, in ``replay`` mode."""
+
+
+def cassette_mode() -> CassetteMode:
+    """``LLM_CASSETTE_MODE``, else ``missing`` with a model key and ``replay`` without."""
+    mode = os.environ.get(MODE_ENV, "") or (
+        "missing" if os.environ.get(KEY_ENV) else "replay"
+    )
+    if mode not in MODES:
+        raise ValueError(f"{MODE_ENV} must be one of {', '.join(MODES)}, not {mode!r}")
+    return mode  # type: ignore[return-value]
+
+
+def _tool_schema(tool: FunctionTool | RawFunctionTool) -> dict[str, Any]:
+    if is_function_tool(tool):
+        return build_legacy_openai_schema(tool, internally_tagged=True)
+    return get_raw_function_info(tool).raw_schema
+
+
+def request_of(
+    chat_ctx: llm.ChatContext,
+    tools: list[FunctionTool | RawFunctionTool],
+    *,
+    model: str,
+    chat_kwargs: dict[str, Any],
+) -> dict[str, Any]:
+    """The parts of a request that decide the reply, as plain JSON."""
+    items = []
+    for item in chat_ctx.to_dict(exclude_timestamp=True)["items"]:
+        # generated per run; calls and outputs stay paired by their order
+        item.pop("id", None)
+        item.pop("call_id", None)
+        items.append(item)
+    return {
+        "model": model,
+        "items": items,
+        "tools": sorted(
+            (_tool_schema(tool) for tool in tools), key=lambda schema: schema["name"]
+        ),
+        **{
+            name: value
+            for name, value in chat_kwargs.items()
+            if value is not NOT_GIVEN and value is not None
+        },
+    }
+
+
+def request_key(request: dict[str, Any]) -> str:
+    canonical = json.dumps(
+        request, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _last_user_text(request: dict[str, Any]) -> str:
+    for item in reversed(request["items"]):
+        if item.get("type") == "message" and item.get("role") == "user":
+            return " ".join(str(part) for part in item.get("content", []))
+    return ""
+
+
+class Cassette:
+    """Recorded replies, one JSON file per request key under ``directory``."""
+
+    def __init__(self, directory: str | Path) -> None:
+        self.directory = Path(directory)
+
+    def path(self, key: str) -> Path:
+        return self.directory / f"{key[:24]}.json"
+
+    def load(self, key: str) -> list[dict[str, Any]] | None:
+        """The recorded chunks with their offsets in seconds, or None."""
+        try:
+            entry = json.loads(self.path(key).read_text())
+        except FileNotFoundError:
+            return None
+        return entry["chunks"] if entry["key"] == key else None
+
+    def save(
+        self, key: str, request: dict[str, Any], chunks: list[dict[str, Any]]
+    ) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        entry = {"key": key, "request": request, "chunks": chunks}
+        # a reader in another worker sees the old file or the new one, never half
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(entry, f, indent=1, ensure_ascii=False)
+            f.write("\n")
+        os.replace(tmp, self.path(key))
+
+
+class CassetteLLM(llm.LLM):
+    """An LLM recording the replies of ``inner`` or replaying recorded ones.
+
+    Args:
+        directory: Where the recorded replies are stored.
+        inner: The model requests are recorded from. Not needed to replay.
+        mode: ``replay``, ``record`` or ``missing``; ``LLM_CASSETTE_MODE`` when
+            not given.
+        model: Model name of the recording, part of every key. Defaults to the
+            name of ``inner``.
+        timing: Scale of the recorded chunk timing on replay, 0 streams every
+            chunk at once and 1 at the speed it was recorded.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        inner: llm.LLM | None = None,
+        *,
+        mode: CassetteMode | None = None,
+        model: str | None = None,
+        timing: float = 0.0,
+    ) -> None:
+        super().__init__()
+        self.cassette = Cassette(directory)
+        self.mode = mode or cassette_mode()
+        if self.mode != "replay" and inner is None:
+            raise ValueError(f"recording in {self.mode!r} mode needs an inner LLM")
+        if model is None and inner is None:
+            raise ValueError("the model name is needed to replay without an LLM")
+        self._inner = inner
+        self._model = model or inner.model  # type: ignore[union-attr]
+        self.timing = timing
+        self.hits = 0
+        self.recorded = 0
+        self.misses: list[str] = []
+
+    @property
+    def model(self) -> str:
+        return self._model
+
+    @property
+    def provider(self) -> str:
+        return self._inner.provider if self._inner is not None else "cassette"
+
+    def chat(
+        self,
+        *,
+        chat_ctx: llm.ChatContext,
+        tools: list[FunctionTool | RawFunctionTool] | None = None,
+        conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+        parallel_tool_calls: NotGivenOr[bool] = NOT_GIVEN,
+        tool_choice: NotGivenOr[ToolChoice] = NOT_GIVEN,
+        extra_kwargs: NotGivenOr[dict[str, Any]] = NOT_GIVEN,
+    ) -> CassetteLLMStream:
+        return CassetteLLMStream(
+            self,
+            chat_ctx=chat_ctx,
+            tools=tools or [],
+            conn_options=conn_options,
+            chat_kwargs={
+                "parallel_tool_calls": parallel_tool_calls,
+                "tool_choice": tool_choice,
+                "extra_kwargs": extra_kwargs,
+            },
+        )
+
+    async def aclose(self) -> None:
+        if self._inner is not None:
+            await self._inner.aclose()
+
+
+class CassetteLLMStream(llm.LLMStream):
+    def __init__(
+        self,
+        llm: CassetteLLM,
+        *,
+        chat_ctx: llm.ChatContext,
+        tools: list[FunctionTool | RawFunctionTool],
+        conn_options: APIConnectOptions,
+        chat_kwargs: dict[str, Any],
+    ) -> None:
+        super().__init__(llm, chat_ctx=chat_ctx, tools=tools, conn_options=conn_options)
+        self._cassette_llm: CassetteLLM = llm
+        self._chat_kwargs = chat_kwargs
+
+    async def _run(self) -> None:
+        owner = self._cassette_llm
+        request = request_of(
+            self._chat_ctx,
+            self._tools,
+            model=owner.model,
+            chat_kwargs=self._chat_kwargs,
+        )
+        key = request_key(request)
+
+        chunks = None if owner.mode == "record" else owner.cassette.load(key)
+        if chunks is not None:
+            owner.hits += 1
+            await self._replay(chunks)
+            return
+        if owner.mode == "replay":
+            owner.misses.append(key)
+            raise CassetteMissError(
+                f"no recorded reply for request {key[:24]} "
+                f"(last user message: {_last_user_text(request)!r}) in "
+                f"{owner.cassette.directory}; record it with {MODE_ENV}=missing"
+            )
+        await self._record(key, request)
+
+    async def _replay(self, chunks: list[dict[str, Any]]) -> None:
+        started = time.perf_counter()
+        for recorded in chunks:
+            if self._cassette_llm.timing > 0:
+                due = started + recorded["at"] * self._cassette_llm.timing
+                await asyncio.sleep(max(0.0, due - time.perf_counter()))
+            self._event_ch.send_nowait(llm.ChatChunk.model_validate(recorded["chunk"]))
+
+    async def _record(self, key: str, request: dict[str, Any]) -> None:
+        owner = self._cassette_llm
+        assert owner._inner is not None
+        chunks = []
+        started = time.perf_counter()
+        try:
+            async with owner._inner.chat(
+                chat_ctx=self._chat_ctx,
+                tools=self._tools,
+                conn_options=self._conn_options,
+                **self._chat_kwargs,
+            ) as stream:
+                async for chunk in stream:
+                    chunks.append(
+                        {
+                            "at": round(time.perf_counter() - started, 4),
+                            "chunk": chunk.model_dump(mode="json", exclude_none=True),
+                        }
+                    )
+                    self._event_ch.send_nowait(chunk)
+        except Exception as e:
+            # the inner stream already retried, nothing is stored
+            raise APIConnectionError(f"recording failed: {e!r}", retryable=False) from e
+        owner.cassette.save(key, request, chunks)
+        owner.recorded += 1
@@ -0,0 +1,74 @@
+"""Backend lookups behind the agent's tools.
+
+They live apart from the ``@function_tool`` methods, and take no ``RunContext``,
+so the same cached lookup can also be started speculatively from the transcript
+(see ``prefetch.py``) before the LLM asks for it.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+
+from tool_runtime import BACKEND_URL_ENV, ToolRuntime
+
+
+def canonical_order_number(text: str) -> str | None:
+    """``112-7890123-4567890`` for any spelling of its 17 digits, else ``None``."""
+    digits = re.sub(r"\D", "", text)
+    if len(digits) != 17:
+        return None
+    return f"{digits[:3]}-{digits[3:10]}-{digits[10:]}"
+
+
+class Lookups:
+    """The lookups of one job, with its pooled HTTP client, deadlines and cache.
+
+    One per job, shared by the agents of the call and the prefetcher: the
+    runtime's client belongs to the job's event loop, and closing it at the end
+    of the call must not cancel the lookups of another job in the process.
+
+    Args:
+        runtime: Defaults to a runtime for ``TOOL_BACKEND_URL``.
+    """
+
+    def __init__(self, runtime: ToolRuntime | None = None) -> None:
+        self.runtime = runtime or ToolRuntime(base_url=os.environ.get(BACKEND_URL_ENV))
+        self.fetch_weather = self.runtime.tool(
+            name="fetch_weather",
+            ttl=600,
+            fallback="The weather service is not responding right now.",
+        )(self._weather)
+        self.fetch_order = self.runtime.tool(
+            name="fetch_order",
+            ttl=120,
+            fallback="The order system is not responding right now.",
+        )(self._order)
+
+    async def _weather(self, location: str) -> str:
+        if self.runtime.base_url is None:
+            # demo answer until a weather backend is configured
+            return "sunny with a temperature of 70 degrees."
+
+        weather = await self.runtime.get_json("/weather", location=location)
+        return weather["summary"]
+
+    async def _order(self, order_number: str) -> str:
+        if self.runtime.base_url is None:
+            # demo order matching the persona's sample interactions
+            order = {
+                "order_id": order_number,
+                "status": "delivered",
+                "item": "Apple AirPods Pro",
+                "delivered_on": "yesterday",
+            }
+        else:
+            order = await self.runtime.get_json(f"/orders/{order_number}")
+        return json.dumps(order)
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        return self.runtime.summary()
+
+    async def aclose(self) -> None:
+        await self.runtime.aclose()
@@ -0,0 +1,242 @@
+"""Opt-in instrumentation of a job's event loop.
+
+Every callback of a call shares one asyncio loop: metrics handlers, tool
+calls, audio frame handling. When one of them blocks, every stage of the call
+waits. Two tools find out which one, both running on their own daemon thread
+and reading the loop thread's stack through ``sys._current_frames``:
+
+* ``BlockingDetector`` keeps a heartbeat on the loop. When the heartbeat is
+  older than the threshold, it logs the stack the loop is stuck in. When the
+  loop runs again, it logs the full duration of the stall.
+* ``SamplingProfiler`` samples the loop thread's stack at a fixed rate. At the
+  end of the call it writes the counts as collapsed stacks, the input format of
+  ``flamegraph.pl`` and speedscope.
+
+``LoopInstrumentation.from_env`` returns ``None`` unless ``LOOP_BLOCKING_MS``
+or ``LOOP_PROFILE_DIR`` is set. Then nothing is started and the cost is one
+environment lookup per call.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from pathlib import Path
+from types import FrameType
+
+logger = logging.getLogger("loop-profiler")
+
+BLOCKING_MS_ENV = "LOOP_BLOCKING_MS"
+PROFILE_DIR_ENV = "LOOP_PROFILE_DIR"
+
+
+def _loop_frame(thread_id: int) -> FrameType | None:
+    return sys._current_frames().get(thread_id)
+
+
+class BlockingDetector:
+    """Log the stack of any callback or task step that blocks the loop too long.
+
+    Args:
+        threshold: Seconds the loop may go without running before it is flagged.
+        label: Added to the log records, e.g. the room name.
+    """
+
+    def __init__(self, *, threshold: float = 0.1, label: str = "") -> None:
+        self._threshold = threshold
+        self._label = label
+        self._interval = threshold / 4
+        self._beat = time.monotonic()
+        self._loop_thread = 0
+        self._stalled_since: float | None = None
+        self._stop = threading.Event()
+        self._task: asyncio.Task[None] | None = None
+        self._thread: threading.Thread | None = None
+        self.stalls = 0
+        self.worst = 0.0
+
+    def start(self) -> None:
+        """Start watching the running loop."""
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._task = asyncio.create_task(self._heartbeat(), name="BlockingDetector")
+        self._thread = threading.Thread(
+            target=self._watch, name="loop-blocking-detector", daemon=True
+        )
+        self._thread.start()
+
+    async def _heartbeat(self) -> None:
+        while True:
+            self._beat = time.monotonic()
+            await asyncio.sleep(self._interval)
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self._interval):
+            beat = self._beat
+            stalled = time.monotonic() - beat
+            if self._stalled_since == beat:
+                continue  # already reported, waiting for the loop to run again
+            if self._stalled_since is not None:
+                self._unblocked(beat)
+            if stalled >= self._threshold:
+                self._blocked(beat, stalled)
+
+    def _blocked(self, beat: float, stalled: float) -> None:
+        self._stalled_since = beat
+        self.stalls += 1
+        frame = _loop_frame(self._loop_thread)
+        stack = "".join(traceback.format_stack(frame)) if frame else ""
+        logger.warning(
+            "event loop blocked",
+            extra={
+                "label": self._label,
+                "blocked_ms": round(stalled * 1000),
+                "stack": stack,
+            },
+        )
+
+    def _unblocked(self, beat: float) -> None:
+        assert self._stalled_since is not None
+        # the heartbeat is due every interval, the rest of the gap was the stall
+        duration = beat - self._stalled_since - self._interval
+        self._stalled_since = None
+        self.worst = max(self.worst, duration)
+        logger.info(
+            "event loop unblocked",
+            extra={"label": self._label, "blocked_ms": round(duration * 1000)},
+        )
+
+    async def aclose(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+
+
+def _frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    name = (
+        f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    )
+    # collapsed stacks use ";" between frames
+    return name.replace(";", ":")
+
+
+class SamplingProfiler:
+    """Count the stacks of the loop thread, sampled every ``interval`` seconds."""
+
+    def __init__(self, *, interval: float = 0.01) -> None:
+        self._interval = interval
+        self._loop_thread = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.stacks: Counter[str] = Counter()
+
+    def start(self) -> None:
+        """Profile the thread this is called from."""
+        self._loop_thread = threading.get_ident()
+        self._thread = threading.Thread(
+            target=self._sample, name="loop-sampling-profiler", daemon=True
+        )
+        self._thread.start()
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self._interval):
+            frame = _loop_frame(self._loop_thread)
+            names = []
+            while frame is not None:
+                names.append(_frame_name(frame))
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def write(self, path: str | Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(self.collapsed())
+
+
+class LoopInstrumentation:
+    """Blocking detector and sampling profiler of one call, as configured.
+
+    Args:
+        label: Room name, used in log records and the profile file name.
+        blocking_threshold: Seconds, ``None`` to not detect blocking.
+        profile_dir: Where the collapsed stacks go, ``None`` to not profile.
+    """
+
+    def __init__(
+        self,
+        label: str,
+        *,
+        blocking_threshold: float | None = None,
+        profile_dir: str | Path | None = None,
+    ) -> None:
+        self._label = label
+        self._profile_dir = Path(profile_dir) if profile_dir else None
+        self.detector = (
+            BlockingDetector(threshold=blocking_threshold, label=label)
+            if blocking_threshold
+            else None
+        )
+        self.profiler = SamplingProfiler() if self._profile_dir else None
+
+    @classmethod
+    def from_env(cls, label: str) -> LoopInstrumentation | None:
+        blocking_ms = os.environ.get(BLOCKING_MS_ENV)
+        profile_dir = os.environ.get(PROFILE_DIR_ENV)
+        if not blocking_ms and not profile_dir:
+            return None
+        return cls(
+            label,
+            blocking_threshold=float(blocking_ms) / 1000 if blocking_ms else None,
+            profile_dir=profile_dir,
+        )
+
+    def start(self) -> None:
+        if self.detector is not None:
+            self.detector.start()
+        if self.profiler is not None:
+            self.profiler.start()
+
+    @property
+    def profile_path(self) -> Path | None:
+        if self._profile_dir is None:
+            return None
+        name = re.sub(r"[^\w.-]", "_", self._label) or "job"
+        return self._profile_dir / f"{name}-{os.getpid()}.collapsed"
+
+    async def aclose(self) -> None:
+        if self.detector is not None:
+            await self.detector.aclose()
+            if self.detector.stalls:
+                logger.info(
+                    "event loop stalls",
+                    extra={
+                        "label": self._label,
+                        "stalls": self.detector.stalls,
+                        "worst_ms": round(self.detector.worst * 1000),
+                    },
+                )
+        if self.profiler is not None and (path := self.profile_path) is not None:
+            await asyncio.to_thread(self.profiler.stop)
+            try:
+                await asyncio.to_thread(self.profiler.write, path)
+            except OSError:
+                logger.warning("failed to write the loop profile", exc_info=True)
+                return
+            logger.info("loop profile written", extra={"path": str(path)})
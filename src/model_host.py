@@ -0,0 +1,115 @@
+"""Models shared by the job processes of a worker, and per-job memory reports.
+
+Every call runs in its own job process, and a worker keeps a few idle ones
+prewarmed. Loading the silero VAD in ``prewarm`` used to give each of them a
+private copy of the ONNX session. On Linux, livekit forks job processes from a
+forkserver that imports the registered plugin packages first. ``enable_preload``
+registers ``model_preload`` as one more such package. The forkserver then loads
+the VAD once, and every job process inherits it as copy-on-write pages that
+stay shared, since inference never writes to the weights.
+
+The turn detector weights already live once per worker, in livekit's inference
+process. ``MultilingualModel`` is only a client of it, and ``shared_turn_detector``
+keeps one per process. With ``JOB_EXECUTOR=thread`` all calls run as threads of
+one process and share both models.
+
+``JobMemory`` reports the RSS of the job process and the part of it that is not
+shared with other processes (USS), which is what each extra call costs.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import os
+from typing import Any
+
+import psutil
+from livekit.agents import JobExecutorType, Plugin, vad
+from livekit.plugins import silero
+from livekit.plugins.turn_detector.multilingual import MultilingualModel
+
+logger = logging.getLogger("model-host")
+
+JOB_EXECUTOR_ENV = "JOB_EXECUTOR"
+PRELOAD_PACKAGE = "model_preload"
+
+_vads: dict[tuple[tuple[str, Any], ...], vad.VAD] = {}
+_turn_detector: MultilingualModel | None = None
+
+
+def shared_vad(**options: Any) -> vad.VAD:
+    """The silero VAD with ``options``, loaded once per process (or forkserver)."""
+    key = tuple(sorted(options.items()))
+    if key not in _vads:
+        _vads[key] = silero.VAD.load(**options)
+    return _vads[key]
+
+
+def shared_turn_detector() -> MultilingualModel:
+    """One turn detector client per process, created inside the first job."""
+    global _turn_detector
+    if _turn_detector is None:
+        _turn_detector = MultilingualModel()
+    return _turn_detector
+
+
+def job_executor_type() -> JobExecutorType:
+    """``JOB_EXECUTOR=thread`` runs all calls in one process, ``process`` is default."""
+    return JobExecutorType(os.environ.get(JOB_EXECUTOR_ENV, "process"))
+
+
+class _PreloadPlugin(Plugin):
+    def __init__(self) -> None:
+        super().__init__("model-host", "0.1.0", PRELOAD_PACKAGE, logger)
+
+
+def enable_preload() -> None:
+    """Have the forkserver load the models before it forks job processes."""
+    if not any(p.package == PRELOAD_PACKAGE for p in Plugin.registered_plugins):
+        Plugin.register_plugin(_PreloadPlugin())
+
+
+def _mb(n: int) -> float:
+    return round(n / (1024 * 1024), 1)
+
+
+class JobMemory:
+    """Sample the memory of the job process while the call runs.
+
+    Args:
+        interval: Seconds between RSS samples for the peak.
+    """
+
+    def __init__(self, *, interval: float = 5.0) -> None:
+        self._interval = interval
+        self._process = psutil.Process()
+        self._task: asyncio.Task[None] | None = None
+        self.start_rss = self._process.memory_info().rss
+        self.peak_rss = self.start_rss
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._sample(), name="JobMemory._sample")
+
+    async def _sample(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            self.peak_rss = max(self.peak_rss, self._process.memory_info().rss)
+
+    def summary(self) -> dict[str, float]:
+        rss = self._process.memory_info().rss
+        self.peak_rss = max(self.peak_rss, rss)
+        summary = {
+            "start_rss_mb": _mb(self.start_rss),
+            "rss_mb": _mb(rss),
+            "peak_rss_mb": _mb(self.peak_rss),
+        }
+        with contextlib.suppress(psutil.AccessDenied, AttributeError):
+            # walks the page tables, only done once at the end of the call
+            summary["uss_mb"] = _mb(self._process.memory_full_info().uss)
+        return summary
+
+    async def aclose(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
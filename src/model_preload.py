@@ -0,0 +1,18 @@
+"""Imported by the worker's forkserver before it forks job processes.
+
+Job processes inherit the plugins imported and the VAD loaded here, see
+``model_host.enable_preload``.
+"""
+
+from startup import get_timeline, import_plugins
+
+timeline = get_timeline()
+timeline.role = "forkserver"
+
+from agent import VAD_OPTIONS  # noqa: E402
+from model_host import shared_vad  # noqa: E402
+
+timeline.mark("imports done")
+import_plugins()
+with timeline.span("load vad"):
+    shared_vad(**VAD_OPTIONS)
@@ -0,0 +1,121 @@
+"""Speculative tool lookups driven by interim transcripts.
+
+Tool I/O normally starts once the final transcript is in and the LLM has decided
+to call a tool. With interim results on, an order number or a city is often in
+the transcript well before the user stops speaking. ``Prefetcher`` watches the
+transcripts and, once an entity is stable, starts the matching lookup into the
+tool cache: the tool call then finds the result ready, or at least in flight.
+
+Hits and waste are counted by the ``ToolRuntime`` (``prefetched`` and
+``prefetch_waste`` in its summary).
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import time
+from collections.abc import Callable, Iterable
+
+from livekit.agents import AgentSession, UserInputTranscribedEvent
+
+from lookups import canonical_order_number
+
+logger = logging.getLogger("prefetch")
+
+# cities callers ask the weather for, matched as whole words
+KNOWN_CITIES = (
+    "New York", "Los Angeles", "Chicago", "Houston", "Phoenix", "Philadelphia",
+    "San Antonio", "San Diego", "Dallas", "Austin", "San Jose", "San Francisco",
+    "Seattle", "Denver", "Boston", "Miami", "Atlanta", "Las Vegas", "Portland",
+    "Detroit", "Nashville", "Washington", "Baltimore", "Minneapolis", "Orlando",
+    "Toronto", "Vancouver", "Montreal", "Mexico City", "London", "Paris",
+    "Berlin", "Madrid", "Rome", "Amsterdam", "Dublin", "Tokyo", "Seoul",
+    "Beijing", "Shanghai", "Hong Kong", "Singapore", "Mumbai", "Delhi",
+    "Bangalore", "Dubai", "Sydney", "Melbourne", "Sao Paulo",
+)  # fmt: skip
+
+# STT writes the 17 digits with dashes, spaces or nothing in between
+_ORDER_RE = re.compile(r"(?<!\d)\d(?:[\s-]?\d){16}(?![\d])")
+_CITY_RE = re.compile(
+    r"\b(?:"
+    + "|".join(re.escape(c) for c in sorted(KNOWN_CITIES, key=len, reverse=True))
+    + r")\b",
+    re.IGNORECASE,
+)
+_CITIES = {city.casefold(): city for city in KNOWN_CITIES}
+
+Extractor = Callable[[str], Iterable[str]]
+Prefetch = Callable[[str], bool]
+
+
+def extract_order_numbers(text: str) -> list[str]:
+    return [
+        number
+        for match in _ORDER_RE.findall(text)
+        if (number := canonical_order_number(match))
+    ]
+
+
+def extract_cities(text: str) -> list[str]:
+    return [_CITIES[match.casefold()] for match in _CITY_RE.findall(text)]
+
+
+class Prefetcher:
+    """Start tool lookups for entities heard in the user's transcripts.
+
+    Args:
+        rules: ``{name: (extractor, prefetch)}``. The extractor pulls entities out
+            of a transcript, ``prefetch`` is the ``.prefetch`` of a runtime tool.
+        min_stable: Consecutive interim transcripts an entity must appear in
+            before it is looked up. Entities of a final transcript always are.
+        ttl: Seconds before an entity is looked up again when mentioned again,
+            at most the shortest cache TTL of the tools so an expired result is
+            fetched anew.
+    """
+
+    def __init__(
+        self,
+        rules: dict[str, tuple[Extractor, Prefetch]],
+        *,
+        min_stable: int = 2,
+        ttl: float = 60.0,
+    ) -> None:
+        self._rules = rules
+        self._min_stable = min_stable
+        self._ttl = ttl
+        self._streak: dict[tuple[str, str], int] = {}
+        # when each entity was last looked up
+        self._fired: dict[tuple[str, str], float] = {}
+
+    @property
+    def fired(self) -> set[tuple[str, str]]:
+        return set(self._fired)
+
+    def attach(self, session: AgentSession) -> None:
+        session.on("user_input_transcribed", self._on_user_input_transcribed)
+
+    def _on_user_input_transcribed(self, ev: UserInputTranscribedEvent) -> None:
+        self.observe(ev.transcript, final=ev.is_final)
+
+    def observe(self, transcript: str, *, final: bool) -> None:
+        found = {
+            (name, entity)
+            for name, (extract, _) in self._rules.items()
+            for entity in extract(transcript)
+        }
+        # interim hypotheses get revised, only trust what survives a few of them
+        self._streak = {} if final else {c: self._streak.get(c, 0) + 1 for c in found}
+
+        now = time.monotonic()
+        self._fired = {c: at for c, at in self._fired.items() if now - at < self._ttl}
+        for candidate in found - self._fired.keys():
+            if not final and self._streak[candidate] < self._min_stable:
+                continue
+            self._fired[candidate] = now
+            name, entity = candidate
+            started = self._rules[name][1](entity)
+            logger.debug(
+                "speculative lookup",
+                extra={"rule": name, "entity": entity, "started": started},
+            )
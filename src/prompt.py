@@ -0,0 +1,216 @@
+"""Token-budgeted assembly of the system prompt.
+
+The persona prompt is written as tagged sections (``<AgentProfile>...</AgentProfile>``).
+Only a compact core is sent on every turn; it is byte-stable so the provider can
+reuse it as a cached prefix. The other sections are added for the turns whose
+conversation state asks for them (keywords in the latest user messages, the
+opening of the call), by priority, as long as the prompt stays within a token
+budget.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
+
+from livekit.agents import llm
+
+logger = logging.getLogger("prompt")
+
+_SECTION_RE = re.compile(r"<(\w+)>\n(.*?)\n</\1>", re.DOTALL)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English with Gemini/GPT)."""
+    return (len(text) + 3) // 4
+
+
+def parse_sections(text: str) -> dict[str, str]:
+    """Split a tagged prompt into ``{tag: full tagged block}``, in order."""
+    return {m.group(1): m.group(0) for m in _SECTION_RE.finditer(text)}
+
+
+def subsections(section: str) -> dict[str, str]:
+    """Split a tagged block into its ``Heading:`` paragraphs, keyed by heading."""
+    match = _SECTION_RE.fullmatch(section)
+    body = match.group(2) if match else section
+    return {
+        block.split(":", 1)[0].strip(): block.strip()
+        for block in body.split("\n\n")
+        if block.strip()
+    }
+
+
+@dataclass(frozen=True)
+class ConversationState:
+    """What section selection looks at: the latest user text and the turn count."""
+
+    recent_user_text: str
+    user_turns: int
+
+    @classmethod
+    def from_chat_ctx(
+        cls, chat_ctx: llm.ChatContext, *, window: int = 2
+    ) -> ConversationState:
+        user_texts = [
+            item.text_content or ""
+            for item in chat_ctx.items
+            if item.type == "message" and item.role == "user"
+        ]
+        return cls(
+            recent_user_text=" ".join(user_texts[-window:]).lower(),
+            user_turns=len(user_texts),
+        )
+
+
+@dataclass(frozen=True)
+class SectionRule:
+    """When to add an optional section.
+
+    Args:
+        keywords: Regex fragments matched against the recent user text.
+        opening: Also add the section while the user has spoken fewer than
+            ``opening`` times (``2`` covers the greeting and the first answer).
+        priority: Higher priority sections are added first when the budget is tight.
+        whole_words: Keywords must end at a word boundary too, so ``late`` does
+            not match "later". By default they are prefixes.
+    """
+
+    keywords: Sequence[str] = ()
+    opening: int = 0
+    priority: int = 0
+    whole_words: bool = False
+    _pattern: re.Pattern[str] | None = field(init=False, default=None, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.keywords:
+            end = r"\b" if self.whole_words else ""
+            object.__setattr__(
+                self,
+                "_pattern",
+                re.compile(r"\b(?:" + "|".join(self.keywords) + ")" + end),
+            )
+
+    def matches(self, state: ConversationState) -> bool:
+        if state.user_turns < self.opening:
+            return True
+        return self._pattern is not None and bool(
+            self._pattern.search(state.recent_user_text)
+        )
+
+
+@dataclass(frozen=True)
+class AssembledPrompt:
+    core: str
+    dynamic: str
+    sections: list[str]
+    tokens: int
+
+
+class PromptAssembler:
+    """Build the per-turn system prompt from tagged sections.
+
+    Args:
+        prompt: The full tagged persona prompt.
+        core: Sections sent on every turn, in this order.
+        rules: Optional sections and when to add them. Sections in neither ``core``
+            nor ``rules`` are never sent (reference material such as internal KPIs).
+        budget_tokens: Upper bound for the whole system prompt, core included.
+    """
+
+    def __init__(
+        self,
+        prompt: str,
+        *,
+        core: Iterable[str],
+        rules: dict[str, SectionRule],
+        budget_tokens: int,
+    ) -> None:
+        self._sections = parse_sections(prompt)
+        missing = [n for n in [*core, *rules] if n not in self._sections]
+        if missing:
+            raise ValueError(f"unknown prompt sections: {', '.join(missing)}")
+
+        self._core = "\n\n".join(self._sections[name] for name in core)
+        self._rules = rules
+        self._budget_tokens = budget_tokens
+        self._core_tokens = estimate_tokens(self._core)
+        if self._core_tokens > budget_tokens:
+            logger.warning(
+                "prompt core exceeds the token budget",
+                extra={"core_tokens": self._core_tokens, "budget": budget_tokens},
+            )
+
+    @property
+    def core(self) -> str:
+        """The static prefix, identical on every turn."""
+        return self._core
+
+    @property
+    def budget_tokens(self) -> int:
+        return self._budget_tokens
+
+    @property
+    def rules(self) -> dict[str, SectionRule]:
+        return dict(self._rules)
+
+    def section(self, name: str) -> str:
+        return self._sections[name]
+
+    def assemble(self, state: ConversationState) -> AssembledPrompt:
+        candidates = sorted(
+            (name for name, rule in self._rules.items() if rule.matches(state)),
+            key=lambda name: -self._rules[name].priority,
+        )
+
+        tokens = self._core_tokens
+        selected = []
+        for name in candidates:
+            cost = estimate_tokens(self._sections[name])
+            if tokens + cost > self._budget_tokens:
+                continue
+            selected.append(name)
+            tokens += cost
+
+        # keep the original document order so the model sees a consistent layout
+        selected.sort(key=list(self._sections).index)
+        return AssembledPrompt(
+            core=self._core,
+            dynamic="\n\n".join(self._sections[name] for name in selected),
+            sections=selected,
+            tokens=tokens,
+        )
+
+    def apply(self, chat_ctx: llm.ChatContext) -> llm.ChatContext:
+        """Return a copy of ``chat_ctx`` with this turn's sections after the core.
+
+        The agent's instructions (the core) stay the first system message so the
+        prefix is unchanged; the selected sections follow as a second one.
+        """
+        prompt = self.assemble(ConversationState.from_chat_ctx(chat_ctx))
+        logger.info(
+            "prompt assembled",
+            extra={
+                "sections": prompt.sections,
+                "prompt_tokens": prompt.tokens,
+                "budget": self._budget_tokens,
+            },
+        )
+        if not prompt.dynamic:
+            return chat_ctx
+
+        chat_ctx = chat_ctx.copy()
+        index = next(
+            (
+                i + 1
+                for i, item in enumerate(chat_ctx.items)
+                if item.type == "message" and item.role == "system"
+            ),
+            0,
+        )
+        chat_ctx.items.insert(
+            index, llm.ChatMessage(role="system", content=[prompt.dynamic])
+        )
+        return chat_ctx
@@ -0,0 +1,237 @@
+"""Resume falsely interrupted speech from its buffered audio.
+
+A cough or line noise cuts the agent off, and after ``false_interruption_timeout``
+the session reports a false interruption. When the audio output can pause,
+livekit paused it and resumes in place (``resumed=True``). Outputs that cannot
+pause (avatars, some telephony bridges) have already interrupted the speech. The
+only way on from there used to be a new LLM generation and TTS synthesis.
+
+``SpeechBuffer`` keeps the text and synthesized frames of the last few
+utterances, captured in ``Assistant.tts_node``. When playback is interrupted it
+remembers how far the utterance got. On a false interruption it plays the rest
+from the buffer with ``session.say``. It regenerates only when the buffer has
+expired, the utterance was not fully synthesized, the user has spoken since, or
+the output gave no synchronized transcript to match the utterance by.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections import deque
+from collections.abc import AsyncIterable, AsyncIterator
+from dataclasses import dataclass
+
+from livekit import rtc
+from livekit.agents import AgentFalseInterruptionEvent, AgentSession
+from livekit.agents.voice.io import PlaybackFinishedEvent
+
+logger = logging.getLogger("speech-buffer")
+
+
+class Recording:
+    """Text and audio of one utterance, as they went to the audio output."""
+
+    def __init__(self, *, max_audio: float) -> None:
+        self.text = ""
+        self.frames: list[rtc.AudioFrame] = []
+        self.duration = 0.0
+        self._max_audio = max_audio
+        self._text_done = False
+        self._audio_done = False
+        self._truncated = False
+
+    @classmethod
+    def of(
+        cls, text: str, frames: list[rtc.AudioFrame], *, max_audio: float
+    ) -> Recording:
+        recording = cls(max_audio=max_audio)
+        recording.text = text
+        recording._text_done = True
+        for frame in frames:
+            recording.add_frame(frame)
+        recording.finish()
+        return recording
+
+    @property
+    def complete(self) -> bool:
+        """All of the utterance was synthesized and fits in the buffer."""
+        return self._text_done and self._audio_done and not self._truncated
+
+    async def tee(self, text: AsyncIterable[str]) -> AsyncIterator[str]:
+        async for chunk in text:
+            self.text += chunk
+            yield chunk
+        self._text_done = True
+
+    def add_frame(self, frame: rtc.AudioFrame) -> None:
+        if self._truncated or self.duration + frame.duration > self._max_audio:
+            # too long to keep, an interruption of it is regenerated
+            self._truncated = True
+            self.frames.clear()
+            return
+        self.frames.append(frame)
+        self.duration += frame.duration
+
+    def finish(self) -> None:
+        self._audio_done = True
+
+    def words(self) -> list[str]:
+        return self.text.split()
+
+    def frames_from(self, position: float) -> list[rtc.AudioFrame]:
+        """Frames from the one playing at ``position`` seconds onwards."""
+        end = 0.0
+        for i, frame in enumerate(self.frames):
+            end += frame.duration
+            if end > position:
+                return self.frames[i:]
+        return []
+
+
+@dataclass
+class _Interrupted:
+    recording: Recording
+    position: float
+    played_words: int
+    at: float
+
+
+class SpeechBuffer:
+    """Record what the agent says, resume it after a false interruption.
+
+    Args:
+        max_utterances: Recent utterances kept.
+        max_audio: Seconds of audio kept per utterance. Longer ones are
+            regenerated when interrupted.
+        ttl: Seconds after the interruption the remainder may still be resumed.
+        rewind: Seconds replayed before the interruption point, so the resumed
+            audio does not start mid-word.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_utterances: int = 4,
+        max_audio: float = 30.0,
+        ttl: float = 10.0,
+        rewind: float = 0.3,
+    ) -> None:
+        self._recordings: deque[Recording] = deque(maxlen=max_utterances)
+        self._max_audio = max_audio
+        self._ttl = ttl
+        self._rewind = rewind
+        self._session: AgentSession | None = None
+        self._interrupted: _Interrupted | None = None
+        self.resumed = 0
+        self.replayed = 0
+        self.regenerated = 0
+
+    def record(self) -> Recording:
+        """Start recording an utterance, called once per ``tts_node`` run."""
+        recording = Recording(max_audio=self._max_audio)
+        self._recordings.append(recording)
+        return recording
+
+    def attach(self, session: AgentSession) -> None:
+        """Handle the false interruptions of ``session``; call after it started."""
+        self._session = session
+        session.on("agent_false_interruption", self._on_false_interruption)
+        if session.output.audio is not None:
+            session.output.audio.on("playback_finished", self._on_playback_finished)
+
+    def _on_playback_finished(self, ev: PlaybackFinishedEvent) -> None:
+        if not ev.interrupted:
+            return
+        recording = self._find(ev.synchronized_transcript)
+        if recording is None:
+            # e.g. a filler clip, or no transcript to tell which utterance it was
+            self._interrupted = None
+            return
+        self._interrupted = _Interrupted(
+            recording,
+            position=ev.playback_position,
+            played_words=len((ev.synchronized_transcript or "").split()),
+            at=time.time(),
+        )
+
+    def _find(self, transcript: str | None) -> Recording | None:
+        if transcript is None:
+            # without it a filler or another clip could pass for the last reply,
+            # and the remainder would not be known; it is regenerated instead
+            return None
+        played = transcript.split()
+        for recording in reversed(self._recordings):
+            if recording.words()[: len(played)] == played:
+                return recording
+        return None
+
+    def _on_false_interruption(self, ev: AgentFalseInterruptionEvent) -> None:
+        interrupted, self._interrupted = self._interrupted, None
+        if ev.resumed:
+            # the output was paused and picked up where it stopped
+            self.resumed += 1
+            logger.debug("false interruption, resumed in place")
+            return
+
+        reason = self._stale(interrupted)
+        if reason is None and interrupted is not None:
+            self._replay(interrupted)
+            return
+
+        self.regenerated += 1
+        logger.info("false interruption, regenerating", extra={"reason": reason})
+        assert self._session is not None
+        self._session.generate_reply()
+
+    def _stale(self, interrupted: _Interrupted | None) -> str | None:
+        """Why the buffered remainder cannot be resumed, ``None`` if it can."""
+        if interrupted is None:
+            return "nothing buffered"
+        if not interrupted.recording.complete:
+            return "incomplete"
+        if time.time() - interrupted.at > self._ttl:
+            return "expired"
+        assert self._session is not None
+        for item in reversed(self._session.history.items):
+            if item.created_at < interrupted.at:
+                break
+            if item.type == "message" and item.role == "user":
+                return "context changed"
+        return None
+
+    def _replay(self, interrupted: _Interrupted) -> None:
+        recording = interrupted.recording
+        text = " ".join(recording.words()[interrupted.played_words :])
+        frames = recording.frames_from(max(0.0, interrupted.position - self._rewind))
+        if not frames:
+            logger.debug("false interruption after the utterance was played")
+            return
+
+        # the rest is an utterance of its own, it can be interrupted and resumed too
+        rest = Recording.of(text, frames, max_audio=self._max_audio)
+        self._recordings.append(rest)
+
+        self.replayed += 1
+        logger.info(
+            "false interruption, resuming from the buffer",
+            extra={"remaining_s": round(rest.duration, 2)},
+        )
+        assert self._session is not None
+        self._session.say(text, audio=_stream(frames))
+
+    def summary(self) -> dict[str, float]:
+        resumes = self.resumed + self.replayed
+        total = resumes + self.regenerated
+        return {
+            "false_interruptions": total,
+            "resumed": self.resumed,
+            "replayed": self.replayed,
+            "regenerated": self.regenerated,
+            "resume_rate": round(resumes / total, 3) if total else 0.0,
+        }
+
+
+async def _stream(frames: list[rtc.AudioFrame]) -> AsyncIterator[rtc.AudioFrame]:
+    for frame in frames:
+        yield frame
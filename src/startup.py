@@ -0,0 +1,260 @@
+"""Cold-start timeline of the worker, and plugins imported when first needed.
+
+A new pod is useful once its worker has registered and has an idle process to
+give a call to. Until then it pays for the imports of the worker process, the
+forkserver's preload, the inference process loading the turn detector and the
+prewarm of each idle job process. ``StartupTimeline`` records these steps in
+every process: import times, model loads, worker registration and the first
+idle process. Each step is logged as a ``startup`` record. With
+``STARTUP_TIMELINE_PATH`` set, it is also appended as a JSON line to a file
+shared by all processes of the worker. ``python src/startup.py <path>`` prints
+them as one timeline.
+
+The Google and noise cancellation plugins take about half of the worker's
+import time (``google.genai`` alone ~0.6 s), and only job processes use them.
+They are ``lazy_import`` modules that import on first attribute access.
+``import_plugins`` imports them on purpose: in the worker process unless
+``LAZY_PLUGINS=1`` defers them for ``start``, in the forkserver's preload so
+that job processes inherit them, and in prewarm otherwise. Plugins register
+themselves on import and livekit only allows that on the main thread, so
+threads must not be the first to touch a lazy plugin.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import importlib
+import json
+import logging
+import os
+import sys
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from types import ModuleType
+from typing import Any
+
+import psutil
+
+logger = logging.getLogger("startup")
+
+STARTUP_TIMELINE_ENV = "STARTUP_TIMELINE_PATH"
+LAZY_PLUGINS_ENV = "LAZY_PLUGINS"
+
+# heavy modules only job processes use, see import_plugins
+PLUGINS = (
+    "livekit.plugins.google",
+    "livekit.plugins.noise_cancellation",
+)
+
+
+class StartupTimeline:
+    """Startup steps of this process, in seconds since the process was created.
+
+    Args:
+        role: Which process this is (``worker``, ``forkserver``, ``job``).
+        path: JSON lines file shared with the other processes, if any.
+    """
+
+    def __init__(self, role: str = "process", path: str | None = None) -> None:
+        self.role = role
+        self.path = path
+        self.started_at = psutil.Process().create_time()
+        self.records: list[dict[str, Any]] = []
+
+    def mark(self, phase: str, **fields: Any) -> dict[str, Any]:
+        """Record that ``phase`` was reached now."""
+        now = time.time()
+        record = {
+            "phase": phase,
+            "role": self.role,
+            "pid": os.getpid(),
+            "time": round(now, 4),
+            "at": round(now - self.started_at, 4),
+            **fields,
+        }
+        self.records.append(record)
+        logger.info("startup", extra=record)
+        if self.path:
+            # one short write per line, appends from several processes don't interleave
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+        return record
+
+    @contextlib.contextmanager
+    def span(self, phase: str, **fields: Any) -> Iterator[None]:
+        """Record ``phase`` with how long the block took, when it is done."""
+        start = time.perf_counter()
+        yield
+        self.mark(phase, seconds=round(time.perf_counter() - start, 4), **fields)
+
+    def phase(self, phase: str) -> dict[str, Any] | None:
+        return next((r for r in self.records if r["phase"] == phase), None)
+
+
+_timeline: StartupTimeline | None = None
+
+
+def get_timeline() -> StartupTimeline:
+    """The timeline of the current process, created on first use."""
+    global _timeline
+    if _timeline is None:
+        _timeline = StartupTimeline(path=os.environ.get(STARTUP_TIMELINE_ENV))
+    return _timeline
+
+
+def _reset_after_fork() -> None:
+    # a forked job process starts its own timeline, not the forkserver's
+    global _timeline
+    _timeline = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class LazyModule(ModuleType):
+    """A module imported on the first access to one of its attributes."""
+
+    def __getattr__(self, attr: str) -> Any:
+        module = _import(self.__name__)
+        # later lookups find the attributes on the proxy itself
+        self.__dict__.update(
+            {k: v for k, v in module.__dict__.items() if k not in ("__name__",)}
+        )
+        return getattr(module, attr)
+
+
+def lazy_import(name: str) -> ModuleType:
+    """``name`` if it is already imported, else a module importing it when used."""
+    return sys.modules.get(name) or LazyModule(name)
+
+
+def _import(name: str) -> ModuleType:
+    if name in sys.modules:
+        return sys.modules[name]
+    with get_timeline().span(f"import {name}"):
+        return importlib.import_module(name)
+
+
+def import_plugins() -> None:
+    """Import the plugins that ``lazy_import`` deferred, on the main thread."""
+    for name in PLUGINS:
+        _import(name)
+
+
+def plugins_deferred(argv: list[str], *, thread_jobs: bool) -> bool:
+    """Whether the worker process may skip the plugins (``LAZY_PLUGINS=1``).
+
+    Only for ``start`` with job processes: jobs running as threads of the worker
+    (``console``, ``JOB_EXECUTOR=thread``) could not import them later.
+    """
+    return (
+        os.environ.get(LAZY_PLUGINS_ENV) == "1"
+        and argv[1:2] == ["start"]
+        and not thread_jobs
+    )
+
+
+# livekit worker log messages and the startup step they stand for
+_WORKER_PHASES = {
+    "starting worker": "worker starting",
+    "starting inference executor": "inference executor starting",
+    "registered worker": "worker registered",
+}
+
+
+class WorkerLifecycle(logging.Filter):
+    """Turn livekit's worker log records into steps of the startup timeline.
+
+    Installed on the ``livekit.agents`` logger of the worker process. The first
+    job process to finish initializing (prewarm included) is the first idle one.
+    Once the worker is also registered, a summary of its startup is logged.
+    """
+
+    def __init__(self, timeline: StartupTimeline) -> None:
+        super().__init__()
+        self._timeline = timeline
+        self._summarized = False
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        message = record.getMessage()
+        if message in _WORKER_PHASES:
+            self._timeline.mark(_WORKER_PHASES[message])
+        elif message == "process initialized":
+            inference = getattr(record, "inference", False)
+            phase = "inference process ready" if inference else "job process ready"
+            first_idle = not inference and self._timeline.phase(phase) is None
+            self._timeline.mark(
+                phase,
+                child_pid=getattr(record, "pid", None),
+                seconds=getattr(record, "elapsed_time", None),
+            )
+            if first_idle:
+                self._timeline.mark("first idle process")
+        if not self._summarized:
+            summary = self.summary()
+            if summary["registered"] and summary["first_idle"]:
+                self._summarized = True
+                logger.info("worker startup", extra=summary)
+        return True
+
+    def summary(self) -> dict[str, float | None]:
+        """Seconds from the worker process start to each milestone."""
+
+        def at(phase: str) -> float | None:
+            record = self._timeline.phase(phase)
+            return record["at"] if record else None
+
+        return {
+            "imports": at("imports done"),
+            "inference_ready": at("inference process ready"),
+            "registered": at("worker registered"),
+            "first_idle": at("first idle process"),
+        }
+
+
+def watch_worker() -> StartupTimeline:
+    """Timeline of the worker process, following livekit's startup log records."""
+    timeline = get_timeline()
+    timeline.role = "worker"
+    logging.getLogger("livekit.agents").addFilter(WorkerLifecycle(timeline))
+    return timeline
+
+
+def load_timeline(path: str | Path) -> list[dict[str, Any]]:
+    records = [json.loads(line) for line in Path(path).read_text().splitlines() if line]
+    return sorted(records, key=lambda r: r["time"])
+
+
+def print_timeline(records: list[dict[str, Any]]) -> None:
+    """One line per step, in seconds since the first worker process started."""
+    workers = [r["time"] - r["at"] for r in records if r["role"] == "worker"]
+    origin = min(workers or [r["time"] - r["at"] for r in records])
+    for r in records:
+        took = f"{r['seconds']:>7.3f} s" if r.get("seconds") is not None else " " * 9
+        print(
+            f"{r['time'] - origin:>8.3f}  {r['role']:<10} {r['pid']:>7}  "
+            f"{took}  {r['phase']}"
+        )
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Cold-start timeline of a worker.")
+    parser.add_argument("path", type=Path, help=f"the {STARTUP_TIMELINE_ENV} file")
+    parser.add_argument("--json", action="store_true", help="print JSON lines")
+    args = parser.parse_args(argv)
+
+    if not args.path.exists():
+        parser.error(f"no startup timeline at {args.path}")
+    records = load_timeline(args.path)
+    if args.json:
+        for record in records:
+            print(json.dumps(record))
+    else:
+        print_timeline(records)
+
+
+if __name__ == "__main__":
+    main()
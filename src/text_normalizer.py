@@ -0,0 +1,280 @@
+"""Spoken form of numbers, amounts, dates and codes, applied on the way to TTS.
+
+The persona prompt used to ask the LLM to spell out every number, date and
+order number. That costs prompt tokens on every turn, and the spelled-out
+replies are several times longer in output tokens: "one one two, seven eight
+nine ..." instead of "112-789...". Long replies also reach ``max_output_tokens``
+sooner. The LLM now writes digits, and ``normalize`` rewrites them for speech:
+
+* order, phone and other dashed numbers, long digit runs and confirmation codes
+  are read one character at a time;
+* ``$29.99`` as "twenty-nine dollars and ninety-nine cents", ``20%`` as "twenty
+  percent";
+* ``March 15, 2024`` and ``3/15/2024`` as "March fifteenth, twenty twenty-four",
+  ``since 2019`` as "since twenty nineteen", ``3:30 PM`` as "three thirty PM";
+  other four-digit numbers are quantities;
+* other numbers, ordinals and ranges (``3-5``) as words, ``&``, ``@`` and a few
+  abbreviations spelled out.
+
+Only the audio is affected: the transcript and the chat context keep the LLM's
+text. ``StreamingNormalizer`` does the same on the text stream of a reply. It
+holds back at most the word still being written, and the first words of a date
+or time until the rest arrives, so the first sentence is not delayed.
+"""
+
+from __future__ import annotations
+
+import re
+from collections.abc import AsyncIterable, AsyncIterator
+
+_ONES = (
+    "zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine",
+    "ten", "eleven", "twelve", "thirteen", "fourteen", "fifteen", "sixteen",
+    "seventeen", "eighteen", "nineteen",
+)  # fmt: skip
+_TENS = (
+    "", "", "twenty", "thirty", "forty", "fifty", "sixty", "seventy", "eighty",
+    "ninety",
+)  # fmt: skip
+_SCALES = (
+    (10**12, "trillion"), (10**9, "billion"), (10**6, "million"), (1000, "thousand"),
+)  # fmt: skip
+_ORDINALS = {
+    "one": "first",
+    "two": "second",
+    "three": "third",
+    "five": "fifth",
+    "eight": "eighth",
+    "nine": "ninth",
+    "twelve": "twelfth",
+}
+_MONTHS = (
+    "January", "February", "March", "April", "May", "June", "July", "August",
+    "September", "October", "November", "December",
+)  # fmt: skip
+_MONTH_ABBREVIATIONS = {
+    **{month[:3]: month for month in _MONTHS},
+    "Sept": "September",
+}
+_ABBREVIATIONS = {
+    "USPS": "United States Postal Service",
+    "e.g.": "for example",
+    "i.e.": "that is",
+    "etc.": "et cetera",
+}
+
+
+def _under_thousand(n: int) -> str:
+    words = []
+    if n >= 100:
+        words.append(f"{_ONES[n // 100]} hundred")
+        n %= 100
+    if n >= 20:
+        words.append(_TENS[n // 10] + (f"-{_ONES[n % 10]}" if n % 10 else ""))
+    elif n or not words:
+        words.append(_ONES[n])
+    return " ".join(words)
+
+
+def cardinal(n: int) -> str:
+    """``1299`` as "one thousand two hundred ninety-nine"."""
+    if n < 0:
+        return f"minus {cardinal(-n)}"
+    words = []
+    for scale, name in _SCALES:
+        if n >= scale:
+            words.append(f"{cardinal(n // scale)} {name}")
+            n %= scale
+    if n or not words:
+        words.append(_under_thousand(n))
+    return " ".join(words)
+
+
+def ordinal(n: int) -> str:
+    """``21`` as "twenty-first"."""
+    words = cardinal(n)
+    split = max(words.rfind(" "), words.rfind("-")) + 1
+    head, last = words[:split], words[split:]
+    if last in _ORDINALS:
+        last = _ORDINALS[last]
+    elif last.endswith("y"):
+        last = last[:-1] + "ieth"
+    else:
+        last += "th"
+    return head + last
+
+
+def year(n: int) -> str:
+    """``2024`` as "twenty twenty-four", ``2005`` as "two thousand five"."""
+    if not 1100 <= n <= 2099 or 2000 <= n <= 2009:
+        return cardinal(n)
+    high, low = divmod(n, 100)
+    if low == 0:
+        return f"{cardinal(high)} hundred"
+    return f"{cardinal(high)} {'oh ' if low < 10 else ''}{cardinal(low)}"
+
+
+def digits(text: str) -> str:
+    """Each digit of ``text`` as a word, other characters as they are."""
+    return " ".join(_ONES[int(c)] if c.isdigit() else c for c in text)
+
+
+def _money(dollars: str, cents: str | None) -> str:
+    amount = int(dollars.replace(",", ""))
+    cents_amount = int(cents) if cents else 0
+    parts = []
+    if amount or not cents_amount:
+        parts.append(f"{cardinal(amount)} {'dollar' if amount == 1 else 'dollars'}")
+    if cents_amount:
+        cents_word = "cent" if cents_amount == 1 else "cents"
+        parts.append(f"{cardinal(cents_amount)} {cents_word}")
+    return " and ".join(parts)
+
+
+def _number(integer: str, fraction: str | None) -> str:
+    if "," not in integer and len(integer) >= 5 and not fraction:
+        return digits(integer)  # zip codes, tracking and account numbers
+    words = cardinal(int(integer.replace(",", "")))
+    if fraction:
+        words += f" point {digits(fraction)}"
+    return words
+
+
+def _date(month: str, day: int, year_: str | None) -> str:
+    words = f"{month} {ordinal(day)}"
+    return f"{words}, {year(int(year_))}" if year_ else words
+
+
+_MONTH = "|".join([*_MONTHS, *_MONTH_ABBREVIATIONS])
+# words before a bare year, "since 2019"; "1234 items" stays a quantity
+_YEAR_LEAD = "in|since|from|until|before|after"
+_PATTERN = re.compile(
+    rf"""
+    (?P<date>\b(?P<month>{_MONTH})\.?\s+(?P<day>\d{{1,2}})(?:st|nd|rd|th)?\b
+        (?:,?\s+(?P<year>\d{{4}})\b)?)
+    | (?P<slash>\b(?P<sm>\d{{1,2}})/(?P<sd>\d{{1,2}})/(?P<sy>\d{{4}})\b)
+    | (?P<money>\$(?P<dollars>\d{{1,3}}(?:,\d{{3}})+|\d+)(?:\.(?P<cents>\d{{2}}))?(?!\d))
+    | (?P<percent>(?P<pct>\d+(?:\.\d+)?)%)
+    | (?P<time>\b(?P<hour>\d{{1,2}}):(?P<minute>[0-5]\d)\b
+        (?:\s*(?P<ampm>[AaPp])\.?[Mm]\b\.?)?)
+    | (?P<code>\b(?=[A-Z\d-]{{4,}}\b)(?=[A-Z\d-]*\d)(?=[A-Z\d-]*[A-Z])
+        [A-Z\d]+(?:-[A-Z\d]+)*\b)
+    | (?P<dashed>(?<![\w-])\d+(?:-\d+)+(?![\w-]))
+    | (?P<ordinal>\b(?P<ord>\d+)(?:st|nd|rd|th)\b)
+    | (?P<bare_year>\b(?P<lead>(?i:{_YEAR_LEAD}))\s+(?P<yyyy>(?:19|20)\d\d)(?![\w%]|[.,]\d))
+    | (?P<number>(?<![A-Za-z\d])(?P<int>\d{{1,3}}(?:,\d{{3}})+|\d+)
+        (?:\.(?P<frac>\d+))?(?![A-Za-z\d]))
+    | (?P<symbol>[&@]|\#(?=\d))
+    | (?P<abbreviation>\b(?:{"|".join(re.escape(a) for a in _ABBREVIATIONS)})(?!\w))
+    """,
+    re.VERBOSE,
+)
+
+
+def _replace(m: re.Match[str]) -> str:
+    kind = m.lastgroup
+    if kind == "date":
+        month = m["month"]
+        return _date(_MONTH_ABBREVIATIONS.get(month, month), int(m["day"]), m["year"])
+    if kind == "slash":
+        month, day = int(m["sm"]), int(m["sd"])
+        if 1 <= month <= 12 and 1 <= day <= 31:
+            return _date(_MONTHS[month - 1], day, m["sy"])
+        return digits(m[0])
+    if kind == "money":
+        return _money(m["dollars"], m["cents"])
+    if kind == "percent":
+        integer, _, fraction = m["pct"].partition(".")
+        return f"{_number(integer, fraction or None)} percent"
+    if kind == "time":
+        hour, minute = int(m["hour"]), int(m["minute"])
+        words = cardinal(hour)
+        if minute:
+            words += f" {'oh ' if minute < 10 else ''}{cardinal(minute)}"
+        elif not m["ampm"]:
+            words += " o'clock"
+        return f"{words} {m['ampm'].upper()}M" if m["ampm"] else words
+    if kind == "code":
+        return ", ".join(digits(group) for group in m[0].split("-"))
+    if kind == "dashed":
+        groups = m[0].split("-")
+        if len(groups) == 2 and all(len(g) <= 3 for g in groups):
+            return f"{cardinal(int(groups[0]))} to {cardinal(int(groups[1]))}"
+        return ", ".join(digits(group) for group in groups)
+    if kind == "ordinal":
+        return ordinal(int(m["ord"]))
+    if kind == "bare_year":
+        return f"{m['lead']} {year(int(m['yyyy']))}"
+    if kind == "number":
+        return _number(m["int"], m["frac"])
+    if kind == "symbol":
+        if m[0] == "#":
+            return "number "
+        word = "and" if m[0] == "&" else "at"
+        # "A & B" keeps its spaces, "AT&T" and "help@amazon.com" get them
+        before = m.start() == 0 or m.string[m.start() - 1].isspace()
+        after = m.end() == len(m.string) or m.string[m.end()].isspace()
+        return f"{'' if before else ' '}{word}{'' if after else ' '}"
+    return _ABBREVIATIONS[m[0]]
+
+
+def normalize(text: str) -> str:
+    """Rewrite the digits, symbols and abbreviations of ``text`` as spoken words."""
+    return _PATTERN.sub(_replace, text)
+
+
+# the start of a date, year or time whose remaining words have not arrived yet
+_PENDING = re.compile(
+    rf"(?:\b(?:{_MONTH})\.?\s+(?:\d{{1,2}}(?:st|nd|rd|th)?,?\s+)?"
+    rf"|\b(?i:{_YEAR_LEAD})\s+"
+    r"|\b\d{1,2}:[0-5]\d\s+)$"
+)
+# a sentence is complete, nothing can continue its last word; not "$29." of
+# "$29.99", "e." of "e.g." or "Dec." of "Dec. 5"
+_SENTENCE_END = re.compile(r"(?<!\S)([A-Za-z]{2,})[.!?]['\")]*$")
+_LAST_SPACE = re.compile(r"\s(?=\S*$)")
+
+
+class StreamingNormalizer:
+    """``normalize`` applied to text that arrives in chunks.
+
+    Args:
+        max_hold: Characters held back at most, waiting for a word to end.
+    """
+
+    def __init__(self, *, max_hold: int = 64) -> None:
+        self._max_hold = max_hold
+        self._buffer = ""
+
+    def push(self, chunk: str) -> str:
+        """Add ``chunk``, return the normalized text that is complete."""
+        self._buffer += chunk
+        cut = self._complete_until()
+        text, self._buffer = self._buffer[:cut], self._buffer[cut:]
+        return normalize(text)
+
+    def flush(self) -> str:
+        """Return the rest, at the end of the reply."""
+        text, self._buffer = self._buffer, ""
+        return normalize(text)
+
+    def _complete_until(self) -> int:
+        buffer = self._buffer
+        end = _SENTENCE_END.search(buffer)
+        if end is not None and end[1] not in _MONTH_ABBREVIATIONS:
+            return len(buffer)
+        space = _LAST_SPACE.search(buffer)
+        cut = space.end() if space else 0
+        if (pending := _PENDING.search(buffer, 0, cut)) is not None:
+            cut = pending.start()
+        return len(buffer) if len(buffer) - cut > self._max_hold else cut
+
+
+async def normalize_stream(text: AsyncIterable[str]) -> AsyncIterator[str]:
+    """Normalize the text stream of a reply for TTS."""
+    normalizer = StreamingNormalizer()
+    async for chunk in text:
+        if normalized := normalizer.push(chunk):
+            yield normalized
+    if rest := normalizer.flush():
+        yield rest
@@ -0,0 +1,304 @@
+"""Runtime for ``@function_tool`` methods that do network I/O in the agent's event loop.
+
+Tools share one connection-pooled ``aiohttp`` client per job, so the TLS
+handshake to a backend is paid once and not on every lookup. The client belongs
+to the job's event loop: jobs running as threads of one process each need their
+own runtime. ``ToolRuntime.tool``
+wraps a tool with:
+
+* a deadline: past it the caller gets a fallback string the LLM can speak, and
+  the backend request keeps running in the background to fill the cache;
+* a TTL cache keyed on the normalized arguments, so asking twice for the same
+  location or order within a call does not hit the backend again;
+* deduplication of identical calls in flight;
+* ``prefetch()``: start a lookup speculatively, before the LLM asks for it, and
+  count how many of those were used (hits) or not (waste).
+
+It goes under ``@function_tool``, which still sees the original signature::
+
+    @function_tool
+    @runtime.tool(ttl=600, fallback="The weather service is not responding.")
+    async def lookup_weather(self, context: RunContext, location: str): ...
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import inspect
+import json
+import logging
+import time
+from collections import OrderedDict, deque
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any, TypeVar
+
+import aiohttp
+from livekit.agents import RunContext
+
+logger = logging.getLogger("tool-runtime")
+
+BACKEND_URL_ENV = "TOOL_BACKEND_URL"
+
+F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
+
+
+def normalize_arg(value: Any) -> Any:
+    """Canonical form of a tool argument: " Tokyo" and "tokyo" are the same lookup."""
+    if isinstance(value, str):
+        return " ".join(value.split()).casefold()
+    if isinstance(value, (list, tuple)):
+        return [normalize_arg(v) for v in value]
+    if isinstance(value, dict):
+        return {k: normalize_arg(v) for k, v in value.items()}
+    return value
+
+
+@dataclass
+class ToolStats:
+    calls: int = 0
+    hits: int = 0
+    timeouts: int = 0
+    prefetched: int = 0
+    prefetch_hits: int = 0
+    latencies: deque[float] = field(default_factory=lambda: deque(maxlen=1000))
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.calls if self.calls else 0.0
+
+    @property
+    def prefetch_waste(self) -> float:
+        """Share of the speculative lookups no tool call used."""
+        if not self.prefetched:
+            return 0.0
+        return 1.0 - self.prefetch_hits / self.prefetched
+
+    def quantile(self, q: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ToolRuntime:
+    """Shared HTTP client, deadlines and result cache for the agent's tools.
+
+    Args:
+        base_url: Root URL of the tool backend, ``None`` when none is configured.
+        max_connections: Size of the connection pool.
+        default_timeout: Deadline of a tool call when the tool sets none, in seconds.
+        max_entries: Cached results kept at most, the oldest are evicted first.
+    """
+
+    def __init__(
+        self,
+        *,
+        base_url: str | None = None,
+        max_connections: int = 20,
+        default_timeout: float = 2.0,
+        max_entries: int = 1024,
+    ) -> None:
+        self._base_url = base_url.rstrip("/") if base_url else None
+        self._max_connections = max_connections
+        self._default_timeout = default_timeout
+        self._max_entries = max_entries
+        self._http: aiohttp.ClientSession | None = None
+        self._cache: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Task[Any]] = {}
+        self._speculative: set[str] = set()
+        self.stats: dict[str, ToolStats] = {}
+
+    @property
+    def base_url(self) -> str | None:
+        return self._base_url
+
+    def http(self) -> aiohttp.ClientSession:
+        """The pooled client, created on first use in the running loop."""
+        if self._http is None or self._http.closed:
+            self._http = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self._max_connections,
+                    keepalive_timeout=60,
+                    ttl_dns_cache=300,
+                ),
+                # requests outliving the tool deadline still fill the cache,
+                # this bounds how long they may hold a connection
+                timeout=aiohttp.ClientTimeout(total=10),
+            )
+        return self._http
+
+    async def get_json(self, path: str, **params: Any) -> Any:
+        if self._base_url is None:
+            raise RuntimeError(f"{BACKEND_URL_ENV} is not set")
+        async with self.http().get(f"{self._base_url}{path}", params=params) as resp:
+            resp.raise_for_status()
+            return await resp.json()
+
+    def tool(
+        self,
+        *,
+        fallback: str,
+        ttl: float = 300.0,
+        timeout: float | None = None,
+        name: str | None = None,
+    ) -> Callable[[F], F]:
+        """Give a tool a deadline and a result cache.
+
+        Args:
+            fallback: Returned instead of the result when the deadline passes.
+            ttl: Seconds a result is reused for the same arguments, ``0`` disables it.
+            timeout: Deadline in seconds, defaults to the runtime's.
+            name: Name of the tool in the stats and cache keys, defaults to the
+                function's.
+        """
+        deadline = timeout if timeout is not None else self._default_timeout
+        tool_name = name
+
+        def decorator(fn: F) -> F:
+            signature = inspect.signature(fn)
+            name = tool_name or fn.__name__
+
+            def key(args: tuple[Any, ...], kwargs: dict[str, Any]) -> str:
+                bound = signature.bind(*args, **kwargs)
+                return json.dumps(
+                    [
+                        name,
+                        {
+                            arg: normalize_arg(value)
+                            for arg, value in bound.arguments.items()
+                            if arg != "self" and not isinstance(value, RunContext)
+                        },
+                    ],
+                    sort_keys=True,
+                    default=str,
+                )
+
+            @functools.wraps(fn)
+            async def wrapper(*args: Any, **kwargs: Any) -> Any:
+                return await self._call(
+                    name, key(args, kwargs), ttl, deadline, fallback, fn, args, kwargs
+                )
+
+            def prefetch(*args: Any, **kwargs: Any) -> bool:
+                return self._prefetch(name, key(args, kwargs), ttl, fn, args, kwargs)
+
+            wrapper.prefetch = prefetch  # type: ignore[attr-defined]
+            return wrapper  # type: ignore[return-value]
+
+        return decorator
+
+    async def _call(
+        self,
+        name: str,
+        key: str,
+        ttl: float,
+        deadline: float,
+        fallback: str,
+        fn: Callable[..., Awaitable[Any]],
+        args: tuple[Any, ...],
+        kwargs: dict[str, Any],
+    ) -> Any:
+        stats = self.stats.setdefault(name, ToolStats())
+        stats.calls += 1
+        started = time.perf_counter()
+
+        if key in self._speculative and (self._cached(key) or key in self._inflight):
+            self._speculative.discard(key)
+            stats.prefetch_hits += 1
+
+        cached = self._cached(key)
+        if cached is not None:
+            stats.hits += 1
+            stats.latencies.append(time.perf_counter() - started)
+            return cached[1]
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._start(name, key, ttl, fn, args, kwargs)
+        else:
+            stats.hits += 1  # same lookup already running
+
+        try:
+            # shielded: a call past its deadline still fills the cache
+            return await asyncio.wait_for(asyncio.shield(task), deadline)
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            logger.warning(
+                "tool deadline exceeded",
+                extra={"tool": name, "deadline": deadline},
+            )
+            return fallback
+        finally:
+            stats.latencies.append(time.perf_counter() - started)
+
+    def _prefetch(
+        self,
+        name: str,
+        key: str,
+        ttl: float,
+        fn: Callable[..., Awaitable[Any]],
+        args: tuple[Any, ...],
+        kwargs: dict[str, Any],
+    ) -> bool:
+        """Start the lookup unless it is cached or running, return whether it was."""
+        if ttl <= 0 or self._cached(key) is not None or key in self._inflight:
+            return False
+        self.stats.setdefault(name, ToolStats()).prefetched += 1
+        self._speculative.add(key)
+        self._start(name, key, ttl, fn, args, kwargs)
+        return True
+
+    def _start(
+        self,
+        name: str,
+        key: str,
+        ttl: float,
+        fn: Callable[..., Awaitable[Any]],
+        args: tuple[Any, ...],
+        kwargs: dict[str, Any],
+    ) -> asyncio.Task[Any]:
+        task = asyncio.create_task(fn(*args, **kwargs), name=f"tool.{name}")
+        self._inflight[key] = task
+        task.add_done_callback(functools.partial(self._on_done, key, ttl))
+        return task
+
+    def _cached(self, key: str) -> tuple[float, Any] | None:
+        cached = self._cache.get(key)
+        if cached is None or cached[0] <= time.monotonic():
+            return None
+        return cached
+
+    def _on_done(self, key: str, ttl: float, task: asyncio.Task[Any]) -> None:
+        self._inflight.pop(key, None)
+        if ttl <= 0 or task.cancelled() or task.exception() is not None:
+            return
+        self._cache[key] = (time.monotonic() + ttl, task.result())
+        self._cache.move_to_end(key)
+        while len(self._cache) > self._max_entries:
+            self._cache.popitem(last=False)
+
+    def clear_cache(self) -> None:
+        self._cache.clear()
+        self._speculative.clear()
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        return {
+            name: {
+                "calls": stats.calls,
+                "hit_rate": round(stats.hit_rate, 3),
+                "timeouts": stats.timeouts,
+                "p95_ms": round(stats.quantile(0.95) * 1000, 1),
+                "prefetched": stats.prefetched,
+                "prefetch_waste": round(stats.prefetch_waste, 3),
+            }
+            for name, stats in self.stats.items()
+        }
+
+    async def aclose(self) -> None:
+        for task in list(self._inflight.values()):
+            task.cancel()
+        if self._http is not None:
+            await self._http.close()
+            self._http = None
@@ -0,0 +1,598 @@
+"""Phrase cache for synthesized speech.
+
+The persona repeats the same sentences on almost every call (greeting, "is there
+anything else I can help you with today?", closing). ``CachedTTS`` wraps the real
+TTS, splits its input into sentences and serves every sentence it has already
+synthesized from ``PhraseCache`` without a provider round-trip.
+
+``PhraseCache`` has two tiers:
+
+* an in-process LRU, bounded in bytes;
+* raw PCM files in a directory shared by all job processes of the host. Files
+  are written atomically, so concurrent jobs never see a partial phrase.
+
+A phrase read from disk stays in the LRU as a ``memoryview`` of the ``mmap``'d
+file, not a copy: every job process holding it maps the same page-cache pages.
+Each mapping keeps a file descriptor open until it is evicted. Audio is copied
+out in short slices as it is played.
+
+The disk tier is only touched from worker threads when used from the event loop
+(``aget``/``aput``), and it is pruned at most once per ``prune_interval``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import mmap
+import os
+import re
+import tempfile
+import threading
+import time
+import unicodedata
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterable, AsyncIterator, Callable, Iterable, Mapping
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from livekit.agents import (
+    DEFAULT_API_CONNECT_OPTIONS,
+    APIConnectOptions,
+    tokenize,
+    tts,
+    utils,
+)
+
+logger = logging.getLogger("tts-cache")
+
+CACHE_DIR_ENV = "TTS_CACHE_DIR"
+
+# bump when the stored format changes so old files are never replayed
+_FORMAT_VERSION = 1
+
+# cached PCM is handed to the audio emitter, which only takes bytes, in slices
+# of this size (~100 ms at 24 kHz)
+_PLAY_SLICE = 4800
+
+
+def default_cache_dir() -> Path:
+    return Path(
+        os.environ.get(CACHE_DIR_ENV) or Path(tempfile.gettempdir()) / "agent-tts-cache"
+    )
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form of a phrase: unicode NFKC with collapsed whitespace."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def phrase_key(text: str, voice: Mapping[str, Any]) -> str:
+    payload = json.dumps(
+        {"v": _FORMAT_VERSION, "text": normalize_text(text), "voice": dict(voice)},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class PhraseCache:
+    """Two-tier cache of 16-bit PCM keyed by ``phrase_key``.
+
+    Args:
+        directory: Directory of the shared on-disk tier, ``None`` for memory only.
+        max_memory_bytes: Budget of the in-process LRU tier.
+        max_disk_bytes: Budget of the on-disk tier, oldest phrases are pruned first.
+        prune_interval: Least seconds between two prunes triggered by writes.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path | None = None,
+        *,
+        max_memory_bytes: int = 32 * 1024 * 1024,
+        max_disk_bytes: int = 512 * 1024 * 1024,
+        prune_interval: float = 300.0,
+    ) -> None:
+        self._dir = Path(directory) if directory is not None else None
+        self._max_memory_bytes = max_memory_bytes
+        self._max_disk_bytes = max_disk_bytes
+        self._prune_interval = prune_interval
+        self._pruned_at = time.monotonic()
+        # bytes of the phrases synthesized here, views of the mapped files otherwise
+        self._lru: OrderedDict[str, bytes | memoryview] = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_written = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if self._dir is not None:
+            self._dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        assert self._dir is not None
+        return self._dir / key[:2] / f"{key}.pcm"
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            if key in self._lru:
+                return True
+        return self._dir is not None and self._path(key).exists()
+
+    def get(self, key: str) -> bytes | memoryview | None:
+        pcm = self._from_memory(key)
+        if pcm is not None:
+            return pcm
+        return self._from_disk(key)
+
+    async def aget(self, key: str) -> bytes | memoryview | None:
+        """``get`` that reads the disk tier in a worker thread."""
+        pcm = self._from_memory(key)
+        if pcm is not None:
+            return pcm
+        if self._dir is None:
+            return self._from_disk(key)  # no I/O, just counts the miss
+        return await asyncio.to_thread(self._from_disk, key)
+
+    def put(self, key: str, pcm: bytes) -> None:
+        if not pcm:
+            return
+        with self._lock:
+            self._remember(key, pcm)
+        self._write_disk(key, pcm)
+
+    async def aput(self, key: str, pcm: bytes) -> None:
+        """``put`` that writes the disk tier, and prunes it, in a worker thread."""
+        if not pcm:
+            return
+        with self._lock:
+            self._remember(key, pcm)
+        if self._dir is not None:
+            await asyncio.to_thread(self._write_disk, key, pcm)
+
+    def _from_memory(self, key: str) -> bytes | memoryview | None:
+        with self._lock:
+            pcm = self._lru.get(key)
+            if pcm is not None:
+                self._lru.move_to_end(key)
+                self.hits += 1
+            return pcm
+
+    def _from_disk(self, key: str) -> bytes | memoryview | None:
+        pcm = self._read_disk(key)
+        with self._lock:
+            if pcm is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, pcm)
+        return pcm
+
+    def _remember(self, key: str, pcm: bytes | memoryview) -> None:
+        if len(pcm) > self._max_memory_bytes:
+            return
+        previous = self._lru.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        self._lru[key] = pcm
+        self._memory_bytes += len(pcm)
+        while self._memory_bytes > self._max_memory_bytes:
+            _, evicted = self._lru.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _read_disk(self, key: str) -> memoryview | None:
+        if self._dir is None:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                # the view keeps the mapping alive; a file replaced or pruned
+                # meanwhile is unlinked, the mapped pages stay valid
+                pcm = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            # mtime doubles as the last-used time for pruning
+            os.utime(path)
+        except (FileNotFoundError, ValueError):
+            # ValueError: empty file, mmap refuses zero-length mappings
+            return None
+        except OSError:
+            logger.warning("failed to read cached phrase", exc_info=True)
+            return None
+        return pcm
+
+    def _write_disk(self, key: str, pcm: bytes) -> None:
+        if self._dir is None:
+            return
+        path = self._path(key)
+        try:
+            path.parent.mkdir(exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(pcm)
+            os.replace(tmp, path)
+        except OSError:
+            logger.warning("failed to store cached phrase", exc_info=True)
+            return
+
+        with self._lock:
+            self._disk_written += len(pcm)
+            due = (
+                self._disk_written > self._max_disk_bytes // 10
+                and time.monotonic() - self._pruned_at >= self._prune_interval
+            )
+            if due:
+                self._disk_written = 0
+                self._pruned_at = time.monotonic()
+        if due:
+            self.prune()
+
+    def prune(self) -> None:
+        """Delete the least recently used phrases until the disk tier fits its budget."""
+        if self._dir is None:
+            return
+        entries = []
+        total = 0
+        for path in self._dir.glob("*/*.pcm"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self._max_disk_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+@dataclass
+class ChunkTiming:
+    """When one chunk of a reply was cut from the text and when its audio started.
+
+    Attributes:
+        index: Position of the chunk in the reply.
+        chars: Length of the chunk.
+        text_wait: Seconds from the first text of the reply to the chunk.
+        ttfb: Seconds from the chunk to its first audio, ``None`` until then.
+        cached: Whether the audio came from the phrase cache.
+    """
+
+    index: int
+    chars: int
+    text_wait: float
+    ttfb: float | None = None
+    cached: bool = False
+
+
+class CachedTTS(tts.TTS):
+    """Serve previously synthesized sentences from a ``PhraseCache``.
+
+    Input is split into sentences; each one is looked up by its normalized text plus
+    ``voice``, which must hold every option that changes the audio (the provider
+    label is added automatically). Misses are synthesized by the wrapped TTS one
+    sentence per request, with the next sentence requested while the current one
+    plays, and stored once complete. Interrupted sentences are never stored.
+
+    Args:
+        inner: The provider TTS, it must produce mono audio.
+        voice: Voice options of ``inner`` that are part of the cache key.
+        cache: Cache to use, defaults to one in ``default_cache_dir()``.
+        tokenizer: Sentence tokenizer, defaults to the one used by the Google plugin.
+        max_phrase_chars: Longer sentences are synthesized but never cached.
+        lookahead: Number of sentences synthesized ahead of the one playing.
+
+    The timing of the recent chunks is kept in ``chunk_timings``, to tune the
+    tokenizer against the provider's time to first byte.
+    """
+
+    def __init__(
+        self,
+        inner: tts.TTS,
+        *,
+        voice: Mapping[str, Any],
+        cache: PhraseCache | None = None,
+        tokenizer: tokenize.SentenceTokenizer | None = None,
+        max_phrase_chars: int = 300,
+        lookahead: int = 1,
+    ) -> None:
+        super().__init__(
+            capabilities=tts.TTSCapabilities(streaming=True),
+            sample_rate=inner.sample_rate,
+            num_channels=1,
+        )
+        if inner.num_channels != 1:
+            raise ValueError("CachedTTS only supports mono TTS")
+
+        self._tts = inner
+        self._voice = {
+            **voice,
+            "provider": inner.label,
+            "sample_rate": inner.sample_rate,
+        }
+        self._cache = cache or PhraseCache(default_cache_dir())
+        self._tokenizer = tokenizer or tokenize.blingfire.SentenceTokenizer()
+        self._max_phrase_chars = max_phrase_chars
+        self._lookahead = lookahead
+        self.chunk_timings: deque[ChunkTiming] = deque(maxlen=256)
+
+        # the provider's usage, for the sentences it synthesized; the streams of
+        # this class emit none of their own, see _ProviderMetrics
+        self._tts.on("metrics_collected", lambda m: self.emit("metrics_collected", m))
+        self._tts.on("error", lambda e: self.emit("error", e))
+
+    @property
+    def cache(self) -> PhraseCache:
+        return self._cache
+
+    @property
+    def model(self) -> str:
+        # livekit's TTS base class has no model or provider, plugins may add them
+        return getattr(self._tts, "model", "unknown")
+
+    @property
+    def provider(self) -> str:
+        return getattr(self._tts, "provider", self._tts.label)
+
+    def synthesize(
+        self,
+        text: str,
+        *,
+        conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+    ) -> CachedChunkedStream:
+        return CachedChunkedStream(tts=self, input_text=text, conn_options=conn_options)
+
+    def stream(
+        self, *, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS
+    ) -> CachedSynthesizeStream:
+        return CachedSynthesizeStream(tts=self, conn_options=conn_options)
+
+    def prewarm(self) -> None:
+        self._tts.prewarm()
+
+    def chunk_summary(self) -> dict[str, float]:
+        """Averages over ``chunk_timings`` in milliseconds: the first chunk of each
+        reply, and the provider's time to first byte over all synthesized chunks."""
+        timings = [t for t in self.chunk_timings if t.ttfb is not None]
+        first = [t for t in timings if t.index == 0]
+
+        def _ms(values: list[float]) -> float:
+            return round(sum(values) / len(values) * 1000, 1) if values else 0.0
+
+        return {
+            "chunks": len(timings),
+            "first_chunk_chars": (
+                round(sum(t.chars for t in first) / len(first), 1) if first else 0.0
+            ),
+            "first_text_wait_ms": _ms([t.text_wait for t in first]),
+            "first_audio_ms": _ms([t.text_wait + (t.ttfb or 0.0) for t in first]),
+            "first_ttfb_ms": _ms([t.ttfb or 0.0 for t in first if not t.cached]),
+            "ttfb_ms": _ms([t.ttfb or 0.0 for t in timings if not t.cached]),
+        }
+
+    async def warm(self, texts: Iterable[str]) -> int:
+        """Synthesize the sentences of ``texts`` missing from the cache.
+
+        Used for fixed answers known in advance, so their first use already plays
+        from the cache. Returns the number of sentences synthesized.
+        """
+        synthesized = 0
+        for text in texts:
+            for sentence in self._tokenizer.tokenize(text):
+                key = phrase_key(sentence, self._voice)
+                if len(sentence) > self._max_phrase_chars or await asyncio.to_thread(
+                    self._cache.__contains__, key
+                ):
+                    continue
+                chunks = [
+                    data
+                    async for data in self._synthesize_uncached(
+                        sentence, DEFAULT_API_CONNECT_OPTIONS
+                    )
+                ]
+                await self._cache.aput(key, b"".join(chunks))
+                synthesized += 1
+        return synthesized
+
+    async def aclose(self) -> None:
+        await self._tts.aclose()
+
+    def _fetch(
+        self,
+        text: str,
+        conn_options: APIConnectOptions,
+        timing: ChunkTiming | None = None,
+    ) -> tuple[asyncio.Task[None], utils.aio.Chan[bytes]]:
+        """Start producing the PCM of one sentence into a channel."""
+        ch = utils.aio.Chan[bytes]()
+        started = time.perf_counter()
+
+        async def _produce() -> None:
+            chunks: list[bytes] = []
+            try:
+                key = phrase_key(text, self._voice)
+                cacheable = len(text) <= self._max_phrase_chars
+                if cacheable and (pcm := await self._cache.aget(key)) is not None:
+                    if timing is not None:
+                        timing.ttfb = time.perf_counter() - started
+                        timing.cached = True
+                    for i in range(0, len(pcm), _PLAY_SLICE):
+                        ch.send_nowait(bytes(pcm[i : i + _PLAY_SLICE]))
+                    return
+
+                async for data in self._synthesize_uncached(text, conn_options):
+                    if timing is not None and timing.ttfb is None:
+                        timing.ttfb = time.perf_counter() - started
+                    chunks.append(data)
+                    ch.send_nowait(data)
+            finally:
+                ch.close()
+            # stored after the audio is handed over, the sentence plays meanwhile
+            if cacheable:
+                await self._cache.aput(key, b"".join(chunks))
+
+        return asyncio.create_task(_produce(), name="CachedTTS._fetch"), ch
+
+    async def _synthesize_uncached(
+        self, text: str, conn_options: APIConnectOptions
+    ) -> AsyncIterator[bytes]:
+        if self._tts.capabilities.streaming:
+            stream = self._tts.stream(conn_options=conn_options)
+            stream.push_text(text)
+            stream.end_input()
+        else:
+            stream = self._tts.synthesize(text, conn_options=conn_options)
+
+        async with stream:
+            async for ev in stream:
+                yield bytes(ev.frame.data)
+
+
+async def _play_sentences(
+    cached: CachedTTS,
+    sentences: AsyncIterable[tokenize.TokenData],
+    output_emitter: tts.AudioEmitter,
+    conn_options: APIConnectOptions,
+    on_first_sentence: Callable[[], None] | None = None,
+    started: float | None = None,
+) -> None:
+    """Push the audio of each sentence in order, fetching ``lookahead`` ahead.
+
+    ``started`` is when the first text of the reply arrived, for the chunk timings.
+    """
+    started = time.perf_counter() if started is None else started
+    # a sentence plays as soon as its audio arrives, while the next ones are cut
+    # and fetched, at most ``lookahead`` of them ahead of the one playing
+    slots = asyncio.Semaphore(cached._lookahead + 1)
+    fetches = utils.aio.Chan[tuple[asyncio.Task[None], utils.aio.Chan[bytes]]]()
+    tasks: list[asyncio.Task[None]] = []
+
+    async def _fetch_all() -> None:
+        nonlocal on_first_sentence
+        index = 0
+        try:
+            async for sentence in sentences:
+                text = sentence.token
+                if not text.strip():
+                    continue
+                if on_first_sentence is not None:
+                    on_first_sentence()
+                    on_first_sentence = None
+                timing = ChunkTiming(
+                    index=index,
+                    chars=len(text),
+                    text_wait=time.perf_counter() - started,
+                )
+                cached.chunk_timings.append(timing)
+                index += 1
+                await slots.acquire()
+                task, ch = cached._fetch(text, conn_options, timing)
+                tasks.append(task)
+                fetches.send_nowait((task, ch))
+        finally:
+            fetches.close()
+
+    fetcher = asyncio.create_task(_fetch_all(), name="CachedTTS._fetch_all")
+    try:
+        async for task, ch in fetches:
+            async for data in ch:
+                output_emitter.push(data)
+            await task  # surface provider errors
+            slots.release()
+        await fetcher
+    finally:
+        await utils.aio.cancel_and_wait(fetcher, *tasks)
+
+
+class _ProviderMetrics:
+    """The metrics of a reply are those of the provider requests behind it.
+
+    ``CachedTTS`` forwards the wrapped TTS's metrics, one per synthesized sentence.
+    The reply's own metrics would count every character a second time, and the
+    sentences served from the cache, which cost nothing, too.
+    """
+
+    async def _metrics_monitor_task(
+        self, event_aiter: AsyncIterable[tts.SynthesizedAudio]
+    ) -> None:
+        async for _ in event_aiter:
+            pass
+
+
+class CachedChunkedStream(_ProviderMetrics, tts.ChunkedStream):
+    def __init__(
+        self, *, tts: CachedTTS, input_text: str, conn_options: APIConnectOptions
+    ) -> None:
+        super().__init__(tts=tts, input_text=input_text, conn_options=conn_options)
+        self._cached: CachedTTS = tts
+
+    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
+        output_emitter.initialize(
+            request_id=utils.shortuuid(),
+            sample_rate=self._cached.sample_rate,
+            num_channels=1,
+            mime_type="audio/pcm",
+        )
+
+        stream = self._cached._tokenizer.stream()
+        stream.push_text(self._input_text)
+        stream.end_input()
+        await _play_sentences(self._cached, stream, output_emitter, self._conn_options)
+
+
+class CachedSynthesizeStream(_ProviderMetrics, tts.SynthesizeStream):
+    def __init__(self, *, tts: CachedTTS, conn_options: APIConnectOptions) -> None:
+        super().__init__(tts=tts, conn_options=conn_options)
+        self._cached: CachedTTS = tts
+        self._segments_ch = utils.aio.Chan[tuple[tokenize.SentenceStream, float]]()
+
+    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
+        output_emitter.initialize(
+            request_id=utils.shortuuid(),
+            sample_rate=self._cached.sample_rate,
+            num_channels=1,
+            mime_type="audio/pcm",
+            stream=True,
+        )
+
+        async def _tokenize_input() -> None:
+            input_stream = None
+            async for data in self._input_ch:
+                if isinstance(data, str):
+                    if input_stream is None:
+                        input_stream = self._cached._tokenizer.stream()
+                        self._segments_ch.send_nowait(
+                            (input_stream, time.perf_counter())
+                        )
+                    input_stream.push_text(data)
+                elif input_stream is not None:
+                    input_stream.end_input()
+                    input_stream = None
+            self._segments_ch.close()
+
+        async def _run_segments() -> None:
+            async for input_stream, started in self._segments_ch:
+                output_emitter.start_segment(segment_id=utils.shortuuid())
+                await _play_sentences(
+                    self._cached,
+                    input_stream,
+                    output_emitter,
+                    self._conn_options,
+                    on_first_sentence=self._mark_started,
+                    started=started,
+                )
+                output_emitter.end_segment()
+
+        tasks = [
+            asyncio.create_task(_tokenize_input()),
+            asyncio.create_task(_run_segments()),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            await utils.aio.cancel_and_wait(*tasks)
@@ -0,0 +1,164 @@
+"""Where the reply text is cut into TTS requests.
+
+``CachedTTS`` synthesizes one chunk of the reply per provider request, so the
+first chunk decides when audio can start. Cutting on full sentences waits for
+the whole of a long opener ("I'm sorry to hear that, Sarah. Let me look into
+this right away.") before anything is synthesized. Short chunks throughout
+would start sooner but sound choppy, since each request gets its own prosody.
+
+``AdaptiveChunker`` cuts the first chunk at the first clause boundary: a comma,
+a semicolon, a dash or a conjunction once ``first_min_words`` words are in, or
+a sentence end at any length. After that, chunks are whole sentences of at
+least ``min_chars``. Cuts depend only on the text, never on how it was streamed,
+so ``tokenize`` and ``stream`` give the same chunks and the phrase cache keys
+stay stable.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from dataclasses import dataclass
+
+from livekit.agents import tokenize, utils
+
+FIRST_CHUNK_WORDS_ENV = "TTS_FIRST_CHUNK_WORDS"
+
+# a sentence ends at ., ! or ? followed by a space, not after a title
+_SENTENCE_END = re.compile(
+    r"(?<!\bMr)(?<!\bMs)(?<!\bDr)(?<!\bSt)(?<!\bMrs)[.!?]+[\"')\]]*(?=\s)"
+)
+_CLAUSE_END = re.compile(r"[,;:\u2013\u2014](?=\s)|\s-(?=\s)")
+_CONJUNCTION = re.compile(
+    r"(?<=\S)(?=\s+(?:and|but|so|because|or|while|which|then)\s)", re.IGNORECASE
+)
+_WORD = re.compile(r"\S+")
+_LAST_SPACE = re.compile(r"\s(?=\S*$)")
+
+
+@dataclass(frozen=True)
+class ChunkPolicy:
+    """How the reply is cut into TTS requests.
+
+    Args:
+        first_min_words: Words before the first clause boundary may cut, 0 to cut
+            the first chunk on a sentence end like the others.
+        first_max_words: A clause boundary later than this no longer cuts, the
+            first chunk then ends with its sentence.
+        min_chars: Shorter sentences are joined with the next one.
+        max_chars: Longer text without a sentence end is cut at a space.
+    """
+
+    first_min_words: int = 4
+    first_max_words: int = 12
+    min_chars: int = 20
+    max_chars: int = 300
+
+    @classmethod
+    def from_env(cls) -> ChunkPolicy:
+        words = os.environ.get(FIRST_CHUNK_WORDS_ENV)
+        return cls(first_min_words=int(words)) if words else cls()
+
+
+def _first_cut(text: str, policy: ChunkPolicy) -> int | None:
+    cuts = []
+    end = _SENTENCE_END.search(text, 0, policy.max_chars)
+    if end is not None:
+        cuts.append(end.end())
+    if policy.first_min_words:
+        for pattern in (_CLAUSE_END, _CONJUNCTION):
+            for m in pattern.finditer(text):
+                words = len(_WORD.findall(text, 0, m.end()))
+                if words > policy.first_max_words:
+                    break
+                if words >= policy.first_min_words:
+                    cuts.append(m.end())
+                    break
+    return min(cuts, default=None)
+
+
+def _sentence_cut(text: str, policy: ChunkPolicy) -> int | None:
+    for end in _SENTENCE_END.finditer(text, 0, policy.max_chars):
+        if len(text[: end.end()].strip()) >= policy.min_chars:
+            return end.end()
+    if len(text) > policy.max_chars:
+        space = _LAST_SPACE.search(text, 0, policy.max_chars)
+        return space.start() if space else policy.max_chars
+    return None
+
+
+def split_chunks(
+    text: str, policy: ChunkPolicy, *, first: bool, final: bool
+) -> tuple[list[str], int]:
+    """Complete chunks of ``text`` and the length they cover.
+
+    ``first`` when no chunk of the reply was cut yet; ``final`` when no more text
+    follows, then the rest is a chunk too.
+    """
+    chunks: list[str] = []
+    position = 0
+    while True:
+        rest = text[position:]
+        cut = _first_cut(rest, policy) if first else _sentence_cut(rest, policy)
+        if cut is None:
+            if first and len(_WORD.findall(rest)) > policy.first_max_words + 1:
+                first = False  # no early boundary, end with the sentence
+                continue
+            if final and rest.strip():
+                chunks.append(rest.strip())
+                position = len(text)
+            return chunks, position
+        if chunk := rest[:cut].strip():
+            chunks.append(chunk)
+            first = False
+        position += cut
+
+
+class AdaptiveChunker(tokenize.SentenceTokenizer):
+    """Sentence tokenizer for ``CachedTTS`` that cuts the first clause early."""
+
+    def __init__(self, policy: ChunkPolicy | None = None) -> None:
+        self.policy = policy or ChunkPolicy()
+
+    def tokenize(self, text: str, *, language: str | None = None) -> list[str]:
+        return split_chunks(text, self.policy, first=True, final=True)[0]
+
+    def stream(self, *, language: str | None = None) -> AdaptiveChunkStream:
+        return AdaptiveChunkStream(self.policy)
+
+
+class AdaptiveChunkStream(tokenize.SentenceStream):
+    def __init__(self, policy: ChunkPolicy) -> None:
+        super().__init__()
+        self._policy = policy
+        self._buffer = ""
+        self._first = True
+        self._segment_id = utils.shortuuid()
+
+    def push_text(self, text: str) -> None:
+        self._check_not_closed()
+        self._buffer += text
+        self._emit(final=False)
+
+    def flush(self) -> None:
+        self._check_not_closed()
+        self._emit(final=True)
+        self._segment_id = utils.shortuuid()
+
+    def end_input(self) -> None:
+        self.flush()
+        self._do_close()
+
+    async def aclose(self) -> None:
+        self._do_close()
+
+    def _emit(self, *, final: bool) -> None:
+        chunks, position = split_chunks(
+            self._buffer, self._policy, first=self._first, final=final
+        )
+        self._buffer = self._buffer[position:]
+        for chunk in chunks:
+            self._first = False
+            self._event_ch.send_nowait(
+                tokenize.TokenData(token=chunk, segment_id=self._segment_id)
+            )
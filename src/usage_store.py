@@ -0,0 +1,364 @@
+"""Usage of every call in a local SQLite store, and its cost.
+
+``metrics.UsageCollector`` only lives as long as the job, and its summary is a
+log line at shutdown. It is lost when the process crashes, and adding it up over
+many calls means parsing logs. ``UsageStore`` keeps one row per billable metric
+instead: LLM tokens, STT audio seconds and TTS characters, with the room, the
+job and the turn (``speech_id``) they belong to.
+
+Rows are built on the event loop, which costs a tuple and a queue put per
+metric. They are written on the ``ExportPipeline`` thread, one transaction per
+batch. The database is in WAL mode: every job process of the worker appends to
+the same file, readers never block the writers, and a committed batch survives a
+crash of the process. At most the rows still queued are lost.
+
+Costs are computed when querying, from ``PRICES`` or a JSON file with the same
+keys, so a price change applies to past calls too:
+
+    uv run python src/usage_store.py calls --since-hours 24
+    uv run python src/usage_store.py models --prices prices.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Mapping
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from livekit.agents import metrics
+
+from export_pipeline import ExportPipeline, get_pipeline
+
+USAGE_DB_ENV = "USAGE_DB_PATH"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage (
+    ts REAL NOT NULL,
+    room TEXT NOT NULL,
+    job_id TEXT NOT NULL,
+    speech_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    model TEXT NOT NULL,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    cached_tokens INTEGER NOT NULL DEFAULT 0,
+    completion_tokens INTEGER NOT NULL DEFAULT 0,
+    audio_seconds REAL NOT NULL DEFAULT 0,
+    characters INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS usage_ts ON usage (ts);
+CREATE INDEX IF NOT EXISTS usage_room ON usage (room, job_id);
+"""
+
+_INSERT = "INSERT INTO usage VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+
+Row = tuple[float, str, str, str, str, str, int, int, int, float, int]
+
+
+@dataclass(frozen=True)
+class Price:
+    """List price in USD: per million tokens or characters, per audio minute."""
+
+    prompt_tokens: float = 0.0
+    cached_tokens: float = 0.0
+    completion_tokens: float = 0.0
+    audio_minutes: float = 0.0
+    characters: float = 0.0
+
+
+# Keyed by model name, or by the plugin's label where it has no model name
+PRICES: dict[str, Price] = {
+    "gemini-2.0-flash-001": Price(
+        prompt_tokens=0.10, cached_tokens=0.025, completion_tokens=0.40
+    ),
+    "gemini-2.0-flash-lite": Price(
+        prompt_tokens=0.075, cached_tokens=0.01875, completion_tokens=0.30
+    ),
+    "livekit.plugins.google.stt.STT": Price(audio_minutes=0.016),
+    "livekit.plugins.google.tts.TTS": Price(characters=30.0),  # Chirp 3 HD
+}
+
+
+def usage_row(
+    metric: metrics.AgentMetrics, room: str, job_id: str, model: str | None
+) -> Row | None:
+    """Row of a billable metric, ``None`` for the others (VAD, EOU, ...)."""
+    if isinstance(metric, metrics.LLMMetrics):
+        usage = (
+            metric.prompt_tokens,
+            metric.prompt_cached_tokens,
+            metric.completion_tokens,
+            0.0,
+            0,
+        )
+        kind = "llm"
+    elif isinstance(metric, metrics.STTMetrics):
+        usage = (0, 0, 0, metric.audio_duration, 0)
+        kind = "stt"
+    elif isinstance(metric, metrics.TTSMetrics):
+        usage = (0, 0, 0, 0.0, metric.characters_count)
+        kind = "tts"
+    else:
+        return None
+    speech_id = getattr(metric, "speech_id", None) or ""
+    model = model or metric.label
+    return (metric.timestamp, room, job_id, speech_id, kind, model, *usage)
+
+
+def session_models(session: Any) -> dict[str, str | None]:
+    """Model name of the session's LLM, STT and TTS, where the plugin has one.
+
+    Without one ("unknown" is livekit's default), rows are keyed by the label
+    of the metrics, which is the provider plugin's.
+    """
+
+    def _model(component: Any) -> str | None:
+        try:
+            model = getattr(component, "model", None)
+        except Exception:
+            return None  # wrappers may forward to a plugin without the property
+        return model if model and model != "unknown" else None
+
+    return {
+        kind: _model(getattr(session, kind, None)) for kind in ("llm", "stt", "tts")
+    }
+
+
+class UsageStore:
+    """Append usage rows to a SQLite database from the export thread.
+
+    Args:
+        path: Database file, created with its schema on first write.
+        pipeline: Queue and thread the writes go through.
+        busy_timeout: Seconds to wait for another process's write transaction.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        pipeline: ExportPipeline | None = None,
+        *,
+        busy_timeout: float = 5.0,
+    ) -> None:
+        self.path = Path(path)
+        self._pipeline = pipeline or get_pipeline()
+        self._busy_timeout = busy_timeout
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self.rows = 0
+
+    def call(
+        self, room: str, job_id: str, models: Mapping[str, str | None] | None = None
+    ) -> CallUsage:
+        self._pipeline.start()
+        return CallUsage(self, room, job_id, models or {})
+
+    def submit(self, row: Row) -> None:
+        self._pipeline.submit(self._write, row)
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(
+            self.path, timeout=self._busy_timeout, check_same_thread=False
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        # a commit survives a crash of the process, only power loss can undo it
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        return conn
+
+    def _write(self, rows: list[Row]) -> None:
+        with self._lock:
+            if self._conn is None:
+                self._conn = self._connect()
+            with self._conn:
+                self._conn.executemany(_INSERT, rows)
+            self.rows += len(rows)
+
+    def close(self) -> None:
+        """Write the queued rows and close the connection."""
+        self._pipeline.flush()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    async def aclose(self) -> None:
+        await asyncio.to_thread(self.close)
+
+
+class CallUsage:
+    """Usage sink of one call, ``collect`` it every metric like ``UsageCollector``."""
+
+    def __init__(
+        self,
+        store: UsageStore,
+        room: str,
+        job_id: str,
+        models: Mapping[str, str | None],
+    ) -> None:
+        self._store = store
+        self._room = room
+        self._job_id = job_id
+        self._models = models
+
+    def collect(self, metric: metrics.AgentMetrics) -> None:
+        kind = metric.type.removesuffix("_metrics")
+        row = usage_row(metric, self._room, self._job_id, self._models.get(kind))
+        if row is not None:
+            self._store.submit(row)
+
+
+# Columns a report is grouped by
+GROUPS = {
+    "calls": ("room", "job_id"),
+    "turns": ("room", "job_id", "speech_id"),
+    "hours": ("strftime('%Y-%m-%d %H:00', ts, 'unixepoch') AS hour",),
+    "models": ("kind",),
+}
+
+
+def _cost(price: Price, usage: Mapping[str, float]) -> float:
+    return (
+        (usage["prompt_tokens"] - usage["cached_tokens"]) * price.prompt_tokens
+        + usage["cached_tokens"] * price.cached_tokens
+        + usage["completion_tokens"] * price.completion_tokens
+        + usage["characters"] * price.characters
+    ) / 1e6 + usage["audio_seconds"] / 60 * price.audio_minutes
+
+
+def query_usage(
+    path: str | Path,
+    by: str,
+    *,
+    since: float | None = None,
+    room: str | None = None,
+    prices: Mapping[str, Price] = PRICES,
+) -> list[dict[str, Any]]:
+    """Usage and cost in USD per call, turn, hour or model, oldest first.
+
+    Models without a price count as zero cost and are listed under ``unpriced``.
+    """
+    columns = [*GROUPS[by], "model"]
+    keys = [c.rsplit(" AS ", 1)[-1] for c in columns]
+    where, params = ["ts >= ?"], [since or 0.0]
+    if room is not None:
+        where.append("room = ?")
+        params.append(room)
+    sql = (
+        f"SELECT {', '.join(columns)}, min(ts), sum(prompt_tokens), "
+        "sum(cached_tokens), sum(completion_tokens), sum(audio_seconds), "
+        f"sum(characters) FROM usage WHERE {' AND '.join(where)} "
+        f"GROUP BY {', '.join(keys)} ORDER BY min(ts)"
+    )
+    with contextlib.closing(sqlite3.connect(f"file:{path}?mode=ro", uri=True)) as conn:
+        rows = conn.execute(sql, params).fetchall()
+
+    reports: dict[tuple[Any, ...], dict[str, Any]] = {}
+    for row in rows:
+        group = row[: len(keys)]
+        usage = dict(
+            zip(
+                (
+                    "prompt_tokens",
+                    "cached_tokens",
+                    "completion_tokens",
+                    "audio_seconds",
+                    "characters",
+                ),
+                row[len(keys) + 1 :],
+            )
+        )
+        # per model the model is part of the group, otherwise it is summed over
+        key = group if by == "models" else group[:-1]
+        report = reports.setdefault(
+            key,
+            {
+                **dict(zip(keys, group)),
+                "llm_tokens": 0,
+                "stt_seconds": 0.0,
+                "tts_characters": 0,
+                "cost": 0.0,
+                "unpriced": [],
+            },
+        )
+        report["llm_tokens"] += usage["prompt_tokens"] + usage["completion_tokens"]
+        report["stt_seconds"] += usage["audio_seconds"]
+        report["tts_characters"] += usage["characters"]
+        model = group[-1]
+        if (price := prices.get(model)) is not None:
+            report["cost"] += _cost(price, usage)
+        elif model not in report["unpriced"]:
+            report["unpriced"].append(model)
+
+    for report in reports.values():
+        if by != "models":
+            report.pop("model")
+    return list(reports.values())
+
+
+def load_prices(path: str | Path) -> dict[str, Price]:
+    """``PRICES`` updated from a JSON object of model to ``Price`` fields."""
+    data = json.loads(Path(path).read_text())
+    return {**PRICES, **{model: Price(**fields) for model, fields in data.items()}}
+
+
+def print_report(reports: list[dict[str, Any]]) -> None:
+    total = 0.0
+    for report in reports:
+        label = " ".join(
+            str(v)
+            for k, v in report.items()
+            if k in ("room", "job_id", "speech_id", "hour", "kind", "model")
+        )
+        unpriced = f"  (no price: {', '.join(report['unpriced'])})"
+        print(
+            f"{label:<48} {report['llm_tokens']:>9} tok "
+            f"{report['stt_seconds']:>8.1f} s {report['tts_characters']:>8} chars "
+            f"${report['cost']:>9.4f}{unpriced if report['unpriced'] else ''}"
+        )
+        total += report["cost"]
+    print(f"{'total':<48} ${total:.4f}")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Usage and cost of recorded calls.")
+    parser.add_argument("by", choices=sorted(GROUPS), help="what to group by")
+    parser.add_argument(
+        "--db",
+        type=Path,
+        default=Path(os.environ.get(USAGE_DB_ENV, "usage.db")),
+        help=f"the agent's database, defaults to {USAGE_DB_ENV} or usage.db",
+    )
+    parser.add_argument("--since-hours", type=float, help="only the last hours")
+    parser.add_argument("--room", help="only this room")
+    parser.add_argument("--prices", type=Path, help="JSON of model prices to use")
+    parser.add_argument("--json", action="store_true", help="print JSON lines")
+    args = parser.parse_args(argv)
+
+    if not args.db.exists():
+        parser.error(f"no usage database at {args.db}")
+    reports = query_usage(
+        args.db,
+        args.by,
+        since=time.time() - args.since_hours * 3600 if args.since_hours else None,
+        room=args.room,
+        prices=load_prices(args.prices) if args.prices else PRICES,
+    )
+    if args.json:
+        for report in reports:
+            print(json.dumps(report))
+    else:
+        print_report(reports)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+"""Per-call tuning of the VAD silence duration and activation threshold.
+
+``VAD_OPTIONS`` suits an average caller. Fast talkers with short pauses inside a
+sentence are cut off (the user resumes right after the turn was closed), noise
+on the line triggers ``agent_false_interruption``, and callers who pause often
+still pay the full silence on every turn. ``ThresholdTuner`` moves the two
+settings within ``TuningBounds`` once per user turn, from what the call has
+shown so far:
+
+- a false interruption raises the activation threshold;
+- the noise floor (level of the frames the VAD scores as non-speech) raises
+  the threshold on a noisy line;
+- a cut-off lengthens the silence duration. So does a turn with a pause the
+  turn detector (queried at every VAD end of speech) found ambiguous, a near
+  cut-off. A turn it closed with confidence and no such pause shortens it.
+
+Each call gets its own ``TunedVAD``, which shares the ONNX session of the
+process-wide silero VAD but not its options. ``TunedTurnDetector`` passes the
+probabilities of the shared turn detector on to the tuner.
+``benchmarks/vad_tuning.py`` replays a labeled corpus against the fixed and the
+tuned settings.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import os
+import time
+from dataclasses import dataclass, replace
+from typing import Any
+
+import numpy as np
+from livekit import rtc
+from livekit.agents import (
+    AgentSession,
+    MetricsCollectedEvent,
+    UserStateChangedEvent,
+    llm,
+    metrics,
+    vad,
+)
+from livekit.plugins import silero
+from livekit.plugins.silero import onnx_model
+from livekit.plugins.turn_detector.base import EOUModelBase
+
+logger = logging.getLogger("vad-tuner")
+
+VAD_TUNING_ENV = "VAD_TUNING"
+
+# frames the VAD scores below this are background, not quiet speech
+NOISE_PROBABILITY = 0.2
+
+
+def frame_dbfs(frame: rtc.AudioFrame) -> float:
+    """RMS level of an int16 frame in dB relative to full scale."""
+    samples = np.frombuffer(frame.data, dtype=np.int16).astype(np.float32)
+    if not samples.size:
+        return -math.inf
+    rms = float(np.sqrt(np.mean(samples**2))) / 32768
+    return 20 * math.log10(rms) if rms > 0 else -math.inf
+
+
+@dataclass(frozen=True)
+class TuningBounds:
+    """How far the tuner may move the VAD settings, and how fast.
+
+    Args:
+        min_silence: Lowest and highest ``min_silence_duration`` (seconds).
+        activation: Lowest and highest ``activation_threshold``.
+        cut_off_step: Silence added per cut-off.
+        relax_step: Silence removed after a turn the turn detector closed with
+            confidence.
+        hesitant_step: Silence added after a turn with a pause that nearly
+            closed it.
+        false_interruption_step: Threshold added per false interruption.
+        quiet_dbfs: Noise floor at or below which the threshold is left alone.
+        noisy_dbfs: Noise floor at or above which it is raised by ``noise_step``.
+        noise_step: Largest threshold increase for line noise.
+    """
+
+    min_silence: tuple[float, float] = (0.2, 0.7)
+    activation: tuple[float, float] = (0.5, 0.8)
+    cut_off_step: float = 0.1
+    relax_step: float = 0.03
+    hesitant_step: float = 0.05
+    false_interruption_step: float = 0.05
+    quiet_dbfs: float = -60.0
+    noisy_dbfs: float = -40.0
+    noise_step: float = 0.1
+
+
+@dataclass(frozen=True)
+class Thresholds:
+    min_silence_duration: float
+    activation_threshold: float
+
+
+def _clamp(value: float, bounds: tuple[float, float]) -> float:
+    return min(max(value, bounds[0]), bounds[1])
+
+
+class ThresholdTuner:
+    """Pick the VAD settings of the next turn from the signals of the call so far.
+
+    Args:
+        min_silence_duration: Starting silence duration, usually from ``VAD_OPTIONS``.
+        activation_threshold: Starting threshold, the noise and false
+            interruption adjustments are relative to it.
+        bounds: Limits and step sizes.
+        confident: End-of-utterance probability of the pause that closed a turn
+            above which the silence is shortened.
+        ambiguous: Probability of a pause inside a turn at or above which it
+            nearly closed the turn; the silence is lengthened instead.
+    """
+
+    def __init__(
+        self,
+        min_silence_duration: float,
+        activation_threshold: float,
+        *,
+        bounds: TuningBounds | None = None,
+        confident: float = 0.6,
+        ambiguous: float = 0.1,
+    ) -> None:
+        self.bounds = bounds or TuningBounds()
+        self._confident = confident
+        self._ambiguous = ambiguous
+        self._base_activation = activation_threshold
+        self._silence = _clamp(min_silence_duration, self.bounds.min_silence)
+        self._false_interruption_bias = 0.0
+        # one probability per pause; a pause can be predicted again when its
+        # final transcript arrives, the last prediction is kept
+        self._pauses: list[float] = []
+        self._pause: float | None = None
+        self.eou_probability: float | None = None
+        self._pending_cut_offs = 0
+        self._pending_false_interruptions = 0
+        self.noise_dbfs: float | None = None
+        self.turns = 0
+        self.cut_offs = 0
+        self.false_interruptions = 0
+
+    @property
+    def thresholds(self) -> Thresholds:
+        return Thresholds(
+            min_silence_duration=round(self._silence, 3),
+            activation_threshold=round(self._activation(), 3),
+        )
+
+    def observe_noise(self, dbfs: float, *, alpha: float = 0.05) -> None:
+        """A background frame; the noise floor is a moving average of their level."""
+        dbfs = max(dbfs, -100.0)
+        if self.noise_dbfs is None:
+            self.noise_dbfs = dbfs
+        else:
+            self.noise_dbfs += alpha * (dbfs - self.noise_dbfs)
+
+    def observe_eou(self, probability: float) -> None:
+        """The turn detector's probability at the current pause."""
+        self._pause = self.eou_probability = probability
+
+    def speech_started(self) -> None:
+        """The user spoke again, the pause so far was inside the turn."""
+        if self._pause is not None:
+            self._pauses.append(self._pause)
+            self._pause = None
+
+    def cut_off(self) -> None:
+        """The user went on speaking right after their turn was closed."""
+        self._pending_cut_offs += 1
+        self.cut_offs += 1
+
+    def false_interruption(self) -> None:
+        self._pending_false_interruptions += 1
+        self.false_interruptions += 1
+
+    def update(self) -> Thresholds:
+        """Settings for the next turn, called once at the end of each user turn."""
+        self.turns += 1
+        bounds = self.bounds
+        # the current pause closed the turn, the earlier ones were inside it
+        closing = self._pause
+        if self._pending_cut_offs:
+            self._silence += bounds.cut_off_step * self._pending_cut_offs
+        elif any(p >= self._ambiguous for p in self._pauses):
+            self._silence += bounds.hesitant_step
+        elif closing is not None and closing >= self._confident:
+            self._silence -= bounds.relax_step
+        self._silence = _clamp(self._silence, bounds.min_silence)
+        self._pauses = []
+        self._pause = None
+
+        self._false_interruption_bias += (
+            bounds.false_interruption_step * self._pending_false_interruptions
+        )
+        self._pending_cut_offs = self._pending_false_interruptions = 0
+        return self.thresholds
+
+    def _activation(self) -> float:
+        bounds = self.bounds
+        noise_bias = 0.0
+        if self.noise_dbfs is not None:
+            span = bounds.noisy_dbfs - bounds.quiet_dbfs
+            level = _clamp((self.noise_dbfs - bounds.quiet_dbfs) / span, (0.0, 1.0))
+            noise_bias = bounds.noise_step * level
+        return _clamp(
+            self._base_activation + noise_bias + self._false_interruption_bias,
+            bounds.activation,
+        )
+
+
+class _TunedVADStream(silero.VADStream):
+    def __init__(self, owner: TunedVAD, opts: Any, model: onnx_model.OnnxModel) -> None:
+        super().__init__(owner, opts, model)
+        self._tuner = owner.tuner
+
+    async def __anext__(self) -> vad.VADEvent:
+        ev = await super().__anext__()
+        if ev.type == vad.VADEventType.START_OF_SPEECH:
+            self._tuner.speech_started()
+        elif (
+            ev.type == vad.VADEventType.INFERENCE_DONE
+            and not ev.speaking
+            and ev.probability < NOISE_PROBABILITY
+            and ev.frames
+        ):
+            self._tuner.observe_noise(frame_dbfs(ev.frames[0]))
+        return ev
+
+
+class TunedVAD(silero.VAD):
+    """A silero VAD with its own options, on the ONNX session of ``shared``."""
+
+    def __init__(self, shared: silero.VAD, tuner: ThresholdTuner) -> None:
+        super().__init__(session=shared._onnx_session, opts=replace(shared._opts))
+        self.tuner = tuner
+        self.apply(tuner.thresholds)
+
+    def stream(self) -> silero.VADStream:
+        stream = _TunedVADStream(
+            self,
+            self._opts,
+            onnx_model.OnnxModel(
+                onnx_session=self._onnx_session, sample_rate=self._opts.sample_rate
+            ),
+        )
+        self._streams.add(stream)
+        return stream
+
+    def apply(self, thresholds: Thresholds) -> None:
+        self.update_options(
+            min_silence_duration=thresholds.min_silence_duration,
+            activation_threshold=thresholds.activation_threshold,
+        )
+
+
+class TunedTurnDetector:
+    """Forward to ``inner`` and pass its end-of-utterance probabilities to the tuner."""
+
+    def __init__(self, inner: EOUModelBase, tuner: ThresholdTuner) -> None:
+        self._inner = inner
+        self._tuner = tuner
+
+    async def unlikely_threshold(self, language: str | None) -> float | None:
+        return await self._inner.unlikely_threshold(language)
+
+    async def supports_language(self, language: str | None) -> bool:
+        return await self._inner.supports_language(language)
+
+    async def predict_end_of_turn(
+        self, chat_ctx: llm.ChatContext, *, timeout: float | None = None
+    ) -> float:
+        probability = await self._inner.predict_end_of_turn(chat_ctx, timeout=timeout)
+        self._tuner.observe_eou(probability)
+        return probability
+
+
+class EndpointingTuner:
+    """Tune the VAD of one call from its session's events.
+
+    Args:
+        shared_vad: The process-wide silero VAD, its options are the starting point.
+        turn_detector: The turn detector the session would use.
+        bounds: Limits and step sizes of the tuner.
+        cut_off_window: The user speaking again within this many seconds of the
+            end of their turn counts as a cut-off.
+    """
+
+    def __init__(
+        self,
+        shared_vad: silero.VAD,
+        turn_detector: EOUModelBase,
+        *,
+        bounds: TuningBounds | None = None,
+        cut_off_window: float = 1.0,
+    ) -> None:
+        self.tuner = ThresholdTuner(
+            shared_vad._opts.min_silence_duration,
+            shared_vad._opts.activation_threshold,
+            bounds=bounds,
+        )
+        self.vad = TunedVAD(shared_vad, self.tuner)
+        self.turn_detector = TunedTurnDetector(turn_detector, self.tuner)
+        self._cut_off_window = cut_off_window
+        self._turn_ended_at: float | None = None
+
+    @classmethod
+    def from_env(
+        cls, shared_vad: silero.VAD, turn_detector: EOUModelBase
+    ) -> EndpointingTuner | None:
+        """A tuner for the call, None when ``VAD_TUNING=0`` keeps the fixed settings."""
+        if os.environ.get(VAD_TUNING_ENV, "1") == "0":
+            return None
+        return cls(shared_vad, turn_detector)
+
+    def attach(self, session: AgentSession) -> None:
+        session.on(
+            "agent_false_interruption", lambda _: self.tuner.false_interruption()
+        )
+        session.on("user_state_changed", self._on_user_state_changed)
+        session.on("metrics_collected", self._on_metrics_collected)
+
+    def _on_user_state_changed(self, ev: UserStateChangedEvent) -> None:
+        if ev.new_state != "speaking" or self._turn_ended_at is None:
+            return
+        if time.monotonic() - self._turn_ended_at < self._cut_off_window:
+            self.tuner.cut_off()
+        self._turn_ended_at = None
+
+    def _on_metrics_collected(self, ev: MetricsCollectedEvent) -> None:
+        if not isinstance(ev.metrics, metrics.EOUMetrics):
+            return
+        self._turn_ended_at = time.monotonic()
+        thresholds = self.tuner.update()
+        self.vad.apply(thresholds)
+        logger.info(
+            "vad tuned",
+            extra={
+                "speech_id": ev.metrics.speech_id,
+                "min_silence_duration": thresholds.min_silence_duration,
+                "activation_threshold": thresholds.activation_threshold,
+                "noise_dbfs": _rounded(self.tuner.noise_dbfs),
+                "eou_probability": _rounded(self.tuner.eou_probability),
+                "cut_offs": self.tuner.cut_offs,
+                "false_interruptions": self.tuner.false_interruptions,
+            },
+        )
+
+    def summary(self) -> dict[str, object]:
+        thresholds = self.tuner.thresholds
+        return {
+            "turns": self.tuner.turns,
+            "min_silence_duration": thresholds.min_silence_duration,
+            "activation_threshold": thresholds.activation_threshold,
+            "noise_dbfs": _rounded(self.tuner.noise_dbfs),
+            "cut_offs": self.tuner.cut_offs,
+            "false_interruptions": self.tuner.false_interruptions,
+        }
+
+
+def _rounded(value: float | None) -> float | None:
+    return round(value, 3) if value is not None else None
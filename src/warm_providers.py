@@ -0,0 +1,267 @@
+"""Provider clients created at prewarm and connected before the first turn.
+
+The Google plugins open their channels lazily: the first STT stream, the first
+TTS request and the first Gemini request of a call each pay DNS, TCP, TLS (and
+for gRPC, the channel and an OAuth token) on top of their own latency. Those
+first requests are the greeting and the first answer, the caller's first
+impression.
+
+``ProviderPool`` builds the plugin instances in ``prewarm``, while the job
+process is idle. Channels are tied to an event loop, and livekit only runs one
+once the job starts, so ``start`` opens them in the background at the top of
+the entrypoint: connecting to the room and starting the session overlap with
+it. Each connection is health-checked with a cheap authenticated request, and
+optionally warmed with a minimal real one (``PROVIDER_WARMUP=1``). A failed
+check is logged, and the next ``connect`` on the pool replaces the instance.
+Connections checked less than ``max_idle`` seconds ago are reused as they are.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections.abc import Awaitable, Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any
+
+from startup import lazy_import
+
+# the Google plugin is imported by the first client built, see startup.py
+google = lazy_import("livekit.plugins.google")
+types = lazy_import("google.genai.types")
+
+logger = logging.getLogger("warm-providers")
+
+WARMUP_ENV = "PROVIDER_WARMUP"
+
+
+@dataclass
+class WarmProvider:
+    """How one provider client is built and connected.
+
+    Args:
+        name: Key of the instance in the pool.
+        factory: Builds the client, runs at prewarm without an event loop.
+        connect: Opens the connection with a cheap request that fails when the
+            provider is unreachable or the credentials are rejected.
+        warmup: Minimal real request sent after ``connect`` when warm-up is on.
+    """
+
+    name: str
+    factory: Callable[[], Any]
+    connect: Callable[[Any], Awaitable[Any]]
+    warmup: Callable[[Any], Awaitable[Any]] | None = None
+
+
+@dataclass
+class ProviderHealth:
+    healthy: bool = False
+    checked_at: float | None = None
+    connect_ms: float | None = None
+    warmup_ms: float | None = None
+    error: str | None = None
+    checks: int = 0
+    replaced: int = 0
+
+
+class ProviderPool:
+    """Provider clients of a job process, connected ahead of their first use.
+
+    Args:
+        providers: Clients to build and connect.
+        warmup: Send each provider's warm-up request after connecting.
+        timeout: Seconds each connect or warm-up request may take.
+        max_idle: A connection checked less than this many seconds ago is reused
+            without a new check.
+    """
+
+    def __init__(
+        self,
+        providers: list[WarmProvider],
+        *,
+        warmup: bool = False,
+        timeout: float = 5.0,
+        max_idle: float = 60.0,
+    ) -> None:
+        self._providers = {provider.name: provider for provider in providers}
+        self._warmup = warmup
+        self._timeout = timeout
+        self._max_idle = max_idle
+        self._instances: dict[str, Any] = {}
+        self.health = {name: ProviderHealth() for name in self._providers}
+        self._connecting: asyncio.Task[None] | None = None
+
+    def create(self, *, parallel: bool = False) -> None:
+        """Build the clients that do not exist yet, at prewarm.
+
+        A client that cannot be built (e.g. missing credentials) is logged and
+        left to the job, where ``pool[name]`` raises the error again. With
+        ``parallel`` each client is built on its own thread; most of the time
+        goes to resolving credentials, which waits on files and the network.
+        The plugins of the factories must already be imported.
+        """
+        pending = [name for name in self._providers if name not in self._instances]
+        if parallel and len(pending) > 1:
+            with ThreadPoolExecutor(len(pending), "provider-create") as pool:
+                list(pool.map(self._create, pending))
+        else:
+            for name in pending:
+                self._create(name)
+
+    def _create(self, name: str) -> None:
+        try:
+            self._instances[name] = self._providers[name].factory()
+        except Exception as e:
+            self.health[name].error = repr(e)
+            logger.warning(
+                "failed to create provider client",
+                extra={"provider": name},
+                exc_info=True,
+            )
+
+    def __getitem__(self, name: str) -> Any:
+        if name not in self._instances:
+            self._instances[name] = self._providers[name].factory()
+        return self._instances[name]
+
+    def get(self, name: str) -> Any | None:
+        return self[name] if name in self._providers else None
+
+    def start(self) -> asyncio.Task[None]:
+        """Connect in the background, the session can use the clients meanwhile."""
+        if self._connecting is None or self._connecting.done():
+            self._connecting = asyncio.create_task(self.connect())
+        return self._connecting
+
+    async def ready(self, timeout: float | None = None) -> bool:
+        """Wait up to ``timeout`` for ``start``, whether every provider is healthy."""
+        try:
+            await asyncio.wait_for(asyncio.shield(self.start()), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return all(health.healthy for health in self.health.values())
+
+    async def connect(self) -> None:
+        """Connect every provider not checked within ``max_idle``, never raises."""
+        self.create()
+        await asyncio.gather(*(self._connect(name) for name in self._instances))
+
+    async def _connect(self, name: str) -> None:
+        provider, health = self._providers[name], self.health[name]
+        if (
+            health.healthy
+            and health.checked_at is not None
+            and time.monotonic() - health.checked_at < self._max_idle
+        ):
+            return
+
+        health.checks += 1
+        try:
+            if health.checked_at is not None and not health.healthy:
+                # a fresh client gets a fresh channel, the old one is not reused
+                await _aclose(self._instances.pop(name))
+                self._instances[name] = provider.factory()
+                health.replaced += 1
+
+            instance = self._instances[name]
+            started = time.perf_counter()
+            await asyncio.wait_for(provider.connect(instance), self._timeout)
+            health.connect_ms = (time.perf_counter() - started) * 1000
+            if self._warmup and provider.warmup is not None:
+                started = time.perf_counter()
+                await asyncio.wait_for(provider.warmup(instance), self._timeout)
+                health.warmup_ms = (time.perf_counter() - started) * 1000
+        except Exception as e:
+            health.healthy, health.error = False, repr(e)
+            logger.warning(
+                "provider connection failed", extra={"provider": name}, exc_info=True
+            )
+        else:
+            health.healthy, health.error = True, None
+        # a client that could not be replaced is built again by the next
+        # ``create`` (or ``pool[name]``), and checked as a new one
+        health.checked_at = time.monotonic() if name in self._instances else None
+
+    def summary(self) -> dict[str, dict[str, Any]]:
+        return {
+            name: {
+                "healthy": health.healthy,
+                "connect_ms": _round(health.connect_ms),
+                "warmup_ms": _round(health.warmup_ms),
+                "checks": health.checks,
+                "replaced": health.replaced,
+                **({"error": health.error} if health.error else {}),
+            }
+            for name, health in self.health.items()
+        }
+
+    async def aclose(self) -> None:
+        if self._connecting is not None:
+            self._connecting.cancel()
+        for instance in self._instances.values():
+            await _aclose(instance)
+        self._instances.clear()
+
+
+def _round(ms: float | None) -> float | None:
+    return None if ms is None else round(ms, 1)
+
+
+async def _aclose(instance: Any) -> None:
+    aclose = getattr(instance, "aclose", None)
+    if aclose is None:
+        return
+    try:
+        await aclose()
+    except Exception:
+        logger.warning("failed to close provider client", exc_info=True)
+
+
+def warmup_enabled() -> bool:
+    return os.environ.get(WARMUP_ENV, "") not in ("", "0")
+
+
+# The Google plugins keep their clients private, these reach into them to open
+# the same connection pool the plugin then streams on.
+
+
+def gemini_provider(name: str, factory: Callable[[], google.LLM]) -> WarmProvider:
+    async def _connect(model: google.LLM) -> None:
+        await model._client.aio.models.get(model=model.model)
+
+    async def _warmup(model: google.LLM) -> None:
+        await model._client.aio.models.generate_content(
+            model=model.model,
+            contents="Hi",
+            config=types.GenerateContentConfig(max_output_tokens=1),
+        )
+
+    return WarmProvider(name, factory, _connect, _warmup)
+
+
+def google_stt_provider(name: str, factory: Callable[[], google.STT]) -> WarmProvider:
+    async def _connect(stt: google.STT) -> None:
+        # the pooled client is the one the first recognize stream is opened on
+        client = await stt._pool.get(timeout=5.0)
+        try:
+            parent = stt._get_recognizer(client).rsplit("/recognizers/", 1)[0]
+            await client.list_recognizers(parent=parent, page_size=1)
+        finally:
+            stt._pool.put(client)
+
+    return WarmProvider(name, factory, _connect)
+
+
+def google_tts_provider(name: str, factory: Callable[[], google.TTS]) -> WarmProvider:
+    async def _connect(tts: google.TTS) -> None:
+        await tts._ensure_client().list_voices(language_code="en-US")
+
+    async def _warmup(tts: google.TTS) -> None:
+        async with tts.synthesize("Hi") as stream:
+            async for _ in stream:
+                pass
+
+    return WarmProvider(name, factory, _connect, _warmup)
@@ -0,0 +1,87 @@
+import asyncio
+import json
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from admission import AdmissionController, LoadLimits, LoopLagMonitor, load_score
+
+
+class _Request:
+    def __init__(self) -> None:
+        self.answer: str | None = None
+
+    async def accept(self) -> None:
+        self.answer = "accepted"
+
+    async def reject(self) -> None:
+        self.answer = "rejected"
+
+
+def _worker(jobs: int = 0, inference: int = 0) -> SimpleNamespace:
+    return SimpleNamespace(
+        active_jobs=[object()] * jobs,
+        _inference_executor=SimpleNamespace(
+            _active_requests=dict.fromkeys(range(inference))
+        ),
+    )
+
+
+def test_the_most_loaded_signal_decides() -> None:
+    limits = LoadLimits(loop_lag=0.1, sessions=10, inference_queue=4)
+    quiet = {"cpu": 0.2, "loop_lag": 0.01, "sessions": 3, "inference_queue": 0}
+    assert load_score(quiet, limits) == 0.3
+    assert load_score({**quiet, "loop_lag": 0.08}, limits) == pytest.approx(0.8)
+    assert load_score({**quiet, "inference_queue": 12}, limits) == 1.0
+
+
+async def test_blocked_loop_is_reported(tmp_path) -> None:
+    monitor = LoopLagMonitor(tmp_path, interval=0.01)
+    monitor.start()
+    await asyncio.sleep(0.03)
+    time.sleep(0.15)  # e.g. inference run on the event loop
+    await asyncio.sleep(0.03)
+
+    path = tmp_path / f"load-{os.getpid()}.json"
+    assert json.loads(path.read_text())["loop_lag"] >= 0.1
+    await monitor.aclose()
+    assert not path.exists()
+
+
+def test_load_combines_jobs_and_workers(tmp_path) -> None:
+    (tmp_path / "load-1.json").write_text(json.dumps({"loop_lag": 0.05}))
+    stale = tmp_path / "load-2.json"
+    stale.write_text(json.dumps({"loop_lag": 2.0}))
+    os.utime(stale, (time.time() - 60, time.time() - 60))
+
+    admission = AdmissionController(tmp_path, cpu=lambda: 0.1)
+    assert admission.load(_worker(jobs=4, inference=2)) == 0.5
+    assert admission.components == {
+        "cpu": 0.1,
+        "loop_lag": 0.05,
+        "sessions": 4.0,
+        "inference_queue": 2.0,
+    }
+    assert 'agent_worker_load{signal="score"} 0.5' in admission.render_prometheus()
+
+
+async def test_jobs_are_deferred_then_rejected_when_overloaded() -> None:
+    admission = AdmissionController(None, threshold=0.7, defer=0.2, cpu=lambda: 0.9)
+    admission.load(_worker())
+
+    rejected = _Request()
+    await admission.request(rejected)
+    assert rejected.answer == "rejected"
+
+    async def _calls_end() -> None:
+        await asyncio.sleep(0.05)
+        admission._cpu = lambda: 0.0
+        for _ in range(4):  # the moving average catches up
+            admission.load(_worker())
+
+    accepted = _Request()
+    await asyncio.gather(admission.request(accepted), _calls_end())
+    assert accepted.answer == "accepted"
+    assert admission.decisions == {"accepted": 1, "deferred": 2, "rejected": 1}
@@ -1,15 +1,61 @@
+import functools
+import os
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+
 import pytest
 from livekit.agents import AgentSession, llm, mock_tools
 from livekit.plugins import openai
 
 from agent import Assistant
+from llm_cassette import KEY_ENV, CassetteLLM, cassette_mode
+
+# recorded replies of MODEL; with OPENAI_API_KEY set, missing ones are recorded
+# and LLM_CASSETTE_MODE=record re-records all of them
+CASSETTES = Path(__file__).parent / "cassettes" / "agent"
+MODEL = "gpt-4o-mini"
+SKIP_MISSES_ENV = "LLM_CASSETTE_SKIP_MISSES"
+
+_models: list[CassetteLLM] = []
 
 
 def _llm() -> llm.LLM:
-    return openai.LLM(model="gpt-4o-mini")
+    # the real model is only built, and only needs a key, when recording
+    inner = None if cassette_mode() == "replay" else openai.LLM(model=MODEL)
+    model = CassetteLLM(CASSETTES, inner, model=MODEL)
+    _models.append(model)
+    return model
+
+
+def _fails_unrecorded(test: Callable[[], Awaitable[None]]):
+    """Fail a test that needed a reply nobody recorded, naming the requests.
+
+    A miss surfaces as a failed expectation first, or not at all when the
+    session swallowed the error. ``LLM_CASSETTE_SKIP_MISSES=1`` skips such a test
+    instead, for local runs without ``OPENAI_API_KEY``.
+    """
+
+    @functools.wraps(test)
+    async def run() -> None:
+        _models.clear()
+        try:
+            await test()
+        finally:
+            misses = [key[:24] for model in _models for key in model.misses]
+            if misses:
+                message = (
+                    f"no recorded reply in {CASSETTES} for {misses}, "
+                    f"record them with {KEY_ENV} set"
+                )
+                if os.environ.get(SKIP_MISSES_ENV) == "1":
+                    pytest.skip(message)
+                pytest.fail(message)
+
+    return run
 
 
 @pytest.mark.asyncio
+@_fails_unrecorded
 async def test_offers_assistance() -> None:
     """Evaluation of the agent's friendly nature."""
     async with (
@@ -42,6 +88,7 @@ async def test_offers_assistance() -> None:
 
 
 @pytest.mark.asyncio
+@_fails_unrecorded
 async def test_weather_tool() -> None:
     """Unit test for the weather tool combined with an evaluation of the agent's ability to incorporate its results."""
     async with (
@@ -84,6 +131,7 @@ async def test_weather_tool() -> None:
 
 
 @pytest.mark.asyncio
+@_fails_unrecorded
 async def test_weather_unavailable() -> None:
     """Evaluation of the agent's ability to handle tool errors."""
     async with (
@@ -122,6 +170,7 @@ async def test_weather_unavailable() -> None:
 
 
 @pytest.mark.asyncio
+@_fails_unrecorded
 async def test_unsupported_location() -> None:
     """Evaluation of the agent's ability to handle a weather response with an unsupported location."""
     async with (
@@ -154,6 +203,7 @@ async def test_unsupported_location() -> None:
 
 
 @pytest.mark.asyncio
+@_fails_unrecorded
 async def test_grounding() -> None:
     """Evaluation of the agent's ability to refuse to answer when it doesn't know something."""
     async with (
@@ -196,6 +246,7 @@ async def test_grounding() -> None:
 
 
 @pytest.mark.asyncio
+@_fails_unrecorded
 async def test_refuses_harmful_request() -> None:
     """Evaluation of the agent's ability to refuse inappropriate or harmful requests."""
     async with (
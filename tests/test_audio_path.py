@@ -0,0 +1,40 @@
+import numpy as np
+from livekit import rtc
+
+from agent import TTS_VOICE, VAD_OPTIONS
+from audio_path import INPUT_SAMPLE_RATE, frame_of, resampling_steps, samples
+from model_host import shared_vad
+
+
+def test_samples_are_a_view_of_the_frame() -> None:
+    frame = rtc.AudioFrame.create(16000, 2, 160)
+    view = samples(frame)
+    assert view.shape == (160, 2)
+
+    view[0] = (1000, -1000)
+    assert list(frame.data[:2]) == [1000, -1000]
+
+
+def test_frame_of_copies_once() -> None:
+    audio = (np.arange(480) * 10).astype(np.int16)
+    frame = frame_of(audio[:240], sample_rate=24000)
+    assert (frame.sample_rate, frame.num_channels) == (24000, 1)
+    assert frame.samples_per_channel == 240
+
+    audio[0] = 1
+    assert samples(frame)[0, 0] == 0  # a copy, not a view
+    # float samples, e.g. a fade, are converted
+    faded = frame_of(audio[:2, None] * 0.5, sample_rate=24000)
+    assert list(faded.data) == [0, 5]
+
+
+def test_input_path_resamples_once() -> None:
+    vad = shared_vad(**VAD_OPTIONS)
+    consumers = {"stt": INPUT_SAMPLE_RATE, "vad": vad._opts.sample_rate}
+    assert resampling_steps(INPUT_SAMPLE_RATE, consumers) == []
+    # RoomIO's default input rate, what the pipeline used before
+    assert resampling_steps(24000, consumers) == [
+        "stt: 24000 -> 16000 Hz",
+        "vad: 24000 -> 16000 Hz",
+    ]
+    assert TTS_VOICE["sample_rate"] == 24000  # the room output rate
@@ -0,0 +1,140 @@
+from livekit.agents import llm
+
+from context_window import ContextWindow, PinnedFacts
+from fakes import FakeLLM, LatencyProfile
+
+
+def _call(turns: int) -> llm.ChatContext:
+    chat_ctx = llm.ChatContext()
+    chat_ctx.add_message(role="system", content="You are Riya.")
+    chat_ctx.add_message(
+        role="user",
+        content="Hi, this is Sarah Johnson, my order 112-7890123-4567890 never arrived.",
+    )
+    chat_ctx.add_message(role="assistant", content="I'm sorry to hear that, Sarah.")
+    for _ in range(1, turns):
+        _add_turn(chat_ctx)
+    return chat_ctx
+
+
+def _add_turn(chat_ctx: llm.ChatContext) -> None:
+    i = sum(1 for item in chat_ctx.items if item.role == "user")
+    chat_ctx.add_message(role="user", content=f"Question number {i}.")
+    chat_ctx.add_message(role="assistant", content=f"Answer number {i}.")
+
+
+def _messages(chat_ctx: llm.ChatContext, role: str) -> list[str]:
+    return [
+        item.text_content
+        for item in chat_ctx.items
+        if item.type == "message" and item.role == role
+    ]
+
+
+def test_pinned_facts_are_extracted() -> None:
+    facts = PinnedFacts()
+    facts.update(
+        "Hi, this is Sarah Johnson, my order 112-7890123-4567890 never arrived."
+    )
+    facts.update("My email is sarah.j@example.com and I was charged twice.")
+    facts.update("I'm calling about a translation of the manual.")
+
+    assert facts.name == "Sarah Johnson"
+    assert facts.order_numbers == ["112-7890123-4567890"]
+    assert facts.emails == ["sarah.j@example.com"]
+    assert facts.issues == ["missing delivery", "billing"]
+
+
+def test_names_follow_a_capitalized_lead_in() -> None:
+    for text, name in (
+        ("My name is Sarah Johnson.", "Sarah Johnson"),
+        ("I'm Lisa Wang.", "Lisa Wang"),
+        ("I am David.", "David"),
+        ("Hi, This is Sarah.", "Sarah"),
+    ):
+        facts = PinnedFacts()
+        facts.update(text)
+        assert facts.name == name
+
+    facts = PinnedFacts()
+    facts.update("I'm Sorry, I am Still waiting. This is about my refund.")
+    assert facts.name is None
+
+
+async def test_short_calls_are_sent_unchanged() -> None:
+    window = ContextWindow(FakeLLM(profile=LatencyProfile()), keep_turns=4)
+    chat_ctx = llm.ChatContext()
+    chat_ctx.add_message(role="system", content="You are Riya.")
+    chat_ctx.add_message(role="user", content="Hello")
+
+    assert window.apply(chat_ctx) is chat_ctx
+
+
+async def test_old_turns_are_folded_into_the_summary() -> None:
+    summarizer = FakeLLM(["Sarah reported a missing order."], profile=LatencyProfile())
+    window = ContextWindow(summarizer, keep_turns=3, fold_batch=2)
+
+    # until the summary is ready, everything is still sent verbatim
+    chat_ctx = _call(turns=6)
+    first = window.apply(chat_ctx)
+    assert len(_messages(first, "user")) == 6
+    assert window._task is not None
+    await window._task
+    assert summarizer.num_requests == 1
+
+    bounded = window.apply(chat_ctx)
+    system = _messages(bounded, "system")
+    assert system[0] == "You are Riya."
+    assert "Sarah reported a missing order." in system[1]
+    # pinned even though the turn that mentioned them is folded
+    assert "112-7890123-4567890" in system[1]
+    assert "Customer name: Sarah Johnson" in system[1]
+    assert _messages(bounded, "user") == [
+        "Question number 3.",
+        "Question number 4.",
+        "Question number 5.",
+    ]
+
+
+async def test_bounded_context_stays_flat() -> None:
+    window = ContextWindow(
+        FakeLLM(["Summary."], profile=LatencyProfile()), keep_turns=3
+    )
+
+    chat_ctx = _call(turns=1)
+    sizes = []
+    for _ in range(20):
+        _add_turn(chat_ctx)
+        sizes.append(len(window.apply(chat_ctx).items))
+        if window._task is not None:
+            await window._task
+
+    # system + memory, then at most keep_turns + fold_batch turns of backlog
+    assert max(sizes) <= 2 + 2 * (3 + 2)
+    assert len(chat_ctx.items) == 1 + 2 * 21
+
+
+async def test_failed_summary_keeps_turns_verbatim() -> None:
+    def _fail(chat_ctx: llm.ChatContext) -> str:
+        raise RuntimeError("provider down")
+
+    window = ContextWindow(FakeLLM(_fail, profile=LatencyProfile()), keep_turns=2)
+    chat_ctx = _call(turns=5)
+    window.apply(chat_ctx)
+    await window._task
+
+    assert window.summary == ""
+    assert len(_messages(window.apply(chat_ctx), "user")) == 5
+
+
+async def test_aclose_waits_for_the_summary_task() -> None:
+    window = ContextWindow(
+        FakeLLM(["Summary."], profile=LatencyProfile(first_delay=5.0)), keep_turns=2
+    )
+    window.apply(_call(turns=5))
+    task = window._task
+    assert task is not None and not task.done()
+
+    await window.aclose()
+    assert task.cancelled()
+    assert window.summary == ""
@@ -0,0 +1,130 @@
+import json
+import logging
+import threading
+import time
+
+from livekit.agents import metrics
+
+from export_pipeline import ExportPipeline, MetricsExporter
+
+
+class _Collect(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__()
+        self.records: list[tuple[str, str]] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append((record.getMessage(), threading.current_thread().name))
+
+
+def _eou(n: int) -> metrics.EOUMetrics:
+    return metrics.EOUMetrics(
+        timestamp=float(n),
+        end_of_utterance_delay=0.3,
+        transcription_delay=0.1,
+        on_user_turn_completed_delay=0.0,
+        last_speaking_time=float(n),
+        speech_id=f"speech-{n}",
+    )
+
+
+def test_records_are_handled_in_order_on_the_export_thread() -> None:
+    root = logging.getLogger()
+    original = root.handlers
+    collect = _Collect()
+    root.handlers = [collect]
+    pipeline = ExportPipeline()
+    try:
+        pipeline.attach_logging()
+        pipeline.attach_logging()  # a second job in the same process
+        for n in range(50):
+            logging.getLogger("test").warning("record %d", n)
+
+        pipeline.detach_logging()
+        assert root.handlers != [collect]
+        pipeline.detach_logging()
+        assert root.handlers == [collect]
+    finally:
+        root.handlers = original
+        pipeline.close()
+
+    assert [m for m, _ in collect.records] == [f"record {n}" for n in range(50)]
+    assert {thread for _, thread in collect.records} == {"export-pipeline"}
+
+
+def test_full_queue_drops_and_reports() -> None:
+    pipeline = ExportPipeline(max_queue=4)
+    written: list[int] = []
+    release = threading.Event()
+
+    def _slow(batch: list[int]) -> None:
+        release.wait()
+        written.extend(batch)
+
+    pipeline.start()
+    pipeline.submit(_slow, 0)
+    time.sleep(0.05)  # the thread is now stuck in the sink
+    results = [pipeline.submit(_slow, n) for n in range(1, 10)]
+    assert results == [True] * 4 + [False] * 5
+
+    root = logging.getLogger()
+    original = root.handlers
+    collect = _Collect()
+    root.handlers = [collect]
+    try:
+        release.set()
+        pipeline.flush()
+    finally:
+        root.handlers = original
+        pipeline.close()
+
+    assert written == [0, 1, 2, 3, 4]
+    assert (pipeline.submitted, pipeline.dropped) == (5, 5)
+    assert ("export queue full, records dropped", "export-pipeline") in (
+        collect.records
+    )
+
+
+def test_submit_does_not_wait_for_a_slow_sink() -> None:
+    pipeline = ExportPipeline()
+    pipeline.start()
+
+    started = time.perf_counter()
+    for n in range(100):
+        pipeline.submit(lambda batch: time.sleep(0.01), n)
+    assert time.perf_counter() - started < 0.05
+
+    pipeline.close()
+    assert pipeline.stats()["submitted"] == 100
+    assert pipeline.batches < 100
+
+
+def test_failing_sink_does_not_stop_the_thread(capsys) -> None:
+    pipeline = ExportPipeline()
+    written: list[int] = []
+
+    def _broken(batch: list[int]) -> None:
+        raise OSError("disk full")
+
+    pipeline.start()
+    pipeline.submit(_broken, 1)
+    pipeline.submit(written.extend, 2)
+    pipeline.close()
+
+    assert written == [2]
+    assert "disk full" in capsys.readouterr().err
+
+
+def test_metrics_are_written_as_json_lines(tmp_path) -> None:
+    pipeline = ExportPipeline()
+    pipeline.start()
+    path = tmp_path / "metrics.jsonl"
+    exporter = MetricsExporter(pipeline, path, {"room": "call-1"})
+    for n in range(3):
+        exporter.submit(_eou(n))
+    pipeline.close()
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["speech_id"] for line in lines] == ["speech-0", "speech-1", "speech-2"]
+    assert {line["room"] for line in lines} == {"call-1"}
+    assert lines[0]["type"] == "eou_metrics"
@@ -0,0 +1,92 @@
+import time
+
+import numpy as np
+import pytest
+from livekit import rtc
+from livekit.agents import AgentSession, llm, stt
+
+from agent import Assistant
+from fakes import FakeLLM, FakeSTT, FakeTTS, LatencyProfile, synthetic_speech
+
+
+def _frames(samples: np.ndarray, sample_rate: int = 16000):
+    size = sample_rate // 100
+    for i in range(len(samples) // size):
+        chunk = samples[i * size : (i + 1) * size]
+        yield rtc.AudioFrame(
+            data=chunk.tobytes(),
+            sample_rate=sample_rate,
+            num_channels=1,
+            samples_per_channel=size,
+        )
+
+
+def test_latency_profile_is_deterministic() -> None:
+    profile = LatencyProfile(first_delay=0.3, jitter=0.1, seed=7)
+    a, b = profile.rng(), profile.rng()
+    delays = [profile.delay(a) for _ in range(10)]
+
+    assert delays == [profile.delay(b) for _ in range(10)]
+    assert all(0.2 <= d <= 0.4 for d in delays)
+
+
+async def test_fake_llm_streams_with_ttft() -> None:
+    fake = FakeLLM(
+        ["Hello there, how can I help?"],
+        profile=LatencyProfile(first_delay=0.05, rate=1000.0),
+    )
+    chat_ctx = llm.ChatContext()
+    chat_ctx.add_message(role="user", content="hi")
+
+    started = time.perf_counter()
+    first_token_at = None
+    text = ""
+    async with fake.chat(chat_ctx=chat_ctx) as stream:
+        async for chunk in stream:
+            if chunk.delta and chunk.delta.content:
+                first_token_at = first_token_at or time.perf_counter()
+                text += chunk.delta.content
+
+    assert text == "Hello there, how can I help?"
+    assert first_token_at - started >= 0.05
+    assert fake.num_requests == 1
+
+
+async def test_fake_tts_audio_length_follows_text() -> None:
+    fake = FakeTTS(profile=LatencyProfile(), streaming=False, chars_per_second=10)
+
+    frames = [ev.frame async for ev in fake.synthesize("Twenty characters!!!")]
+    duration = sum(f.duration for f in frames)
+
+    assert frames[0].sample_rate == 24000
+    assert duration == pytest.approx(2.0, abs=0.1)
+
+
+async def test_fake_stt_endpoints_on_silence() -> None:
+    fake = FakeSTT(["where is my order"], profile=LatencyProfile())
+    speech = synthetic_speech(1.0)
+    silence = np.zeros(16000 // 2, dtype=np.int16)
+
+    stream = fake.stream()
+    for frame in _frames(np.concatenate([speech, silence])):
+        stream.push_frame(frame)
+    stream.end_input()
+
+    events = [ev async for ev in stream]
+    types = [ev.type for ev in events]
+
+    assert types[0] == stt.SpeechEventType.START_OF_SPEECH
+    assert stt.SpeechEventType.INTERIM_TRANSCRIPT in types
+    finals = [ev for ev in events if ev.type == stt.SpeechEventType.FINAL_TRANSCRIPT]
+    assert [ev.alternatives[0].text for ev in finals] == ["where is my order"]
+
+
+async def test_session_runs_on_fakes() -> None:
+    fake = FakeLLM(["Your package arrives tomorrow."], profile=LatencyProfile())
+    async with AgentSession(llm=fake) as session:
+        await session.start(Assistant())
+        result = await session.run(user_input="Where is my package?")
+        result.expect.next_event().is_message(role="assistant")
+        result.expect.no_more_events()
+
+    assert fake.num_requests == 1
@@ -0,0 +1,83 @@
+import pytest
+from livekit.agents import AgentSession, llm
+
+from agent import FAQ_ENTRIES, Assistant
+from fakes import FakeLLM, FakeTTS, LatencyProfile
+from faq import FaqIndex, FaqResponder, tokenize
+from tts_cache import CachedTTS, PhraseCache
+
+
+def test_tokenize_drops_filler_words() -> None:
+    assert tokenize("Hi, what are the Prime benefits?") == ["prime", "benefit"]
+
+
+@pytest.mark.parametrize(
+    ("question", "faq"),
+    [
+        ("Hi, what's your return policy?", "return_window"),
+        ("what do I get with prime membership", "prime_benefits"),
+        ("Do you have same-day delivery in Seattle?", "delivery_options"),
+        ("can I drop off my return at whole foods", "return_methods"),
+        ("can I pay with a gift card", "payment_methods"),
+    ],
+)
+def test_common_questions_match(question: str, faq: str) -> None:
+    match = FaqIndex(FAQ_ENTRIES).match(question)
+    assert match is not None
+    assert match.entry.id == faq
+    assert match.score >= 0.6
+
+
+@pytest.mark.parametrize(
+    "request_text",
+    [
+        "I returned a laptop two weeks ago but haven't gotten my refund yet",
+        "I want to cancel my Prime membership",
+        "My gift card is not working",
+        "my order shows delivered but I never received it",
+        "yes",
+    ],
+)
+def test_account_specific_requests_go_to_the_llm(request_text: str) -> None:
+    match = FaqIndex(FAQ_ENTRIES).match(request_text)
+    assert match is None or match.score < 0.6
+
+
+async def test_matched_turns_skip_the_llm() -> None:
+    fake = FakeLLM(["Let me look at that order."], profile=LatencyProfile())
+    faq = FaqResponder(FaqIndex(FAQ_ENTRIES))
+    async with AgentSession(llm=fake) as session:
+        await session.start(Assistant(faq=faq))
+        result = await session.run(user_input="What's the return window?")
+        result.expect.next_event().is_message(role="assistant")
+        assert fake.num_requests == 0
+
+        await session.run(user_input="My order never arrived.")
+        assert fake.num_requests == 1
+
+    assert faq.summary()["matches"] == 1
+    assert faq.summary()["match_rate"] == 0.5
+
+
+async def test_answers_are_pre_synthesized(tmp_path) -> None:
+    fake_tts = FakeTTS(profile=LatencyProfile())
+    cached = CachedTTS(fake_tts, voice={"voice": "test"}, cache=PhraseCache(tmp_path))
+    faq = FaqResponder(FaqIndex(FAQ_ENTRIES[:1]))
+
+    faq.attach(AgentSession(llm=FakeLLM()), cached)
+    await faq._warm_task
+    assert fake_tts.num_requests == 2  # two sentences
+
+    assert await cached.warm([FAQ_ENTRIES[0].answer]) == 0
+    await cached.aclose()
+
+
+def test_tool_replies_are_never_matched() -> None:
+    chat_ctx = llm.ChatContext()
+    chat_ctx.add_message(role="user", content="What's the return window?")
+    chat_ctx.insert(
+        llm.FunctionCallOutput(
+            call_id="1", name="lookup_order", output="{}", is_error=False
+        )
+    )
+    assert FaqResponder(FaqIndex(FAQ_ENTRIES)).answer(chat_ctx) is None
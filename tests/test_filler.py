@@ -0,0 +1,125 @@
+import asyncio
+from typing import Any
+
+from livekit import rtc
+from livekit.agents import AgentSession, llm
+
+from agent import Assistant
+from fakes import FakeLLM, FakeTTS, LatencyProfile
+from filler import FillerBank, ToolFiller
+
+
+class _Handle:
+    def __init__(self, audio: Any) -> None:
+        self.frames: list[rtc.AudioFrame] = []
+        self.interrupted = False
+        self._task = asyncio.create_task(self._consume(audio))
+
+    async def _consume(self, audio: Any) -> None:
+        async for frame in audio:
+            self.frames.append(frame)
+
+    async def wait_for_playout(self) -> None:
+        await self._task
+
+    @property
+    def duration(self) -> float:
+        return sum(frame.duration for frame in self.frames)
+
+
+class _Session:
+    """Records what the filler says instead of playing it."""
+
+    def __init__(self) -> None:
+        self.said: list[tuple[str, _Handle]] = []
+        self.handlers: dict[str, Any] = {}
+
+    def on(self, event: str, callback: Any) -> None:
+        self.handlers[event] = callback
+
+    def say(self, text: str, *, audio: Any, add_to_chat_ctx: bool) -> _Handle:
+        assert not add_to_chat_ctx
+        handle = _Handle(audio)
+        self.said.append((text, handle))
+        return handle
+
+
+async def _filler(**kwargs: Any) -> tuple[ToolFiller, _Session]:
+    bank = FillerBank(["One moment please."], ["Still on it."])
+    await bank.render(FakeTTS(profile=LatencyProfile(), chars_per_second=60))
+    filler = ToolFiller(bank, **kwargs)
+    session = _Session()
+    filler.attach(session)  # type: ignore[arg-type]
+    return filler, session
+
+
+async def test_bank_renders_and_rotates_clips() -> None:
+    bank = FillerBank(["One moment please.", "Sure, just a second."], [])
+    assert not bank.ready
+    await bank.render(FakeTTS(profile=LatencyProfile()))
+
+    assert bank.ready
+    assert [bank.pick().text for _ in range(3)] == [
+        "One moment please.",
+        "Sure, just a second.",
+        "One moment please.",
+    ]
+    assert bank.pick(followup=True) is None
+
+
+async def test_fast_tools_get_no_filler() -> None:
+    filler, session = await _filler(delay=0.1)
+    filler.tool_called()
+    await asyncio.sleep(0.02)
+    session.handlers["function_tools_executed"](None)
+    await filler._task
+
+    assert session.said == []
+
+
+async def test_slow_tool_plays_clips_until_it_returns() -> None:
+    filler, session = await _filler(delay=0.05, repeat_after=0.05)
+    filler.tool_called()
+    await filler._task
+
+    assert [text for text, _ in session.said] == ["One moment please.", "Still on it."]
+    # played in full, paced to real time
+    assert abs(session.said[0][1].duration - len("One moment please.") / 60) < 0.02
+
+
+async def test_reply_cuts_the_clip_short() -> None:
+    filler, session = await _filler(delay=0.0, fade_out=0.03)
+    filler.tool_called()
+    await asyncio.sleep(0.1)
+    filler.speech_ready()
+    await filler._task
+
+    [(_, handle)] = session.said
+    assert handle.duration < 0.1 + 0.1 + 0.03  # elapsed + lead + fade
+    assert handle.duration < len("One moment please.") / 60
+
+
+async def test_assistant_reports_tool_calls() -> None:
+    calls: list[str] = []
+
+    class _Recorder(ToolFiller):
+        def tool_called(self) -> None:
+            calls.append("tool_called")
+
+    fake = FakeLLM(
+        [
+            llm.FunctionToolCall(
+                name="lookup_weather", arguments='{"location": "Paris"}', call_id="1"
+            ),
+            "It is sunny in Paris.",
+        ],
+        profile=LatencyProfile(),
+    )
+    async with AgentSession(llm=fake) as session:
+        await session.start(Assistant(filler=_Recorder(FillerBank())))
+        result = await session.run(user_input="What's the weather in Paris?")
+        result.expect.next_event().is_function_call(name="lookup_weather")
+        result.expect.next_event().is_function_call_output()
+        result.expect.next_event().is_message(role="assistant")
+
+    assert calls == ["tool_called"]
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+from livekit.agents import AgentSession, StopResponse, llm
+
+from agent import ROUTES, OrdersAgent, TriageAgent, build_triage
+from fakes import FakeLLM, LatencyProfile
+from handoff import Router, carry_over
+
+FAST = LatencyProfile(first_delay=0.01, rate=1000.0)
+
+
+def test_router_picks_specialist_by_keywords() -> None:
+    router = Router(ROUTES)
+    assert router.route("Where is my package?") == "orders"
+    assert router.route("I was charged for Prime twice") == "billing"
+    # returns outrank orders when a message mentions both
+    assert router.route("I want a refund for my order") == "returns"
+    assert router.route("Hi, this is Lisa") is None
+
+
+def test_router_keeps_the_current_specialist() -> None:
+    router = Router(ROUTES)
+    assert router.route("the refund for my order", current="orders") is None
+    assert router.route("thanks, that's all", current="returns") is None
+    assert router.route("and my Prime membership?", current="orders") == "billing"
+
+
+def test_router_leads_back_to_triage_and_matches_whole_words() -> None:
+    router = Router(ROUTES)
+    assert router.route("What's the weather in Paris?", current="orders") == "triage"
+    assert router.route("I have another question", current="billing") == "triage"
+    assert router.route("I'll call back later") is None
+    assert router.route("Can you translate that?") is None
+    assert router.route("My parcel arrived late", current="triage") == "orders"
+
+
+def test_carry_over_keeps_conversation_and_lookups() -> None:
+    chat_ctx = llm.ChatContext()
+    chat_ctx.add_message(role="system", content="triage instructions")
+    chat_ctx.add_message(role="user", content="I'm Lisa, order 115-3456789-0123456")
+    chat_ctx.insert(
+        [
+            llm.FunctionCall(call_id="1", name="lookup_order", arguments="{}"),
+            llm.FunctionCallOutput(
+                call_id="1", name="lookup_order", output="delivered", is_error=False
+            ),
+        ]
+    )
+
+    carried = carry_over(chat_ctx, Router(ROUTES).routes["returns"])
+    note, user = carried.items
+    assert "a return or a refund" in note.text_content
+    assert "lookup_order returned: delivered" in note.text_content
+    assert user.text_content.startswith("I'm Lisa")
+
+    # the next handoff keeps the lookups of the note along with the new ones
+    carried.insert(
+        llm.FunctionCallOutput(
+            call_id="2", name="lookup_weather", output="sunny", is_error=False
+        )
+    )
+    note = carry_over(carried, Router(ROUTES).routes["triage"]).items[0]
+    assert "a general question" in note.text_content
+    assert note.text_content.count("Earlier lookups") == 1
+    assert "lookup_order returned: delivered" in note.text_content
+    assert "lookup_weather returned: sunny" in note.text_content
+
+
+async def test_handoff_answers_the_turn_with_one_request() -> None:
+    requests: list[llm.ChatContext] = []
+
+    def _respond(chat_ctx: llm.ChatContext) -> str:
+        requests.append(chat_ctx)
+        return "Your package arrives tomorrow."
+
+    model = FakeLLM(_respond, profile=FAST)
+    async with AgentSession(llm=model) as session:
+        triage = build_triage()
+        await session.start(triage)
+        replied = asyncio.Event()
+        session.on(
+            "conversation_item_added",
+            lambda ev: ev.item.role == "assistant" and replied.set(),
+        )
+
+        message = llm.ChatMessage(role="user", content=["Where is my package?"])
+        with pytest.raises(StopResponse):
+            await triage.on_user_turn_completed(triage.chat_ctx, message)
+        await asyncio.wait_for(replied.wait(), 5)
+
+        agent = session.current_agent
+        assert isinstance(agent, OrdersAgent) and not isinstance(agent, TriageAgent)
+        assert [tool.__name__ for tool in agent.tools] == ["lookup_order"]
+        # no request from the triage agent, the specialist answered the turn
+        assert model.num_requests == 1
+        system = requests[0].items[0].text_content
+        assert "<OrdersDesk>" in system and "<BillingDesk>" not in system
+        assert requests[0].items[-1].text_content == "Where is my package?"
+        assert triage.handoffs.summary()["paths"] == {"triage->orders": 1}
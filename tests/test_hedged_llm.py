@@ -0,0 +1,111 @@
+import time
+
+import pytest
+from livekit.agents import APIConnectionError, APIStatusError, llm
+from livekit.agents.metrics import LLMMetrics
+
+from fakes import FakeLLM, LatencyProfile
+from hedged_llm import HedgedLLM, HedgePolicy
+
+FAST = LatencyProfile(first_delay=0.02, rate=1000.0)
+POLICY = HedgePolicy(initial_deadline=0.1, min_samples=3)
+
+
+def _chat_ctx() -> llm.ChatContext:
+    chat_ctx = llm.ChatContext()
+    chat_ctx.add_message(role="user", content="Where is my order?")
+    return chat_ctx
+
+
+async def _reply(model: HedgedLLM) -> tuple[str, float, list[LLMMetrics]]:
+    collected: list[LLMMetrics] = []
+    model.on("metrics_collected", collected.append)
+    started = time.perf_counter()
+    ttft, text = None, ""
+    async with model.chat(chat_ctx=_chat_ctx()) as stream:
+        async for chunk in stream:
+            if ttft is None:
+                ttft = time.perf_counter() - started
+            if chunk.delta and chunk.delta.content:
+                text += chunk.delta.content
+    model.off("metrics_collected", collected.append)
+    return text, ttft, collected
+
+
+async def test_fast_primary_is_not_hedged() -> None:
+    primary = FakeLLM(["From the primary."], profile=FAST)
+    hedge = FakeLLM(["From the hedge."], profile=FAST)
+    model = HedgedLLM(primary, hedge, policy=POLICY)
+
+    text, _, collected = await _reply(model)
+    assert text == "From the primary."
+    assert (primary.num_requests, hedge.num_requests) == (1, 0)
+    # one set of metrics for the reply, under the primary's model
+    assert len(collected) == 1
+    assert model.model == "fake-llm"
+    assert model.summary()["hedge_rate"] == 0.0
+
+
+async def test_stalled_primary_is_hedged_and_cancelled() -> None:
+    primary = FakeLLM(["From the primary."], profile=FAST, stalls=[2.0])
+    hedge = FakeLLM(["From the hedge."], profile=FAST)
+    model = HedgedLLM(primary, hedge, policy=POLICY)
+
+    text, ttft, _ = await _reply(model)
+    assert text == "From the hedge."
+    # the deadline plus the hedge's own TTFT, not the 2 s stall
+    assert 0.1 <= ttft < 0.3
+    summary = model.summary()
+    assert summary["hedge_rate"] == 1.0
+    assert summary["hedge"]["wins"] == 1
+    assert summary["primary"]["wins"] == 0
+
+
+async def test_primary_wins_when_it_answers_first_after_the_deadline() -> None:
+    primary = FakeLLM(["From the primary."], profile=FAST, stalls=[0.1])
+    hedge = FakeLLM(["From the hedge."], profile=LatencyProfile(first_delay=0.5))
+    model = HedgedLLM(primary, hedge, policy=POLICY)
+
+    text, _, _ = await _reply(model)
+    assert text == "From the primary."
+    assert hedge.num_requests == 1
+    assert model.summary()["primary"]["wins"] == 1
+
+
+async def test_errors_fail_over_before_the_deadline() -> None:
+    primary = FakeLLM(
+        ["From the primary."], profile=FAST, stalls=[APIStatusError("overloaded")]
+    )
+    hedge = FakeLLM(["From the hedge."], profile=FAST)
+    model = HedgedLLM(primary, hedge, policy=POLICY)
+
+    text, ttft, _ = await _reply(model)
+    assert text == "From the hedge."
+    assert ttft < 0.1  # did not wait for the deadline
+    summary = model.summary()
+    assert (summary["failovers"], summary["hedge_rate"]) == (1, 0.0)
+    assert summary["primary"]["errors"] == 1
+
+
+async def test_all_backends_failing_raises() -> None:
+    error = APIStatusError("overloaded", retryable=False)
+    primary = FakeLLM(profile=FAST, stalls=[error])
+    model = HedgedLLM(primary, FakeLLM(profile=FAST, stalls=[error]), policy=POLICY)
+
+    with pytest.raises(APIConnectionError):
+        await _reply(model)
+
+
+async def test_deadline_follows_the_primary_p95() -> None:
+    primary = FakeLLM(["Sure."], profile=LatencyProfile(first_delay=0.05))
+    model = HedgedLLM(primary, policy=POLICY)
+    assert model.deadline() == POLICY.initial_deadline
+
+    for _ in range(POLICY.min_samples):
+        await _reply(model)
+    assert model.deadline() == POLICY.min_deadline  # 50 ms p95, clamped
+
+    slow = HedgedLLM(primary, policy=HedgePolicy(min_deadline=0.01, min_samples=3))
+    for _ in range(3):
+        await _reply(slow)
+    assert 0.05 <= slow.deadline() < 0.1
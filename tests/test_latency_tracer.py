@@ -0,0 +1,189 @@
+import json
+import time
+import urllib.request
+from types import SimpleNamespace
+
+from livekit import rtc
+from livekit.agents import AgentStateChangedEvent, MetricsCollectedEvent, metrics
+
+from latency_tracer import (
+    STAGE_EOU,
+    STAGE_FIRST_AUDIO,
+    STAGE_LLM_TTFT,
+    STAGE_TRANSCRIPT,
+    STAGE_TTS_TTFB,
+    LatencyHistogram,
+    LatencyRegistry,
+    TurnTracer,
+    collect,
+    render_prometheus,
+    start_metrics_server,
+)
+
+
+class _Session(rtc.EventEmitter):
+    """Just enough of AgentSession for the tracer: events and the current speech."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.current_speech = None
+
+
+def _eou(speech_id: str, last_speaking_time: float) -> MetricsCollectedEvent:
+    return MetricsCollectedEvent(
+        metrics=metrics.EOUMetrics(
+            timestamp=time.time(),
+            end_of_utterance_delay=0.2,
+            transcription_delay=0.15,
+            on_user_turn_completed_delay=0.0,
+            last_speaking_time=last_speaking_time,
+            speech_id=speech_id,
+        )
+    )
+
+
+def _llm(speech_id: str, ttft: float) -> MetricsCollectedEvent:
+    return MetricsCollectedEvent(
+        metrics=metrics.LLMMetrics(
+            label="llm",
+            request_id="req",
+            timestamp=time.time(),
+            duration=1.0,
+            ttft=ttft,
+            cancelled=False,
+            completion_tokens=10,
+            prompt_tokens=100,
+            prompt_cached_tokens=0,
+            total_tokens=110,
+            tokens_per_second=10.0,
+            speech_id=speech_id,
+        )
+    )
+
+
+def _tts(speech_id: str, ttfb: float) -> MetricsCollectedEvent:
+    return MetricsCollectedEvent(
+        metrics=metrics.TTSMetrics(
+            label="tts",
+            request_id="req",
+            timestamp=time.time(),
+            ttfb=ttfb,
+            duration=1.0,
+            audio_duration=2.0,
+            cancelled=False,
+            characters_count=20,
+            streamed=True,
+            speech_id=speech_id,
+        )
+    )
+
+
+def _speaking(session: _Session, speech_id: str, at: float) -> None:
+    session.current_speech = SimpleNamespace(id=speech_id)
+    session.emit(
+        "agent_state_changed",
+        AgentStateChangedEvent(
+            old_state="thinking", new_state="speaking", created_at=at
+        ),
+    )
+
+
+def test_histogram_quantiles() -> None:
+    hist = LatencyHistogram()
+    for i in range(1, 101):
+        hist.observe(i / 100)
+
+    assert hist.count == 100
+    assert abs(hist.quantile(0.5) - 0.5) < 0.05
+    assert abs(hist.quantile(0.95) - 0.95) < 0.1
+    assert hist.quantile(0.99) <= 1.0 * 1.25
+
+
+def test_histogram_merge_roundtrip() -> None:
+    a, b = LatencyHistogram(), LatencyHistogram()
+    a.observe(0.1)
+    b.observe(0.3)
+    a.merge(LatencyHistogram.from_dict(b.to_dict()))
+    assert a.count == 2
+    assert abs(a.sum - 0.4) < 1e-9
+
+
+def test_tracer_links_stages_under_one_turn() -> None:
+    registry = LatencyRegistry()
+    session = _Session()
+    tracer = TurnTracer(registry=registry)
+    tracer.attach(session)
+
+    # with preemptive generation the LLM may answer before the EOU is reported
+    session.emit("metrics_collected", _llm("speech_1", 0.4))
+    _speaking(session, "speech_1", at=101.0)
+    session.emit("metrics_collected", _eou("speech_1", last_speaking_time=100.0))
+    session.emit("metrics_collected", _tts("speech_1", 0.25))
+    # a late metric of the finished turn must not be counted twice
+    session.emit("metrics_collected", _tts("speech_1", 0.5))
+
+    hists = registry.histograms
+    assert hists[STAGE_EOU].count == 1
+    assert hists[STAGE_TRANSCRIPT].count == 1
+    assert hists[STAGE_LLM_TTFT].count == 1
+    assert hists[STAGE_TTS_TTFB].count == 1
+    assert hists[STAGE_FIRST_AUDIO].count == 1
+    assert abs(hists[STAGE_FIRST_AUDIO].sum - 1.0) < 1e-9
+
+
+def test_first_turn_is_recorded_separately(tmp_path) -> None:
+    registry = LatencyRegistry(tmp_path)
+    session = _Session()
+    tracer = TurnTracer(registry=registry)
+    tracer.attach(session)
+
+    # the greeting has no user turn, but pays the first LLM and TTS requests
+    session.emit("metrics_collected", _llm("greeting", 0.9))
+    session.emit("metrics_collected", _tts("greeting", 0.6))
+    for i, at in enumerate((100.0, 110.0)):
+        speech_id = f"speech_{i}"
+        session.emit("metrics_collected", _eou(speech_id, last_speaking_time=at))
+        session.emit("metrics_collected", _llm(speech_id, 0.4))
+        session.emit("metrics_collected", _tts(speech_id, 0.2))
+        _speaking(session, speech_id, at=at + 1.0)
+    tracer.flush()
+
+    first = registry.first_turn
+    assert first[STAGE_LLM_TTFT].count == 1
+    assert abs(first[STAGE_LLM_TTFT].sum - 0.9) < 1e-9
+    assert abs(first[STAGE_TTS_TTFB].sum - 0.6) < 1e-9
+    # the first user turn is the first with an end of utterance and first audio
+    assert (first[STAGE_EOU].count, first[STAGE_FIRST_AUDIO].count) == (1, 1)
+    assert registry.histograms[STAGE_LLM_TTFT].count == 3
+
+    assert collect(tmp_path, first_turn=True)[STAGE_LLM_TTFT].count == 1
+    body = render_prometheus(collect(tmp_path), collect(tmp_path, first_turn=True))
+    assert 'agent_first_turn_latency_seconds_count{stage="llm_ttft"} 1' in body
+
+
+def test_metrics_endpoint_merges_process_snapshots(tmp_path) -> None:
+    for value in (0.1, 0.2):
+        registry = LatencyRegistry()
+        registry.observe(STAGE_LLM_TTFT, value)
+        (tmp_path / f"latency-{int(value * 10)}.json").write_text(
+            json.dumps(registry.snapshot())
+        )
+
+    assert collect(tmp_path)[STAGE_LLM_TTFT].count == 2
+
+    server = start_metrics_server(0, tmp_path)
+    try:
+        port = server.server_address[1]
+        body = (
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics").read().decode()
+        )
+    finally:
+        server.shutdown()
+
+    assert body == render_prometheus(
+        collect(tmp_path), collect(tmp_path, first_turn=True)
+    )
+    assert 'agent_turn_latency_seconds_count{stage="llm_ttft"} 2' in body
+    assert (
+        'agent_turn_latency_quantile_seconds{stage="llm_ttft",quantile="0.99"}' in body
+    )
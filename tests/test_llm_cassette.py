@@ -0,0 +1,117 @@
+import time
+
+import pytest
+from livekit.agents import llm
+
+from fakes import FakeLLM, LatencyProfile
+from llm_cassette import (
+    CassetteLLM,
+    CassetteMissError,
+    cassette_mode,
+    request_key,
+    request_of,
+)
+
+FAST = LatencyProfile(first_delay=0.01, rate=1000.0)
+SLOW = LatencyProfile(first_delay=0.2, rate=20.0)
+
+
+@llm.function_tool
+async def lookup_order(order_id: str) -> str:
+    """Look up the status of an order."""
+    return "shipped"
+
+
+def _chat_ctx(text: str = "Where is my order?") -> llm.ChatContext:
+    chat_ctx = llm.ChatContext()
+    chat_ctx.add_message(role="system", content="You are a helpful assistant.")
+    chat_ctx.add_message(role="user", content=text)
+    return chat_ctx
+
+
+async def _reply(model: llm.LLM, chat_ctx: llm.ChatContext, **kwargs) -> list:
+    async with model.chat(chat_ctx=chat_ctx, **kwargs) as stream:
+        return [chunk async for chunk in stream]
+
+
+def _text(chunks: list[llm.ChatChunk]) -> str:
+    return "".join(c.delta.content or "" for c in chunks if c.delta)
+
+
+async def test_replays_recorded_replies_without_the_model(tmp_path) -> None:
+    inner = FakeLLM(["It shipped yesterday."], profile=FAST)
+    recorder = CassetteLLM(tmp_path, inner, mode="record")
+    recorded = await _reply(recorder, _chat_ctx())
+    assert recorder.recorded == 1
+
+    replayer = CassetteLLM(tmp_path, model="fake-llm", mode="replay")
+    replayed = await _reply(replayer, _chat_ctx())
+    assert _text(replayed) == _text(recorded) == "It shipped yesterday."
+    assert replayed[-1].usage == recorded[-1].usage
+    assert (replayer.hits, inner.num_requests) == (1, 1)
+
+
+async def test_function_calls_are_recorded(tmp_path) -> None:
+    call = llm.FunctionToolCall(
+        name="lookup_order", arguments='{"order_id": "A12"}', call_id="call_1"
+    )
+    recorder = CassetteLLM(tmp_path, FakeLLM([call], profile=FAST), mode="record")
+    await _reply(recorder, _chat_ctx(), tools=[lookup_order], tool_choice="required")
+
+    replayer = CassetteLLM(tmp_path, model="fake-llm", mode="replay")
+    chunks = await _reply(
+        replayer, _chat_ctx(), tools=[lookup_order], tool_choice="required"
+    )
+    assert chunks[0].delta.tool_calls == [call]
+    # the tool choice is part of the request
+    with pytest.raises(CassetteMissError):
+        await _reply(replayer, _chat_ctx(), tools=[lookup_order])
+
+
+async def test_miss_fails_in_replay_mode(tmp_path) -> None:
+    replayer = CassetteLLM(tmp_path, model="fake-llm", mode="replay")
+    with pytest.raises(CassetteMissError, match="Where is my order"):
+        await _reply(replayer, _chat_ctx())
+    assert len(replayer.misses) == 1
+
+    # only misses reach the model in ``missing`` mode
+    inner = FakeLLM(profile=FAST)
+    filler = CassetteLLM(tmp_path, inner, mode="missing")
+    await _reply(filler, _chat_ctx())
+    await _reply(filler, _chat_ctx())
+    assert (inner.num_requests, filler.recorded, filler.hits) == (1, 1, 1)
+
+
+def test_key_ignores_ids_and_timestamps() -> None:
+    def _key(chat_ctx: llm.ChatContext, tools: list | None = None) -> str:
+        request = request_of(
+            chat_ctx, tools or [], model="fake-llm", chat_kwargs={"tool_choice": None}
+        )
+        return request_key(request)
+
+    first, second = _chat_ctx(), _chat_ctx()
+    assert first.items[1].id != second.items[1].id
+    assert _key(first) == _key(second)
+    assert _key(first) != _key(_chat_ctx("Where is my refund?"))
+    assert _key(first) != _key(first, [lookup_order])
+
+
+async def test_recorded_timing_is_simulated(tmp_path) -> None:
+    recorder = CassetteLLM(tmp_path, FakeLLM(profile=SLOW), mode="record")
+    await _reply(recorder, _chat_ctx())
+
+    for timing, bounds in ((0.0, (0.0, 0.05)), (1.0, (0.2, 1.0))):
+        replayer = CassetteLLM(tmp_path, model="fake-llm", mode="replay", timing=timing)
+        started = time.perf_counter()
+        await _reply(replayer, _chat_ctx())
+        assert bounds[0] <= time.perf_counter() - started < bounds[1]
+
+
+def test_mode_records_misses_when_the_model_can_be_reached(monkeypatch) -> None:
+    monkeypatch.delenv("LLM_CASSETTE_MODE", raising=False)
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    assert cassette_mode() == "replay"
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    assert cassette_mode() == "missing"
+    monkeypatch.setenv("LLM_CASSETTE_MODE", "replay")
+    assert cassette_mode() == "replay"
@@ -0,0 +1,85 @@
+import asyncio
+import logging
+import time
+
+import pytest
+
+from loop_profiler import (
+    BLOCKING_MS_ENV,
+    PROFILE_DIR_ENV,
+    BlockingDetector,
+    LoopInstrumentation,
+    SamplingProfiler,
+)
+
+
+def _log_metrics_synchronously() -> None:
+    time.sleep(0.2)
+
+
+async def test_blocking_callback_is_reported_with_its_stack(caplog) -> None:
+    detector = BlockingDetector(threshold=0.05, label="room-1")
+    detector.start()
+    with caplog.at_level(logging.INFO, logger="loop-profiler"):
+        await asyncio.sleep(0.05)
+        asyncio.get_running_loop().call_soon(_log_metrics_synchronously)
+        await asyncio.sleep(0.1)  # returns once the loop runs again
+        await asyncio.sleep(0.05)
+    await detector.aclose()
+
+    blocked, unblocked = caplog.records
+    assert blocked.label == "room-1"
+    assert "_log_metrics_synchronously" in blocked.stack
+    assert 150 <= unblocked.blocked_ms <= 260
+    assert detector.stalls == 1
+
+
+async def test_short_callbacks_are_not_reported(caplog) -> None:
+    detector = BlockingDetector(threshold=0.05)
+    detector.start()
+    with caplog.at_level(logging.INFO, logger="loop-profiler"):
+        for _ in range(10):
+            time.sleep(0.01)
+            await asyncio.sleep(0.01)
+    await detector.aclose()
+    assert not caplog.records
+
+
+async def test_profile_is_written_as_collapsed_stacks(tmp_path) -> None:
+    profiler = SamplingProfiler(interval=0.005)
+    profiler.start()
+    _log_metrics_synchronously()
+    profiler.stop()
+
+    profiler.write(tmp_path / "room.collapsed")
+    stack, count = (
+        (tmp_path / "room.collapsed").read_text().splitlines()[0].rsplit(" ", 1)
+    )
+    assert "test_profile_is_written_as_collapsed_stacks" in stack
+    assert stack.split(";")[-1].startswith("_log_metrics_synchronously (")
+    assert int(count) >= 10
+
+
+async def test_off_unless_configured(monkeypatch, tmp_path) -> None:
+    monkeypatch.delenv(BLOCKING_MS_ENV, raising=False)
+    monkeypatch.delenv(PROFILE_DIR_ENV, raising=False)
+    assert LoopInstrumentation.from_env("room") is None
+
+    monkeypatch.setenv(PROFILE_DIR_ENV, str(tmp_path))
+    instrumentation = LoopInstrumentation.from_env("room/1")
+    assert instrumentation is not None
+    assert instrumentation.detector is None
+    instrumentation.start()
+    await instrumentation.aclose()
+    assert instrumentation.profile_path is not None
+    assert instrumentation.profile_path.parent == tmp_path
+    assert instrumentation.profile_path.name.startswith("room_1-")
+    assert instrumentation.profile_path.exists()
+
+
+@pytest.mark.parametrize("threshold_ms", ["100", "25"])
+def test_threshold_from_env(monkeypatch, threshold_ms: str) -> None:
+    monkeypatch.setenv(BLOCKING_MS_ENV, threshold_ms)
+    instrumentation = LoopInstrumentation.from_env("room")
+    assert instrumentation is not None and instrumentation.detector is not None
+    assert instrumentation.detector._threshold == int(threshold_ms) / 1000
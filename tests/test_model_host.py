@@ -0,0 +1,65 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from livekit.agents import JobExecutorType, Plugin
+
+import model_host
+from agent import VAD_OPTIONS, prewarm
+from model_host import (
+    JOB_EXECUTOR_ENV,
+    PRELOAD_PACKAGE,
+    JobMemory,
+    enable_preload,
+    job_executor_type,
+    shared_vad,
+)
+
+
+def test_vad_is_loaded_once_per_options() -> None:
+    vad = shared_vad(**VAD_OPTIONS)
+    assert shared_vad(**dict(reversed(VAD_OPTIONS.items()))) is vad
+    assert shared_vad(**{**VAD_OPTIONS, "activation_threshold": 0.5}) is not vad
+
+    proc = SimpleNamespace(userdata={})
+    prewarm(proc)  # type: ignore[arg-type]
+    assert proc.userdata["vad"] is vad
+
+
+def test_preload_is_registered_once() -> None:
+    registered = list(Plugin.registered_plugins)
+    try:
+        enable_preload()
+        enable_preload()
+        packages = [p.package for p in Plugin.registered_plugins]
+        assert packages.count(PRELOAD_PACKAGE) == 1
+    finally:
+        Plugin.registered_plugins[:] = registered
+
+
+def test_preload_module_loads_the_agent_vad() -> None:
+    model_host._vads.clear()
+    import model_preload  # noqa: F401  what the forkserver imports
+
+    assert list(model_host._vads) == [tuple(sorted(VAD_OPTIONS.items()))]
+
+
+def test_job_executor_from_env(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv(JOB_EXECUTOR_ENV, raising=False)
+    assert job_executor_type() is JobExecutorType.PROCESS
+    monkeypatch.setenv(JOB_EXECUTOR_ENV, "thread")
+    assert job_executor_type() is JobExecutorType.THREAD
+
+
+async def test_job_memory_reports_peak_rss() -> None:
+    memory = JobMemory(interval=0.01)
+    memory.start()
+    ballast = bytearray(64 * 1024 * 1024)
+    await asyncio.sleep(0.05)
+    del ballast
+    await memory.aclose()
+
+    summary = memory.summary()
+    assert summary["peak_rss_mb"] >= summary["start_rss_mb"] + 60
+    assert summary["peak_rss_mb"] >= summary["rss_mb"]
+    assert 0 < summary["uss_mb"] <= summary["rss_mb"]
@@ -0,0 +1,124 @@
+import asyncio
+import time
+
+from livekit.agents import AgentSession, llm
+
+from agent import Assistant, build_prefetcher
+from fakes import FakeBackend, FakeLLM, LatencyProfile
+from lookups import Lookups
+from prefetch import Prefetcher, extract_cities, extract_order_numbers
+from tool_runtime import ToolRuntime
+
+
+def test_order_numbers_in_any_spelling() -> None:
+    text = "it's 112 7890123 4567890, or maybe 115-3456789-0123456 and 1127890123"
+    assert extract_order_numbers(text) == ["112-7890123-4567890", "115-3456789-0123456"]
+    assert extract_order_numbers("11278901234567890") == ["112-7890123-4567890"]
+
+
+def test_known_cities() -> None:
+    assert extract_cities("weather in new york city and San Francisco") == [
+        "New York",
+        "San Francisco",
+    ]
+    assert extract_cities("I'm in Parisville") == []
+
+
+def test_only_stable_entities_are_prefetched() -> None:
+    started: list[str] = []
+
+    def _prefetch(entity: str) -> bool:
+        started.append(entity)
+        return True
+
+    prefetcher = Prefetcher({"city": (extract_cities, _prefetch)}, min_stable=2)
+    prefetcher.observe("what's the weather in Paris", final=False)
+    # the recognizer revised its hypothesis
+    prefetcher.observe("what's the weather in Paris Texas or Austin", final=False)
+    assert started == ["Paris"]
+
+    prefetcher.observe("what's the weather in Austin", final=False)
+    prefetcher.observe("weather in Tokyo", final=True)
+    assert started == ["Paris", "Austin", "Tokyo"]
+
+    prefetcher.observe("weather in Tokyo", final=True)
+    assert started == ["Paris", "Austin", "Tokyo"]
+
+
+def test_entities_are_looked_up_again_after_the_ttl() -> None:
+    started: list[str] = []
+
+    def _prefetch(entity: str) -> bool:
+        started.append(entity)
+        return True
+
+    prefetcher = Prefetcher({"city": (extract_cities, _prefetch)}, ttl=0.05)
+    prefetcher.observe("weather in Tokyo", final=True)
+    prefetcher.observe("and Tokyo tomorrow?", final=True)
+    assert started == ["Tokyo"]
+
+    time.sleep(0.05)
+    prefetcher.observe("Tokyo again, please", final=True)
+    assert started == ["Tokyo", "Tokyo"]
+    assert prefetcher.fired == {("city", "Tokyo")}
+
+
+async def test_prefetched_lookups_are_counted() -> None:
+    async with FakeBackend(profile=LatencyProfile(first_delay=0.05)) as backend:
+        runtime = ToolRuntime(base_url=backend.url)
+
+        @runtime.tool(fallback="unavailable")
+        async def fetch_weather(location: str) -> str:
+            return (await runtime.get_json("/weather", location=location))["summary"]
+
+        assert fetch_weather.prefetch("Tokyo")
+        assert fetch_weather.prefetch("Paris")
+        assert not fetch_weather.prefetch("tokyo")  # already in flight
+        await fetch_weather("Tokyo")  # joins the request in flight
+        await asyncio.sleep(0.1)
+        await runtime.aclose()
+
+    stats = runtime.stats["fetch_weather"]
+    assert backend.num_requests == 2
+    assert stats.prefetched == 2
+    assert stats.prefetch_hits == 1
+    assert stats.prefetch_waste == 0.5
+
+
+async def test_order_tool_uses_the_prefetched_lookup() -> None:
+    lookups = Lookups()
+    build_prefetcher(lookups).observe(
+        "my order number is 112 7890123 4567890", final=True
+    )
+
+    fake = FakeLLM(
+        [
+            llm.FunctionToolCall(
+                name="lookup_order",
+                arguments='{"order_number": "112-7890123-4567890"}',
+                call_id="1",
+            ),
+            "Your AirPods were delivered yesterday.",
+        ],
+        profile=LatencyProfile(),
+    )
+    async with AgentSession(llm=fake) as session:
+        await session.start(Assistant(lookups=lookups))
+        result = await session.run(user_input="Where is my order?")
+        result.expect.next_event().is_function_call(name="lookup_order")
+        result.expect.next_event().is_function_call_output()
+
+    assert lookups.runtime.stats["fetch_order"].prefetch_hits == 1
+
+
+async def test_each_call_closes_only_its_own_lookups() -> None:
+    async with FakeBackend(profile=LatencyProfile(first_delay=0.05)) as backend:
+        ending = Lookups(ToolRuntime(base_url=backend.url))
+        ongoing = Lookups(ToolRuntime(base_url=backend.url))
+        await ending.fetch_weather("Paris")
+        lookup = asyncio.create_task(ongoing.fetch_weather("Tokyo"))
+        await asyncio.sleep(0.01)
+
+        await ending.aclose()
+        assert await lookup == "sunny with a temperature of 70 degrees."
+        await ongoing.aclose()
@@ -0,0 +1,98 @@
+from livekit.agents import AgentSession, llm
+
+from agent import PROMPT, Assistant
+from fakes import FakeLLM, LatencyProfile
+from prompt import (
+    ConversationState,
+    PromptAssembler,
+    SectionRule,
+    estimate_tokens,
+    parse_sections,
+)
+
+DOC = """<Core>
+Be brief.
+</Core>
+
+<Refunds>
+Refunds take three to five days.
+</Refunds>
+
+<Escalation>
+Offer a supervisor.
+</Escalation>"""
+
+
+def _assembler(budget: int = 1000) -> PromptAssembler:
+    return PromptAssembler(
+        DOC,
+        core=["Core"],
+        rules={
+            "Refunds": SectionRule(keywords=[r"refund"], priority=1),
+            "Escalation": SectionRule(keywords=[r"supervisor", r"refund"], priority=2),
+        },
+        budget_tokens=budget,
+    )
+
+
+def test_parse_sections_keeps_order_and_tags() -> None:
+    sections = parse_sections(DOC)
+    assert list(sections) == ["Core", "Refunds", "Escalation"]
+    assert sections["Core"] == "<Core>\nBe brief.\n</Core>"
+
+
+def test_sections_follow_the_conversation() -> None:
+    assembler = _assembler()
+    assert assembler.assemble(ConversationState("hello", 1)).sections == []
+    prompt = assembler.assemble(ConversationState("where is my refund", 1))
+    # document order, not priority order
+    assert prompt.sections == ["Refunds", "Escalation"]
+    assert prompt.tokens == estimate_tokens(assembler.core) + sum(
+        estimate_tokens(parse_sections(DOC)[name]) for name in prompt.sections
+    )
+
+
+def test_budget_drops_low_priority_sections() -> None:
+    core = estimate_tokens(parse_sections(DOC)["Core"])
+    escalation = estimate_tokens(parse_sections(DOC)["Escalation"])
+    assembler = _assembler(budget=core + escalation)
+
+    prompt = assembler.assemble(ConversationState("refund please", 1))
+    assert prompt.sections == ["Escalation"]
+    assert prompt.tokens <= assembler.budget_tokens
+
+
+def test_apply_keeps_the_core_as_first_system_message() -> None:
+    chat_ctx = llm.ChatContext()
+    chat_ctx.add_message(role="system", content=_assembler().core)
+    chat_ctx.add_message(role="user", content="I need a supervisor")
+
+    applied = _assembler().apply(chat_ctx)
+    assert applied.items[0].text_content == _assembler().core
+    assert applied.items[1].role == "system"
+    assert "<Escalation>" in applied.items[1].text_content
+    assert len(chat_ctx.items) == 2  # the agent's own context is untouched
+
+
+def test_persona_core_fits_the_budget() -> None:
+    assert estimate_tokens(PROMPT.core) < PROMPT.budget_tokens
+    assert "<DemoScriptExamples>" not in PROMPT.core
+    assert "<PerformanceMetrics>" not in PROMPT.core
+
+
+async def test_assistant_sends_sections_for_the_turn() -> None:
+    seen: list[llm.ChatContext] = []
+
+    def _respond(chat_ctx: llm.ChatContext) -> str:
+        seen.append(chat_ctx)
+        return "I can help with that refund."
+
+    fake = FakeLLM(_respond, profile=LatencyProfile())
+    async with AgentSession(llm=fake) as session:
+        await session.start(Assistant())
+        await session.run(user_input="Hi, I'd like a refund for my Prime order.")
+
+    system = [i.text_content for i in seen[-1].items if i.role == "system"]
+    assert system[0] == PROMPT.core
+    assert "<AmazonSpecificKnowledge>" in system[1]
+    assert "<PerformanceMetrics>" not in "".join(system)
@@ -0,0 +1,174 @@
+from typing import Any
+
+from livekit import rtc
+from livekit.agents import AgentFalseInterruptionEvent, llm
+from livekit.agents.voice.io import PlaybackFinishedEvent
+
+from speech_buffer import SpeechBuffer
+
+TEXT = "Your AirPods were delivered yesterday. Is there anything else?"
+
+
+def _frames(n: int) -> list[rtc.AudioFrame]:
+    # 100 ms each, the index in the first sample to tell them apart
+    return [
+        rtc.AudioFrame(
+            data=i.to_bytes(2, "little") * 2400,
+            sample_rate=24000,
+            num_channels=1,
+            samples_per_channel=2400,
+        )
+        for i in range(n)
+    ]
+
+
+class _Output:
+    def __init__(self) -> None:
+        self.handlers: dict[str, Any] = {}
+
+    def on(self, event: str, callback: Any) -> None:
+        self.handlers[event] = callback
+
+
+class _Session:
+    """Records how a false interruption was handled."""
+
+    def __init__(self) -> None:
+        self.handlers: dict[str, Any] = {}
+        self.output = type("_Outputs", (), {"audio": _Output()})()
+        self.history = llm.ChatContext()
+        self.said: list[tuple[str, list[rtc.AudioFrame]]] = []
+        self.regenerated = 0
+        self._pending: list[Any] = []
+
+    def on(self, event: str, callback: Any) -> None:
+        self.handlers[event] = callback
+
+    def say(self, text: str, *, audio: Any) -> None:
+        self._pending.append((text, audio))
+
+    def generate_reply(self) -> None:
+        self.regenerated += 1
+
+    async def played(self) -> list[tuple[str, list[rtc.AudioFrame]]]:
+        for text, audio in self._pending:
+            self.said.append((text, [frame async for frame in audio]))
+        self._pending.clear()
+        return self.said
+
+    def interrupt(self, position: float, transcript: str | None) -> None:
+        self.output.audio.handlers["playback_finished"](
+            PlaybackFinishedEvent(
+                playback_position=position,
+                interrupted=True,
+                synchronized_transcript=transcript,
+            )
+        )
+
+    def false_interruption(self, *, resumed: bool = False) -> None:
+        self.handlers["agent_false_interruption"](
+            AgentFalseInterruptionEvent(resumed=resumed)
+        )
+
+
+async def _spoken(buffer: SpeechBuffer, text: str = TEXT, frames: int = 30) -> None:
+    async def _text():
+        for word in text.split(" "):
+            yield word + " "
+
+    recording = buffer.record()
+    async for _ in recording.tee(_text()):
+        pass
+    for frame in _frames(frames):
+        recording.add_frame(frame)
+    recording.finish()
+
+
+def _buffer(**kwargs: Any) -> tuple[SpeechBuffer, _Session]:
+    buffer = SpeechBuffer(**kwargs)
+    session = _Session()
+    buffer.attach(session)  # type: ignore[arg-type]
+    return buffer, session
+
+
+async def test_remainder_is_replayed_from_the_buffer() -> None:
+    buffer, session = _buffer(rewind=0.3)
+    await _spoken(buffer)
+    session.interrupt(1.25, "Your AirPods were")
+    session.false_interruption()
+
+    [(text, frames)] = await session.played()
+    assert text == "delivered yesterday. Is there anything else?"
+    # from the frame playing 0.3 s before the interruption
+    assert frames[0].data[0] == 9
+    assert len(frames) == 21
+    assert session.regenerated == 0
+
+    # the resumed rest can be cut off and resumed again
+    session.interrupt(0.5, "delivered yesterday.")
+    session.false_interruption()
+    assert (await session.played())[-1][0] == "Is there anything else?"
+    assert buffer.summary()["replayed"] == 2
+
+
+async def test_paused_output_resumes_in_place() -> None:
+    buffer, session = _buffer()
+    await _spoken(buffer)
+    session.false_interruption(resumed=True)
+
+    assert await session.played() == []
+    assert session.regenerated == 0
+    assert buffer.summary() == {
+        "false_interruptions": 1,
+        "resumed": 1,
+        "replayed": 0,
+        "regenerated": 0,
+        "resume_rate": 1.0,
+    }
+
+
+async def test_regenerates_when_the_user_spoke_since() -> None:
+    buffer, session = _buffer()
+    await _spoken(buffer)
+    session.interrupt(1.0, "Your AirPods")
+    session.history.add_message(role="user", content="wait, which order?")
+    session.false_interruption()
+
+    assert await session.played() == []
+    assert session.regenerated == 1
+
+
+async def test_regenerates_expired_or_incomplete_utterances() -> None:
+    buffer, session = _buffer(ttl=0.0)
+    await _spoken(buffer)
+    session.interrupt(1.0, "Your AirPods")
+    session.false_interruption()
+    assert session.regenerated == 1
+
+    buffer, session = _buffer(max_audio=2.0)
+    await _spoken(buffer)  # 3 s of audio
+    session.interrupt(1.0, "Your AirPods")
+    session.false_interruption()
+    assert session.regenerated == 1
+    assert buffer.summary()["resume_rate"] == 0.0
+
+
+async def test_other_playback_is_not_mistaken_for_the_reply() -> None:
+    buffer, session = _buffer()
+    await _spoken(buffer)
+    session.interrupt(0.4, "One moment please.")  # a filler clip
+    session.false_interruption()
+
+    assert await session.played() == []
+    assert session.regenerated == 1
+
+
+async def test_regenerates_without_a_synchronized_transcript() -> None:
+    buffer, session = _buffer()
+    await _spoken(buffer)
+    session.interrupt(1.0, "Your AirPods")
+    session.interrupt(0.4, None)  # e.g. a clip on an output without transcripts
+    session.false_interruption()
+
+    assert await session.played() == []
+    assert session.regenerated == 1
@@ -0,0 +1,104 @@
+import logging
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import startup
+from startup import (
+    StartupTimeline,
+    WorkerLifecycle,
+    lazy_import,
+    load_timeline,
+    plugins_deferred,
+    print_timeline,
+)
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+
+
+def test_lazy_module_imports_on_first_use(tmp_path, monkeypatch) -> None:
+    (tmp_path / "slow_plugin.py").write_text("VALUE = 42\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setattr(startup, "_timeline", StartupTimeline())
+
+    module = lazy_import("slow_plugin")
+    assert "slow_plugin" not in sys.modules
+    assert module.VALUE == 42
+    assert "slow_plugin" in sys.modules
+    assert lazy_import("slow_plugin") is sys.modules["slow_plugin"]
+
+    record = startup.get_timeline().phase("import slow_plugin")
+    assert record is not None and record["seconds"] >= 0
+    monkeypatch.delitem(sys.modules, "slow_plugin")
+
+
+def test_agent_import_leaves_job_plugins_to_the_jobs() -> None:
+    code = (
+        "import sys, agent, startup; "
+        "print([m for m in startup.PLUGINS if m in sys.modules])"
+    )
+    env = {**os.environ, "PYTHONPATH": str(SRC), "LIVEKIT_URL": "ws://localhost"}
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert out.stdout.strip().splitlines()[-1] == "[]"
+
+
+def test_plugins_are_deferred_only_for_start_with_job_processes(monkeypatch) -> None:
+    assert not plugins_deferred(["agent.py", "start"], thread_jobs=False)
+    monkeypatch.setenv("LAZY_PLUGINS", "1")
+    assert plugins_deferred(["agent.py", "start"], thread_jobs=False)
+    assert not plugins_deferred(["agent.py", "start"], thread_jobs=True)
+    assert not plugins_deferred(["agent.py", "console"], thread_jobs=False)
+
+
+def test_worker_records_become_one_timeline(tmp_path, caplog, capsys) -> None:
+    path = tmp_path / "startup.jsonl"
+    worker = StartupTimeline("worker", str(path))
+    lifecycle = WorkerLifecycle(worker)
+    livekit_logger = logging.getLogger("livekit.agents")
+    livekit_logger.addFilter(lifecycle)
+    caplog.set_level(logging.INFO)
+    try:
+        worker.mark("imports done")
+        livekit_logger.info("starting worker")
+        livekit_logger.info(
+            "process initialized",
+            extra={"pid": 11, "inference": True, "elapsed_time": 2.5},
+        )
+        with StartupTimeline("job", str(path)).span("prewarm"):
+            pass
+        livekit_logger.info("process initialized", extra={"pid": 12, "elapsed_time": 3})
+        livekit_logger.info("process initialized", extra={"pid": 13, "elapsed_time": 3})
+        livekit_logger.info("registered worker")
+    finally:
+        livekit_logger.removeFilter(lifecycle)
+
+    records = load_timeline(path)
+    phases = [r["phase"] for r in records]
+    assert phases == [
+        "imports done",
+        "worker starting",
+        "inference process ready",
+        "prewarm",
+        "job process ready",
+        "first idle process",
+        "job process ready",
+        "worker registered",
+    ]
+    assert records[2]["child_pid"] == 11 and records[2]["seconds"] == 2.5
+    summary = lifecycle.summary()
+    assert None not in summary.values()
+    assert summary["imports"] <= summary["first_idle"] <= summary["registered"]
+    assert [r.getMessage() for r in caplog.records].count("worker startup") == 1
+
+    print_timeline(records)
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == len(records)
+    assert float(lines[0].split()[0]) >= 0
+    assert lines[-1].split()[-2:] == ["worker", "registered"]
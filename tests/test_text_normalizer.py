@@ -0,0 +1,133 @@
+import random
+
+import pytest
+
+from text_normalizer import (
+    StreamingNormalizer,
+    cardinal,
+    normalize,
+    normalize_stream,
+    ordinal,
+)
+
+# (LLM text, what the TTS gets)
+CORPUS = [
+    (
+        "Your order 112-7890123-4567890 has shipped.",
+        "Your order one one two, seven eight nine zero one two three, "
+        "four five six seven eight nine zero has shipped.",
+    ),
+    (
+        "The refund of $29.99 is on its way.",
+        "The refund of twenty-nine dollars and ninety-nine cents is on its way.",
+    ),
+    (
+        "That's $1, $0.50 or $1,299.",
+        "That's one dollar, fifty cents or "
+        "one thousand two hundred ninety-nine dollars.",
+    ),
+    (
+        "It arrives March 15, 2024 by 8 PM.",
+        "It arrives March fifteenth, twenty twenty-four by eight PM.",
+    ),
+    ("Delivered on 3/5/2025.", "Delivered on March fifth, twenty twenty-five."),
+    ("Ordered Dec. 3rd, I see.", "Ordered December third, I see."),
+    ("Between 9:05 a.m. and 10:00.", "Between nine oh five AM and ten o'clock."),
+    ("Expect 3-5 business days.", "Expect three to five business days."),
+    (
+        "Call 1-888-280-4331 anytime.",
+        "Call one, eight eight eight, two eight zero, four three three one anytime.",
+    ),
+    (
+        "Your confirmation code is XK7-42QF.",
+        "Your confirmation code is X K seven, four two Q F.",
+    ),
+    ("Ship it to 98109, please.", "Ship it to nine eight one zero nine, please."),
+    (
+        "You saved 20% or 2.5% more.",
+        "You saved twenty percent or two point five percent more.",
+    ),
+    (
+        "Prime since 2019, your 21st order!",
+        "Prime since twenty nineteen, your twenty-first order!",
+    ),
+    (
+        "We have 1,250,000 items & more, e.g. at help@amazon.com.",
+        "We have one million two hundred fifty thousand items and more, "
+        "for example at help at amazon.com.",
+    ),
+    (
+        "Returns via USPS or UPS, item #4.",
+        "Returns via United States Postal Service or UPS, item number four.",
+    ),
+    (
+        "We shipped 1234 items in 2024, out of 2019.",
+        "We shipped one thousand two hundred thirty-four items in twenty "
+        "twenty-four, out of two thousand nineteen.",
+    ),
+    ("No numbers here, just words.", "No numbers here, just words."),
+    ("Try a 4K TV or v2.", "Try a 4K TV or v2."),
+]
+
+
+@pytest.mark.parametrize(("text", "spoken"), CORPUS)
+def test_corpus(text: str, spoken: str) -> None:
+    assert normalize(text) == spoken
+    # already spoken text stays as it is
+    assert normalize(spoken) == spoken
+
+
+def test_number_words() -> None:
+    assert cardinal(0) == "zero"
+    assert cardinal(115) == "one hundred fifteen"
+    assert cardinal(2_000_040) == "two million forty"
+    assert ordinal(12) == "twelfth"
+    assert ordinal(40) == "fortieth"
+    assert ordinal(103) == "one hundred third"
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_streaming_matches_whole_text(seed: int) -> None:
+    rng = random.Random(seed)
+    text = " ".join(text for text, _ in CORPUS)
+    expected = normalize(text)
+
+    normalizer = StreamingNormalizer()
+    out, position = [], 0
+    while position < len(text):
+        size = rng.randint(1, 8)  # like LLM tokens
+        out.append(normalizer.push(text[position : position + size]))
+        position += size
+    out.append(normalizer.flush())
+    assert "".join(out) == expected
+
+
+def test_only_the_word_being_written_is_held_back() -> None:
+    normalizer = StreamingNormalizer()
+    assert normalizer.push("Sure, your refund") == "Sure, your "
+    assert normalizer.push(" of $29") == "refund of "
+    assert normalizer.push(".99 was issued.") == (
+        "twenty-nine dollars and ninety-nine cents was issued."
+    )
+    # a date waits for its year
+    assert normalizer.push(" It ships March 5") == " It ships "
+    assert normalizer.push(", 2026") == ""
+    assert normalizer.push(" by noon") == "March fifth, twenty twenty-six by "
+    assert normalizer.flush() == "noon"
+    # and a bare year for the word before it
+    assert normalizer.push("Prime since ") == "Prime "
+    assert normalizer.push("2019. Thanks") == "since twenty nineteen. "
+
+
+async def test_normalize_stream() -> None:
+    async def _reply():
+        for chunk in ["Order 112-", "7890123-4567890", " costs $5."]:
+            yield chunk
+
+    chunks = [chunk async for chunk in normalize_stream(_reply())]
+    assert chunks == [
+        "Order ",
+        "one one two, seven eight nine zero one two three, four five six seven "
+        "eight nine zero costs ",
+        "five dollars.",  # "$5." could still become "$5.99"
+    ]
@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from fakes import FakeBackend, LatencyProfile
+from tool_runtime import ToolRuntime, normalize_arg
+
+
+def _weather_tool(runtime: ToolRuntime, **options):
+    @runtime.tool(fallback="The weather service is not responding.", **options)
+    async def lookup_weather(location: str) -> str:
+        weather = await runtime.get_json("/weather", location=location)
+        return weather["summary"]
+
+    return lookup_weather
+
+
+def test_arguments_are_normalized() -> None:
+    assert normalize_arg("  New   York ") == normalize_arg("new york")
+    assert normalize_arg({"ids": ["A1", 2]}) == {"ids": ["a1", 2]}
+
+
+async def test_repeated_lookups_hit_the_cache() -> None:
+    async with FakeBackend(profile=LatencyProfile()) as backend:
+        runtime = ToolRuntime(base_url=backend.url)
+        lookup_weather = _weather_tool(runtime)
+
+        for location in ["Tokyo", " tokyo", "Paris", "TOKYO"]:
+            assert await lookup_weather(location) == (
+                "sunny with a temperature of 70 degrees."
+            )
+        await runtime.aclose()
+
+    assert backend.num_requests == 2
+    assert runtime.stats["lookup_weather"].hit_rate == 0.5
+
+
+async def test_concurrent_lookups_share_one_request() -> None:
+    async with FakeBackend(profile=LatencyProfile(first_delay=0.05)) as backend:
+        runtime = ToolRuntime(base_url=backend.url)
+        lookup_weather = _weather_tool(runtime)
+
+        await asyncio.gather(*(lookup_weather("Tokyo") for _ in range(5)))
+        await runtime.aclose()
+
+    assert backend.num_requests == 1
+
+
+async def test_deadline_returns_the_fallback_and_late_result_is_cached() -> None:
+    async with FakeBackend(stall_rate=1.0, stall_delay=0.2) as backend:
+        runtime = ToolRuntime(base_url=backend.url)
+        lookup_weather = _weather_tool(runtime, timeout=0.05)
+
+        assert await lookup_weather("Tokyo") == "The weather service is not responding."
+        await asyncio.sleep(0.3)
+        assert (
+            await lookup_weather("Tokyo") == "sunny with a temperature of 70 degrees."
+        )
+        await runtime.aclose()
+
+    assert backend.num_requests == 1
+    assert runtime.stats["lookup_weather"].timeouts == 1
+
+
+async def test_failures_are_not_cached() -> None:
+    runtime = ToolRuntime()
+    calls = 0
+
+    @runtime.tool(fallback="unavailable")
+    async def lookup_order(order_id: str) -> str:
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise RuntimeError("backend down")
+        return "delivered"
+
+    with pytest.raises(RuntimeError):
+        await lookup_order("112-7890123-4567890")
+    assert await lookup_order("112-7890123-4567890") == "delivered"
+    assert calls == 2
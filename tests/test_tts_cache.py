@@ -0,0 +1,141 @@
+import threading
+import time
+
+from fakes import FakeTTS, LatencyProfile
+from tts_cache import CachedTTS, PhraseCache, normalize_text, phrase_key
+
+GREETING = "Thank you for calling Amazon Customer Service. My name is Riya."
+VOICE = {"language": "en-US", "gender": "female", "speaking_rate": 1.1}
+
+
+async def _speak(tts: CachedTTS, text: str) -> tuple[bytes, float]:
+    started = time.perf_counter()
+    first_frame_at = None
+    pcm = b""
+    async with tts.stream() as stream:
+        stream.push_text(text)
+        stream.end_input()
+        async for ev in stream:
+            first_frame_at = first_frame_at or time.perf_counter()
+            pcm += bytes(ev.frame.data)
+    return pcm, first_frame_at - started
+
+
+def test_phrase_key_normalizes_text_but_not_voice() -> None:
+    assert normalize_text("  Hello\n  there ") == "Hello there"
+    assert phrase_key("Hello  there", VOICE) == phrase_key("Hello there ", VOICE)
+    assert phrase_key("Hello there", VOICE) != phrase_key(
+        "Hello there", {**VOICE, "speaking_rate": 1.0}
+    )
+
+
+def test_memory_tier_is_bounded_lru() -> None:
+    cache = PhraseCache(max_memory_bytes=10)
+    cache.put("a", b"12345")
+    cache.put("b", b"12345")
+    assert cache.get("a") == b"12345"  # a is now the most recently used
+    cache.put("c", b"12345")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"12345"
+    assert cache.get("c") == b"12345"
+
+
+def test_disk_tier_is_shared_between_instances(tmp_path) -> None:
+    PhraseCache(tmp_path).put("key", b"\x01\x02" * 100)
+
+    other = PhraseCache(tmp_path)
+    pcm = other.get("key")
+    assert pcm == b"\x01\x02" * 100
+    assert other.hits == 1
+    # the LRU holds the mapped file, not a copy; a rewrite doesn't change it
+    assert isinstance(pcm, memoryview) and other.get("key") is pcm
+    PhraseCache(tmp_path).put("key", b"\x03\x04" * 100)
+    assert pcm == b"\x01\x02" * 100
+
+
+def test_prune_keeps_disk_tier_within_budget(tmp_path) -> None:
+    cache = PhraseCache(tmp_path, max_disk_bytes=250)
+    for i in range(5):
+        cache.put(f"{i:02d}", bytes(100))
+    cache.prune()
+
+    assert sum(p.stat().st_size for p in tmp_path.glob("*/*.pcm")) <= 250
+
+
+def test_writes_prune_at_most_once_per_interval(tmp_path) -> None:
+    cache = PhraseCache(tmp_path, max_disk_bytes=250, prune_interval=3600)
+    for i in range(5):
+        cache.put(f"{i:02d}", bytes(100))
+    assert len(list(tmp_path.glob("*/*.pcm"))) == 5
+
+    cache = PhraseCache(tmp_path, max_disk_bytes=250, prune_interval=0)
+    cache.put("05", bytes(100))
+    assert sum(p.stat().st_size for p in tmp_path.glob("*/*.pcm")) <= 250
+
+
+async def test_disk_tier_is_used_off_the_event_loop(tmp_path, monkeypatch) -> None:
+    threads = []
+    for name in ("_read_disk", "_write_disk"):
+        original = getattr(PhraseCache, name)
+
+        def _record(self, *args, _original=original):
+            threads.append(threading.current_thread())
+            return _original(self, *args)
+
+        monkeypatch.setattr(PhraseCache, name, _record)
+
+    inner = FakeTTS(profile=LatencyProfile())
+    first, _ = await _speak(
+        CachedTTS(inner, voice=VOICE, cache=PhraseCache(tmp_path)), GREETING
+    )
+    fresh = CachedTTS(inner, voice=VOICE, cache=PhraseCache(tmp_path))
+    assert (await _speak(fresh, GREETING))[0] == first
+
+    assert len(threads) == 6  # a miss and a write, then a hit, per sentence
+    assert threading.current_thread() not in threads
+
+
+async def test_cached_phrases_skip_the_provider(tmp_path) -> None:
+    inner = FakeTTS(profile=LatencyProfile(first_delay=0.2))
+    tts = CachedTTS(inner, voice=VOICE, cache=PhraseCache(tmp_path))
+
+    first, first_ttfb = await _speak(tts, GREETING)
+    requests = inner.num_requests
+    second, second_ttfb = await _speak(tts, GREETING)
+
+    assert requests == 2  # one provider request per sentence
+    assert inner.num_requests == requests
+    assert second == first
+    assert first_ttfb >= 0.2
+    assert second_ttfb < 0.05
+
+    # another process plays the phrases from the mapped files
+    fresh = CachedTTS(inner, voice=VOICE, cache=PhraseCache(tmp_path))
+    assert (await _speak(fresh, GREETING))[0] == first
+    assert inner.num_requests == requests
+    assert (fresh.model, fresh.provider) == ("unknown", inner.label)
+
+
+async def test_cache_key_includes_the_output_format(tmp_path) -> None:
+    cache = PhraseCache(tmp_path)
+    await _speak(
+        CachedTTS(FakeTTS(profile=LatencyProfile()), voice=VOICE, cache=cache), GREETING
+    )
+
+    other = FakeTTS(profile=LatencyProfile(), sample_rate=16000)
+    await _speak(CachedTTS(other, voice=VOICE, cache=cache), GREETING)
+    assert other.num_requests == 2
+
+
+async def test_only_provider_characters_are_counted(tmp_path) -> None:
+    inner = FakeTTS(profile=LatencyProfile())
+    tts = CachedTTS(inner, voice=VOICE, cache=PhraseCache(tmp_path))
+    collected = []
+    tts.on("metrics_collected", collected.append)
+
+    await _speak(tts, GREETING)  # miss, synthesized by the provider
+    await _speak(tts, GREETING)  # hit, no provider request
+
+    assert sum(m.characters_count for m in collected) == len(GREETING) - 1
+    assert {m.label for m in collected} == {inner.label}
@@ -0,0 +1,110 @@
+import asyncio
+import random
+import time
+
+import pytest
+
+from fakes import FakeTTS, LatencyProfile
+from tts_cache import CachedTTS, PhraseCache
+from tts_chunking import AdaptiveChunker, ChunkPolicy
+
+VOICE = {"language": "en-US", "gender": "female", "speaking_rate": 1.1}
+OPENER = "I'm sorry to hear that, Sarah. Let me look into this right away."
+APOLOGY = (
+    "I'm so sorry about that, I know how frustrating a late delivery can be. "
+    "Let me check where it is."
+)
+
+
+def test_first_clause_is_cut_early_then_sentences() -> None:
+    chunker = AdaptiveChunker()
+    assert chunker.tokenize(OPENER) == [
+        "I'm sorry to hear that,",
+        "Sarah. Let me look into this right away.",  # short sentences are joined
+    ]
+    # short openers are a chunk on their own, commas before enough words are not
+    assert chunker.tokenize("Sure, I can check. Your package arrives Monday.") == [
+        "Sure, I can check.",
+        "Your package arrives Monday.",
+    ]
+
+
+def test_conjunction_and_limits() -> None:
+    chunker = AdaptiveChunker()
+    assert chunker.tokenize(
+        "I can see the order here and it shipped yesterday from Seattle."
+    ) == ["I can see the order here", "and it shipped yesterday from Seattle."]
+
+    # too late for an early cut, the first chunk ends with its sentence
+    late = (
+        "Your order of the blue running shoes in size ten from last Tuesday "
+        "morning is delayed, sorry. It arrives Friday."
+    )
+    assert chunker.tokenize(late)[0].endswith("delayed, sorry.")
+
+    sentences = AdaptiveChunker(ChunkPolicy(first_min_words=0))
+    assert sentences.tokenize(OPENER) == [
+        "I'm sorry to hear that, Sarah.",
+        "Let me look into this right away.",
+    ]
+
+
+@pytest.mark.parametrize("seed", range(4))
+async def test_stream_cuts_like_tokenize(seed: int) -> None:
+    rng = random.Random(seed)
+    text = (
+        f"{OPENER} Your order 112-7890123-4567890 shipped, it arrives Monday. "
+        "Mr. Patel at the depot confirmed it! Is there anything else I can help "
+        "you with today? " + "Thanks for your patience " * 15 + "and goodbye."
+    )
+    chunker = AdaptiveChunker()
+    stream = chunker.stream()
+    position = 0
+    while position < len(text):
+        size = rng.randint(1, 12)
+        stream.push_text(text[position : position + size])
+        position += size
+    stream.end_input()
+
+    chunks = [data.token async for data in stream]
+    assert chunks == chunker.tokenize(text)
+    assert all(len(chunk) <= chunker.policy.max_chars for chunk in chunks)
+
+
+async def _first_audio(tts: CachedTTS) -> float:
+    started = time.perf_counter()
+    async with tts.stream() as stream:
+
+        async def _llm() -> None:
+            for word in APOLOGY.split(" "):
+                stream.push_text(word + " ")
+                await asyncio.sleep(0.02)
+            stream.end_input()
+
+        task = asyncio.create_task(_llm())
+        async for _ in stream:
+            first = time.perf_counter() - started
+            break
+        await task
+    return first
+
+
+async def test_first_audio_starts_before_the_sentence_is_written(tmp_path) -> None:
+    def _tts(tokenizer=None) -> CachedTTS:
+        inner = FakeTTS(profile=LatencyProfile(first_delay=0.05))
+        return CachedTTS(
+            inner, voice=VOICE, cache=PhraseCache(tmp_path), tokenizer=tokenizer
+        )
+
+    by_sentence = await _first_audio(_tts())
+    adaptive = _tts(AdaptiveChunker())
+    early = await _first_audio(adaptive)
+
+    # the first clause is 5 words in, the first sentence 14
+    assert early < by_sentence - 0.1
+    first = adaptive.chunk_timings[0]
+    assert (first.index, first.chars, first.cached) == (0, 24, False)
+    assert 0.05 <= first.ttfb < 0.1
+    summary = adaptive.chunk_summary()
+    assert summary["first_chunk_chars"] == 24
+    assert summary["first_audio_ms"] < by_sentence * 1000
@@ -0,0 +1,177 @@
+import sqlite3
+
+import pytest
+from livekit.agents import AgentSession, metrics
+
+from export_pipeline import ExportPipeline
+from fakes import FakeTTS, LatencyProfile
+from tts_cache import CachedTTS, PhraseCache
+from usage_store import PRICES, UsageStore, main, query_usage, session_models
+
+
+def _llm(speech_id: str, ts: float, prompt: int = 1000, cached: int = 800):
+    return metrics.LLMMetrics(
+        label="livekit.plugins.google.llm.LLM",
+        request_id=speech_id,
+        timestamp=ts,
+        duration=0.5,
+        ttft=0.3,
+        cancelled=False,
+        completion_tokens=100,
+        prompt_tokens=prompt,
+        prompt_cached_tokens=cached,
+        total_tokens=prompt + 100,
+        tokens_per_second=200.0,
+        speech_id=speech_id,
+    )
+
+
+def _stt(ts: float, seconds: float = 60.0):
+    return metrics.STTMetrics(
+        label="livekit.plugins.google.stt.STT",
+        request_id="stt",
+        timestamp=ts,
+        duration=0.0,
+        audio_duration=seconds,
+        streamed=True,
+    )
+
+
+def _tts(speech_id: str, ts: float, characters: int = 1000):
+    return metrics.TTSMetrics(
+        label="livekit.plugins.google.tts.TTS",
+        request_id=speech_id,
+        timestamp=ts,
+        ttfb=0.2,
+        duration=0.5,
+        audio_duration=2.0,
+        cancelled=False,
+        characters_count=characters,
+        streamed=True,
+        speech_id=speech_id,
+    )
+
+
+MODELS = {"llm": "gemini-2.0-flash-001", "stt": None, "tts": None}
+
+
+@pytest.fixture
+def store(tmp_path):
+    pipeline = ExportPipeline()
+    store = UsageStore(tmp_path / "usage.db", pipeline)
+    yield store
+    store.close()
+    pipeline.close()
+
+
+def test_cost_per_call_and_turn(store) -> None:
+    call = store.call("room-1", "job-1", MODELS)
+    for metric in (_llm("s1", 100.0), _tts("s1", 101.0), _stt(102.0)):
+        call.collect(metric)
+    eou = metrics.EOUMetrics(
+        timestamp=103.0,
+        end_of_utterance_delay=0.3,
+        transcription_delay=0.1,
+        on_user_turn_completed_delay=0.0,
+        last_speaking_time=103.0,
+        speech_id="s1",
+    )
+    call.collect(eou)  # not billed, not stored
+    store.close()
+
+    [report] = query_usage(store.path, "calls")
+    assert (report["room"], report["job_id"]) == ("room-1", "job-1")
+    assert report["llm_tokens"] == 1100
+    assert report["stt_seconds"] == 60.0
+    assert report["tts_characters"] == 1000
+    # 200 prompt, 800 cached, 100 completion tokens, one minute of audio, 1000 chars
+    expected = (200 * 0.10 + 800 * 0.025 + 100 * 0.40 + 1000 * 30.0) / 1e6 + 0.016
+    assert report["cost"] == pytest.approx(expected)
+    assert report["unpriced"] == []
+
+    turns = query_usage(store.path, "turns")
+    assert [t["speech_id"] for t in turns] == ["s1", ""]
+    assert store.rows == 3
+
+
+def test_models_and_hours_across_calls(store) -> None:
+    first = store.call("room-1", "job-1", MODELS)
+    second = store.call("room-2", "job-2", {"llm": "some-new-model"})
+    first.collect(_llm("s1", 0.0))
+    first.collect(_llm("s2", 3600.0))
+    second.collect(_llm("s3", 3700.0))
+    store.close()
+
+    models = {(r["kind"], r["model"]): r for r in query_usage(store.path, "models")}
+    assert models[("llm", "gemini-2.0-flash-001")]["llm_tokens"] == 2200
+    assert models[("llm", "some-new-model")]["unpriced"] == ["some-new-model"]
+    assert models[("llm", "some-new-model")]["cost"] == 0.0
+
+    hours = query_usage(store.path, "hours")
+    assert [h["hour"] for h in hours] == ["1970-01-01 00:00", "1970-01-01 01:00"]
+    assert hours[1]["llm_tokens"] == 2200
+    assert [r["room"] for r in query_usage(store.path, "calls", since=3000)] == [
+        "room-1",
+        "room-2",
+    ]
+
+
+def test_rows_are_committed_before_close(store) -> None:
+    # another job process, or whoever reads after this one crashed
+    store.call("room-1", "job-1", MODELS).collect(_llm("s1", 1.0))
+    store._pipeline.flush()
+
+    with sqlite3.connect(store.path) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+        assert conn.execute("SELECT count(*) FROM usage").fetchone() == (1,)
+
+
+def test_processes_share_one_database(tmp_path) -> None:
+    pipelines = [ExportPipeline(), ExportPipeline()]
+    stores = [UsageStore(tmp_path / "usage.db", p) for p in pipelines]
+    for n, store in enumerate(stores):
+        call = store.call(f"room-{n}", f"job-{n}", MODELS)
+        for i in range(100):
+            call.collect(_tts(f"s{i}", float(i)))
+    for store, pipeline in zip(stores, pipelines):
+        store.close()
+        pipeline.close()
+
+    reports = query_usage(tmp_path / "usage.db", "calls")
+    assert [r["tts_characters"] for r in reports] == [100_000, 100_000]
+
+
+def test_cli_prints_the_costs(store, capsys, monkeypatch) -> None:
+    store.call("room-1", "job-1", MODELS).collect(_stt(1.0, seconds=120.0))
+    store.close()
+
+    main(["calls", "--db", str(store.path)])
+    out = capsys.readouterr().out
+    assert "room-1 job-1" in out
+    assert "total" in out and "$0.0320" in out
+
+    # the database the agent writes to is the default
+    monkeypatch.setenv("USAGE_DB_PATH", str(store.path))
+    main(["calls"])
+    assert capsys.readouterr().out == out
+
+
+async def test_cached_tts_is_priced_by_its_provider(store, tmp_path) -> None:
+    inner = FakeTTS(profile=LatencyProfile())
+    inner._label = "livekit.plugins.google.tts.TTS"  # no model name, like Google's
+    tts = CachedTTS(inner, voice={"language": "en-US"}, cache=PhraseCache(tmp_path))
+    async with AgentSession(tts=tts) as session:
+        call = store.call("room-1", "job-1", session_models(session))
+    tts.on("metrics_collected", call.collect)
+
+    async with tts.stream() as stream:
+        stream.push_text("Your refund is on its way.")
+        stream.end_input()
+        async for _ in stream:
+            pass
+    store.close()
+
+    (report,) = query_usage(store.path, "models", prices=PRICES)
+    assert report["model"] == "livekit.plugins.google.tts.TTS"
+    assert not report["unpriced"]
+    assert report["cost"] == pytest.approx(26 * 30.0 / 1e6)
@@ -0,0 +1,145 @@
+import numpy as np
+from livekit import rtc
+from livekit.agents import (
+    AgentSession,
+    MetricsCollectedEvent,
+    UserStateChangedEvent,
+    metrics,
+    vad,
+)
+
+from agent import VAD_OPTIONS
+from fakes import synthetic_speech
+from model_host import shared_vad
+from vad_tuner import EndpointingTuner, ThresholdTuner, TunedVAD, TuningBounds
+
+
+def _eou(speech_id: str) -> MetricsCollectedEvent:
+    return MetricsCollectedEvent(
+        metrics=metrics.EOUMetrics(
+            timestamp=0.0,
+            end_of_utterance_delay=0.5,
+            transcription_delay=0.1,
+            on_user_turn_completed_delay=0.0,
+            last_speaking_time=0.0,
+            speech_id=speech_id,
+        )
+    )
+
+
+class _TurnDetector:
+    def __init__(self, probability: float) -> None:
+        self.probability = probability
+
+    async def unlikely_threshold(self, language: str | None) -> float | None:
+        return 0.1
+
+    async def supports_language(self, language: str | None) -> bool:
+        return True
+
+    async def predict_end_of_turn(self, chat_ctx, *, timeout=None) -> float:
+        return self.probability
+
+
+def test_silence_follows_cut_offs_and_turn_detector() -> None:
+    tuner = ThresholdTuner(0.3, 0.6)
+    for _ in range(3):
+        tuner.observe_eou(0.9)
+        tuner.update()
+    assert tuner.thresholds.min_silence_duration == 0.21
+
+    tuner.cut_off()
+    assert tuner.update().min_silence_duration == 0.31
+    for _ in range(20):
+        tuner.cut_off()
+        tuner.update()
+    assert tuner.thresholds.min_silence_duration == TuningBounds().min_silence[1]
+
+    # an ambiguous pause inside the turn nearly closed it
+    hesitant = ThresholdTuner(0.3, 0.6)
+    hesitant.observe_eou(0.3)
+    hesitant.speech_started()
+    hesitant.observe_eou(0.9)
+    assert hesitant.update().min_silence_duration == 0.35
+
+
+def test_a_pause_predicted_twice_counts_once() -> None:
+    # the final transcript after the VAD end of speech predicts the pause again
+    tuner = ThresholdTuner(0.3, 0.6)
+    tuner.observe_eou(0.3)
+    tuner.observe_eou(0.9)
+    assert tuner.update().min_silence_duration == 0.27
+
+    # the user speaking again after the closing pause starts the next turn clean
+    tuner.speech_started()
+    tuner.observe_eou(0.9)
+    assert tuner.update().min_silence_duration == 0.24
+
+
+def test_threshold_follows_noise_and_false_interruptions() -> None:
+    quiet = ThresholdTuner(0.3, 0.6)
+    for _ in range(50):
+        quiet.observe_noise(-80.0)
+    assert quiet.update().activation_threshold == 0.6
+
+    noisy = ThresholdTuner(0.3, 0.6)
+    for _ in range(50):
+        noisy.observe_noise(-30.0)
+    assert noisy.update().activation_threshold == 0.7
+
+    noisy.false_interruption()
+    assert noisy.update().activation_threshold == 0.75
+    for _ in range(5):
+        noisy.false_interruption()
+    assert noisy.update().activation_threshold == TuningBounds().activation[1]
+
+
+async def test_tuned_vad_keeps_the_shared_options_and_measures_noise() -> None:
+    shared = shared_vad(**VAD_OPTIONS)
+    tuner = ThresholdTuner(0.3, 0.6)
+    tuned = TunedVAD(shared, tuner)
+    tuned.update_options(min_silence_duration=0.5)
+    assert tuned._onnx_session is shared._onnx_session
+    assert shared._opts.min_silence_duration == VAD_OPTIONS["min_silence_duration"]
+
+    rng = np.random.default_rng(0)
+    noise = (rng.normal(0, 0.01 * 32767, 16000)).astype(np.int16)
+    samples = np.concatenate([noise, synthetic_speech(1.0), noise])
+    stream = tuned.stream()
+    for start in range(0, len(samples), 160):
+        chunk = samples[start : start + 160]
+        stream.push_frame(
+            rtc.AudioFrame(chunk.tobytes(), 16000, 1, samples_per_channel=len(chunk))
+        )
+    stream.end_input()
+    events = [ev.type async for ev in stream]
+
+    assert vad.VADEventType.START_OF_SPEECH in events
+    # white noise at 1% of full scale is about -40 dBFS
+    assert tuner.noise_dbfs is not None and -43 < tuner.noise_dbfs < -37
+
+
+async def test_session_events_tune_the_vad_per_turn() -> None:
+    shared = shared_vad(**VAD_OPTIONS)
+    tuner = EndpointingTuner(shared, _TurnDetector(0.3), cut_off_window=60.0)
+
+    async with AgentSession() as session:
+        tuner.attach(session)
+        # two pauses in the turn, the first one was ambiguous
+        assert await tuner.turn_detector.predict_end_of_turn(None) == 0.3
+        tuner.tuner.speech_started()
+        await tuner.turn_detector.predict_end_of_turn(None)
+        session.emit("metrics_collected", _eou("turn-1"))
+        assert tuner.vad._opts.min_silence_duration == 0.35
+
+        # speaking again right after the turn closed is a cut-off
+        session.emit(
+            "user_state_changed",
+            UserStateChangedEvent(old_state="listening", new_state="speaking"),
+        )
+        session.emit("metrics_collected", _eou("turn-2"))
+        assert tuner.vad._opts.min_silence_duration == 0.45
+        assert shared._opts.min_silence_duration == VAD_OPTIONS["min_silence_duration"]
+
+    assert tuner.summary()["turns"] == 2
+    assert tuner.summary()["cut_offs"] == 1
@@ -0,0 +1,141 @@
+import time
+
+from fakes import FakeProviderClient, FakeProviderEndpoint
+from warm_providers import ProviderPool, WarmProvider
+
+
+def _pool(endpoint: FakeProviderEndpoint, **kwargs) -> ProviderPool:
+    return ProviderPool(
+        [
+            WarmProvider(
+                "llm",
+                lambda: FakeProviderClient(endpoint.url),
+                FakeProviderClient.health,
+                FakeProviderClient.warmup,
+            )
+        ],
+        **kwargs,
+    )
+
+
+async def _first_request(client: FakeProviderClient) -> float:
+    started = time.perf_counter()
+    await client.generate()
+    return time.perf_counter() - started
+
+
+async def test_first_request_reuses_the_warm_connection() -> None:
+    async with FakeProviderEndpoint(setup_delay=0.1) as endpoint:
+        cold = _pool(endpoint)
+        cold.create()  # at prewarm, nothing is connected yet
+        assert endpoint.connections == 0
+        cold_first = await _first_request(cold["llm"])
+
+        warm = _pool(endpoint)
+        warm.create()
+        await warm.start()
+        warm_first = await _first_request(warm["llm"])
+
+        assert cold_first >= 0.1 > warm_first
+        # one connection per client, the warm one was opened by the health check
+        assert endpoint.connections == 2
+        assert endpoint.requests == ["/generate", "/health", "/generate"]
+        assert warm.summary()["llm"]["healthy"] is True
+        assert warm.summary()["llm"]["connect_ms"] >= 100
+
+        await cold.aclose()
+        await warm.aclose()
+
+
+async def test_warmup_requests_are_opt_in() -> None:
+    async with FakeProviderEndpoint(setup_delay=0.0) as endpoint:
+        pool = _pool(endpoint, warmup=True)
+        assert await pool.ready(timeout=1.0)
+        assert endpoint.requests == ["/health", "/warmup"]
+        assert pool.summary()["llm"]["warmup_ms"] is not None
+        await pool.aclose()
+
+
+async def test_recently_checked_connections_are_reused() -> None:
+    async with FakeProviderEndpoint(setup_delay=0.0) as endpoint:
+        pool = _pool(endpoint, max_idle=0.2)
+        await pool.connect()
+        client = pool["llm"]
+        await pool.connect()
+        assert endpoint.requests == ["/health"]
+
+        time.sleep(0.2)
+        await pool.connect()
+        assert pool["llm"] is client
+        assert endpoint.requests == ["/health", "/health"]
+        assert endpoint.connections == 1
+        await pool.aclose()
+
+
+async def test_failed_health_check_replaces_the_client() -> None:
+    async with FakeProviderEndpoint(setup_delay=0.0) as endpoint:
+        endpoint.healthy = False
+        pool = _pool(endpoint)
+        assert not await pool.ready(timeout=1.0)  # logged, never raised
+        summary = pool.summary()["llm"]
+        assert summary["healthy"] is False
+        assert "503" in summary["error"]
+        client = pool["llm"]
+
+        endpoint.healthy = True
+        await pool.connect()
+        assert pool["llm"] is not client
+        assert pool.summary()["llm"]["replaced"] == 1
+        assert pool.health["llm"].healthy
+        await pool.aclose()
+
+
+async def test_failed_replacement_is_recorded_and_retried() -> None:
+    async with FakeProviderEndpoint(setup_delay=0.0) as endpoint:
+        broken = False
+
+        def factory() -> FakeProviderClient:
+            if broken:
+                raise RuntimeError("no credentials")
+            return FakeProviderClient(endpoint.url)
+
+        pool = ProviderPool([WarmProvider("llm", factory, FakeProviderClient.health)])
+        endpoint.healthy = False
+        await pool.connect()
+        client = pool["llm"]
+
+        endpoint.healthy, broken = True, True
+        await pool.connect()  # logged, never raised
+        summary = pool.summary()["llm"]
+        assert summary["healthy"] is False
+        assert "no credentials" in summary["error"]
+        assert summary["replaced"] == 0
+
+        broken = False
+        await pool.connect()
+        assert pool["llm"] is not client
+        assert pool.health["llm"].healthy
+        assert pool.summary()["llm"]["checks"] == 3
+        await pool.aclose()
+
+
+def test_clients_are_built_in_parallel() -> None:
+    def slow_client() -> FakeProviderClient:
+        time.sleep(0.2)
+        return FakeProviderClient("http://localhost")
+
+    def no_credentials() -> FakeProviderClient:
+        raise RuntimeError("no credentials")
+
+    pool = ProviderPool(
+        [
+            WarmProvider(name, slow_client, FakeProviderClient.health)
+            for name in ("stt", "llm", "tts")
+        ]
+        + [WarmProvider("broken", no_credentials, FakeProviderClient.health)]
+    )
+    started = time.perf_counter()
+    pool.create(parallel=True)
+    assert time.perf_counter() - started < 0.4
+    assert isinstance(pool["stt"], FakeProviderClient)
+    assert pool.health["broken"].error == "RuntimeError('no credentials')"